@@ -0,0 +1,101 @@
+"""
+Decode time and memory of a large /resources page: the json module into plain
+dicts (what ``response.json()`` does) vs ``_json_body`` with the fastest
+installed decoder (orjson or msgspec), and plain dicts vs slotted models.
+
+Usage:
+    python benchmarks/bench_decode.py [resources]
+"""
+
+import gc
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import worklocal_tools  # noqa: E402
+from worklocal_tools import _Resource, _fast_loads, _typed_body  # noqa: E402
+
+
+def _payload(count):
+    return json.dumps(
+        {
+            "items": [
+                {
+                    "id": f"res-{i:06d}",
+                    "name": f"web-{i:06d}",
+                    "type": ("server", "container", "database")[i % 3],
+                    "status": "running" if i % 7 else "stopped",
+                    "created_at": "2025-01-01T00:00:00Z",
+                    "updated_at": "2025-06-01T12:00:00Z",
+                    "metadata": {"region": ("eu", "us")[i % 2], "tier": "prod"},
+                }
+                for i in range(count)
+            ],
+            "total": count,
+        }
+    ).encode()
+
+
+def _timed(fn, rounds=7):
+    # Like timeit, with the garbage collector off so its pauses don't drown the decoders
+    samples = []
+    gc.disable()
+    try:
+        for _ in range(rounds):
+            start = time.perf_counter()
+            fn()
+            samples.append((time.perf_counter() - start) * 1000)
+    finally:
+        gc.enable()
+    return statistics.median(samples)
+
+
+def _allocated(build):
+    tracemalloc.start()
+    kept = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return size / 1e6
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    body = _payload(count)
+    if worklocal_tools.orjson is not None:
+        decoder = "orjson"
+    elif worklocal_tools.msgspec is not None:
+        decoder = "msgspec"
+    else:
+        decoder = "json (no fast decoder installed)"
+
+    stdlib = _timed(lambda: json.loads(body.decode("utf-8")))
+    fast = _timed(lambda: _fast_loads(body))
+    decoded = _fast_loads(body)
+    typed = _timed(lambda: _typed_body("resources", decoded))
+
+    items = decoded["items"]
+    as_dicts = _allocated(lambda: [dict(item) for item in items])
+    as_models = _allocated(lambda: [_Resource(item) for item in items])
+
+    print(f"{count} resources, {len(body) / 1e6:.1f} MB of JSON")
+    print(f"decode  json.loads (response.json())   {stdlib:8.1f} ms")
+    print(f"decode  {decoder:<30} {fast:8.1f} ms   ({stdlib / fast:.1f}x)")
+    print(
+        f"build   slotted models                 {typed:8.1f} ms   "
+        f"({1000 * typed / count:.2f} us per resource)"
+    )
+    print(f"memory  dicts                          {as_dicts:8.1f} MB")
+    print(
+        f"memory  slotted models                 {as_models:8.1f} MB   "
+        f"({100 * (1 - as_models / as_dicts):.0f}% less)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""
+Cost of loading the tool, each round in a fresh interpreter: importing the
+module (timed with ``python -X importtime``), the first ``Tools()`` and a
+repeated one, the setup on first use (config parsing and the shared client),
+plus compiling and running the module from its source, which is how OpenWebUI
+loads a tool.
+
+The medians over ``--rounds`` are checked against budgets, and so is the list
+of heavy dependencies (requests, httpx, asyncio, ...) that importing and
+instantiating the tool must leave unloaded; any breach is reported and the
+script exits with status 1, so it can gate CI.
+
+Usage:
+    python benchmarks/bench_import.py [--class Tools] [--rounds 7] [--top 8]
+        [--import-budget 60] [--instantiate-budget 25] [--source-budget 300]
+"""
+
+import argparse
+import json
+import os
+import py_compile
+import statistics
+import subprocess
+import sys
+
+SRC = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+MODULE = os.path.join(SRC, "worklocal_tools.py")
+
+# Loaded on first use only; none may be imported by loading the tool
+HEAVY = (
+    "requests",
+    "urllib3",
+    "httpx",
+    "httpcore",
+    "asyncio",
+    "orjson",
+    "msgspec",
+    "sqlite3",
+    "h2",
+)
+
+# Milliseconds (medians)
+BUDGETS = {"import_ms": 60.0, "instantiate_ms": 25.0, "source_ms": 300.0}
+
+_IMPORT = """
+import json, sys, time
+sys.path.insert(0, {src!r})
+start = time.perf_counter()
+import worklocal_tools
+imported = time.perf_counter()
+loaded = [m for m in {heavy!r} if m in sys.modules]
+worklocal_tools.{cls}()
+first = time.perf_counter()
+tools = worklocal_tools.{cls}()
+again = time.perf_counter()
+tools._client
+print(json.dumps({{
+    "instantiate_ms": (first - imported) * 1000,
+    "again_ms": (again - first) * 1000,
+    "setup_ms": (time.perf_counter() - again) * 1000,
+    "loaded_at_import": loaded,
+    "loaded_by_instance": [m for m in {heavy!r} if m in sys.modules and m not in loaded],
+}}))
+"""
+
+_SOURCE = """
+import json, sys, time, types
+start = time.perf_counter()
+with open({path!r}, encoding="utf-8") as f:
+    code = compile(f.read(), {path!r}, "exec")
+compiled = time.perf_counter()
+module = types.ModuleType("worklocal_tools_from_source")
+module.__file__ = {path!r}
+exec(code, module.__dict__)
+print(json.dumps({{"compile_ms": (compiled - start) * 1000, "source_ms": (time.perf_counter() - start) * 1000}}))
+"""
+
+
+def _importtime(stderr):
+    """(name, self us, cumulative us) rows from ``-X importtime`` output, nesting kept in the name."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:") :].split("|")
+        rows.append((name.rstrip(), int(own), int(cumulative)))
+    return rows
+
+
+def _run(code, env):
+    child = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+    return json.loads(child.stdout), _importtime(child.stderr)
+
+
+def measure(tools_class="Tools"):
+    """
+    One fresh-interpreter round: import and instantiation times, the heavy
+    modules loaded along the way, and the modules the import pulled in as
+    (name, self ms) pairs, costliest first.
+    """
+    # Time the import against an up-to-date bytecode cache, as a server would
+    py_compile.compile(MODULE)
+    env = {k: v for k, v in os.environ.items() if k != "PYTHONDONTWRITEBYTECODE"}
+    run, rows = _run(_IMPORT.format(src=SRC, heavy=HEAVY, cls=tools_class), env)
+    # Everything listed before the module's own top-level row was imported by it
+    for index, (name, own, cumulative) in enumerate(rows):
+        if name.strip() == "worklocal_tools" and not name.startswith(" " * 2):
+            run["import_ms"] = cumulative / 1000
+            run["modules"] = sorted(
+                (
+                    (n.strip(), us / 1000)
+                    for n, us, _ in rows[_top_level_before(rows, index) : index + 1]
+                ),
+                key=lambda row: -row[1],
+            )
+            break
+    source, _ = _run(_SOURCE.format(path=MODULE), env)
+    run.update(source)
+    return run
+
+
+def _top_level_before(rows, index):
+    """Index just after the last top-level import that precedes ``rows[index]``."""
+    for previous in range(index - 1, -1, -1):
+        if not rows[previous][0].startswith("  "):
+            return previous + 1
+    return 0
+
+
+def summarize(runs):
+    """Medians of the timings of ``runs``, and every heavy module any of them loaded."""
+    summary = {
+        key: statistics.median(run[key] for run in runs)
+        for key in (
+            "import_ms",
+            "instantiate_ms",
+            "again_ms",
+            "setup_ms",
+            "compile_ms",
+            "source_ms",
+        )
+    }
+    summary["loaded"] = sorted(
+        {m for run in runs for m in run["loaded_at_import"] + run["loaded_by_instance"]}
+    )
+    return summary
+
+
+def breaches(summary, budgets=BUDGETS):
+    """Human-readable budget violations of ``summary``; empty when it is within budget."""
+    found = [
+        f"{key} {summary[key]:.1f} ms over its {budget:g} ms budget"
+        for key, budget in budgets.items()
+        if summary[key] > budget
+    ]
+    if summary["loaded"]:
+        found.append(f"loading the tool imported {', '.join(summary['loaded'])}")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure how long loading the WorkLocal tool takes."
+    )
+    parser.add_argument(
+        "--class", dest="tools_class", default="Tools", choices=("Tools", "AsyncTools")
+    )
+    parser.add_argument(
+        "--rounds", type=int, default=7, help="fresh interpreters to measure"
+    )
+    parser.add_argument(
+        "--top", type=int, default=8, help="costliest imported modules to list"
+    )
+    parser.add_argument(
+        "--import-budget", type=float, default=BUDGETS["import_ms"], help="ms"
+    )
+    parser.add_argument(
+        "--instantiate-budget", type=float, default=BUDGETS["instantiate_ms"], help="ms"
+    )
+    parser.add_argument(
+        "--source-budget", type=float, default=BUDGETS["source_ms"], help="ms"
+    )
+    args = parser.parse_args()
+
+    runs = [measure(args.tools_class) for _ in range(args.rounds)]
+    summary = summarize(runs)
+    print(f"median of {args.rounds} fresh interpreters, {args.tools_class}")
+    print(f"import worklocal_tools                {summary['import_ms']:8.1f} ms")
+    print(f"first {args.tools_class + '()':<31} {summary['instantiate_ms']:8.2f} ms")
+    print(f"next {args.tools_class + '()':<32} {summary['again_ms']:8.3f} ms")
+    print(f"setup on first use (config, client)    {summary['setup_ms']:8.2f} ms")
+    print(
+        f"from source (compile + run, OpenWebUI) {summary['source_ms']:7.1f} ms   "
+        f"(compile {summary['compile_ms']:.1f} ms)"
+    )
+    print("costliest modules pulled in by the import (self time):")
+    for name, ms in runs[-1]["modules"][: args.top]:
+        print(f"  {name:<34} {ms:8.2f} ms")
+
+    problems = breaches(
+        summary,
+        {
+            "import_ms": args.import_budget,
+            "instantiate_ms": args.instantiate_budget,
+            "source_ms": args.source_budget,
+        },
+    )
+    for problem in problems:
+        print(f"OVER BUDGET: {problem}")
+    if problems:
+        sys.exit(1)
+    print("within budget")
+
+
+if __name__ == "__main__":
+    main()
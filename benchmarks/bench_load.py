@@ -0,0 +1,283 @@
+"""
+Throughput and p50/p99 latency of each tool across concurrency levels, against
+the local stub server.
+
+Each tool is called in a closed loop by ``concurrency`` workers (threads for
+Tools, tasks for AsyncTools with --async) for ``--duration`` seconds. The stub
+options inject latency, 5xx errors and 429s, and set the inventory size.
+
+Save a run with --save and compare later runs against it with --baseline; any
+tool whose throughput drops or whose p99 grows by more than --tolerance is
+reported and the script exits with status 1, so it can gate CI.
+
+Usage:
+    python benchmarks/bench_load.py [--tools health,list,get,search,metrics,action,batch_get]
+        [--concurrency 1,8,32] [--duration 3] [--async] [--no-cache]
+        [--save results.json] [--baseline results.json] [--tolerance 0.25]
+        [stub options, see stub_server.py --help]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from stub_server import start_stub_server, stub_arguments, stub_options  # noqa: E402
+from worklocal_tools import AsyncTools, Tools, _load_config  # noqa: E402
+
+# Each scenario takes (tools, rng, inventory size) and returns the tool call
+# (a string for Tools, an awaitable for AsyncTools).
+SCENARIOS = {
+    "health": lambda tools, rng, n: tools.worklocal_health_check(),
+    "list": lambda tools, rng, n: tools.worklocal_list_resources(
+        limit=50, offset=rng.randrange(max(n - 50, 1))
+    ),
+    "get": lambda tools, rng, n: tools.worklocal_get_resource(
+        f"res-{rng.randint(1, n)}"
+    ),
+    "search": lambda tools, rng, n: tools.worklocal_search_resources(
+        f"-{rng.randint(0, 9)}", limit=20
+    ),
+    "metrics": lambda tools, rng, n: tools.worklocal_get_metrics(
+        f"res-{rng.randint(1, n)}"
+    ),
+    "action": lambda tools, rng, n: tools.worklocal_execute_action(
+        f"res-{rng.randint(1, n)}", "restart"
+    ),
+    "batch_get": lambda tools, rng, n: tools.worklocal_batch_get_resources(
+        json.dumps([f"res-{rng.randint(1, n)}" for _ in range(10)])
+    ),
+}
+
+
+def _failed(result):
+    return result.startswith(("❌", "⚠️"))
+
+
+def _percentile(samples, fraction):
+    return samples[min(int(len(samples) * fraction), len(samples) - 1)]
+
+
+def _stats(tool, concurrency, elapsed, samples, errors):
+    samples.sort()
+    return {
+        "tool": tool,
+        "concurrency": concurrency,
+        "calls": len(samples),
+        "throughput": len(samples) / elapsed,
+        "p50_ms": _percentile(samples, 0.50) if samples else 0.0,
+        "p99_ms": _percentile(samples, 0.99) if samples else 0.0,
+        "errors": errors,
+    }
+
+
+def run_threads(tools, tool, concurrency, duration, inventory, seed=0):
+    """Call one tool from ``concurrency`` threads for ``duration`` seconds."""
+    call = SCENARIOS[tool]
+    samples, errors = [], []
+    deadline = time.perf_counter() + duration
+
+    def worker(index):
+        rng = random.Random(seed + index)
+        local, failed = [], 0
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            result = call(tools, rng, inventory)
+            local.append((time.perf_counter() - start) * 1000)
+            failed += _failed(result)
+        samples.extend(local)
+        errors.append(failed)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return _stats(
+        tool, concurrency, time.perf_counter() - started, samples, sum(errors)
+    )
+
+
+async def run_tasks(tools, tool, concurrency, duration, inventory, seed=0):
+    """Call one AsyncTools tool from ``concurrency`` tasks for ``duration`` seconds."""
+    call = SCENARIOS[tool]
+    samples, errors = [], []
+    deadline = time.perf_counter() + duration
+
+    async def worker(index):
+        rng = random.Random(seed + index)
+        failed = 0
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            result = await call(tools, rng, inventory)
+            samples.append((time.perf_counter() - start) * 1000)
+            failed += _failed(result)
+        errors.append(failed)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return _stats(
+        tool, concurrency, time.perf_counter() - started, samples, sum(errors)
+    )
+
+
+def regressions(results, baseline, tolerance, floor_ms=1.0):
+    """
+    Rows of ``results`` that are worse than the matching ``baseline`` row.
+
+    A row regresses when its throughput falls, or its p99 rises, by more than
+    ``tolerance`` (a fraction); p99 changes under ``floor_ms`` are noise.
+    """
+    before = {(row["tool"], row["concurrency"]): row for row in baseline}
+    worse = []
+    for row in results:
+        base = before.get((row["tool"], row["concurrency"]))
+        if base is None:
+            continue
+        slower = row["throughput"] < base["throughput"] * (1 - tolerance)
+        p99 = row["p99_ms"] > max(
+            base["p99_ms"] * (1 + tolerance), base["p99_ms"] + floor_ms
+        )
+        if slower or p99:
+            worse.append((row, base))
+    return worse
+
+
+def _config_file(base_url, pool_size, cache, transport=None):
+    # JSON is valid YAML, so the tools load this like any config.yaml
+    config = {
+        "api": {"base_url": base_url},
+        "pool": {"connections": pool_size, "maxsize": pool_size},
+        "cache": {} if cache else {"max_entries": 0},
+        "transport": transport or {},
+    }
+    handle, path = tempfile.mkstemp(suffix=".yaml")
+    with os.fdopen(handle, "w") as f:
+        json.dump(config, f)
+    return path
+
+
+def _print_row(row):
+    print(
+        f"{row['tool']:<10} {row['concurrency']:>5} {row['calls']:>8} {row['throughput']:>10.1f} "
+        f"{row['p50_ms']:>9.2f} {row['p99_ms']:>9.2f} {row['errors']:>7}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Load-test the WorkLocal tools against the stub server."
+    )
+    parser.add_argument(
+        "--tools", default=",".join(SCENARIOS), help="comma-separated scenarios"
+    )
+    parser.add_argument(
+        "--concurrency", default="1,8,32", help="comma-separated worker counts"
+    )
+    parser.add_argument(
+        "--duration", type=float, default=3.0, help="seconds per tool and level"
+    )
+    parser.add_argument(
+        "--async", dest="use_async", action="store_true", help="load AsyncTools instead"
+    )
+    parser.add_argument(
+        "--no-cache",
+        dest="cache",
+        action="store_false",
+        help="disable the response cache",
+    )
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare against results saved with --save")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.25, help="allowed regression (fraction)"
+    )
+    stub_arguments(parser)
+    args = parser.parse_args()
+
+    tools_wanted = args.tools.split(",")
+    unknown = [tool for tool in tools_wanted if tool not in SCENARIOS]
+    if unknown:
+        parser.error(
+            f"unknown tools: {', '.join(unknown)} (choose from {', '.join(SCENARIOS)})"
+        )
+    levels = [int(level) for level in args.concurrency.split(",")]
+
+    server, base_url = start_stub_server(**stub_options(args))
+    config_path = _config_file(base_url, max(levels), args.cache)
+    os.environ["WORKLOCAL_CONFIG"] = config_path
+    _load_config.cache_clear()
+    results = []
+    try:
+        print(
+            f"{args.resources} resources at {base_url}, latency {args.latency * 1000:g} ms, "
+            f"errors {args.error_rate:.0%}, 429s {args.throttle_rate:.0%}, "
+            f"{'AsyncTools' if args.use_async else 'Tools'}, cache {'on' if args.cache else 'off'}"
+        )
+        print(
+            f"{'tool':<10} {'conc':>5} {'calls':>8} {'calls/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}"
+        )
+        if args.use_async:
+
+            async def run_all():
+                tools = AsyncTools()
+                try:
+                    for tool in tools_wanted:
+                        for level in levels:
+                            row = await run_tasks(
+                                tools,
+                                tool,
+                                level,
+                                args.duration,
+                                args.resources,
+                                args.seed,
+                            )
+                            _print_row(row)
+                            results.append(row)
+                finally:
+                    await tools._client.aclose()
+
+            asyncio.run(run_all())
+        else:
+            tools = Tools()
+            try:
+                for tool in tools_wanted:
+                    for level in levels:
+                        row = run_threads(
+                            tools, tool, level, args.duration, args.resources, args.seed
+                        )
+                        _print_row(row)
+                        results.append(row)
+            finally:
+                tools._client.close()
+        print(f"stub replies by status: {dict(sorted(server.stub.counts.items()))}")
+    finally:
+        server.shutdown()
+        os.unlink(config_path)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            worse = regressions(results, json.load(f), args.tolerance)
+        for row, base in worse:
+            print(
+                f"REGRESSION {row['tool']} x{row['concurrency']}: "
+                f"{base['throughput']:.1f} -> {row['throughput']:.1f} calls/s, "
+                f"p99 {base['p99_ms']:.2f} -> {row['p99_ms']:.2f} ms"
+            )
+        if worse:
+            sys.exit(1)
+        print(f"no regressions beyond {args.tolerance:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
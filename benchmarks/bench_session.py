@@ -0,0 +1,63 @@
+"""
+Per-call latency of unpooled module-level requests vs the pooled Tools session.
+
+Usage:
+    python benchmarks/bench_session.py [calls]
+"""
+
+import os
+import statistics
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from stub_server import start_stub_server  # noqa: E402
+from worklocal_tools import Tools  # noqa: E402
+
+
+def _timed(fn, calls):
+    samples = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def _report(label, samples):
+    samples = sorted(samples)
+    p99 = samples[int(len(samples) * 0.99) - 1]
+    print(
+        f"{label:<28} mean {statistics.mean(samples):7.3f} ms   "
+        f"p50 {statistics.median(samples):7.3f} ms   p99 {p99:7.3f} ms"
+    )
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    server, base_url = start_stub_server()
+    try:
+        tools = Tools()
+        tools.base_url = tools._client.base_url = base_url
+
+        before = _timed(
+            lambda: requests.get(
+                f"{base_url}/health", headers=tools.headers, timeout=10
+            ),
+            calls,
+        )
+        tools.worklocal_health_check()  # warm the pool
+        after = _timed(tools.worklocal_health_check, calls)
+
+        print(f"{calls} calls to /health against {base_url}")
+        _report("before: requests.get", before)
+        _report("after: pooled session", after)
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+HTTP/1.1 vs HTTP/2, with and without gzip, against the local stub server.
+
+Each transport runs the same closed-loop load as bench_load.py (uncached, so
+every call crosses the wire) and reports throughput, p50/p99 latency, the
+connections the stub accepted and the reply bytes it sent per call. Under
+concurrency HTTP/1.1 opens a connection per in-flight call, while HTTP/2
+multiplexes them all over one; gzip shrinks the large /resources pages.
+
+The HTTP/2 rows need the h2 package (pip install "httpx[http2]") and are
+skipped without it.
+
+Usage:
+    python benchmarks/bench_transport.py [--tools list,get] [--concurrency 1,16,64]
+        [--duration 3] [--async] [stub options, see stub_server.py --help]
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from bench_load import SCENARIOS, _config_file, run_tasks, run_threads  # noqa: E402
+from stub_server import (
+    start_h2_stub_server,
+    start_stub_server,
+    stub_arguments,
+    stub_options,
+)  # noqa: E402
+from worklocal_tools import AsyncTools, Tools, _load_config  # noqa: E402
+
+# name -> (HTTP/2, stub gzips replies of at least this many bytes)
+TRANSPORTS = {
+    "http/1.1": (False, None),
+    "http/1.1+gzip": (False, 1024),
+    "http/2": (True, None),
+    "http/2+gzip": (True, 1024),
+}
+
+
+def run_transport(name, tools_wanted, levels, args):
+    """Load each tool at each level over one transport; returns a row per run."""
+    http2, compress_min_bytes = TRANSPORTS[name]
+    start = start_h2_stub_server if http2 else start_stub_server
+    server, base_url = start(
+        **{**stub_options(args), "compress_min_bytes": compress_min_bytes}
+    )
+    config_path = _config_file(
+        base_url, max(levels), cache=False, transport={"http2": http2}
+    )
+    os.environ["WORKLOCAL_CONFIG"] = config_path
+    _load_config.cache_clear()
+    stub = server.stub
+    rows = []
+    try:
+        for tool in tools_wanted:
+            for level in levels:
+                connections, sent = stub.connections, stub.sent_bytes
+                if args.use_async:
+
+                    async def run():
+                        tools = AsyncTools()
+                        try:
+                            return await run_tasks(
+                                tools,
+                                tool,
+                                level,
+                                args.duration,
+                                args.resources,
+                                args.seed,
+                            )
+                        finally:
+                            await tools._client.aclose()
+
+                    row = asyncio.run(run())
+                else:
+                    tools = Tools()
+                    try:
+                        row = run_threads(
+                            tools, tool, level, args.duration, args.resources, args.seed
+                        )
+                    finally:
+                        tools._client.close()
+                row["transport"] = name
+                row["connections"] = stub.connections - connections
+                row["kb_per_call"] = (
+                    (stub.sent_bytes - sent) / 1024 / max(row["calls"], 1)
+                )
+                rows.append(row)
+                print(
+                    f"{name:<14} {row['tool']:<8} {level:>5} {row['throughput']:>10.1f} "
+                    f"{row['p50_ms']:>9.2f} {row['p99_ms']:>9.2f} {row['connections']:>6} "
+                    f"{row['kb_per_call']:>8.2f} {row['errors']:>7}"
+                )
+    finally:
+        server.shutdown()
+        server.server_close()
+        os.unlink(config_path)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare HTTP/1.1 and HTTP/2, with and without gzip."
+    )
+    parser.add_argument(
+        "--tools", default="list,get", help="comma-separated bench_load scenarios"
+    )
+    parser.add_argument(
+        "--concurrency", default="1,16,64", help="comma-separated worker counts"
+    )
+    parser.add_argument(
+        "--duration", type=float, default=3.0, help="seconds per tool and level"
+    )
+    parser.add_argument(
+        "--async", dest="use_async", action="store_true", help="load AsyncTools instead"
+    )
+    stub_arguments(parser)
+    parser.set_defaults(latency=0.02, resources=1000)
+    args = parser.parse_args()
+
+    tools_wanted = args.tools.split(",")
+    unknown = [tool for tool in tools_wanted if tool not in SCENARIOS]
+    if unknown:
+        parser.error(
+            f"unknown tools: {', '.join(unknown)} (choose from {', '.join(SCENARIOS)})"
+        )
+    levels = [int(level) for level in args.concurrency.split(",")]
+    transports = list(TRANSPORTS)
+    if importlib.util.find_spec("h2") is None:
+        print(
+            'h2 is not installed (pip install "httpx[http2]"); skipping the HTTP/2 rows'
+        )
+        transports = [name for name in transports if not TRANSPORTS[name][0]]
+
+    print(
+        f"{args.resources} resources, latency {args.latency * 1000:g} ms, "
+        f"{'AsyncTools' if args.use_async else 'Tools'}, cache off"
+    )
+    print(
+        f"{'transport':<14} {'tool':<8} {'conc':>5} {'calls/s':>10} {'p50 ms':>9} {'p99 ms':>9} "
+        f"{'conns':>6} {'KB/call':>8} {'errors':>7}"
+    )
+    for name in transports:
+        run_transport(name, tools_wanted, levels, args)
+
+
+if __name__ == "__main__":
+    main()
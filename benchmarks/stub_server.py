@@ -0,0 +1,539 @@
+"""
+Local stand-in for the WorkLocal Studio API, used by the benchmarks and the
+load tests.
+
+Speaks HTTP/1.1 with keep-alive so pooled clients can reuse connections (or
+HTTP/2 over cleartext with --http2, which needs the h2 package), and serves a
+generated inventory with real paging and search so tools do the same work they
+would against the real API. Latency, 5xx errors and 429 throttling can be
+injected per request to see how the tools behave under load; replies can be
+gzipped and gzipped request bodies are accepted.
+
+Usage:
+    python benchmarks/stub_server.py [--port 8765] [--http2] [--resources 10000]
+        [--latency 0.02] [--jitter 0.01] [--error-rate 0.01]
+        [--throttle-rate 0.05] [--retry-after 0.1] [--job-duration 1.0]
+        [--compress-min-bytes 1024]
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+_TYPES = ("server", "container", "database", "storage")
+_METRICS = ("cpu", "memory", "network", "disk")
+
+
+class StubState:
+    """
+    Inventory, injected faults and request counters shared by every handler thread.
+
+    Args:
+        resources (int): Size of the generated inventory
+        latency (float): Seconds added to every reply
+        jitter (float): Extra random delay, uniform in ``[0, jitter]`` seconds
+        error_rate (float): Fraction of API requests answered with a 500
+        throttle_rate (float): Fraction of API requests answered with a 429
+        retry_after (float): ``Retry-After`` seconds sent with each 429
+        job_duration (float): Seconds before a job started with
+            ``Prefer: respond-async`` reports success
+        compress_min_bytes (int): Gzip replies of at least this many bytes
+            to clients that accept gzip (None: never compress)
+        seed (int): Seed for fault injection, so runs are repeatable
+    """
+
+    def __init__(
+        self,
+        resources: int = 100,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        retry_after: float = 0.0,
+        job_duration: float = 0.0,
+        compress_min_bytes: Optional[int] = None,
+        seed: int = 0,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.job_duration = job_duration
+        self.compress_min_bytes = compress_min_bytes
+        self.inventory: List[Dict[str, Any]] = [_resource(i) for i in range(resources)]
+        self.by_id = {resource["id"]: resource for resource in self.inventory}
+        self.jobs: Dict[str, float] = {}
+        self.counts: Dict[int, int] = {}
+        self.connections = 0
+        self.sent_bytes = 0
+        self.gzipped_requests = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def fault(self) -> Tuple[Optional[int], float]:
+        """Pick this request's injected status (None for a normal reply) and delay."""
+        with self._lock:
+            roll = self._random.random()
+            delay = self.latency + (
+                self._random.uniform(0, self.jitter) if self.jitter else 0.0
+            )
+        if roll < self.throttle_rate:
+            return 429, delay
+        if roll < self.throttle_rate + self.error_rate:
+            return 500, delay
+        return None, delay
+
+    def start_job(self) -> str:
+        with self._lock:
+            job_id = f"job-{len(self.jobs) + 1}"
+            self.jobs[job_id] = time.monotonic() + self.job_duration
+        return job_id
+
+    def connected(self) -> None:
+        with self._lock:
+            self.connections += 1
+
+    def respond(
+        self, method: str, target: str, headers: Dict[str, str], body: bytes
+    ) -> Tuple[int, Dict[str, str], bytes]:
+        """
+        Answer one request, whatever protocol it came in on.
+
+        Args:
+            method (str): HTTP method
+            target (str): Path and query string
+            headers (dict): Request headers, with lower-case names
+            body (bytes): Request body as sent (gzipped if Content-Encoding says so)
+
+        Returns:
+            tuple: Status, reply headers and reply body
+        """
+        if headers.get("content-encoding") == "gzip":
+            body = gzip.decompress(body)
+            with self._lock:
+                self.gzipped_requests += 1
+        url = urlsplit(target)
+        parts = [part for part in url.path.split("/") if part]
+        status, reply, extra = self._route(
+            method, parts, parse_qs(url.query), headers, body
+        )
+        payload = (
+            reply.encode() if isinstance(reply, str) else json.dumps(reply).encode()
+        )
+        reply_headers = {"Content-Type": "application/json", **extra}
+        gzipped = (
+            self.compress_min_bytes is not None
+            and len(payload) >= self.compress_min_bytes
+            and "gzip" in headers.get("accept-encoding", "")
+        )
+        if gzipped:
+            payload = gzip.compress(payload)
+            reply_headers["Content-Encoding"] = "gzip"
+        with self._lock:
+            self.counts[status] = self.counts.get(status, 0) + 1
+            self.sent_bytes += len(payload)
+        return status, reply_headers, payload
+
+    def _route(
+        self,
+        method: str,
+        parts: List[str],
+        query: Dict[str, List[str]],
+        headers: Dict[str, str],
+        body: bytes,
+    ) -> Tuple[int, Any, Dict[str, str]]:
+        status, delay = self.fault()
+        if delay:
+            time.sleep(delay)
+        # /health is never faulted
+        if status == 429 and parts != ["health"]:
+            return (
+                429,
+                {"error": "rate limited"},
+                {"Retry-After": f"{self.retry_after:g}"},
+            )
+        if status is not None and parts != ["health"]:
+            return status, {"error": "injected failure"}, {}
+        if method == "GET":
+            return self._get(parts, query)
+        if method == "POST":
+            return self._post(parts, headers, body)
+        if method == "PATCH":
+            resource = self.by_id.get(parts[1]) if len(parts) == 2 else None
+            if resource is None:
+                return 404, {"error": "not found"}, {}
+            return 200, {**resource, **json.loads(body or b"{}")}, {}
+        if method == "DELETE":
+            return 204, "", {}
+        return 405, {"error": "method not allowed"}, {}
+
+    def _get(
+        self, parts: List[str], query: Dict[str, List[str]]
+    ) -> Tuple[int, Any, Dict[str, str]]:
+        if parts == ["health"]:
+            return 200, "OK", {}
+        if parts == ["resources"]:
+            items = self.inventory
+            for field in ("type", "status"):
+                if field in query:
+                    items = [r for r in items if r[field] == query[field][0]]
+            return 200, _page(items, query), {}
+        if parts == ["resources", "search"]:
+            needle = query.get("q", [""])[0].lower()
+            items = [
+                r for r in self.inventory if needle in r["name"] or needle == r["id"]
+            ]
+            if "type" in query:
+                items = [r for r in items if r["type"] == query["type"][0]]
+            return 200, _page(items, query), {}
+        if len(parts) == 2 and parts[0] == "resources":
+            resource = self.by_id.get(parts[1])
+            if resource is None:
+                return 404, {"error": "not found"}, {}
+            return 200, resource, {}
+        if len(parts) == 3 and parts[0] == "resources" and parts[2] == "metrics":
+            if parts[1] not in self.by_id:
+                return 404, {"error": "not found"}, {}
+            wanted = query.get("type", ["all"])[0]
+            names = _METRICS if wanted == "all" else (wanted,)
+            return 200, {name: _metric(parts[1], name) for name in names}, {}
+        if len(parts) == 2 and parts[0] == "jobs":
+            done_at = self.jobs.get(parts[1])
+            if done_at is None:
+                return 404, {"error": "not found"}, {}
+            if time.monotonic() >= done_at:
+                return (
+                    200,
+                    {"id": parts[1], "status": "succeeded", "message": "done"},
+                    {},
+                )
+            return 200, {"id": parts[1], "status": "running"}, {}
+        return 404, {"error": "not found"}, {}
+
+    def _post(
+        self, parts: List[str], headers: Dict[str, str], body: bytes
+    ) -> Tuple[int, Any, Dict[str, str]]:
+        if parts == ["resources"]:
+            fields = json.loads(body or b"{}")
+            return (
+                201,
+                {
+                    "id": "res-new",
+                    "name": fields.get("name"),
+                    "type": fields.get("type"),
+                },
+                {},
+            )
+        if len(parts) == 3 and parts[0] == "resources" and parts[2] == "actions":
+            if parts[1] not in self.by_id:
+                return 404, {"error": "not found"}, {}
+            if "respond-async" in headers.get("prefer", ""):
+                job_id = self.start_job()
+                return (
+                    202,
+                    {"job_id": job_id, "status": "pending"},
+                    {"Location": f"/jobs/{job_id}"},
+                )
+            return 200, {"id": parts[1], "message": "ok"}, {}
+        return 404, {"error": "not found"}, {}
+
+
+def _resource(i: int) -> Dict[str, Any]:
+    kind = _TYPES[i % len(_TYPES)]
+    return {
+        "id": f"res-{i + 1}",
+        "name": f"{kind}-{i + 1:05d}",
+        "type": kind,
+        "status": "stopped" if i % 7 == 6 else "running",
+        "created_at": "2025-01-01T00:00:00Z",
+        "updated_at": "2025-06-01T12:00:00Z",
+        "metadata": {"region": ("eu-west", "us-east")[i % 2], "tier": "prod"},
+    }
+
+
+def _metric(resource_id: str, name: str) -> Dict[str, float]:
+    base = (sum(map(ord, resource_id + name)) % 80) + 5
+    return {
+        "current": base,
+        "average": base - 2,
+        "max": base + 10,
+        "min": max(base - 5, 0),
+    }
+
+
+def _page(items: List[Dict[str, Any]], query: Dict[str, List[str]]) -> Dict[str, Any]:
+    offset = int(query.get("offset", ["0"])[0])
+    limit = int(query.get("limit", [str(len(items))])[0])
+    return {"items": items[offset : offset + limit], "total": len(items)}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without this, keep-alive
+    # connections stall on delayed ACKs.
+    disable_nagle_algorithm = True
+
+    @property
+    def state(self) -> StubState:
+        return self.server.stub  # type: ignore[attr-defined]
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def setup(self) -> None:
+        super().setup()
+        self.state.connected()
+
+    def _handle(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        headers = {name.lower(): value for name, value in self.headers.items()}
+        status, reply_headers, payload = self.state.respond(
+            self.command, self.path, headers, body
+        )
+        self.send_response(status)
+        for name, value in reply_headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = do_POST = do_PATCH = do_DELETE = _handle
+
+
+def start_stub_server(
+    host: str = "127.0.0.1", port: int = 0, **options: Any
+) -> Tuple[ThreadingHTTPServer, str]:
+    """
+    Start the stub server on a background thread.
+
+    Args:
+        host (str): Interface to bind
+        port (int): Port to bind (0 picks a free one)
+        **options: ``StubState`` settings (``resources``, ``latency``,
+            ``error_rate``, ``throttle_rate``, ...); ``server.stub`` holds the
+            state, including per-status reply counts, connections accepted and
+            bytes sent
+
+    Returns:
+        tuple: The server (call ``shutdown()`` when done) and its base URL
+    """
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    server.daemon_threads = True
+    server.stub = StubState(**options)  # type: ignore[attr-defined]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+class _H2Protocol(asyncio.Protocol):
+    """One HTTP/2 connection; each stream is answered on a worker thread so slow replies don't block the others."""
+
+    def __init__(self, state: StubState, executor: ThreadPoolExecutor):
+        import h2.config
+        import h2.connection
+
+        self.state = state
+        self.executor = executor
+        self.conn = h2.connection.H2Connection(
+            config=h2.config.H2Configuration(client_side=False, header_encoding="utf-8")
+        )
+        self.streams: Dict[int, Tuple[Dict[str, str], bytearray]] = {}
+        self.window = asyncio.Event()
+
+    def connection_made(self, transport: Any) -> None:
+        self.transport = transport
+        self.state.connected()
+        self.conn.initiate_connection()
+        self.transport.write(self.conn.data_to_send())
+
+    def data_received(self, data: bytes) -> None:
+        import h2.events
+        import h2.exceptions
+
+        try:
+            events = self.conn.receive_data(data)
+        except h2.exceptions.ProtocolError:
+            self.transport.write(self.conn.data_to_send())
+            self.transport.close()
+            return
+        for event in events:
+            if isinstance(event, h2.events.RequestReceived):
+                self.streams[event.stream_id] = (dict(event.headers), bytearray())
+            elif isinstance(event, h2.events.DataReceived):
+                self.streams[event.stream_id][1].extend(event.data)
+                self.conn.acknowledge_received_data(
+                    event.flow_controlled_length, event.stream_id
+                )
+            elif isinstance(event, h2.events.StreamEnded):
+                headers, body = self.streams.pop(event.stream_id)
+                asyncio.ensure_future(
+                    self._reply(event.stream_id, headers, bytes(body))
+                )
+            elif isinstance(event, h2.events.WindowUpdated):
+                self.window.set()
+                self.window = asyncio.Event()
+            elif isinstance(event, h2.events.ConnectionTerminated):
+                self.transport.close()
+        self.transport.write(self.conn.data_to_send())
+
+    async def _reply(
+        self, stream_id: int, headers: Dict[str, str], body: bytes
+    ) -> None:
+        import h2.exceptions
+
+        loop = asyncio.get_running_loop()
+        status, reply_headers, payload = await loop.run_in_executor(
+            self.executor,
+            self.state.respond,
+            headers[":method"],
+            headers[":path"],
+            headers,
+            body,
+        )
+        fields = [(":status", str(status)), ("content-length", str(len(payload)))]
+        fields += [(name.lower(), value) for name, value in reply_headers.items()]
+        try:
+            self.conn.send_headers(stream_id, fields, end_stream=not payload)
+            self.transport.write(self.conn.data_to_send())
+            while payload:
+                window = self.conn.local_flow_control_window(stream_id)
+                if window < 1:
+                    await self.window.wait()
+                    continue
+                size = min(window, len(payload), self.conn.max_outbound_frame_size)
+                self.conn.send_data(
+                    stream_id, payload[:size], end_stream=size == len(payload)
+                )
+                self.transport.write(self.conn.data_to_send())
+                payload = payload[size:]
+        except h2.exceptions.ProtocolError:
+            pass  # The client reset the stream or closed the connection
+
+
+class H2StubServer:
+    """The stub over cleartext HTTP/2 (h2c, prior knowledge), served from a background event loop."""
+
+    def __init__(self, host: str, port: int, state: StubState):
+        self.stub = state
+        # Replies sleep the injected latency on these threads, like the
+        # HTTP/1.1 server's thread per connection.
+        self._executor = ThreadPoolExecutor(max_workers=256)
+        self._loop = asyncio.new_event_loop()
+        self._server = self._loop.run_until_complete(
+            self._loop.create_server(
+                lambda: _H2Protocol(state, self._executor), host, port
+            )
+        )
+        self.server_address = self._server.sockets[0].getsockname()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+
+    def shutdown(self) -> None:
+        def stop() -> None:
+            self._server.close()
+            self._loop.stop()
+
+        self._loop.call_soon_threadsafe(stop)
+        self._thread.join()
+        self._executor.shutdown(wait=False)
+
+    def server_close(self) -> None:
+        self._loop.close()
+
+
+def start_h2_stub_server(
+    host: str = "127.0.0.1", port: int = 0, **options: Any
+) -> Tuple[H2StubServer, str]:
+    """
+    Like ``start_stub_server``, but speaking HTTP/2 without upgrade (h2c).
+
+    Every request a client multiplexes over one connection is answered
+    concurrently, as a real HTTP/2 server would. Needs the ``h2`` package.
+    """
+    server = H2StubServer(host, port, StubState(**options))
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def stub_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the ``StubState`` settings as command-line options."""
+    parser.add_argument("--resources", type=int, default=100, help="inventory size")
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="seconds added to every reply"
+    )
+    parser.add_argument(
+        "--jitter",
+        type=float,
+        default=0.0,
+        help="extra random delay, up to this many seconds",
+    )
+    parser.add_argument(
+        "--error-rate",
+        type=float,
+        default=0.0,
+        help="fraction of requests answered with a 500",
+    )
+    parser.add_argument(
+        "--throttle-rate",
+        type=float,
+        default=0.0,
+        help="fraction of requests answered with a 429",
+    )
+    parser.add_argument(
+        "--retry-after",
+        type=float,
+        default=0.0,
+        help="Retry-After seconds sent with each 429",
+    )
+    parser.add_argument(
+        "--job-duration",
+        type=float,
+        default=0.0,
+        help="seconds before async jobs succeed",
+    )
+    parser.add_argument(
+        "--compress-min-bytes",
+        type=int,
+        default=None,
+        help="gzip replies of at least this many bytes (default: never)",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="seed for fault injection")
+
+
+def stub_options(args: argparse.Namespace) -> Dict[str, Any]:
+    return {
+        "resources": args.resources,
+        "latency": args.latency,
+        "jitter": args.jitter,
+        "error_rate": args.error_rate,
+        "throttle_rate": args.throttle_rate,
+        "retry_after": args.retry_after,
+        "job_duration": args.job_duration,
+        "compress_min_bytes": args.compress_min_bytes,
+        "seed": args.seed,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument(
+        "--http2", action="store_true", help="speak HTTP/2 (h2c) instead of HTTP/1.1"
+    )
+    stub_arguments(parser)
+    args = parser.parse_args()
+    start = start_h2_stub_server if args.http2 else start_stub_server
+    server, url = start(port=args.port, **stub_options(args))
+    print(
+        f"WorkLocal stub listening on {url} ({args.resources} resources, "
+        f"{'HTTP/2' if args.http2 else 'HTTP/1.1'})"
+    )
+    threading.Event().wait()
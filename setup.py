@@ -32,6 +32,19 @@ setup(
         "python-dotenv>=0.19.0",
     ],
     extras_require={
+        "async": [
+            "httpx>=0.24",
+        ],
+        "fast": [
+            "orjson>=3.6",
+        ],
+        "http2": [
+            "httpx[http2]>=0.24",
+        ],
+        "compression": [
+            "brotli>=1.0",
+            "zstandard>=0.18",
+        ],
         "dev": [
             "pytest>=7.0",
             "pytest-cov>=4.0",
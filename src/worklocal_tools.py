@@ -2,136 +2,6256 @@
 WorkLocal Studio Infrastructure API Tools for OpenWebUI
 """
 
-import requests
+import base64
+import bisect
+import contextlib
+import contextvars
+import copy
+import datetime
+import functools
+import gzip
+import hashlib
+import importlib
+import importlib.util
 import json
-from typing import Dict, List, Optional, Any
+import logging
+import math
+import os
+import threading
+import time
+import weakref
+import zlib
+from abc import ABC, abstractmethod
+from array import array
+from collections import OrderedDict, deque
+from collections.abc import Mapping
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Dict,
+    Generator,
+    Iterator,
+    List,
+    Optional,
+    Any,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+)
+
+try:
+    from pydantic import BaseModel, Field
+except ImportError:  # OpenWebUI ships pydantic; without it valves are plain attributes
+
+    class BaseModel:  # type: ignore[no-redef]
+        def __init__(self, **values: Any):
+            for name, value in values.items():
+                setattr(self, name, value)
+
+    def Field(default: Any = None, **_: Any) -> Any:  # type: ignore[no-redef]
+        return default
+
+
+# Heavy dependencies are imported on first use. OpenWebUI imports a tool
+# module every time it loads the tool, and requests, asyncio and httpx alone
+# would cost several times the rest of the module; a call that never needs
+# one (a sync tool never touches asyncio) never pays for it.
+# benchmarks/bench_import.py keeps the cost within budget.
+
+
+class _LazyModule:
+    """
+    Stand-in for a module, imported on first attribute access.
+
+    The module then replaces the stand-in among this module's globals, so
+    later lookups are as fast as with a plain import.
+    """
+
+    def __init__(self, name: str, alias: str):
+        self._name = name
+        self._alias = alias
+
+    def __getattr__(self, attr: str) -> Any:
+        module = importlib.import_module(self._name)
+        globals()[self._alias] = module
+        return getattr(module, attr)
+
+    def __repr__(self) -> str:
+        return f"<lazy module {self._name!r}>"
+
+
+def _lazy(name: str, optional: bool = False) -> Any:
+    """A ``_LazyModule`` for ``name``; for ``optional`` ones, None if it is not installed."""
+    if optional and importlib.util.find_spec(name) is None:
+        return None
+    return _LazyModule(name, name)
+
+
+if TYPE_CHECKING:
+    import asyncio
+    import sqlite3
+
+    import httpx
+    import requests
+else:
+    requests = _lazy("requests")
+    asyncio = _lazy("asyncio")
+    sqlite3 = _lazy("sqlite3")
+    httpx = _lazy("httpx", optional=True)  # Only AsyncTools and transport.http2 need httpx
+orjson = _lazy("orjson", optional=True)  # Optional: faster JSON decoding (see _json_body)
+msgspec = _lazy("msgspec", optional=True)  # Optional: the fast decoder when orjson is not installed
+
+logger = logging.getLogger("worklocal_tools")
+
+
+# Instrumentation. Every worklocal_* call gets a _CallRecord, reachable from the
+# transport layers through a context variable; they add phase timings and
+# counters to it, and the finished record goes to each configured sink.
+
+_current_call: "contextvars.ContextVar[Optional[_CallRecord]]" = contextvars.ContextVar(
+    "worklocal_current_call", default=None
+)
+
+
+# The credentials the current tool call runs with; None for the instance's own
+# (config) credentials. Set by _instrumented from OpenWebUI valves / __user__.
+_current_tenant: "contextvars.ContextVar[Optional[_Tenant]]" = contextvars.ContextVar(
+    "worklocal_current_tenant", default=None
+)
+
+
+class _Tenant:
+    """
+    Per-user credentials layered over a shared client.
+
+    ``id`` is a digest of the credential headers; it partitions the response
+    cache, single-flight keys and rate-limit budgets, so tenants never see
+    each other's data while sharing one connection pool per host.
+    """
+
+    __slots__ = ("headers", "id")
+
+    def __init__(self, headers: Dict[str, str]):
+        self.headers = headers
+        self.id = hashlib.sha256(json.dumps(headers, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def _tenant_id() -> str:
+    tenant = _current_tenant.get()
+    return tenant.id if tenant is not None else ""
+
+
+def _tenant_headers(default: Dict[str, str]) -> Dict[str, str]:
+    tenant = _current_tenant.get()
+    return tenant.headers if tenant is not None else default
+
+
+def _own(component: Any) -> Any:
+    """``component`` (the local index or metrics store) unless the call runs as another tenant."""
+    return component if _current_tenant.get() is None else None
+
+
+# When the current tool call must be done by (a time.monotonic() value), or None.
+# Set by _instrumented from api.deadline and any enclosing deadline() block;
+# every request timeout, retry pause and job wait inside the call is cut to fit.
+_current_deadline: "contextvars.ContextVar[Optional[float]]" = contextvars.ContextVar(
+    "worklocal_current_deadline", default=None
+)
+
+
+@contextlib.contextmanager
+def deadline(seconds: float) -> Iterator[None]:
+    """
+    Give the tool calls made inside the block at most ``seconds`` in total.
+
+    For code that knows its own time budget, e.g. what is left of a chat turn::
+
+        with deadline(8.0):
+            result = tools.worklocal_search_resources("web")
+
+    Nested blocks and ``api.deadline`` can only make the deadline earlier.
+    """
+    at = time.monotonic() + seconds
+    outer = _current_deadline.get()
+    token = _current_deadline.set(at if outer is None else min(outer, at))
+    try:
+        yield
+    finally:
+        _current_deadline.reset(token)
+
+
+@functools.lru_cache(maxsize=None)
+def _deadline_exceeded() -> Type[Exception]:
+    """
+    The ``_DeadlineExceeded`` error class. It subclasses requests' Timeout, so
+    it is defined on first use rather than at import (see ``_LazyModule``).
+    """
+
+    class _DeadlineExceeded(requests.exceptions.Timeout):
+        """Raised instead of sending a request once the call's deadline has passed."""
+
+    _DeadlineExceeded.__qualname__ = "_DeadlineExceeded"
+    return _DeadlineExceeded
+
+
+def _remaining() -> Optional[float]:
+    """Seconds left before the current call's deadline, or None without one."""
+    at = _current_deadline.get()
+    return None if at is None else at - time.monotonic()
+
+
+def _until_deadline(seconds: float) -> float:
+    """``seconds`` cut to the time left before the deadline (0 once it has passed)."""
+    remaining = _remaining()
+    return seconds if remaining is None else max(min(seconds, remaining), 0.0)
+
+
+def _deadline_timeout(timeout: float) -> float:
+    """``timeout`` cut to the time left before the deadline; raises once it has passed."""
+    remaining = _remaining()
+    if remaining is None:
+        return timeout
+    if remaining <= 0:
+        _count("deadline_exceeded")
+        raise _deadline_exceeded()(
+            "The deadline for this call passed before the WorkLocal API answered"
+        )
+    return min(timeout, remaining)
+
+
+class _CallRecord:
+    """
+    Timings and counters for one tool invocation.
+
+    Phases: ``queue`` (waiting on the rate limiter), ``server`` (request sent
+    until response headers, including connection setup), ``transfer`` (body
+    download), ``parse`` (JSON decoding) and ``format`` (everything else,
+    chiefly rendering Markdown).
+    """
+
+    __slots__ = (
+        "tool", "start", "duration", "phases", "statuses", "counts",
+        "bytes_in", "bytes_out", "outcome", "_lock",
+    )
+
+    def __init__(self, tool: str):
+        self.tool = tool
+        self.start = time.time()
+        self.duration = 0.0
+        self.phases: Dict[str, float] = {}
+        self.statuses: Dict[int, int] = {}
+        self.counts: Dict[str, int] = {}
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.outcome = "ok"
+        # Batch tools update one record from several worker threads.
+        self._lock = threading.Lock()
+
+    def observe(self, phase: str, seconds: float) -> None:
+        with self._lock:
+            self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + amount
+
+    def response(self, status_code: int, bytes_in: int, bytes_out: int) -> None:
+        with self._lock:
+            self.statuses[status_code] = self.statuses.get(status_code, 0) + 1
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "tool": self.tool,
+            "outcome": self.outcome,
+            "duration_ms": round(self.duration * 1000, 3),
+            "phases_ms": {k: round(v * 1000, 3) for k, v in self.phases.items()},
+            "statuses": {str(k): v for k, v in self.statuses.items()},
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            **self.counts,
+        }
+
+
+def _observe(phase: str, seconds: float) -> None:
+    record = _current_call.get()
+    if record is not None:
+        record.observe(phase, seconds)
+
+
+def _count(name: str, amount: int = 1) -> None:
+    record = _current_call.get()
+    if record is not None:
+        record.count(name, amount)
+
+
+def _body_size(body: Any) -> int:
+    return len(body) if isinstance(body, (bytes, bytearray, str)) else 0
+
+
+def _observe_response(response: Any, seconds: float) -> None:
+    """Split one round trip into server/transfer time and record status and sizes."""
+    record = _current_call.get()
+    if record is None:
+        return
+    try:
+        elapsed = response.elapsed
+    except (AttributeError, RuntimeError):  # httpx: only set once the body is closed
+        elapsed = None
+    server = elapsed.total_seconds() if isinstance(elapsed, datetime.timedelta) else seconds
+    server = min(server, seconds)
+    record.observe("server", server)
+    record.observe("transfer", seconds - server)
+    try:
+        request = response.request
+        # requests.PreparedRequest.body / httpx.Request.content
+        sent = request.body if hasattr(request, "body") else request.content
+    except Exception:  # httpx raises for unread streaming bodies
+        sent = None
+    record.response(
+        response.status_code, _body_size(getattr(response, "content", None)), _body_size(sent)
+    )
+
+
+class _MetricsRegistry:
+    """In-memory counters and latency histograms with a Prometheus text dump."""
+
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+    def __init__(self):
+        self._counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+        self._histograms: Dict[Tuple[Tuple[str, str], ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, amount: float = 1, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, seconds: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            # One slot per bucket, then +Inf, sum and count
+            series = self._histograms.setdefault(key, [0.0] * (len(self.BUCKETS) + 3))
+            for i, bound in enumerate(self.BUCKETS):
+                if seconds <= bound:
+                    series[i] += 1
+            series[-3] += 1
+            series[-2] += seconds
+            series[-1] += 1
+
+    def emit(self, record: _CallRecord) -> None:
+        tool = record.tool
+        self.inc("worklocal_tool_calls_total", tool=tool, outcome=record.outcome)
+        self.observe(record.duration, tool=tool, phase="total")
+        for phase, seconds in record.phases.items():
+            self.observe(seconds, tool=tool, phase=phase)
+        for status, count in record.statuses.items():
+            self.inc("worklocal_http_responses_total", count, tool=tool, status=str(status))
+        self.inc("worklocal_payload_bytes_total", record.bytes_in, tool=tool, direction="in")
+        self.inc("worklocal_payload_bytes_total", record.bytes_out, tool=tool, direction="out")
+        for name, count in record.counts.items():
+            self.inc(f"worklocal_{name}_total", count, tool=tool)
+
+    def value(self, name: str, **labels: str) -> float:
+        with self._lock:
+            return self._counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    def render_text(self) -> str:
+        """Render all series in the Prometheus text exposition format."""
+
+        def fmt(labels: Tuple[Tuple[str, str], ...]) -> str:
+            return ",".join(f'{k}="{v}"' for k, v in labels)
+
+        lines: List[str] = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items())
+        seen = set()
+        for (name, labels), value in counters:
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name}{{{fmt(labels)}}} {value:g}")
+        if histograms:
+            name = "worklocal_tool_phase_seconds"
+            lines.append(f"# TYPE {name} histogram")
+            for labels, series in histograms:
+                label_text = fmt(labels)
+                for bound, cumulative in zip(self.BUCKETS, series):
+                    lines.append(f'{name}_bucket{{{label_text},le="{bound:g}"}} {cumulative:g}')
+                lines.append(f'{name}_bucket{{{label_text},le="+Inf"}} {series[-3]:g}')
+                lines.append(f"{name}_sum{{{label_text}}} {series[-2]:.6f}")
+                lines.append(f"{name}_count{{{label_text}}} {series[-1]:g}")
+        return "\n".join(lines) + "\n"
+
+
+class _LogSink:
+    """Writes one structured (JSON) log line per tool call."""
+
+    def __init__(self, log: logging.Logger = logger, level: int = logging.INFO):
+        self.log = log
+        self.level = level
+
+    def emit(self, record: _CallRecord) -> None:
+        if self.log.isEnabledFor(self.level):
+            self.log.log(self.level, "tool_call %s", json.dumps(record.as_dict(), sort_keys=True))
+
+
+class _SpanSink:
+    """
+    Reports each call as a span through ``hook(name, start, end, attributes)``,
+    with start/end as epoch seconds, e.g. to bridge into a tracing system.
+    """
+
+    def __init__(self, hook: Callable[[str, float, float, Dict[str, Any]], None]):
+        self.hook = hook
+
+    def emit(self, record: _CallRecord) -> None:
+        attributes = {
+            f"worklocal.{key}": value
+            for key, value in record.as_dict().items()
+            if isinstance(value, (str, int, float))
+        }
+        self.hook(record.tool, record.start, record.start + record.duration, attributes)
+
+
+def _opentelemetry_hook() -> Optional[Callable[[str, float, float, Dict[str, Any]], None]]:
+    """A ``_SpanSink`` hook backed by OpenTelemetry, if it is installed."""
+    try:
+        from opentelemetry import trace
+    except ImportError:
+        return None
+    tracer = trace.get_tracer("worklocal_tools")
+
+    def hook(name: str, start: float, end: float, attributes: Dict[str, Any]) -> None:
+        span = tracer.start_span(name, start_time=int(start * 1e9), attributes=attributes)
+        span.end(end_time=int(end * 1e9))
+
+    return hook
+
+
+# Process-wide registry, so every Tools instance reports into one place.
+_REGISTRY = _MetricsRegistry()
+
+
+def metrics_text() -> str:
+    """Prometheus text exposition of the tool-layer metrics of this process."""
+    return _REGISTRY.render_text()
+
+
+class _Telemetry:
+    """Fans finished call records out to the configured sinks."""
+
+    def __init__(self, sinks: Optional[List[Any]] = None):
+        self.sinks = list(sinks or [])
+
+    def emit(self, record: _CallRecord) -> None:
+        for sink in self.sinks:
+            try:
+                sink.emit(record)
+            except Exception:  # A broken sink must never break a tool call
+                logger.debug("Telemetry sink %r failed", sink, exc_info=True)
+
+
+def _outcome(result: Any) -> str:
+    if isinstance(result, str):
+        if result.startswith("❌"):
+            return "error"
+        if result.startswith("⚠️"):
+            return "warning"
+    return "ok"
+
+
+# Appended to replies answered from stale cache entries while a circuit is open
+_STALE_NOTE = (
+    "\n\n⚠️ The WorkLocal API is failing; "
+    "this reply uses cached data that may be out of date."
+)
+
+
+# inspect.CO_COROUTINE: tells async tools apart without importing asyncio
+_CO_COROUTINE = 0x80
+
+
+def _instrumented(method: Any) -> Any:
+    """
+    Wrap a worklocal_* method (sync or async) so each call produces a _CallRecord.
+
+    The wrapper also consumes OpenWebUI's ``__user__`` argument and runs the
+    call as that user's tenant (see ``_tenant_for``).
+    """
+
+    def begin(self: Any, kwargs: Dict[str, Any]) -> Tuple[_CallRecord, Any, float]:
+        record = _CallRecord(method.__name__)
+        tenant = _tenant_for(self, kwargs.pop("__user__", None))
+        at = _current_deadline.get()
+        budget = self.config["api"]["deadline"]
+        if budget is not None:
+            at = min(at, time.monotonic() + budget) if at is not None else time.monotonic() + budget
+        tokens = (_current_call.set(record), _current_tenant.set(tenant), _current_deadline.set(at))
+        return record, tokens, time.perf_counter()
+
+    def finish(self: Any, record: _CallRecord, tokens: Any, start: float) -> None:
+        _current_call.reset(tokens[0])
+        _current_tenant.reset(tokens[1])
+        _current_deadline.reset(tokens[2])
+        record.duration = time.perf_counter() - start
+        accounted = sum(record.phases.values())
+        record.observe("format", max(record.duration - accounted, 0.0))
+        self._telemetry.emit(record)
+
+    if method.__code__.co_flags & _CO_COROUTINE:
+
+        @functools.wraps(method)
+        async def async_wrapper(self: Any, *args: Any, **kwargs: Any) -> Any:
+            record, tokens, start = begin(self, kwargs)
+            try:
+                result = await method(self, *args, **kwargs)
+                record.outcome = _outcome(result)
+                if record.counts.get("stale") and isinstance(result, str):
+                    result += _STALE_NOTE
+                return result
+            except BaseException:
+                record.outcome = "exception"
+                raise
+            finally:
+                finish(self, record, tokens, start)
+
+        return async_wrapper
+
+    @functools.wraps(method)
+    def wrapper(self: Any, *args: Any, **kwargs: Any) -> Any:
+        record, tokens, start = begin(self, kwargs)
+        try:
+            result = method(self, *args, **kwargs)
+            record.outcome = _outcome(result)
+            if record.counts.get("stale") and isinstance(result, str):
+                result += _STALE_NOTE
+            return result
+        except BaseException:
+            record.outcome = "exception"
+            raise
+        finally:
+            finish(self, record, tokens, start)
+
+    return wrapper
+
+
+# JSON decoding. Each response body is decoded once, straight from its bytes,
+# with orjson or msgspec when one is installed (several times faster than the
+# json module on large /resources pages) and with the json module otherwise.
+
+@functools.lru_cache(maxsize=None)
+def _decoder() -> Tuple[Callable[[bytes], Any], Tuple[Type[Exception], ...]]:
+    """The fastest installed JSON decoder and the errors it raises, imported on first use."""
+    if orjson is not None:
+        return orjson.loads, (ValueError,)
+    if msgspec is not None:
+        return msgspec.json.Decoder().decode, (ValueError, msgspec.DecodeError)
+    return json.loads, (ValueError,)
+
+
+def _fast_loads(content: bytes) -> Any:
+    return _decoder()[0](content)
+
+
+_DECODED = "_worklocal_json"  # Attribute memoizing the body on a response
+
+
+def _json_body(response: Any) -> Any:
+    """
+    The decoded JSON body of ``response``, parsed at most once.
+
+    Bytes ``content`` goes through the fastest available decoder. A body it
+    rejects (and any response without bytes content) is left to
+    ``response.json()``, so malformed JSON raises the HTTP client's own error.
+    """
+    if isinstance(response, _CachedResponse):
+        return response.json()
+    content = getattr(response, "content", None)
+    if not isinstance(content, bytes) or not content:
+        return response.json()
+    state = response.__dict__
+    if _DECODED not in state:
+        try:
+            state[_DECODED] = _fast_loads(content)
+        except _decoder()[1]:
+            state[_DECODED] = response.json()
+    return state[_DECODED]
+
+
+_ABSENT: Any = object()  # Marks a model field the JSON object did not have
+
+
+class _Model(Mapping):
+    """
+    Slotted, read-only record made from a decoded JSON object.
+
+    Known fields live in slots (``_ABSENT`` if the object lacked them) and any
+    others in ``extra``. It reads like the dict it came from (``get``, ``[]``,
+    ``**``, iteration, ``==``) in well under half the memory, which matters
+    for cached pages and the resource index. Subclasses assign their slots
+    one by one in ``__init__``; a loop over ``setattr`` would cost twice as much.
+    """
+
+    __slots__ = ("extra",)
+    FIELDS: Tuple[str, ...] = ()
+    _fields: frozenset = frozenset()
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        cls._fields = frozenset(cls.FIELDS)
+
+    def _set_extra(self, data: Mapping) -> None:
+        fields = self._fields
+        self.extra = (
+            None if data.keys() <= fields else {k: v for k, v in data.items() if k not in fields}
+        )
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._fields:
+            value = getattr(self, key)
+            if value is _ABSENT:
+                raise KeyError(key)
+            return value
+        if self.extra is not None and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in self._fields:
+            value = getattr(self, key)
+            return default if value is _ABSENT else value
+        return self.extra.get(key, default) if self.extra is not None else default
+
+    def __iter__(self) -> Iterator[str]:
+        for key in self.FIELDS:
+            if getattr(self, key) is not _ABSENT:
+                yield key
+        if self.extra is not None:
+            yield from self.extra
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({dict(self)!r})"
+
+
+class _Resource(_Model):
+    """A resource as fetched, listed or indexed."""
+
+    FIELDS: Tuple[str, ...] = (
+        "id",
+        "name",
+        "type",
+        "status",
+        "created_at",
+        "updated_at",
+        "metadata",
+    )
+    __slots__ = FIELDS
+
+    def __init__(self, data: Mapping):
+        get = data.get
+        self.id = get("id", _ABSENT)
+        self.name = get("name", _ABSENT)
+        self.type = get("type", _ABSENT)
+        self.status = get("status", _ABSENT)
+        self.created_at = get("created_at", _ABSENT)
+        self.updated_at = get("updated_at", _ABSENT)
+        self.metadata = get("metadata", _ABSENT)
+        self._set_extra(data)
+
+
+class _SearchResult(_Resource):
+    """A search hit: a resource plus the relevance score, if the API sends one."""
+
+    FIELDS: Tuple[str, ...] = _Resource.FIELDS + ("score",)
+    __slots__ = ("score",)
+
+    def __init__(self, data: Mapping):
+        self.score = data.get("score", _ABSENT)
+        super().__init__(data)
+
+
+class _MetricSummary(_Model):
+    """Summary statistics of one metric (summary-only metrics replies)."""
+
+    FIELDS = ("current", "average", "max", "min")
+    __slots__ = FIELDS
+
+    def __init__(self, data: Mapping):
+        get = data.get
+        self.current = get("current", _ABSENT)
+        self.average = get("average", _ABSENT)
+        self.max = get("max", _ABSENT)
+        self.min = get("min", _ABSENT)
+        self._set_extra(data)
+
+
+def _typed_body(endpoint: str, data: Any) -> Any:
+    """
+    A cacheable body with its JSON objects swapped for models: resources,
+    search hits and metric summaries. Anything else is returned unchanged.
+    """
+    if endpoint == "resource":
+        return _Resource(data) if isinstance(data, dict) else data
+    if endpoint in ("resources", "search"):
+        model = _SearchResult if endpoint == "search" else _Resource
+
+        def convert(items: List[Any]) -> List[Any]:
+            return [model(i) if isinstance(i, dict) else i for i in items]
+
+        if isinstance(data, list):
+            return convert(data)
+        if isinstance(data, dict):
+            for key in _PAGE_ITEM_KEYS:
+                if isinstance(data.get(key), list):
+                    return {**data, key: convert(data[key])}
+        return data
+    if endpoint == "metrics" and isinstance(data, dict):
+        return {
+            name: _MetricSummary(value)
+            if isinstance(value, dict)
+            and not any(isinstance(v, (list, dict)) for v in value.values())
+            else value
+            for name, value in data.items()
+        }
+    return data
+
+
+class _CachedResponse:
+    """
+    Response-shaped cache entry: status, raw body and the already-parsed JSON body.
+
+    Also keeps the ETag/Last-Modified validators for conditional revalidation
+    and the Markdown rendered from this body, so a 304 skips re-formatting.
+    The raw body is kept as received and only decoded to ``text`` if asked.
+    """
+
+    __slots__ = (
+        "status_code", "_body", "_data", "size", "endpoint", "expires_at",
+        "etag", "last_modified", "rendered",
+    )
+
+    def __init__(
+        self,
+        status_code: int,
+        body: Any,
+        data: Any,
+        endpoint: str,
+        expires_at: float,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ):
+        self.status_code = status_code
+        self._body = body  # str, or bytes as read from the wire
+        self._data = data
+        self.size = len(body)
+        self.endpoint = endpoint
+        self.expires_at = expires_at
+        self.etag = etag
+        self.last_modified = last_modified
+        self.rendered: Dict[Tuple[Any, ...], str] = {}
+
+    @property
+    def text(self) -> str:
+        body = self._body
+        return body.decode("utf-8", "replace") if isinstance(body, bytes) else body
+
+    def json(self) -> Any:
+        return self._data
+
+
+# Persistent second tier of _ResponseCache (cache.disk). One SQLite database in
+# WAL mode per host: every worker process reads and writes it, so a restarted
+# or newly forked worker starts warm and the host holds one copy of each reply.
+
+_DISK_SCHEMA = 1  # PRAGMA user_version of the database; a mismatch rebuilds it
+_DISK_FORMAT = 1  # Encoding of a row's body: 1 = zlib-compressed JSON as received
+_DISK_EVICT_EVERY = 64  # Writes between checks of the size bound
+
+
+class _DiskCache:
+    """
+    SQLite-backed cache entries shared by every process on the host.
+
+    Rows hold a wall-clock expiry (monotonic clocks are per process), the
+    ETag/Last-Modified validators and the body in a versioned encoding; rows
+    in an unknown encoding read as misses. The stored bodies are bounded by
+    ``max_bytes`` in total, evicting the least recently read rows first.
+    SQLite errors (a locked or full disk, a corrupt file) are logged and read
+    as misses, so a broken cache never fails a tool call.
+
+    Args:
+        path (str): Database file, shared by every process that opens it
+        namespace (str): Partition of the file this client reads and writes
+            (its base URL and home credentials)
+        max_bytes (int): Bound on the total size of the stored bodies
+        stale_for (float): Seconds past expiry rows without validators are kept
+    """
+
+    def __init__(
+        self,
+        path: str,
+        namespace: str,
+        max_bytes: int = 256 * 1024 * 1024,
+        stale_for: float = 0.0,
+    ):
+        self.path = path
+        self.namespace = namespace
+        self.max_bytes = max_bytes
+        self.stale_for = stale_for
+        self.hits = 0
+        self.errors = 0
+        # Check the bound on the first write: the file may be over it
+        self._writes = _DISK_EVICT_EVERY
+        self._conn: Optional["sqlite3.Connection"] = None
+        self._pid = 0
+        self._lock = threading.Lock()
+
+    def _connection(self) -> "sqlite3.Connection":
+        # A connection must not cross a fork; the child opens its own.
+        if self._conn is None or self._pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, mode=0o700, exist_ok=True)
+            conn = sqlite3.connect(
+                self.path, timeout=5, isolation_level=None, check_same_thread=False
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                if conn.execute("PRAGMA user_version").fetchone()[0] != _DISK_SCHEMA:
+                    conn.execute("DROP TABLE IF EXISTS entries")
+                    conn.execute(f"PRAGMA user_version = {_DISK_SCHEMA}")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS entries ("
+                    " namespace TEXT NOT NULL, path TEXT NOT NULL, params TEXT NOT NULL,"
+                    " tenant TEXT NOT NULL, endpoint TEXT NOT NULL, expires_at REAL NOT NULL,"
+                    " accessed_at REAL NOT NULL, etag TEXT, last_modified TEXT,"
+                    " format INTEGER NOT NULL, size INTEGER NOT NULL,"
+                    " body BLOB NOT NULL, PRIMARY KEY (namespace, path, params, tenant))"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)")
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def _run(self, work: Callable[["sqlite3.Connection"], Any], default: Any = None) -> Any:
+        with self._lock:
+            try:
+                return work(self._connection())
+            except sqlite3.Error as e:
+                self.errors += 1
+                logger.warning("WorkLocal disk cache %s unavailable: %s", self.path, e)
+                return default
+
+    def get(self, key: Tuple[str, str, str]) -> Optional[_CachedResponse]:
+        """The row under ``key`` as a cache entry.
+
+        Only if it is fresh, revalidatable or within ``stale_for``.
+        """
+
+        def read(conn: "sqlite3.Connection") -> Any:
+            now = time.time()
+            row = conn.execute(
+                "SELECT endpoint, expires_at, etag, last_modified, format, body FROM entries"
+                " WHERE namespace = ? AND path = ? AND params = ? AND tenant = ?",
+                (self.namespace, *key),
+            ).fetchone()
+            if row is None:
+                return None
+            endpoint, expires_at, etag, last_modified, encoding, body = row
+            if encoding != _DISK_FORMAT or (
+                not (etag or last_modified) and expires_at + self.stale_for <= now
+            ):
+                return None
+            conn.execute(
+                "UPDATE entries SET accessed_at = ?"
+                " WHERE namespace = ? AND path = ? AND params = ? AND tenant = ?",
+                (now, self.namespace, *key),
+            )
+            try:
+                body = zlib.decompress(body)
+            except zlib.error as e:
+                self._discard(conn, key, e)
+                return None
+            return endpoint, expires_at - now, etag, last_modified, body
+
+        row = self._run(read)
+        if row is None:
+            return None
+        endpoint, ttl_left, etag, last_modified, body = row
+        try:
+            try:
+                data = _fast_loads(body)
+            except _decoder()[1]:
+                data = json.loads(body)
+        except ValueError as e:
+            self._run(functools.partial(self._discard, key=key, error=e))
+            return None
+        self.hits += 1
+        return _CachedResponse(
+            200, body, _typed_body(endpoint, data), endpoint, time.monotonic() + ttl_left,
+            etag=etag, last_modified=last_modified,
+        )
+
+    def _discard(
+        self, conn: "sqlite3.Connection", key: Tuple[str, str, str], error: Exception
+    ) -> None:
+        """Delete a row whose body does not decode: it reads as a miss and is refetched."""
+        logger.warning(
+            "WorkLocal disk cache %s: dropping unreadable entry %s: %s", self.path, key[0], error
+        )
+        conn.execute(
+            "DELETE FROM entries WHERE namespace = ? AND path = ? AND params = ? AND tenant = ?",
+            (self.namespace, *key),
+        )
+
+    def put(self, key: Tuple[str, str, str], entry: _CachedResponse) -> None:
+        body = entry._body.encode("utf-8") if isinstance(entry._body, str) else entry._body
+        packed = zlib.compress(body, 1)
+        now = time.time()
+
+        def write(conn: "sqlite3.Connection") -> None:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    self.namespace,
+                    *key,
+                    entry.endpoint,
+                    now + entry.expires_at - time.monotonic(),
+                    now,
+                    entry.etag,
+                    entry.last_modified,
+                    _DISK_FORMAT,
+                    len(packed),
+                    packed,
+                ),
+            )
+            self._writes += 1
+            if self._writes >= _DISK_EVICT_EVERY:
+                self._writes = 0
+                self._evict(conn, now)
+
+        self._run(write)
+
+    def touch(self, key: Tuple[str, str, str], entry: _CachedResponse) -> None:
+        """Carry a revalidated entry's new expiry and ETag over to its row."""
+        self._run(lambda conn: conn.execute(
+            "UPDATE entries SET expires_at = ?, etag = ?"
+            " WHERE namespace = ? AND path = ? AND params = ? AND tenant = ?",
+            (time.time() + entry.expires_at - time.monotonic(), entry.etag, self.namespace, *key),
+        ))
+
+    def _evict(self, conn: "sqlite3.Connection", now: float) -> None:
+        conn.execute(
+            "DELETE FROM entries"
+            " WHERE etag IS NULL AND last_modified IS NULL AND expires_at + ? <= ?",
+            (self.stale_for, now),
+        )
+        excess = conn.execute("SELECT total(size) FROM entries").fetchone()[0] - self.max_bytes
+        if excess <= 0:
+            return
+        doomed = []
+        for rowid, size in conn.execute("SELECT rowid, size FROM entries ORDER BY accessed_at"):
+            doomed.append((rowid,))
+            excess -= size
+            if excess <= 0:
+                break
+        conn.executemany("DELETE FROM entries WHERE rowid = ?", doomed)
+
+    def invalidate(self, resource_id: Optional[str] = None) -> None:
+        """Drop this namespace's list and search rows.
+
+        Plus everything under ``/resources/{resource_id}``.
+        """
+        sql = (
+            "DELETE FROM entries"
+            " WHERE namespace = ? AND (path IN ('/resources', '/resources/search')"
+        )
+        args: List[Any] = [self.namespace]
+        if resource_id:
+            prefix = f"/resources/{resource_id}"
+            sql += " OR path = ? OR substr(path, 1, ?) = ?"
+            args += [prefix, len(prefix) + 1, prefix + "/"]
+        self._run(lambda conn: conn.execute(sql + ")", args))
+
+    def clear(self) -> None:
+        self._run(
+            lambda conn: conn.execute("DELETE FROM entries WHERE namespace = ?", (self.namespace,))
+        )
+
+    def drop_longer_than(self, ttls: Dict[str, float]) -> None:
+        """Drop this namespace's rows of the ``ttls`` endpoints that outlive their TTL from now."""
+        now = time.time()
+        self._run(lambda conn: conn.executemany(
+            "DELETE FROM entries WHERE namespace = ? AND endpoint = ? AND expires_at > ?",
+            [(self.namespace, endpoint, now + ttl) for endpoint, ttl in ttls.items()],
+        ))
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+
+
+class _ResponseCache:
+    """
+    Thread-safe TTL + LRU cache for read-only API responses.
+
+    Entries are keyed by path + params + tenant and expire after the TTL of their
+    endpoint class. Expired entries that carry an ETag or Last-Modified
+    validator are kept so the next request can be made conditional. The cache
+    is bounded by both entry count and total body size; the least recently
+    used entries are evicted first. With a ``disk`` tier, entries are also
+    written through to it and memory misses are filled from it.
+    """
+
+    DEFAULT_TTLS = {
+        "resources": 30.0,  # GET /resources
+        "resource": 30.0,  # GET /resources/{id}
+        "metrics": 10.0,  # GET /resources/{id}/metrics
+        "search": 30.0,  # GET /resources/search
+    }
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        max_bytes: int = 16 * 1024 * 1024,
+        ttls: Optional[Dict[str, float]] = None,
+        stale_for: float = 0.0,
+        disk: Optional[_DiskCache] = None,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttls = {**self.DEFAULT_TTLS, **(ttls or {})}
+        # Seconds past expiry an entry is kept for ``stale`` (0: dropped on expiry)
+        self.stale_for = stale_for
+        self.disk = disk
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.revalidations = 0
+        self._entries: "OrderedDict[Tuple[str, str, str], _CachedResponse]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(path: str, params: Optional[Dict[str, Any]] = None) -> Tuple[str, str, str]:
+        """Cache key of a read, partitioned by the calling tenant."""
+        return path, json.dumps(params or {}, sort_keys=True, default=str), _tenant_id()
+
+    def get(self, key: Tuple[str, str, str]) -> Optional[_CachedResponse]:
+        if self.disk is not None and key not in self._entries:
+            loaded = self.disk.get(key)
+            if loaded is not None:
+                _count("disk_hit")
+                self._store(key, loaded, replace=False)
+        with self._lock:
+            entry = self._entries.get(key)
+            now = time.monotonic()
+            if entry is not None and entry.expires_at <= now:
+                validated = entry.etag or entry.last_modified
+                if not validated and entry.expires_at + self.stale_for <= now:
+                    self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def stale(self, key: Tuple[str, str, str]) -> Optional[_CachedResponse]:
+        """The entry under ``key`` even if expired, up to ``stale_for`` seconds past its TTL."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.expires_at + self.stale_for <= time.monotonic():
+                return None
+            return entry
+
+    def conditional_headers(self, key: Tuple[str, str, str]) -> Dict[str, str]:
+        """Validator headers for revalidating the (expired) entry under ``key``."""
+        with self._lock:
+            entry = self._entries.get(key)
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def put(self, key: Tuple[str, str, str], response: Any, endpoint: str) -> Any:
+        """
+        Cache a successful JSON response, or refresh the entry on a 304.
+
+        Returns:
+            The cached entry, or ``response`` itself if it was not cacheable.
+        """
+        ttl = self.ttls.get(endpoint, 0)
+        if response.status_code == 304:
+            return self._revalidated(key, response, ttl)
+        if response.status_code != 200 or ttl <= 0:
+            return response
+        start = time.perf_counter()
+        try:
+            data = _json_body(response)
+        except ValueError:
+            return response
+        finally:
+            _observe("parse", time.perf_counter() - start)
+        content = getattr(response, "content", None)
+        entry = _CachedResponse(
+            200,
+            content if isinstance(content, bytes) else response.text,
+            _typed_body(endpoint, data),
+            endpoint,
+            time.monotonic() + ttl,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+        )
+        return self._insert(key, entry)
+
+    def put_data(self, key: Tuple[str, str, str], data: Any, endpoint: str) -> None:
+        """Cache an already-known body for ``key`` as if it had just been fetched."""
+        ttl = self.ttls.get(endpoint, 0)
+        if ttl > 0:
+            self._insert(
+                key,
+                _CachedResponse(
+                    200,
+                    json.dumps(data),
+                    _typed_body(endpoint, data),
+                    endpoint,
+                    time.monotonic() + ttl,
+                ),
+            )
+
+    def _insert(self, key: Tuple[str, str, str], entry: _CachedResponse) -> _CachedResponse:
+        if self.disk is not None:
+            self.disk.put(key, entry)
+        return self._store(key, entry)
+
+    def _store(
+        self, key: Tuple[str, str, str], entry: _CachedResponse, replace: bool = True
+    ) -> _CachedResponse:
+        if entry.size > self.max_bytes:
+            return entry
+        with self._lock:
+            if key in self._entries:
+                if not replace:
+                    return self._entries[key]
+                self._remove(key)
+            self._entries[key] = entry
+            self._bytes += entry.size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+        return entry
+
+    def _revalidated(self, key: Tuple[str, str, str], response: Any, ttl: float) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return response
+            entry.expires_at = time.monotonic() + ttl
+            entry.etag = response.headers.get("ETag") or entry.etag
+            self._entries.move_to_end(key)
+            self.revalidations += 1
+            _count("revalidated")
+        if self.disk is not None:
+            self.disk.touch(key, entry)
+        return entry
+
+    def invalidate(self, resource_id: Optional[str] = None) -> None:
+        """
+        Drop list and search entries, plus everything under ``/resources/{resource_id}``.
+        """
+        prefix = f"/resources/{resource_id}" if resource_id else None
+        if self.disk is not None:
+            self.disk.invalidate(resource_id)
+        with self._lock:
+            for key in list(self._entries):
+                path = key[0]
+                if path in ("/resources", "/resources/search") or (
+                    prefix and (path == prefix or path.startswith(prefix + "/"))
+                ):
+                    self._remove(key)
+
+    def invalidate_for_write(self, method: str, path: str) -> None:
+        """Invalidate whatever a successful write to ``path`` may have changed."""
+        parts = path.strip("/").split("/")
+        if parts[0] != "resources":
+            return
+        self.invalidate(parts[1] if len(parts) > 1 else None)
+
+    def clear(self) -> None:
+        if self.disk is not None:
+            self.disk.clear()
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def drop_trusted(self, ttls: Dict[str, float]) -> None:
+        """
+        Forget the entries of the endpoints in ``ttls`` that were stored with a
+        longer TTL (a change feed's ``live_ttl``). Disk rows other workers
+        stored with the usual TTLs are kept.
+        """
+        if self.disk is not None:
+            self.disk.drop_longer_than(ttls)
+        now = time.monotonic()
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                if entry.endpoint in ttls and entry.expires_at > now + ttls[entry.endpoint]:
+                    self._remove(key)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "revalidations": self.revalidations,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+        if self.disk is not None:
+            stats.update(disk_hits=self.disk.hits, disk_errors=self.disk.errors)
+        return stats
+
+    def _remove(self, key: Tuple[str, str, str]) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+
+class _TokenBucket:
+    """
+    Client-side token bucket shared by every request of a client.
+
+    ``reserve`` takes a token under a lock and returns how long the caller must
+    wait before using it, so the same budget can be spent from worker threads
+    (``acquire``) and from asyncio tasks (``acquire_async``) without either
+    blocking the other. ``pause`` stops all callers, e.g. for a Retry-After.
+    """
+
+    def __init__(self, requests_per_minute: float = 60, burst_size: int = 10):
+        self.rate = requests_per_minute / 60.0
+        self.capacity = float(burst_size)
+        self._tokens = float(burst_size)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._tenants: Dict[str, "_TokenBucket"] = {}
+        self._lock = threading.Lock()
+
+    def tenant(self, tenant_id: str) -> "_TokenBucket":
+        """The budget of ``tenant_id``.
+
+        A bucket of the same size, or this one for the default tenant.
+        """
+        if not tenant_id:
+            return self
+        with self._lock:
+            bucket = self._tenants.get(tenant_id)
+            if bucket is None:
+                bucket = self._tenants[tenant_id] = _TokenBucket(self.rate * 60, int(self.capacity))
+            return bucket
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            return max(wait, self._paused_until - now)
+
+    def acquire(self) -> None:
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self) -> None:
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+def _retry_after(
+    response: Any, attempt: int, backoff_factor: float, max_delay: float = 30.0
+) -> float:
+    """Seconds to wait before retrying a 429/503.
+
+    Uses the Retry-After header, else exponential backoff.
+    """
+    value = response.headers.get("Retry-After")
+    if value:
+        try:
+            return min(max(float(value), 0.0), max_delay)
+        except ValueError:
+            try:
+                from email.utils import parsedate_to_datetime
+
+                delay = parsedate_to_datetime(value).timestamp() - time.time()
+                return min(max(delay, 0.0), max_delay)
+            except (TypeError, ValueError):
+                pass
+    return min(backoff_factor * (2 ** attempt), max_delay)
+
+
+def _should_retry_throttled(method: str, response: Any) -> bool:
+    # A 429 means the request was rejected unprocessed. A 503 is only replayed
+    # for idempotent calls, or when the server says when to come back.
+    if response.status_code == 429:
+        return True
+    return response.status_code == 503 and (
+        method in _WorkLocalClient.RETRY_METHODS or "Retry-After" in response.headers
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def _circuit_open_error() -> Type[Exception]:
+    """The ``_CircuitOpenError`` class, defined on first use like ``_deadline_exceeded``."""
+
+    class _CircuitOpenError(requests.exceptions.ConnectionError):
+        """Raised instead of calling an endpoint whose circuit is open."""
+
+        def __init__(self, endpoint: str, retry_in: float):
+            wait = (
+                f"for another {retry_in:.0f}s" if retry_in > 0 else "until a probe request succeeds"
+            )
+            super().__init__(
+                f"WorkLocal API is failing on '{endpoint}' requests; "
+                f"not calling it {wait} (circuit open)"
+            )
+            self.endpoint = endpoint
+            self.retry_in = retry_in
+
+    _CircuitOpenError.__qualname__ = "_CircuitOpenError"
+    return _CircuitOpenError
+
+
+def __getattr__(name: str) -> Any:
+    # The lazily defined error classes, under their class names
+    if name == "_DeadlineExceeded":
+        return _deadline_exceeded()
+    if name == "_CircuitOpenError":
+        return _circuit_open_error()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class _CircuitBreaker:
+    """
+    Per-endpoint circuit breakers shared by every request of a client.
+
+    Each endpoint class (e.g. 'metrics') tracks its calls over the last
+    ``window`` seconds. A call (one request attempt) fails when it raises a
+    transport error, gets a 5xx, or its round trip takes ``slow_call_duration``
+    seconds or more; time spent queued by the rate limiter or waiting out a
+    Retry-After does not count. Once ``min_calls``
+    calls were made and at least ``failure_rate`` of them failed, the circuit
+    opens and calls fail fast with ``_CircuitOpenError`` for ``open_duration``
+    seconds. It then half-opens: ``half_open_probes`` calls go through, and the
+    circuit closes if they all succeed or reopens on any failure.
+
+    Sans-I/O, so Tools and AsyncTools share it: callers ``enter`` before
+    sending and ``exit`` with the outcome.
+    """
+
+    # Always sent, so a health check can tell whether the API is back.
+    UNGUARDED = frozenset({"health"})
+
+    def __init__(
+        self,
+        failure_rate: float = 0.5,
+        min_calls: int = 10,
+        window: float = 60.0,
+        slow_call_duration: float = 5.0,
+        open_duration: float = 30.0,
+        half_open_probes: int = 1,
+    ):
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window = window
+        self.slow_call_duration = slow_call_duration
+        self.open_duration = open_duration
+        self.half_open_probes = half_open_probes
+        self._circuits: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _circuit(self, endpoint: str) -> Dict[str, Any]:
+        circuit = self._circuits.get(endpoint)
+        if circuit is None:
+            circuit = self._circuits[endpoint] = {
+                "state": "closed", "calls": deque(), "failures": 0,
+                "opened_at": 0.0, "probes": 0, "passed": 0, "trips": 0,
+            }
+        return circuit
+
+    def enter(self, endpoint: str) -> bool:
+        """
+        Admit a call to ``endpoint``, or raise ``_CircuitOpenError``.
+
+        Returns:
+            bool: True if the call is a half-open probe
+        """
+        with self._lock:
+            circuit = self._circuit(endpoint)
+            if circuit["state"] == "open":
+                retry_in = circuit["opened_at"] + self.open_duration - time.monotonic()
+                if retry_in > 0:
+                    _count("circuit_open")
+                    raise _circuit_open_error()(endpoint, retry_in)
+                circuit.update(state="half_open", probes=0, passed=0)
+                logger.info("Circuit for '%s' half-open; probing", endpoint)
+            if circuit["state"] == "half_open":
+                if circuit["probes"] >= self.half_open_probes:
+                    _count("circuit_open")
+                    raise _circuit_open_error()(endpoint, 0)
+                circuit["probes"] += 1
+                return True
+            return False
+
+    def exit(self, endpoint: str, probe: bool, seconds: float, failed: Optional[bool]) -> None:
+        """Record the outcome of a call admitted by ``enter``; None if it was abandoned."""
+        with self._lock:
+            circuit = self._circuit(endpoint)
+            if probe:
+                circuit["probes"] -= 1
+            if failed is None:
+                return
+            failed = failed or seconds >= self.slow_call_duration
+            if circuit["state"] == "half_open":
+                if failed:
+                    self._open(endpoint, circuit)
+                elif probe:
+                    circuit["passed"] += 1
+                    if circuit["passed"] >= self.half_open_probes:
+                        circuit["state"] = "closed"
+                        logger.info("Circuit for '%s' closed", endpoint)
+                return
+            if circuit["state"] == "open":
+                return
+            now = time.monotonic()
+            calls = circuit["calls"]
+            calls.append((now, failed))
+            circuit["failures"] += failed
+            while calls[0][0] <= now - self.window:
+                circuit["failures"] -= calls.popleft()[1]
+            failing = circuit["failures"] >= self.failure_rate * len(calls)
+            if len(calls) >= self.min_calls and failing:
+                self._open(endpoint, circuit)
+
+    def _open(self, endpoint: str, circuit: Dict[str, Any]) -> None:
+        circuit.update(state="open", opened_at=time.monotonic(), failures=0)
+        circuit["calls"].clear()
+        circuit["trips"] += 1
+        logger.warning("Circuit for '%s' open for %gs", endpoint, self.open_duration)
+
+    def recovered(self) -> None:
+        """The API answered a health check: let open circuits probe now rather than wait."""
+        with self._lock:
+            for circuit in self._circuits.values():
+                if circuit["state"] == "open":
+                    circuit["opened_at"] = time.monotonic() - self.open_duration
+
+    def states(self) -> Dict[str, Dict[str, Any]]:
+        """Per-endpoint circuit details.
+
+        ``state``, ``retry_in`` seconds, recent ``calls``/``failures`` and ``trips``.
+        """
+        now = time.monotonic()
+        with self._lock:
+            return {
+                endpoint: {
+                    "state": circuit["state"],
+                    "retry_in": max(circuit["opened_at"] + self.open_duration - now, 0.0)
+                    if circuit["state"] == "open" else 0.0,
+                    "calls": len(circuit["calls"]),
+                    "failures": circuit["failures"],
+                    "trips": circuit["trips"],
+                }
+                for endpoint, circuit in sorted(self._circuits.items())
+            }
+
+
+class _Hedger:
+    """
+    Decides when to send a backup copy of a slow GET (opt-in, ``hedging``).
+
+    Keeps the recent latencies of each hedged endpoint. A request still
+    unanswered after their ``percentile`` (but at least ``min_delay``) gets one
+    backup request, and whichever reply comes first is used. Backups are paid
+    from a token budget that each request tops up by ``budget``, so they add
+    at most that fraction of extra load however slow the API gets.
+    Sans-I/O, like ``_CircuitBreaker``: the clients do the sending.
+    """
+
+    MAX_TOKENS = 10.0  # Backups that may go out back to back after a quiet spell
+
+    def __init__(
+        self,
+        endpoints: Tuple[str, ...] = ("resource", "search"),
+        percentile: float = 95,
+        min_delay: float = 0.02,
+        budget: float = 0.05,
+        window: int = 200,
+        min_samples: int = 20,
+    ):
+        self.endpoints = frozenset(endpoints)
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.budget = budget
+        self.window = window
+        self.min_samples = min_samples
+        self.issued = 0
+        self.won = 0
+        self._tokens = 0.0
+        self._samples: Dict[str, "deque[float]"] = {}
+        self._lock = threading.Lock()
+
+    def delay(self, endpoint: Optional[str]) -> Optional[float]:
+        """Seconds to wait before hedging a request to ``endpoint``, or None not to hedge it."""
+        if endpoint not in self.endpoints:
+            return None
+        with self._lock:
+            self._tokens = min(self._tokens + self.budget, self.MAX_TOKENS)
+            samples = self._samples.get(endpoint)
+            if samples is None or len(samples) < self.min_samples:
+                return None
+            ordered = sorted(samples)
+        return max(_percentile(ordered, self.percentile), self.min_delay)
+
+    def observe(self, endpoint: Optional[str], seconds: float) -> None:
+        """Record how long one request to ``endpoint`` took."""
+        if endpoint not in self.endpoints:
+            return
+        with self._lock:
+            samples = self._samples.get(endpoint)
+            if samples is None:
+                samples = self._samples[endpoint] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def spend(self) -> bool:
+        """Take one backup request from the budget; False when it is spent."""
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            self.issued += 1
+        _count("hedge_issued")
+        return True
+
+    def backup_won(self) -> None:
+        with self._lock:
+            self.won += 1
+        _count("hedge_won")
+
+
+# Configuration. Settings come from config.yaml (see config/config.example.yaml)
+# plus WORKLOCAL_* environment variables, which win. The file is parsed once per
+# process, on first use, so importing the tool stays cheap.
+
+_DEFAULT_CONFIG: Dict[str, Any] = {
+    "api": {
+        "base_url": "https://worklocal.app",
+        "api_key": None,
+        "timeout": 10,
+        # Per-endpoint overrides of `timeout`: health, resources, resource,
+        # search, metrics, create, update, delete, action, index, job
+        "timeouts": {"metrics": 30},
+        "verify_ssl": True,
+        # Seconds a whole tool call may take, every request, retry pause and
+        # job wait included (None: only the per-request timeouts apply). When
+        # set, `deadline_header` (e.g. "X-Request-Timeout") tells the API the
+        # milliseconds left.
+        "deadline": None,
+        "deadline_header": None,
+    },
+    "authentication": {"type": "bearer", "header_name": "Authorization"},
+    "pool": {"connections": 10, "maxsize": 20, "max_retries": 3, "backoff_factor": 0.3},
+    "cache": {
+        "max_entries": 512,
+        "max_bytes": 16 * 1024 * 1024,
+        "ttls": {"resources": 30, "resource": 30, "metrics": 10, "search": 30},
+        # Host-wide SQLite tier shared by worker processes and restarts (see
+        # _DiskCache); `path` None means ~/.cache/worklocal_tools/cache.db
+        "disk": {"enabled": False, "path": None, "max_bytes": 256 * 1024 * 1024},
+    },
+    # Local time-series store for metric samples (retentions in seconds)
+    "metrics_store": {
+        "enabled": True,
+        "raw_retention": 7200,
+        "minute_retention": 172800,
+        "hour_retention": 2592000,
+        "max_series": 1024,
+    },
+    # Opt-in local inventory index answering search/list/name lookups (seconds)
+    "index": {
+        "enabled": False,
+        "sync_interval": 60,
+        "full_sync_interval": 900,
+        "max_staleness": 300,
+        "fallback_to_server": True,
+        "max_resources": 100000,
+    },
+    # Optional background consumer of resource change events (see _ChangeFeed)
+    "change_feed": {
+        "enabled": False,
+        "mode": "sse",
+        "path": "/events",
+        "live_ttl": 300,
+        "read_timeout": 90,
+        "reconnect_delay": 1,
+        "max_reconnect_delay": 30,
+        "webhook_host": "127.0.0.1",
+        "webhook_port": 8787,
+        "webhook_secret": None,
+    },
+    # Background action jobs (worklocal_execute_action mode="job", worklocal_wait_action)
+    "jobs": {
+        "status_path": "/jobs/{job_id}",
+        "wait_timeout": 120,
+        "initial_interval": 0.5,
+        "max_interval": 10,
+        "backoff": 1.5,
+    },
+    "rate_limiting": {"enabled": False, "requests_per_minute": 60, "burst_size": 10, "retries": 3},
+    # Opt-in hedged GETs (see _Hedger): a request to one of `endpoints` still
+    # unanswered after the `percentile` of its recent latencies gets a backup
+    # request; backups are capped at `budget` (a fraction) of requests.
+    "hedging": {
+        "enabled": False,
+        "endpoints": ["resource", "search"],
+        "percentile": 95,
+        "min_delay": 0.02,
+        "budget": 0.05,
+        "window": 200,
+        "min_samples": 20,
+    },
+    # Opt-in merging of concurrent updates of one resource into one PATCH
+    # (see _WriteCoalescer): an update waits up to `window` seconds for others
+    # to join it, and at most `max_updates` go out together.
+    "write_coalescing": {"enabled": False, "window": 0.1, "max_updates": 20},
+    # Wire format. `http2` multiplexes concurrent calls over one connection
+    # (needs h2: pip install "httpx[http2]"); `compression` off asks the API for
+    # uncompressed replies; `compress_requests` gzips write bodies of at least
+    # `compress_min_bytes` (the API must accept Content-Encoding: gzip).
+    "transport": {
+        "http2": False,
+        "compression": True,
+        "compress_requests": False,
+        "compress_min_bytes": 1024,
+    },
+    # Per-endpoint circuit breakers (see _CircuitBreaker). While a circuit is
+    # open, reads are answered from cache entries up to `max_stale` seconds
+    # past their TTL when `serve_stale` is on.
+    "circuit_breaker": {
+        "enabled": True,
+        "failure_rate": 0.5,
+        "min_calls": 10,
+        "window": 60,
+        "slow_call_duration": 5,
+        "open_duration": 30,
+        "half_open_probes": 1,
+        "serve_stale": True,
+        "max_stale": 600,
+    },
+    # Default reply layout of list-shaped tools; each call can override both
+    # (see _Renderer). `max_chars` None means no budget.
+    "output": {"format": "markdown", "max_chars": None},
+    "logging": {
+        "level": "INFO",
+        "format": "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        "file": None,
+        "console": True,
+    },
+    # Per-call timings and counters: `metrics` feeds metrics_text(),
+    # `log_calls` writes a JSON line per call to the "worklocal_tools" logger,
+    # `opentelemetry` emits a span per call when opentelemetry is installed.
+    "instrumentation": {"metrics": True, "log_calls": False, "opentelemetry": False},
+    "features": {"metrics_enabled": True, "search_enabled": True, "batch_operations": True},
+    "defaults": {
+        "resource_type": "server",
+        "metric_timeframe": "1h",
+        "search_limit": 50,
+        "page_size": 200,
+        "batch_concurrency": 8,
+        "fleet_limit": 500,
+        "fleet_concurrency": 20,
+    },
+}
+
+# Environment variable -> (section, key, parser)
+_ENV_OVERRIDES: Dict[str, Tuple[str, str, Callable[[str], Any]]] = {
+    "WORKLOCAL_BASE_URL": ("api", "base_url", str),
+    "WORKLOCAL_API_KEY": ("api", "api_key", str),
+    "WORKLOCAL_TIMEOUT": ("api", "timeout", float),
+    "WORKLOCAL_DEADLINE": ("api", "deadline", float),
+    "WORKLOCAL_VERIFY_SSL": ("api", "verify_ssl", lambda v: v.lower() not in ("0", "false", "no")),
+    "WORKLOCAL_AUTH_TYPE": ("authentication", "type", str),
+    "WORKLOCAL_AUTH_HEADER": ("authentication", "header_name", str),
+    "WORKLOCAL_RATE_LIMIT_RPM": ("rate_limiting", "requests_per_minute", float),
+}
+
+_AUTH_TYPES = ("none", "bearer", "api_key", "basic")
+
+
+def _config_path() -> Optional[str]:
+    explicit = os.environ.get("WORKLOCAL_CONFIG")
+    if explicit:
+        return explicit
+    here = os.path.dirname(os.path.abspath(__file__))
+    for candidate in (
+        os.path.join(os.getcwd(), "config", "config.yaml"),
+        os.path.join(here, "..", "config", "config.yaml"),
+    ):
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+def _merge(base: Dict[str, Any], override: Dict[str, Any]) -> Dict[str, Any]:
+    merged = dict(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+@functools.lru_cache(maxsize=None)
+def _load_config() -> Dict[str, Any]:
+    """
+    Load, merge and validate the tool configuration, once per process.
+
+    Returns:
+        dict: The full configuration, with every key of ``_DEFAULT_CONFIG`` present
+
+    Raises:
+        ValueError: If the file or an environment override holds an invalid value
+    """
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        pass
+    else:
+        load_dotenv()
+
+    config = copy.deepcopy(_DEFAULT_CONFIG)
+    path = _config_path()
+    if path:
+        import yaml
+
+        with open(path, encoding="utf-8") as fh:
+            loaded = yaml.safe_load(fh) or {}
+        if not isinstance(loaded, dict):
+            raise ValueError(f"Invalid WorkLocal config {path}: expected a mapping")
+        config = _merge(config, loaded)
+
+    for variable, (section, key, parse) in _ENV_OVERRIDES.items():
+        value = os.environ.get(variable)
+        if value:
+            try:
+                config[section][key] = parse(value)
+            except ValueError:
+                raise ValueError(f"Invalid WorkLocal config: {variable}={value!r}")
+
+    _validate_config(config)
+    return config
+
+
+def _validate_config(config: Dict[str, Any]) -> None:
+    def positive(section: str, key: str, value: Any, allow_zero: bool = False) -> None:
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or (
+            value < 0 if allow_zero else value <= 0
+        ):
+            raise ValueError(f"Invalid WorkLocal config: {section}.{key} must be a positive number")
+
+    api = config["api"]
+    base_url = api["base_url"]
+    if not isinstance(base_url, str) or not base_url.startswith(("http://", "https://")):
+        raise ValueError("Invalid WorkLocal config: api.base_url must be an http(s) URL")
+    api["base_url"] = api["base_url"].rstrip("/")
+    positive("api", "timeout", api["timeout"])
+    if api["deadline"] is not None:
+        positive("api", "deadline", api["deadline"])
+    for endpoint, timeout in (api.get("timeouts") or {}).items():
+        positive("api.timeouts", endpoint, timeout)
+    if not isinstance(api["verify_ssl"], (bool, str)):
+        raise ValueError(
+            "Invalid WorkLocal config: api.verify_ssl must be a boolean or CA bundle path"
+        )
+    if config["authentication"]["type"] not in _AUTH_TYPES:
+        raise ValueError(
+            f"Invalid WorkLocal config: authentication.type must be one of {', '.join(_AUTH_TYPES)}"
+        )
+    for key in ("connections", "maxsize"):
+        positive("pool", key, config["pool"][key])
+    positive("pool", "max_retries", config["pool"]["max_retries"], allow_zero=True)
+    positive("pool", "backoff_factor", config["pool"]["backoff_factor"], allow_zero=True)
+    positive("cache", "max_entries", config["cache"]["max_entries"], allow_zero=True)
+    positive("cache", "max_bytes", config["cache"]["max_bytes"], allow_zero=True)
+    for endpoint, ttl in config["cache"]["ttls"].items():
+        positive("cache.ttls", endpoint, ttl, allow_zero=True)
+    positive("cache.disk", "max_bytes", config["cache"]["disk"]["max_bytes"])
+    if not isinstance(config["cache"]["disk"]["path"], (str, type(None))):
+        raise ValueError("Invalid WorkLocal config: cache.disk.path must be a file path")
+    for key in ("raw_retention", "minute_retention", "hour_retention", "max_series"):
+        positive("metrics_store", key, config["metrics_store"][key])
+    for key in ("sync_interval", "full_sync_interval", "max_staleness", "max_resources"):
+        positive("index", key, config["index"][key])
+    feed = config["change_feed"]
+    if feed["mode"] not in _FEED_MODES:
+        raise ValueError(
+            f"Invalid WorkLocal config: change_feed.mode must be one of {', '.join(_FEED_MODES)}"
+        )
+    for key in ("live_ttl", "read_timeout", "reconnect_delay", "max_reconnect_delay"):
+        positive("change_feed", key, feed[key])
+    positive("change_feed", "webhook_port", feed["webhook_port"], allow_zero=True)
+    for key in ("wait_timeout", "initial_interval", "max_interval", "backoff"):
+        positive("jobs", key, config["jobs"][key])
+    if config["jobs"]["backoff"] < 1 or "{job_id}" not in str(config["jobs"]["status_path"]):
+        raise ValueError(
+            "Invalid WorkLocal config: jobs.backoff must be >= 1 "
+            "and jobs.status_path contain {job_id}"
+        )
+    if config["output"]["format"] not in _OUTPUT_FORMATS:
+        raise ValueError(
+            f"Invalid WorkLocal config: output.format must be one of {', '.join(_OUTPUT_FORMATS)}"
+        )
+    if config["output"]["max_chars"] is not None:
+        positive("output", "max_chars", config["output"]["max_chars"])
+    for key in ("requests_per_minute", "burst_size"):
+        positive("rate_limiting", key, config["rate_limiting"][key])
+    breaker = config["circuit_breaker"]
+    for key in ("min_calls", "window", "slow_call_duration", "open_duration", "half_open_probes"):
+        positive("circuit_breaker", key, breaker[key])
+    positive("circuit_breaker", "max_stale", breaker["max_stale"], allow_zero=True)
+    positive("circuit_breaker", "failure_rate", breaker["failure_rate"])
+    if breaker["failure_rate"] > 1:
+        raise ValueError("Invalid WorkLocal config: circuit_breaker.failure_rate must be at most 1")
+    positive("rate_limiting", "retries", config["rate_limiting"]["retries"], allow_zero=True)
+    hedging = config["hedging"]
+    for key in ("percentile", "budget", "window", "min_samples"):
+        positive("hedging", key, hedging[key])
+    positive("hedging", "min_delay", hedging["min_delay"], allow_zero=True)
+    if hedging["percentile"] >= 100 or hedging["budget"] > 1:
+        raise ValueError(
+            "Invalid WorkLocal config: hedging.percentile must be below 100 "
+            "and hedging.budget at most 1"
+        )
+    positive("write_coalescing", "window", config["write_coalescing"]["window"])
+    positive("write_coalescing", "max_updates", config["write_coalescing"]["max_updates"])
+    positive(
+        "transport",
+        "compress_min_bytes",
+        config["transport"]["compress_min_bytes"],
+        allow_zero=True,
+    )
+    for key in (
+        "search_limit",
+        "page_size",
+        "batch_concurrency",
+        "fleet_limit",
+        "fleet_concurrency",
+    ):
+        positive("defaults", key, config["defaults"][key])
+
+
+def _auth_headers(config: Dict[str, Any], api_key: Optional[str] = None) -> Dict[str, str]:
+    """Authentication header for ``api_key`` (default: the configured ``api.api_key``), if any."""
+    api_key = api_key or config["api"].get("api_key")
+    auth = config["authentication"]
+    if not api_key or auth["type"] == "none":
+        return {}
+    if auth["type"] == "api_key":
+        return {auth.get("header_name") or "X-API-Key": api_key}
+    if auth["type"] == "basic":
+        # api_key holds "user:password"
+        return {"Authorization": "Basic " + base64.b64encode(api_key.encode()).decode()}
+    return {auth.get("header_name") or "Authorization": f"Bearer {api_key}"}
+
+
+def _cache_from_config(
+    config: Dict[str, Any], headers: Optional[Dict[str, str]] = None
+) -> _ResponseCache:
+    cache = config["cache"]
+    breaker = config["circuit_breaker"]
+    stale_for = breaker["max_stale"] if breaker["enabled"] and breaker["serve_stale"] else 0.0
+    disk = None
+    if cache["disk"]["enabled"]:
+        path = cache["disk"]["path"] or os.path.join(
+            os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+            "worklocal_tools",
+            "cache.db",
+        )
+        # Clients with other credentials or another API share the file, not the rows.
+        namespace = hashlib.sha256(
+            json.dumps([config["api"]["base_url"], headers or {}], sort_keys=True).encode()
+        ).hexdigest()[:16]
+        disk = _DiskCache(path, namespace, cache["disk"]["max_bytes"], stale_for)
+    return _ResponseCache(
+        max_entries=cache["max_entries"],
+        max_bytes=cache["max_bytes"],
+        ttls=cache["ttls"],
+        stale_for=stale_for,
+        disk=disk,
+    )
+
+
+def _breaker_from_config(config: Dict[str, Any]) -> Optional[_CircuitBreaker]:
+    breaker = config["circuit_breaker"]
+    if not breaker["enabled"]:
+        return None
+    return _CircuitBreaker(
+        failure_rate=breaker["failure_rate"],
+        min_calls=breaker["min_calls"],
+        window=breaker["window"],
+        slow_call_duration=breaker["slow_call_duration"],
+        open_duration=breaker["open_duration"],
+        half_open_probes=breaker["half_open_probes"],
+    )
+
+
+def _metrics_store_from_config(config: Dict[str, Any]) -> Optional["_MetricsStore"]:
+    store = config["metrics_store"]
+    if not store["enabled"]:
+        return None
+    return _MetricsStore(
+        raw_retention=store["raw_retention"],
+        minute_retention=store["minute_retention"],
+        hour_retention=store["hour_retention"],
+        max_series=store["max_series"],
+    )
+
+
+def _index_from_config(config: Dict[str, Any]) -> Optional["_ResourceIndex"]:
+    index = config["index"]
+    if not index["enabled"]:
+        return None
+    return _ResourceIndex(
+        sync_interval=index["sync_interval"],
+        full_sync_interval=index["full_sync_interval"],
+        max_staleness=index["max_staleness"],
+        fallback_to_server=index["fallback_to_server"],
+        max_resources=index["max_resources"],
+    )
+
+
+def _change_feed_from_config(
+    config: Dict[str, Any],
+    headers: Dict[str, str],
+    cache: _ResponseCache,
+    index: Optional["_ResourceIndex"],
+) -> Optional["_ChangeFeed"]:
+    feed = config["change_feed"]
+    if not feed["enabled"]:
+        return None
+    return _ChangeFeed(
+        config["api"]["base_url"],
+        headers,
+        cache,
+        index,
+        mode=feed["mode"],
+        path=feed["path"],
+        live_ttl=feed["live_ttl"],
+        read_timeout=feed["read_timeout"],
+        reconnect_delay=feed["reconnect_delay"],
+        max_reconnect_delay=feed["max_reconnect_delay"],
+        webhook_host=feed["webhook_host"],
+        webhook_port=feed["webhook_port"],
+        webhook_secret=feed["webhook_secret"],
+        verify_ssl=config["api"]["verify_ssl"],
+    ).start()
+
+
+def _limiter_from_config(config: Dict[str, Any]) -> Optional[_TokenBucket]:
+    limits = config["rate_limiting"]
+    if not limits["enabled"]:
+        return None
+    return _TokenBucket(limits["requests_per_minute"], limits["burst_size"])
+
+
+def _hedger_from_config(config: Dict[str, Any]) -> Optional[_Hedger]:
+    hedging = config["hedging"]
+    if not hedging["enabled"]:
+        return None
+    return _Hedger(
+        endpoints=tuple(hedging["endpoints"]),
+        percentile=hedging["percentile"],
+        min_delay=hedging["min_delay"],
+        budget=hedging["budget"],
+        window=int(hedging["window"]),
+        min_samples=int(hedging["min_samples"]),
+    )
+
+
+_AnyCoalescer = TypeVar("_AnyCoalescer", bound=Union["_WriteCoalescer", "_AsyncWriteCoalescer"])
+
+
+def _coalescer_from_config(
+    config: Dict[str, Any], coalescer_class: Type[_AnyCoalescer]
+) -> Optional[_AnyCoalescer]:
+    coalescing = config["write_coalescing"]
+    if not coalescing["enabled"]:
+        return None
+    return coalescer_class(coalescing["window"], int(coalescing["max_updates"]))
+
+
+def _http2_from_config(config: Dict[str, Any]) -> bool:
+    """Whether clients should speak HTTP/2: configured, and httpx with h2 installed."""
+    if not config["transport"]["http2"]:
+        return False
+    if httpx is None or importlib.util.find_spec("h2") is None:
+        logger.warning(
+            'transport.http2 needs httpx and h2 (pip install "httpx[http2]"); using HTTP/1.1'
+        )
+        return False
+    return True
+
+
+def _compress_min_bytes_from_config(config: Dict[str, Any]) -> Optional[int]:
+    transport = config["transport"]
+    return transport["compress_min_bytes"] if transport["compress_requests"] else None
+
+
+def _configure_logging(config: Dict[str, Any]) -> None:
+    """Apply the ``logging`` section to the "worklocal_tools" logger, once per process."""
+    if getattr(logger, "_worklocal_configured", False):
+        return
+    settings = config["logging"]
+    logger.setLevel(str(settings["level"]).upper())
+    formatter = logging.Formatter(settings["format"])
+    handlers: List[logging.Handler] = []
+    if settings.get("console"):
+        handlers.append(logging.StreamHandler())
+    if settings.get("file"):
+        handlers.append(logging.FileHandler(settings["file"], encoding="utf-8"))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+        logger.addHandler(handler)
+    if handlers:
+        logger.propagate = False
+    logger._worklocal_configured = True  # type: ignore[attr-defined]
+
+
+def _telemetry_from_config(config: Dict[str, Any]) -> _Telemetry:
+    settings = config["instrumentation"]
+    sinks: List[Any] = []
+    if settings["metrics"]:
+        sinks.append(_REGISTRY)
+    if settings["log_calls"]:
+        _configure_logging(config)
+        sinks.append(_LogSink())
+    if settings["opentelemetry"]:
+        hook = _opentelemetry_hook()
+        if hook is not None:
+            sinks.append(_SpanSink(hook))
+    return _Telemetry(sinks)
+
+
+def _feature_disabled(config: Dict[str, Any], feature: str) -> Optional[str]:
+    if config["features"].get(feature, True):
+        return None
+    return f"⚠️ This tool is disabled in the WorkLocal tools configuration (features.{feature})."
+
+
+class _SingleFlight:
+    """
+    Collapses concurrent identical calls into one.
+
+    The first caller for a key runs the call; callers arriving while it is in
+    flight wait for it and share its result (or exception).
+    """
+
+    def __init__(self):
+        self.coalesced = 0
+        self._calls: Dict[Any, "Future[Any]"] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Any, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            shared = self._calls.get(key)
+            if shared is None:
+                future: "Future[Any]" = Future()
+                self._calls[key] = future
+            else:
+                self.coalesced += 1
+                _count("coalesced")
+        if shared is not None:
+            return shared.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+class _AsyncSingleFlight:
+    """
+    Asyncio counterpart of ``_SingleFlight``.
+
+    The shared call runs as its own task, so cancelling one waiting caller
+    (even the first) does not cancel the request for the others.
+    """
+
+    def __init__(self):
+        self.coalesced = 0
+        self._calls: Dict[Any, "asyncio.Task[Any]"] = {}
+
+    async def do(self, key: Any, fn: Callable[[], Any]) -> Any:
+        task = self._calls.get(key)
+        if task is None:
+            task = self._calls[key] = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        else:
+            self.coalesced += 1
+            _count("coalesced")
+        return await asyncio.shield(task)
+
+
+# Write coalescing. Concurrent updates of one resource (parallel tool calls,
+# batch updates, several chats) are folded into a single JSON merge patch and
+# sent as one PATCH, so the API reconciles the resource once.
+
+def _compose_patches(first: Dict[str, Any], second: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    One JSON merge patch (RFC 7396) with the effect of applying ``first`` and
+    then ``second``, or None when there is none: a merge patch cannot replace
+    an object wholesale, which ``second`` would need to do when it patches
+    into a member that ``first`` removes or sets to a non-object.
+    """
+    merged = dict(first)
+    for key, value in second.items():
+        if isinstance(value, dict) and key in first:
+            if not isinstance(first[key], dict):
+                return None
+            inner = _compose_patches(first[key], value)
+            if inner is None:
+                return None
+            merged[key] = inner
+        else:
+            merged[key] = value
+    return merged
+
+
+class _PatchBatch:
+    """Updates of one resource waiting to go out as one PATCH."""
+
+    __slots__ = ("patch", "patches", "previous", "flush", "done")
+
+    def __init__(
+        self, patch: Dict[str, Any], previous: Optional["_PatchBatch"], flush: Any, done: Any
+    ):
+        self.patch = patch
+        self.patches = [patch]
+        # The batch sent before this one, which must finish first
+        self.previous = previous
+        # Set to send now rather than at the end of the window
+        self.flush = flush
+        # Future (Task for AsyncTools) of the replies, one per update
+        self.done = done
+
+
+class _Coalescer(ABC):
+    """Batch bookkeeping shared by the blocking and the asyncio write coalescers."""
+
+    REPLAY_STATUSES = (400, 409, 422)
+
+    def __init__(self, window: float = 0.1, max_updates: int = 20):
+        self.window = window
+        self.max_updates = max_updates
+        self.sent = 0
+        self.merged = 0
+        self._open: Dict[Any, _PatchBatch] = {}
+        self._last: Dict[Any, _PatchBatch] = {}
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def _new_batch(self, patch: Dict[str, Any], previous: Optional[_PatchBatch]) -> _PatchBatch:
+        """A batch opened by ``patch`` with this coalescer's flush event and completion handle."""
+
+    def _join(self, key: Any, patch: Dict[str, Any]) -> Tuple[_PatchBatch, int]:
+        """The batch ``patch`` goes out with and its position there (0: it opened the batch)."""
+        with self._lock:
+            batch = self._open.get(key)
+            if batch is not None:
+                merged = _compose_patches(batch.patch, patch)
+                if merged is not None:
+                    batch.patch = merged
+                    batch.patches.append(patch)
+                    self.merged += 1
+                    _count("writes_coalesced")
+                    if len(batch.patches) >= self.max_updates:
+                        self._close(key, batch)
+                    return batch, len(batch.patches) - 1
+                self._close(key, batch)
+            batch = self._open[key] = self._last[key] = self._new_batch(patch, self._last.get(key))
+            return batch, 0
+
+    def _close(self, key: Any, batch: _PatchBatch) -> None:
+        """Take ``batch`` out of the window and let it go (under ``_lock``)."""
+        if self._open.get(key) is batch:
+            del self._open[key]
+        batch.flush.set()
+
+    def _replayed(self, batch: _PatchBatch, reply: Any) -> bool:
+        """Whether the updates of ``batch`` must be resent one by one after ``reply``."""
+        with self._lock:
+            self.sent += 1
+        return len(batch.patches) > 1 and reply.status_code in self.REPLAY_STATUSES
+
+    def _finish(self, key: Any, batch: _PatchBatch) -> None:
+        batch.previous = None
+        with self._lock:
+            if self._last.get(key) is batch:
+                del self._last[key]
+
+
+class _WriteCoalescer(_Coalescer):
+    """
+    Merges concurrent updates of one resource into one PATCH (opt-in, ``write_coalescing``).
+
+    The first update of a resource opens a batch and holds it for ``window``
+    seconds; updates arriving meanwhile are folded into its merge patch (see
+    ``_compose_patches``) and every caller gets the reply to the merged
+    PATCH. A resource's batches go out one at a time, in order: an update
+    that cannot be merged, or finds the batch full, closes it and opens the
+    next one, which waits for its predecessor. ``flush`` sends a resource's
+    open batch at once and waits for all its pending updates, so an action
+    or delete never overtakes them. If the API rejects a merged PATCH
+    (400/409/422), its updates are replayed one by one so that each caller
+    gets its own verdict.
+    """
+
+    def _new_batch(self, patch: Dict[str, Any], previous: Optional[_PatchBatch]) -> _PatchBatch:
+        return _PatchBatch(patch, previous, threading.Event(), Future())
+
+    def submit(self, key: Any, patch: Dict[str, Any], send: Callable[[Dict[str, Any]], Any]) -> Any:
+        """
+        Send ``patch`` with the next PATCH of ``key`` and return the reply for it.
+
+        ``send(merged_patch)`` does the request; it runs on the thread of the
+        caller that opened the batch.
+        """
+        batch, index = self._join(key, patch)
+        if index:
+            return batch.done.result()[index]
+        batch.flush.wait(_until_deadline(self.window))
+        with self._lock:
+            self._close(key, batch)
+        try:
+            if batch.previous is not None:
+                wait([batch.previous.done])
+            reply = send(batch.patch)
+            if self._replayed(batch, reply):
+                replies = [send(update) for update in batch.patches]
+            else:
+                replies = [reply] * len(batch.patches)
+        except BaseException as e:
+            batch.done.set_exception(e)
+            raise
+        else:
+            batch.done.set_result(replies)
+            return replies[0]
+        finally:
+            self._finish(key, batch)
+
+    def flush(self, key: Any) -> None:
+        """Send the open batch of ``key`` now and wait until all its updates are answered."""
+        with self._lock:
+            batch = self._open.get(key)
+            if batch is not None:
+                self._close(key, batch)
+            last = self._last.get(key)
+        if last is not None:
+            wait([last.done])
+
+
+class _AsyncWriteCoalescer(_Coalescer):
+    """
+    Asyncio counterpart of ``_WriteCoalescer``.
+
+    Each batch is sent by its own task, so cancelling a waiting caller (even
+    the one that opened the batch) does not cancel the PATCH for the others.
+    """
+
+    def _new_batch(self, patch: Dict[str, Any], previous: Optional[_PatchBatch]) -> _PatchBatch:
+        return _PatchBatch(patch, previous, asyncio.Event(), None)
+
+    async def submit(
+        self, key: Any, patch: Dict[str, Any], send: Callable[[Dict[str, Any]], Any]
+    ) -> Any:
+        batch, index = self._join(key, patch)
+        if batch.done is None:
+            batch.done = asyncio.ensure_future(self._run(key, batch, send))
+        replies = await asyncio.shield(batch.done)
+        return replies[index]
+
+    async def _run(
+        self, key: Any, batch: _PatchBatch, send: Callable[[Dict[str, Any]], Any]
+    ) -> List[Any]:
+        try:
+            await asyncio.wait_for(batch.flush.wait(), _until_deadline(self.window))
+        except asyncio.TimeoutError:
+            pass
+        with self._lock:
+            self._close(key, batch)
+        try:
+            if batch.previous is not None:
+                await asyncio.wait([batch.previous.done])
+            reply = await send(batch.patch)
+            if self._replayed(batch, reply):
+                return [await send(update) for update in batch.patches]
+            return [reply] * len(batch.patches)
+        finally:
+            self._finish(key, batch)
+
+    async def flush(self, key: Any) -> None:
+        with self._lock:
+            batch = self._open.get(key)
+            if batch is not None:
+                self._close(key, batch)
+            last = self._last.get(key)
+        if last is not None:
+            await asyncio.wait([last.done])
+
+
+def _coalesced_write(method: str, path: str, kwargs: Dict[str, Any]) -> Tuple[Optional[Any], bool]:
+    """
+    The coalescing key of a write to ``path`` (None if it touches no single
+    resource), and whether the write is an update that may be merged.
+    """
+    parts = path.strip("/").split("/")
+    if len(parts) < 2 or parts[0] != "resources":
+        return None, False
+    mergeable = (
+        method == "PATCH"
+        and len(parts) == 2
+        and isinstance(kwargs.get("json"), dict)
+        and not kwargs.get("headers")
+    )
+    return (_tenant_id(), parts[1]), mergeable
+
+
+def _notify_write(
+    listeners: List[Callable[..., None]], method: str, path: str, body: Any, response: Any
+) -> None:
+    # Listeners (the local index) hold the instance's own view, so other
+    # tenants' writes only invalidate the cache.
+    if _current_tenant.get() is None:
+        for listener in listeners:
+            listener(method, path, body, response)
+
+
+def _compress_write(
+    kwargs: Dict[str, Any], headers: Dict[str, str], min_bytes: Optional[int], field: str
+) -> None:
+    """
+    Swap a write's ``json`` body in ``kwargs`` for gzipped bytes under
+    ``field`` ('data' for requests, 'content' for httpx) when it is at least
+    ``min_bytes`` long, adding the matching headers to ``headers``.
+    """
+    if min_bytes is None or kwargs.get("json") is None:
+        return
+    raw = json.dumps(kwargs["json"], separators=(",", ":")).encode()
+    if len(raw) < min_bytes:
+        return
+    del kwargs["json"]
+    kwargs[field] = gzip.compress(raw)
+    headers.update({"Content-Type": "application/json", "Content-Encoding": "gzip"})
+    _count("compressed_requests")
+
+
+def _stale_entry(cache: _ResponseCache, key: Tuple[str, str, str], endpoint: Optional[str]) -> Any:
+    """The (possibly expired) cache entry to answer a read refused by an open circuit, if any."""
+    entry = cache.stale(key) if endpoint else None
+    if entry is not None:
+        _count("stale")
+    return entry
+
+
+def _deadline_headers(headers: Dict[str, str], name: Optional[str]) -> Dict[str, str]:
+    """``headers`` plus the ``name`` header carrying the milliseconds left, if any."""
+    remaining = _remaining() if name else None
+    if name is None or remaining is None:
+        return headers
+    return {**headers, name: str(max(int(remaining * 1000), 0))}
+
+
+def _first_reply(primary: Future, backup: Future, hedger: _Hedger) -> Any:
+    """The first success of a hedged request or its backup; the primary's error if both fail."""
+    pending = {primary, backup}
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in sorted(done, key=lambda f: f is backup):
+            if future.exception() is None:
+                if future is backup:
+                    hedger.backup_won()
+                return future.result()
+    return primary.result()
+
+
+async def _first_reply_async(
+    primary: "asyncio.Task", backup: "asyncio.Task", hedger: _Hedger
+) -> Any:
+    """Async counterpart of ``_first_reply``."""
+    pending = {primary, backup}
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in sorted(done, key=lambda t: t is backup):
+            if task.exception() is None:
+                if task is backup:
+                    hedger.backup_won()
+                return task.result()
+    return primary.result()
+
+
+class _Http2Session:
+    """
+    The slice of ``requests.Session`` that ``_WorkLocalClient`` uses, over
+    HTTP/2: calls from any thread share one multiplexed connection per host
+    instead of one connection each.
+
+    httpx's sync HTTP/2 connection is not safe to share between threads (they
+    can send stream headers out of order), so requests run on an
+    ``httpx.AsyncClient`` owned by a private event-loop thread. Over https
+    HTTP/2 is negotiated with ALPN, falling back to HTTP/1.1; over plain http
+    the server must speak HTTP/2 directly (h2c). As with
+    ``_AsyncWorkLocalClient``, only connection failures are retried and
+    transport errors are re-raised as ``requests.exceptions`` types.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        verify: Any,
+        max_connections: int,
+        retries: int,
+        headers: Dict[str, str],
+    ):
+        self._client = httpx.AsyncClient(
+            headers=headers,
+            transport=httpx.AsyncHTTPTransport(
+                verify=verify,
+                http1=base_url.startswith("https://"),
+                http2=True,
+                limits=httpx.Limits(
+                    max_connections=max_connections, max_keepalive_connections=max_connections
+                ),
+                retries=retries,
+            ),
+        )
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="worklocal-http2", daemon=True
+        )
+        self._thread.start()
+
+    def request(
+        self, method: str, url: str, data: Optional[bytes] = None, **kwargs: Any
+    ) -> "httpx.Response":
+        call = self._client.request(method, url, content=data, **kwargs)
+        try:
+            return asyncio.run_coroutine_threadsafe(call, self._loop).result()
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.Timeout(str(e))
+        except httpx.HTTPError as e:
+            raise requests.exceptions.ConnectionError(str(e))
+
+    def close(self) -> None:
+        asyncio.run_coroutine_threadsafe(self._client.aclose(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+
+class _WorkLocalClient:
+    """
+    Connection-pooled HTTP client shared by every Tools method.
+
+    OpenWebUI exposes every callable attribute of ``Tools`` as a tool, so the
+    transport plumbing lives here rather than as helper methods on ``Tools``.
+    """
+
+    # Only methods that are safe to replay are retried by the adapter. 429 and
+    # 503 are handled in ``_send`` instead, so they go through the limiter.
+    RETRY_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "DELETE"})
+    RETRY_STATUSES = (502, 504)
+
+    def __init__(
+        self,
+        base_url: str,
+        headers: Dict[str, str],
+        pool_connections: int = 10,
+        pool_maxsize: int = 20,
+        max_retries: int = 3,
+        backoff_factor: float = 0.3,
+        cache: Optional[_ResponseCache] = None,
+        limiter: Optional[_TokenBucket] = None,
+        throttle_retries: int = 3,
+        timeout: float = 10,
+        timeouts: Optional[Dict[str, float]] = None,
+        verify_ssl: Any = True,
+        breaker: Optional[_CircuitBreaker] = None,
+        http2: bool = False,
+        compression: bool = True,
+        compress_min_bytes: Optional[int] = None,
+        hedger: Optional[_Hedger] = None,
+        deadline_header: Optional[str] = None,
+        coalescer: Optional[_WriteCoalescer] = None,
+    ):
+        self.base_url = base_url
+        self.headers = headers
+        self.hedger = hedger
+        self.coalescer = coalescer
+        self.deadline_header = deadline_header
+        self.http2 = http2
+        self.compression = compression
+        self.compress_min_bytes = compress_min_bytes
+        self.cache = cache if cache is not None else _ResponseCache()
+        self.limiter = limiter
+        self.breaker = breaker
+        self.throttle_retries = throttle_retries
+        self.throttled = 0
+        self.flights = _SingleFlight()
+        # Called as listener(method, path, json_body, response) after each successful write
+        self.write_listeners: List[Callable[[str, str, Any, Any], None]] = []
+        self.timeout = timeout
+        self.timeouts = timeouts or {}
+        self.verify_ssl = verify_ssl
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        # A requests.Session, or an _Http2Session with http2
+        self._session: Any = None
+        self._hedge_pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], headers: Dict[str, str]) -> "_WorkLocalClient":
+        api, pool = config["api"], config["pool"]
+        return cls(
+            api["base_url"],
+            headers,
+            pool_connections=pool["connections"],
+            pool_maxsize=pool["maxsize"],
+            max_retries=pool["max_retries"],
+            backoff_factor=pool["backoff_factor"],
+            cache=_cache_from_config(config, headers),
+            limiter=_limiter_from_config(config),
+            throttle_retries=config["rate_limiting"]["retries"],
+            timeout=api["timeout"],
+            timeouts=api["timeouts"],
+            verify_ssl=api["verify_ssl"],
+            breaker=_breaker_from_config(config),
+            http2=_http2_from_config(config),
+            compression=config["transport"]["compression"],
+            compress_min_bytes=_compress_min_bytes_from_config(config),
+            hedger=_hedger_from_config(config),
+            deadline_header=api["deadline_header"],
+            coalescer=_coalescer_from_config(config, _WriteCoalescer),
+        )
+
+    @property
+    def session(self) -> Any:
+        """The keep-alive session (``_Http2Session`` with http2), created on first use."""
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = self._build_session()
+        return self._session
+
+    @property
+    def hedge_pool(self) -> ThreadPoolExecutor:
+        """Threads running hedged requests and their backups, created on first use."""
+        if self._hedge_pool is None:
+            with self._lock:
+                if self._hedge_pool is None:
+                    self._hedge_pool = ThreadPoolExecutor(
+                        max_workers=2 * self.pool_maxsize, thread_name_prefix="worklocal-hedge"
+                    )
+        return self._hedge_pool
+
+    def _build_session(self) -> Any:
+        # "identity" turns off the gzip (and br/zstd, if installed) that both
+        # HTTP stacks ask for by default.
+        defaults = {} if self.compression else {"Accept-Encoding": "identity"}
+        if self.http2:
+            return _Http2Session(
+                self.base_url, self.verify_ssl, self.pool_maxsize, self.max_retries, defaults
+            )
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        retry = Retry(
+            total=self.max_retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=self.RETRY_STATUSES,
+            allowed_methods=self.RETRY_METHODS,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            max_retries=retry,
+        )
+        session = requests.Session()
+        session.verify = self.verify_ssl
+        session.headers.update(defaults)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def request(
+        self, method: str, path: str, endpoint: Optional[str] = None, **kwargs: Any
+    ) -> Any:
+        """
+        Send a request to ``base_url + path`` over the pooled session.
+
+        Args:
+            method (str): HTTP method, e.g. 'GET'
+            path (str): Path relative to the API base URL
+            endpoint (str): Endpoint class (e.g. 'metrics'), selecting its
+                timeout and, for GETs, its cache TTL
+            **kwargs: Passed through to ``requests.Session.request``; ``headers``
+                adds request headers to writes
+
+        Returns:
+            The response, or a ``_CachedResponse`` for cacheable GETs
+        """
+        kwargs.setdefault("timeout", self.timeouts.get(endpoint or "", self.timeout))
+        if method != "GET":
+            coalescer = self.coalescer
+            key, mergeable = _coalesced_write(method, path, kwargs) if coalescer else (None, False)
+            if coalescer is not None and mergeable:
+                return coalescer.submit(
+                    key,
+                    kwargs.pop("json"),
+                    lambda patch: self._write(method, path, endpoint, json=patch, **kwargs),
+                )
+            if coalescer is not None and key is not None:
+                coalescer.flush(key)  # Pending updates of the resource go first
+            return self._write(method, path, endpoint, **kwargs)
+
+        cache = endpoint if endpoint in self.cache.ttls else None
+        key = self.cache.key(path, kwargs.get("params"))
+        if cache:
+            cached = self.cache.get(key)
+            _count("cache_hit" if cached is not None else "cache_miss")
+            if cached is not None:
+                return cached
+        # Identical reads already in flight share one upstream call.
+        try:
+            return self.flights.do(
+                key, lambda: self._fetch(method, path, key, cache, endpoint=endpoint, **kwargs)
+            )
+        except _circuit_open_error():
+            stale = _stale_entry(self.cache, key, cache)
+            if stale is None:
+                raise
+            return stale
+
+    def _write(self, method: str, path: str, endpoint: Optional[str], **kwargs: Any) -> Any:
+        """Send a write, then invalidate the cache entries and notify the listeners it affects."""
+        headers = {**_tenant_headers(self.headers), **(kwargs.pop("headers", None) or {})}
+        body = kwargs.get("json")
+        _compress_write(kwargs, headers, self.compress_min_bytes, "data")
+        response = self._send(method, path, headers, endpoint, **kwargs)
+        if 200 <= response.status_code < 300:
+            self.cache.invalidate_for_write(method, path)
+            _notify_write(self.write_listeners, method, path, body, response)
+        return response
+
+    def _guarded(self, endpoint: Optional[str], send: Callable[[], Any]) -> Any:
+        """
+        Call ``send`` through the endpoint's circuit breaker, if any. Only the
+        round trip is timed: limiter waits and Retry-After pauses happen
+        outside, so client-side throttling never counts as a slow call.
+        """
+        breaker = self.breaker
+        if breaker is None or endpoint in breaker.UNGUARDED:
+            return send()
+        endpoint = endpoint or "other"
+        probe = breaker.enter(endpoint)
+        start = time.monotonic()
+        failed = None
+        try:
+            response = send()
+            failed = response.status_code >= 500
+            return response
+        except requests.exceptions.RequestException:
+            failed = True
+            raise
+        finally:
+            breaker.exit(endpoint, probe, time.monotonic() - start, failed)
+
+    def _fetch(
+        self,
+        method: str,
+        path: str,
+        key: Tuple[str, str, str],
+        cache: Optional[str],
+        endpoint: Optional[str] = None,
+        **kwargs: Any,
+    ) -> Any:
+        base = _tenant_headers(self.headers)
+        if not cache:
+            return self._send(method, path, base, endpoint, **kwargs)
+        headers = {**base, **self.cache.conditional_headers(key)}
+        response = self._send(method, path, headers, endpoint, **kwargs)
+        result = self.cache.put(key, response, cache)
+        if result is response and response.status_code == 304:
+            # The entry was evicted while we revalidated it; fetch in full.
+            response = self._send(method, path, base, endpoint, **kwargs)
+            result = self.cache.put(key, response, cache)
+        return result
+
+    def _send(
+        self,
+        method: str,
+        path: str,
+        headers: Dict[str, str],
+        endpoint: Optional[str] = None,
+        **kwargs: Any,
+    ) -> Any:
+        """
+        Send through the (tenant's) limiter, backing off and retrying on 429/503.
+
+        Each attempt's timeout is cut to what is left of the call's deadline,
+        and no retry pause runs past it.
+        """
+        limiter = self.limiter.tenant(_tenant_id()) if self.limiter is not None else None
+        timeout = kwargs.pop("timeout", self.timeout)
+        for attempt in range(self.throttle_retries + 1):
+            if limiter is not None:
+                start = time.perf_counter()
+                limiter.acquire()
+                _observe("queue", time.perf_counter() - start)
+            # Before the breaker admits the attempt: a call that is already
+            # too late sends nothing and must not count as an endpoint failure.
+            left = _deadline_timeout(timeout)
+            start = time.perf_counter()
+            response = self._guarded(
+                endpoint,
+                lambda: self._send_once(method, path, headers, endpoint, timeout=left, **kwargs),
+            )
+            _observe_response(response, time.perf_counter() - start)
+            if attempt == self.throttle_retries or not _should_retry_throttled(method, response):
+                return response
+            delay = _retry_after(response, attempt, self.backoff_factor)
+            remaining = _remaining()
+            if remaining is not None and delay >= remaining:
+                return response
+            self.throttled += 1
+            _count("retries")
+            if limiter is not None:
+                limiter.pause(delay)
+            else:
+                time.sleep(delay)
+        return response
+
+    def _send_once(
+        self,
+        method: str,
+        path: str,
+        headers: Dict[str, str],
+        endpoint: Optional[str],
+        **kwargs: Any,
+    ) -> Any:
+        """One request; a slow GET gets a backup copy when hedging is on (see ``_Hedger``)."""
+        url = f"{self.base_url}{path}"
+        headers = _deadline_headers(headers, self.deadline_header)
+        hedger = self.hedger
+        if hedger is None or method != "GET":
+            return self.session.request(method, url, headers=headers, **kwargs)
+
+        def attempt() -> Any:
+            start = time.perf_counter()
+            response = self.session.request(method, url, headers=headers, **kwargs)
+            hedger.observe(endpoint, time.perf_counter() - start)
+            return response
+
+        delay = hedger.delay(endpoint)
+        remaining = _remaining()
+        if delay is None or (remaining is not None and remaining <= delay):
+            return attempt()
+        primary = self.hedge_pool.submit(contextvars.copy_context().run, attempt)
+        if wait([primary], timeout=delay).done or not hedger.spend():
+            return primary.result()
+        backup = self.hedge_pool.submit(contextvars.copy_context().run, attempt)
+        return _first_reply(primary, backup, hedger)
+
+    def close(self) -> None:
+        """Release all pooled connections."""
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+            if self._hedge_pool is not None:
+                self._hedge_pool.shutdown(wait=False)
+                self._hedge_pool = None
+
+
+class _AsyncWorkLocalClient:
+    """
+    Async counterpart of ``_WorkLocalClient`` built on a pooled ``httpx.AsyncClient``.
+
+    Transport errors are re-raised as ``requests.exceptions`` types so that
+    ``Tools`` and ``AsyncTools`` share one error contract.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        headers: Dict[str, str],
+        pool_maxsize: int = 20,
+        max_retries: int = 3,
+        transport: Any = None,
+        cache: Optional[_ResponseCache] = None,
+        limiter: Optional[_TokenBucket] = None,
+        throttle_retries: int = 3,
+        backoff_factor: float = 0.3,
+        timeout: float = 10,
+        timeouts: Optional[Dict[str, float]] = None,
+        verify_ssl: Any = True,
+        breaker: Optional[_CircuitBreaker] = None,
+        http2: bool = False,
+        compression: bool = True,
+        compress_min_bytes: Optional[int] = None,
+        hedger: Optional[_Hedger] = None,
+        deadline_header: Optional[str] = None,
+        coalescer: Optional[_AsyncWriteCoalescer] = None,
+    ):
+        if httpx is None:
+            raise ImportError("AsyncTools requires httpx: pip install httpx")
+        self.base_url = base_url
+        self.headers = headers
+        self.hedger = hedger
+        self.coalescer = coalescer
+        self.deadline_header = deadline_header
+        self.http2 = http2
+        self.compression = compression
+        self.compress_min_bytes = compress_min_bytes
+        self.timeout = timeout
+        self.timeouts = timeouts or {}
+        self.verify_ssl = verify_ssl
+        self.cache = cache if cache is not None else _ResponseCache()
+        self.limiter = limiter
+        self.breaker = breaker
+        self.throttle_retries = throttle_retries
+        self.backoff_factor = backoff_factor
+        self.throttled = 0
+        self.flights = _AsyncSingleFlight()
+        self.write_listeners: List[Callable[[str, str, Any, Any], None]] = []
+        self.pool_maxsize = pool_maxsize
+        self.max_retries = max_retries
+        self.transport = transport
+        # An AsyncClient is bound to the event loop it was first used on, so
+        # each loop gets its own, dropped (and its sockets with it) once the
+        # loop is closed or gone.
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    @classmethod
+    def from_config(
+        cls, config: Dict[str, Any], headers: Dict[str, str]
+    ) -> "_AsyncWorkLocalClient":
+        api, pool = config["api"], config["pool"]
+        return cls(
+            api["base_url"],
+            headers,
+            pool_maxsize=pool["maxsize"],
+            max_retries=pool["max_retries"],
+            cache=_cache_from_config(config, headers),
+            limiter=_limiter_from_config(config),
+            throttle_retries=config["rate_limiting"]["retries"],
+            backoff_factor=pool["backoff_factor"],
+            timeout=api["timeout"],
+            timeouts=api["timeouts"],
+            verify_ssl=api["verify_ssl"],
+            breaker=_breaker_from_config(config),
+            http2=_http2_from_config(config),
+            compression=config["transport"]["compression"],
+            compress_min_bytes=_compress_min_bytes_from_config(config),
+            hedger=_hedger_from_config(config),
+            deadline_header=api["deadline_header"],
+            coalescer=_coalescer_from_config(config, _AsyncWriteCoalescer),
+        )
+
+    @property
+    def client(self) -> "httpx.AsyncClient":
+        """The pooled client for the running event loop, created on first use."""
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            for closed in [other for other in self._clients if other.is_closed()]:
+                del self._clients[closed]
+            limits = httpx.Limits(
+                max_connections=self.pool_maxsize,
+                max_keepalive_connections=self.pool_maxsize,
+            )
+            # An explicit transport ignores the client's TLS and pool settings,
+            # so they go on the transport. See _Http2Session for h2 over http.
+            transport = self.transport or httpx.AsyncHTTPTransport(
+                verify=self.verify_ssl,
+                limits=limits,
+                retries=self.max_retries,
+                http1=not self.http2 or self.base_url.startswith("https://"),
+                http2=self.http2,
+            )
+            client = self._clients[loop] = httpx.AsyncClient(
+                headers={} if self.compression else {"Accept-Encoding": "identity"},
+                verify=self.verify_ssl,
+                limits=limits,
+                transport=transport,
+            )
+        return client
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        endpoint: Optional[str] = None,
+        timeout: Optional[float] = None,
+        **kwargs: Any,
+    ) -> Any:
+        """
+        Send a request to ``base_url + path`` over the pooled async client.
+
+        ``timeout`` bounds the whole call, not just each I/O phase; if the
+        calling task is cancelled the in-flight request is cancelled with it.
+
+        Args:
+            method (str): HTTP method, e.g. 'GET'
+            path (str): Path relative to the API base URL
+            endpoint (str): Endpoint class (e.g. 'metrics'), selecting its
+                timeout and, for GETs, its cache TTL
+            timeout (float): Overall deadline for the call in seconds
+            **kwargs: Passed through to ``httpx.AsyncClient.request``; ``headers``
+                adds request headers to writes
+
+        Returns:
+            The response, or a ``_CachedResponse`` for cacheable GETs
+        """
+        if timeout is None:
+            timeout = self.timeouts.get(endpoint or "", self.timeout)
+        if method != "GET":
+            coalescer = self.coalescer
+            key, mergeable = _coalesced_write(method, path, kwargs) if coalescer else (None, False)
+            if coalescer is not None and mergeable:
+                return await coalescer.submit(
+                    key,
+                    kwargs.pop("json"),
+                    lambda patch: self._write(
+                        method, path, endpoint, timeout, json=patch, **kwargs
+                    ),
+                )
+            if coalescer is not None and key is not None:
+                await coalescer.flush(key)  # Pending updates of the resource go first
+            return await self._write(method, path, endpoint, timeout, **kwargs)
+
+        cache = endpoint if endpoint in self.cache.ttls else None
+        key = self.cache.key(path, kwargs.get("params"))
+        if cache:
+            cached = self.cache.get(key)
+            _count("cache_hit" if cached is not None else "cache_miss")
+            if cached is not None:
+                return cached
+        # Identical reads already in flight share one upstream call.
+        try:
+            return await self.flights.do(
+                key,
+                lambda: self._fetch(method, path, timeout, key, cache, endpoint=endpoint, **kwargs),
+            )
+        except _circuit_open_error():
+            stale = _stale_entry(self.cache, key, cache)
+            if stale is None:
+                raise
+            return stale
+
+    async def _write(
+        self, method: str, path: str, endpoint: Optional[str], timeout: float, **kwargs: Any
+    ) -> "httpx.Response":
+        """Send a write, then invalidate the cache entries and notify the listeners it affects."""
+        headers = {**_tenant_headers(self.headers), **(kwargs.pop("headers", None) or {})}
+        body = kwargs.get("json")
+        _compress_write(kwargs, headers, self.compress_min_bytes, "content")
+        response = await self._send(method, path, timeout, headers, endpoint, **kwargs)
+        if 200 <= response.status_code < 300:
+            self.cache.invalidate_for_write(method, path)
+            _notify_write(self.write_listeners, method, path, body, response)
+        return response
+
+    async def _guarded(self, endpoint: Optional[str], send: Callable[[], Any]) -> Any:
+        """Await ``send()`` through the endpoint's circuit breaker, timing only the round trip."""
+        breaker = self.breaker
+        if breaker is None or endpoint in breaker.UNGUARDED:
+            return await send()
+        endpoint = endpoint or "other"
+        probe = breaker.enter(endpoint)
+        start = time.monotonic()
+        failed = None
+        try:
+            response = await send()
+            failed = response.status_code >= 500
+            return response
+        except requests.exceptions.RequestException:
+            failed = True
+            raise
+        finally:
+            breaker.exit(endpoint, probe, time.monotonic() - start, failed)
+
+    async def _fetch(
+        self,
+        method: str,
+        path: str,
+        timeout: float,
+        key: Tuple[str, str, str],
+        cache: Optional[str],
+        endpoint: Optional[str] = None,
+        **kwargs: Any,
+    ) -> Any:
+        base = _tenant_headers(self.headers)
+        if not cache:
+            return await self._send(method, path, timeout, base, endpoint, **kwargs)
+        headers = {**base, **self.cache.conditional_headers(key)}
+        response = await self._send(method, path, timeout, headers, endpoint, **kwargs)
+        result = self.cache.put(key, response, cache)
+        if result is response and response.status_code == 304:
+            # The entry was evicted while we revalidated it; fetch in full.
+            response = await self._send(method, path, timeout, base, endpoint, **kwargs)
+            result = self.cache.put(key, response, cache)
+        return result
+
+    async def _send(
+        self,
+        method: str,
+        path: str,
+        timeout: float,
+        headers: Dict[str, str],
+        endpoint: Optional[str] = None,
+        **kwargs: Any,
+    ) -> "httpx.Response":
+        """
+        Send through the (tenant's) limiter, backing off and retrying on 429/503.
+
+        Each attempt's timeout is cut to what is left of the call's deadline,
+        and no retry pause runs past it.
+        """
+        limiter = self.limiter.tenant(_tenant_id()) if self.limiter is not None else None
+        for attempt in range(self.throttle_retries + 1):
+            if limiter is not None:
+                start = time.perf_counter()
+                await limiter.acquire_async()
+                _observe("queue", time.perf_counter() - start)
+            left = _deadline_timeout(timeout)  # Before the breaker, as in _WorkLocalClient._send
+            start = time.perf_counter()
+            response = await self._guarded(
+                endpoint, lambda: self._send_hedged(method, path, left, headers, endpoint, **kwargs)
+            )
+            _observe_response(response, time.perf_counter() - start)
+            if attempt == self.throttle_retries or not _should_retry_throttled(method, response):
+                return response
+            delay = _retry_after(response, attempt, self.backoff_factor)
+            remaining = _remaining()
+            if remaining is not None and delay >= remaining:
+                return response
+            self.throttled += 1
+            _count("retries")
+            if limiter is not None:
+                limiter.pause(delay)
+            else:
+                await asyncio.sleep(delay)
+        return response
+
+    async def _send_hedged(
+        self,
+        method: str,
+        path: str,
+        timeout: float,
+        headers: Dict[str, str],
+        endpoint: Optional[str],
+        **kwargs: Any,
+    ) -> "httpx.Response":
+        """One request; a slow GET gets a backup copy when hedging is on, the loser is cancelled."""
+        headers = _deadline_headers(headers, self.deadline_header)
+        hedger = self.hedger
+        if hedger is None or method != "GET":
+            return await self._send_once(method, path, timeout, headers, **kwargs)
+
+        async def attempt() -> "httpx.Response":
+            start = time.perf_counter()
+            response = await self._send_once(method, path, timeout, headers, **kwargs)
+            hedger.observe(endpoint, time.perf_counter() - start)
+            return response
+
+        delay = hedger.delay(endpoint)
+        remaining = _remaining()
+        if delay is None or (remaining is not None and remaining <= delay):
+            return await attempt()
+        tasks = [asyncio.ensure_future(attempt())]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done or not hedger.spend():
+                return await tasks[0]
+            tasks.append(asyncio.ensure_future(attempt()))
+            return await _first_reply_async(tasks[0], tasks[1], hedger)
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def _send_once(
+        self, method: str, path: str, timeout: float, headers: Dict[str, str], **kwargs: Any
+    ) -> "httpx.Response":
+        try:
+            return await asyncio.wait_for(
+                self.client.request(
+                    method,
+                    f"{self.base_url}{path}",
+                    headers=headers,
+                    timeout=timeout,
+                    **kwargs,
+                ),
+                timeout,
+            )
+        except asyncio.TimeoutError:
+            raise requests.exceptions.Timeout(f"Request timed out after {round(timeout, 2):g}s")
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.Timeout(str(e))
+        except httpx.HTTPError as e:
+            raise requests.exceptions.ConnectionError(str(e))
+
+    async def aclose(self) -> None:
+        """Release all pooled connections, on every event loop still running."""
+        running = asyncio.get_running_loop()
+        clients, self._clients = self._clients, weakref.WeakKeyDictionary()
+        for loop, client in list(clients.items()):
+            if loop is running:
+                await client.aclose()
+            elif loop.is_running():
+                await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(client.aclose(), loop))
+
+
+# Multi-tenancy. Clients are process-wide: every Tools/AsyncTools instance with
+# the same settings and credentials shares one, with its connection pool,
+# response cache, limiter and circuit breakers, so sockets and memory grow with
+# the number of hosts rather than of users. The metrics store, index and change
+# feed of the client's own credentials are shared the same way, so a freshly
+# instantiated tool starts warm. A user's own API key (UserValves) runs their
+# calls as a tenant of that client.
+
+_CLIENTS: Dict[Tuple[Any, str], Any] = {}
+# (client, settings) -> (metrics store, index, change feed)
+_LOCAL_STATE: Dict[Tuple[Any, str], Tuple[Any, Any, Any]] = {}
+_CLIENTS_LOCK = threading.Lock()
+_REHOME_LOCK = threading.Lock()
+# Config sections a client is built from
+_CLIENT_SECTIONS = (
+    "api",
+    "authentication",
+    "pool",
+    "cache",
+    "rate_limiting",
+    "circuit_breaker",
+    "hedging",
+    "transport",
+    "write_coalescing",
+)
+# Config sections the local state is built from
+_LOCAL_SECTIONS = ("metrics_store", "index", "change_feed")
+
+
+def _shared_client(client_class: Any, config: Dict[str, Any], headers: Dict[str, str]) -> Any:
+    """The process-wide ``client_class`` for these settings and home credentials."""
+    settings = json.dumps(
+        [headers] + [config[section] for section in _CLIENT_SECTIONS], sort_keys=True, default=str
+    )
+    with _CLIENTS_LOCK:
+        client = _CLIENTS.get((client_class, settings))
+        if client is None:
+            client = _CLIENTS[(client_class, settings)] = client_class.from_config(config, headers)
+        return client
+
+
+def _shared_local_state(
+    client: Any, config: Dict[str, Any]
+) -> Tuple[Optional["_MetricsStore"], Optional["_ResourceIndex"], Optional["_ChangeFeed"]]:
+    """The process-wide metrics store, index and change feed of ``client``.
+
+    Each is None when disabled.
+    """
+    settings = json.dumps(
+        [config[section] for section in _LOCAL_SECTIONS], sort_keys=True, default=str
+    )
+    with _CLIENTS_LOCK:
+        state = _LOCAL_STATE.get((client, settings))
+        if state is None:
+            index = _index_from_config(config)
+            if index is not None:
+                client.write_listeners.append(index.apply_write)
+            feed = _change_feed_from_config(config, client.headers, client.cache, index)
+            metrics_store = _metrics_store_from_config(config)
+            state = _LOCAL_STATE[(client, settings)] = (metrics_store, index, feed)
+        return state
+
+
+def _release_local_state(client: Any) -> None:
+    """Stop and forget the change feeds of ``client``, whose credentials are no longer used."""
+    with _CLIENTS_LOCK:
+        for key in [key for key in _LOCAL_STATE if key[0] is client]:
+            feed = _LOCAL_STATE.pop(key)[2]
+            if feed is not None:
+                feed.stop()
+
+
+class _Valves(BaseModel):
+    api_key: str = Field(
+        default="",
+        description="WorkLocal API key for users without their own (overrides the config file)",
+    )
+
+
+class _UserValves(BaseModel):
+    api_key: str = Field(
+        default="",
+        description="Your own WorkLocal API key; tool calls then run with its permissions",
+    )
+
+
+def _attach(tools: Any, client_class: Any) -> Any:
+    """The shared client for the home ``headers`` of ``tools``, with its local state started."""
+    # Every tool call goes through a keep-alive pool shared process-wide, so
+    # concurrent chats reuse connections instead of paying a new TLS
+    # handshake. Read-only results are cached briefly; successful writes
+    # invalidate the affected resource and all lists/searches. An optional
+    # token bucket (`rate_limiting`) spaces requests, and 429/503 replies are
+    # retried after their Retry-After. Endpoints that keep failing trip a
+    # circuit breaker and fail fast, or answer from stale cache entries.
+    # With `write_coalescing`, concurrent updates of one resource go out as
+    # one PATCH. Nothing connects until the first request.
+    client = _shared_client(client_class, tools.config, tools.headers)
+
+    # Raw metric samples are kept locally so repeat queries only fetch
+    # what is new since the last one (see `metrics_store`).
+    # With `index.enabled`, searches, listings and name lookups are
+    # answered from a local inventory kept fresh by periodic syncs and by
+    # write-through from this client's own writes.
+    # With `change_feed.enabled`, a background thread applies resource
+    # change events to the cache and index as they happen.
+    _shared_local_state(client, tools.config)
+    return client
+
+
+# Attributes of a tool that come from _attach
+_ATTACHED = ("_client", "_metrics_store", "_index", "_feed")
+
+
+def _apply_valves(tools: Any) -> None:
+    """Re-home ``tools`` on the admin's Valves API key once OpenWebUI has set (or changed) it."""
+    api_key = getattr(getattr(tools, "valves", None), "api_key", None)
+    headers = {"Content-Type": "application/json", **_auth_headers(tools.config, api_key)}
+    if headers == tools.headers:
+        return
+    with _REHOME_LOCK:
+        if headers == tools.headers:
+            return
+        if "_client" in vars(tools):
+            _release_local_state(tools._client)
+        tools.headers = headers
+        # Attached again, for the new headers, on their next use
+        for name in _ATTACHED:
+            vars(tools).pop(name, None)
+
+
+def _user_api_key(user: Any) -> Optional[str]:
+    valves = user.get("valves") if isinstance(user, dict) else None
+    if isinstance(valves, dict):
+        return valves.get("api_key")
+    return getattr(valves, "api_key", None)
+
+
+def _tenant_for(tools: Any, user: Any) -> Optional[_Tenant]:
+    """
+    The tenant a call runs as: None with the instance's own credentials, or a
+    ``_Tenant`` for the OpenWebUI user's UserValves ``api_key``.
+    """
+    if not hasattr(tools, "valves"):
+        return None
+    _apply_valves(tools)
+    api_key = _user_api_key(user)
+    if not api_key:
+        return None
+    headers = {**tools.headers, **_auth_headers(tools.config, api_key)}
+    return None if headers == tools.headers else _Tenant(headers)
+
+
+# Response rendering shared by Tools and AsyncTools, so both produce identical
+# Markdown. ``response`` is a requests.Response or an httpx.Response.
+
+
+def _reuses_rendered(render: Any) -> Any:
+    """Memoize a renderer's output on cached responses, so cache hits and 304s skip formatting."""
+
+    @functools.wraps(render)
+    def wrapper(response: Any, *args: Any) -> Any:
+        if not isinstance(response, _CachedResponse):
+            return render(response, *args)
+        key = (render.__name__,) + args
+        output = response.rendered.get(key)
+        if output is None:
+            output = response.rendered[key] = render(response, *args)
+        return output
+
+    return wrapper
+
+
+# Output formats. List-shaped replies are built from records by a _Renderer:
+# "markdown" is the classic layout, "table", "csv" and "jsonl" print just the
+# columns, and "summary" prints counts. Under a ``max_chars`` budget, rows that
+# do not fit are dropped whole and reported as "N more", so a large inventory
+# costs a bounded number of tokens.
+
+_OUTPUT_FORMATS = ("markdown", "table", "csv", "jsonl", "summary")
+
+# Leading status marks dropped from cells in the compact formats
+_STATUS_MARKS = "✅❌⚠️⏳ "
+
+
+class _View:
+    """How one kind of record is laid out in each output format."""
+
+    def __init__(
+        self,
+        noun: str,
+        columns: Tuple[str, ...],
+        markdown: Callable[[int, Dict[str, Any]], str],
+        tally: Tuple[str, ...] = (),
+        brief: Optional[Callable[[Dict[str, Any]], str]] = None,
+    ):
+        self.noun = noun
+        self.columns = columns
+        # (row number, record) -> the classic Markdown for one record
+        self.markdown = markdown
+        # Columns counted by value in the summary format
+        self.tally = tally
+        # record -> a few words, listed by the summary format instead of tallies
+        self.brief = brief
+
+
+def _cell(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, float):
+        return f"{value:.4g}"
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, separators=(",", ":"), default=str)
+    return str(value).lstrip(_STATUS_MARKS)
+
+
+def _json_value(value: Any) -> Any:
+    if isinstance(value, float):
+        return float(f"{value:.4g}")
+    if isinstance(value, str):
+        return value.lstrip(_STATUS_MARKS)
+    return value
+
+
+def _csv_cell(value: Any) -> str:
+    text = _cell(value)
+    if any(c in text for c in ',"\n'):
+        return '"' + text.replace('"', '""') + '"'
+    return text
+
+
+def _format_rows(view: _View, output_format: str, records: List[Any], start: int) -> List[str]:
+    columns = view.columns
+    if output_format == "markdown":
+        return [view.markdown(idx, record) for idx, record in enumerate(records, start)]
+    if output_format == "table":
+        return [
+            "| " + " | ".join(
+                _cell(record.get(c)).replace("|", "\\|").replace("\n", " ") for c in columns
+            ) + " |\n"
+            for record in records
+        ]
+    if output_format == "csv":
+        return [",".join(_csv_cell(record.get(c)) for c in columns) + "\n" for record in records]
+    return [
+        json.dumps(
+            {c: _json_value(record[c]) for c in columns if record.get(c) is not None},
+            separators=(",", ":"),
+            ensure_ascii=False,
+            default=str,
+        ) + "\n"
+        for record in records
+    ]
+
+
+@_reuses_rendered
+def _format_page(
+    response: Any, view: _View, output_format: str, start: int, count: int
+) -> Tuple[str, ...]:
+    items = (_page_items(_json_body(response))[0] or [])[:count]
+    return tuple(_format_rows(view, output_format, items, start))
+
+
+def _clip(text: str, limit: int) -> str:
+    """``text`` cut to at most ``limit`` characters, at a line break where possible."""
+    if limit <= 0:
+        return ""
+    if len(text) <= limit:
+        return text
+    cut = text.rfind("\n", 0, limit)
+    return text[: cut + 1] if cut > 0 else text[:limit]
+
+
+class _Renderer:
+    """
+    One list-shaped reply in the requested output format, within an optional
+    character budget.
+
+    Rows are formatted as records arrive (``add``, or ``page`` as a ``_Pager``
+    callback) and joined once by ``render``. As soon as the rows exceed
+    ``max_chars`` the callbacks return False, so the pager stops fetching;
+    ``render`` then drops whole rows from the end until the reply fits and
+    reports how many more there are and where to resume.
+    """
+
+    def __init__(
+        self, view: _View, output_format: str = "markdown", max_chars: Optional[int] = None
+    ):
+        self.view = view
+        self.format = output_format
+        self.max_chars = max_chars
+        self.rows: List[str] = []
+        self.count = 0
+        self.tallies: Dict[str, Dict[str, int]] = {column: {} for column in view.tally}
+        self.briefs: List[str] = []
+        self._size = 0
+
+    def add(self, records: List[Any], start: int = 1) -> bool:
+        """Add records numbered from ``start``; False once the budget is spent."""
+        self.count += len(records)
+        if self.format == "summary":
+            for record in records:
+                for column, counts in self.tallies.items():
+                    value = _cell(record.get(column)) or "unknown"
+                    counts[value] = counts.get(value, 0) + 1
+                if self.view.brief is not None:
+                    self.briefs.append(self.view.brief(record))
+            return True
+        return self._extend(_format_rows(self.view, self.format, records, start))
+
+    def page(self, response: Any, start: int, count: int) -> bool:
+        """``_Pager`` callback: add ``count`` items of a page reply."""
+        if self.format == "summary":
+            return self.add((_page_items(_json_body(response))[0] or [])[:count], start)
+        self.count += count
+        return self._extend(_format_page(response, self.view, self.format, start, count))
+
+    def _extend(self, rows: Any) -> bool:
+        self.rows.extend(rows)
+        self._size += sum(map(len, rows))
+        return self.max_chars is None or self._size <= self.max_chars
+
+    def render(
+        self,
+        header: Any = "",
+        label: str = "",
+        pager: Optional["_Pager"] = None,
+        footer: str = "",
+        preamble: str = "",
+    ) -> str:
+        """
+        Join the reply.
+
+        Args:
+            header: Markdown before the rows; a callable gets the number of rows shown
+            label: Plain title used by the summary format
+            pager: The pager the rows came from, for "more available" hints
+            footer: Text after the rows, in every format
+            preamble: Plain text before the rows in the compact formats
+        """
+        if self.format == "summary":
+            return self._summary(label, pager, footer, preamble)
+
+        def compose(shown: int, clipped: bool = False) -> Tuple[str, str]:
+            if self.format == "markdown":
+                head = header(shown) if callable(header) else header
+            else:
+                head = preamble + self._column_header()
+            if shown < len(self.rows) or clipped:
+                return head, footer + self._more_note(shown, pager, clipped)
+            return head, footer + self._pager_footer(pager)
+
+        shown, size = len(self.rows), self._size
+        head, end = compose(shown)
+        if self.max_chars is not None:
+            while shown and len(head) + size + len(end) > self.max_chars:
+                shown -= 1
+                size -= len(self.rows[shown])
+                head, end = compose(shown)
+            if not shown and len(self.rows) == 1:
+                # A single record that does not fit: show as much of it as the budget allows
+                clipped_head, clipped_end = compose(0, clipped=True)
+                first = _clip(self.rows[0], self.max_chars - len(clipped_head) - len(clipped_end))
+                if first:
+                    return "".join((clipped_head, first, clipped_end))
+        return "".join([head, *self.rows[:shown], end])
+
+    def _pager_footer(self, pager: Optional["_Pager"]) -> str:
+        text = pager.footer(self.view.noun) if pager is not None else ""
+        if text and self.format != "markdown":
+            return text.strip("_\n") + "\n"  # No Markdown italics
+        return text
+
+    def _column_header(self) -> str:
+        columns = self.view.columns
+        if self.format == "table":
+            return "| " + " | ".join(columns) + " |\n" + "|---" * len(columns) + "|\n"
+        if self.format == "csv":
+            return ",".join(columns) + "\n"
+        return ""
+
+    def _more_note(self, shown: int, pager: Optional["_Pager"], clipped: bool) -> str:
+        hidden = len(self.rows) - shown
+        if clipped:
+            text = f"… cut at max_chars={self.max_chars}"
+        else:
+            more = ""
+            if pager is not None and pager.total is not None:
+                hidden += max(pager.total - pager.offset - pager.count, 0)
+            elif pager is not None and pager.more:
+                more = "+"
+            text = f"… {hidden}{more} more {self.view.noun} not shown (max_chars={self.max_chars})"
+        if pager is not None and not clipped:
+            text += (
+                f"; call again with offset={pager.offset + shown} "
+                "or use output_format='summary'"
+            )
+        else:
+            text += "; raise max_chars or use output_format='summary'"
+        return f"_{text}._\n" if self.format == "markdown" else f"{text}\n"
+
+    def _summary(self, label: str, pager: Optional["_Pager"], footer: str, preamble: str) -> str:
+        parts = [label]
+        if self.briefs:
+            parts.append(": " + "; ".join(self.briefs))
+        elif self.tallies:
+            parts.append(f": {self.count} {self.view.noun}")
+            if pager is not None and pager.total is not None and pager.total > self.count:
+                parts.append(f" (of {pager.total})")
+            for column, counts in self.tallies.items():
+                if counts:
+                    ranked = sorted(counts.items(), key=lambda kv: kv[1], reverse=True)
+                    parts.append(f" · {column}: " + ", ".join(f"{v} {n}" for v, n in ranked))
+        parts.append("\n")
+        parts.extend((preamble, footer, self._pager_footer(pager)))
+        text = "".join(parts)
+        return _clip(text, self.max_chars) if self.max_chars is not None else text
+
+
+def _output_options(
+    config: Dict[str, Any], output_format: Optional[str], max_chars: Optional[int]
+) -> Any:
+    """
+    The ``(output_format, max_chars)`` of a call, with the configured defaults
+    filled in, or an error message if either is invalid.
+    """
+    output_format = output_format or config["output"]["format"]
+    if max_chars is None:
+        max_chars = config["output"]["max_chars"]
+    if output_format not in _OUTPUT_FORMATS:
+        return (
+            f"❌ Unknown output_format '{output_format}'. "
+            f"Use one of: {', '.join(_OUTPUT_FORMATS)}."
+        )
+    if max_chars is not None and (
+        isinstance(max_chars, bool) or not isinstance(max_chars, int) or max_chars <= 0
+    ):
+        return "❌ max_chars must be a positive whole number of characters."
+    return output_format, max_chars
+
+
+def _markdown_resource(idx: int, resource: Dict[str, Any]) -> str:
+    return (
+        f"{idx}. **{resource.get('name', 'Unnamed')}**\n"
+        f"   - Type: {resource.get('type', 'Unknown')}\n"
+        f"   - Status: {resource.get('status', 'Unknown')}\n"
+        f"   - ID: `{resource.get('id', 'N/A')}`\n\n"
+    )
+
+
+def _markdown_search_result(idx: int, resource: Dict[str, Any]) -> str:
+    return (
+        f"{idx}. **{resource.get('name', 'Unnamed')}** (`{resource.get('id', 'N/A')}`)\n"
+        f"   - Type: {resource.get('type', 'Unknown')}\n"
+        f"   - Status: {resource.get('status', 'Unknown')}\n\n"
+    )
+
+
+def _markdown_resource_details(idx: int, resource: Dict[str, Any]) -> str:
+    lines = [
+        f"**ID**: `{resource.get('id')}`\n",
+        f"**Name**: {resource.get('name', 'Unnamed')}\n",
+        f"**Type**: {resource.get('type', 'Unknown')}\n",
+        f"**Status**: {resource.get('status', 'Unknown')}\n",
+        f"**Created**: {resource.get('created_at', 'Unknown')}\n",
+        f"**Updated**: {resource.get('updated_at', 'Unknown')}\n\n",
+    ]
+    # Add any additional metadata
+    if 'metadata' in resource:
+        lines.append("**Metadata**:\n")
+        lines.extend(f"  - {key}: {value}\n" for key, value in resource['metadata'].items())
+    return "".join(lines)
+
+
+def _markdown_metric(idx: int, metric: Dict[str, Any]) -> str:
+    if "value" in metric:
+        return f"**{metric['metric'].upper()}**:\n  {metric['value']}\n\n"
+    return (
+        f"**{metric['metric'].upper()}**:\n"
+        f"  - Current: {metric.get('current', 'N/A')}\n"
+        f"  - Average: {metric.get('average', 'N/A')}\n"
+        f"  - Max: {metric.get('max', 'N/A')}\n"
+        f"  - Min: {metric.get('min', 'N/A')}\n\n"
+    )
+
+
+def _markdown_metric_summary(idx: int, summary: Dict[str, Any]) -> str:
+    return (
+        f"**{summary['metric'].upper()}**:\n"
+        f"  - Current: {summary['current']:g}\n"
+        f"  - Average: {summary['average']:.4g}\n"
+        f"  - Max: {summary['max']:g}\n"
+        f"  - Min: {summary['min']:g}\n"
+        f"  - P50/P95/P99: {summary['p50']:.4g} / {summary['p95']:.4g} / {summary['p99']:.4g}\n"
+        f"  - Samples: {summary['samples']} ({summary['resolution']})\n\n"
+    )
+
+
+def _brief_metric(metric: Dict[str, Any]) -> str:
+    text = f"{metric['metric']} {_cell(metric.get('current', metric.get('value')))}"
+    if metric.get("average") is not None:
+        text += f" (avg {_cell(metric['average'])})"
+    return text
+
+
+_RESOURCE_VIEW = _View(
+    "resources", ("id", "name", "type", "status"), _markdown_resource, tally=("type", "status")
+)
+_SEARCH_VIEW = _View(
+    "results", ("id", "name", "type", "status"), _markdown_search_result, tally=("type", "status")
+)
+_RESOURCE_DETAILS_VIEW = _View(
+    "resource",
+    ("id", "name", "type", "status", "created_at", "updated_at", "metadata"),
+    _markdown_resource_details,
+    brief=lambda r: (
+        f"{r.get('name', 'Unnamed')} "
+        f"({r.get('type', 'Unknown')}, {r.get('status', 'Unknown')})"
+    ),
+)
+_METRICS_VIEW = _View(
+    "metrics", ("metric", "current", "average", "max", "min"), _markdown_metric, brief=_brief_metric
+)
+_METRIC_SUMMARY_VIEW = _View(
+    "metrics",
+    ("metric", "current", "average", "max", "min", "p50", "p95", "p99", "samples", "resolution"),
+    _markdown_metric_summary,
+    brief=_brief_metric,
+)
+_BATCH_VIEW = _View(
+    "resources",
+    ("id", "outcome", "result", "ms"),
+    lambda idx, row: f"| `{row['id']}` | {row['result']} | {row['ms']:.0f} ms |\n",
+    tally=("outcome",),
+)
+
+
+def _render_health(response: Any) -> str:
+    if response.status_code == 200:
+        return f"✅ WorkLocal Studio API is healthy. Status: {response.text}"
+    else:
+        return f"⚠️ API returned status code: {response.status_code}"
+
+
+def _render_circuits(breaker: Optional[_CircuitBreaker]) -> str:
+    """Circuit breaker states for the health check; empty while every circuit is closed."""
+    if breaker is None:
+        return ""
+    lines = []
+    for endpoint, circuit in breaker.states().items():
+        trips = f" (tripped {circuit['trips']}x)"
+        if circuit["state"] == "open" and circuit["retry_in"] > 0:
+            retry_in = circuit["retry_in"]
+            lines.append(f"- `{endpoint}`: open, failing fast for another {retry_in:.0f}s{trips}")
+        elif circuit["state"] == "open":
+            lines.append(f"- `{endpoint}`: open, the next call probes the API{trips}")
+        elif circuit["state"] == "half_open":
+            lines.append(f"- `{endpoint}`: half-open, probing{trips}")
+    if not lines:
+        return ""
+    return "\n\n🔌 **Circuit breakers**\n" + "\n".join(lines)
+
+
+def _render_resource_list(response: Any, resource_type: str) -> str:
+    """Render a non-paged ``/resources`` reply: an error or a plain dict payload."""
+    if response.status_code == 200:
+        resources = _json_body(response)
+
+        # Format the response
+        output = f"📋 **WorkLocal Resources ({resource_type})**\n\n"
+
+        if isinstance(resources, dict):
+            for key, value in resources.items():
+                output += f"- **{key}**: {value}\n"
+        else:
+            output += f"Raw response: {resources}\n"
+
+        return output
+    else:
+        return f"⚠️ API returned status code: {response.status_code}\nResponse: {response.text}"
+
+
+def _render_paged_resources(pager: "_Pager", resource_type: str, out: _Renderer) -> str:
+    if pager.count == 0 and pager.unpaged is not None:
+        return _render_resource_list(pager.unpaged, resource_type)
+    return out.render(
+        f"📋 **WorkLocal Resources ({resource_type})**\n\n", f"Resources ({resource_type})", pager
+    )
+
+
+@_reuses_rendered
+def _render_resource(
+    response: Any,
+    resource_id: str,
+    output_format: str = "markdown",
+    max_chars: Optional[int] = None,
+) -> str:
+    if response.status_code == 200:
+        resource = _json_body(response)
+        out = _Renderer(_RESOURCE_DETAILS_VIEW, output_format, max_chars)
+        out.add([{"id": resource_id, **resource}])
+        return out.render("🔍 **Resource Details**\n\n", f"Resource '{resource_id}'")
+    elif response.status_code == 404:
+        return f"❌ Resource with ID '{resource_id}' not found"
+    else:
+        return f"⚠️ API returned status code: {response.status_code}\nResponse: {response.text}"
+
+
+def _render_created(response: Any, name: str, resource_type: str) -> str:
+    if response.status_code in [200, 201]:
+        resource = _json_body(response)
+        return (
+            f"✅ Resource created successfully!\n\n**ID**: `{resource.get('id', 'N/A')}`\n"
+            f"**Name**: {name}\n**Type**: {resource_type}"
+        )
+    else:
+        return (
+            f"⚠️ Failed to create resource. Status: {response.status_code}\n"
+            f"Response: {response.text}"
+        )
+
+
+def _render_updated(response: Any, resource_id: str) -> str:
+    if response.status_code == 200:
+        return f"✅ Resource '{resource_id}' updated successfully!"
+    elif response.status_code == 404:
+        return f"❌ Resource with ID '{resource_id}' not found"
+    else:
+        return (
+            f"⚠️ Failed to update resource. Status: {response.status_code}\n"
+            f"Response: {response.text}"
+        )
+
+
+def _render_deleted(response: Any, resource_id: str) -> str:
+    if response.status_code in [200, 204]:
+        return f"✅ Resource '{resource_id}' deleted successfully!"
+    elif response.status_code == 404:
+        return f"❌ Resource with ID '{resource_id}' not found"
+    else:
+        return (
+            f"⚠️ Failed to delete resource. Status: {response.status_code}\n"
+            f"Response: {response.text}"
+        )
+
+
+def _render_action(response: Any, resource_id: str, action: str) -> str:
+    if response.status_code == 200:
+        result = _json_body(response)
+        return (
+            f"✅ Action '{action}' executed successfully on resource '{resource_id}'\n\n"
+            f"Result: {result.get('message', 'Success')}"
+        )
+    elif response.status_code == 202:
+        return _render_job_accepted(response, resource_id, action)
+    elif response.status_code == 404:
+        return f"❌ Resource with ID '{resource_id}' not found"
+    else:
+        return (
+            f"⚠️ Failed to execute action. Status: {response.status_code}\n"
+            f"Response: {response.text}"
+        )
+
+
+@_reuses_rendered
+def _render_metrics(
+    response: Any,
+    resource_id: str,
+    timeframe: str,
+    output_format: str = "markdown",
+    max_chars: Optional[int] = None,
+) -> str:
+    if response.status_code == 200:
+        metrics = _json_body(response)
+
+        header = f"📊 **Metrics for Resource '{resource_id}'**\n*Timeframe: {timeframe}*\n\n"
+        if not isinstance(metrics, dict):
+            return f"{header}Raw metrics: {metrics}\n"
+
+        out = _Renderer(_METRICS_VIEW, output_format, max_chars)
+        out.add([
+            {"metric": metric_name, **metric_data} if isinstance(metric_data, Mapping)
+            else {"metric": metric_name, "value": metric_data}
+            for metric_name, metric_data in metrics.items()
+        ])
+        return out.render(header, f"Metrics for '{resource_id}' ({timeframe})")
+    elif response.status_code == 404:
+        return f"❌ Resource with ID '{resource_id}' not found"
+    else:
+        return (
+            f"⚠️ Failed to get metrics. Status: {response.status_code}\n"
+            f"Response: {response.text}"
+        )
+
+
+def _render_search(response: Any, query: str) -> str:
+    """Render a non-paged ``/resources/search`` reply: an error or a plain payload."""
+    if response.status_code == 200:
+        results = _json_body(response)
+        return f"🔍 **Search Results for '{query}'**\n\nResults: {results}"
+    else:
+        return f"⚠️ Search failed. Status: {response.status_code}\nResponse: {response.text}"
+
+
+def _render_paged_search(pager: "_Pager", query: str, out: _Renderer) -> str:
+    if pager.count == 0 and pager.unpaged is not None:
+        return _render_search(pager.unpaged, query)
+    title = f"🔍 **Search Results for '{query}'**\n\n"
+    if pager.count == 0:
+        if out.format == "summary":
+            return out.render(label=f"Search results for '{query}'", pager=pager)
+        empty = "No resources found matching your search criteria."
+        return title + empty if out.format == "markdown" else empty
+
+    def header(shown: int) -> str:
+        found = pager.total if pager.total is not None else pager.count
+        if found > shown:
+            first = pager.offset + 1
+            return f"{title}Found {found} resources (showing {first}-{first + shown - 1}):\n\n"
+        return f"{title}Found {shown} resources:\n\n"
+
+    return out.render(header, f"Search results for '{query}'", pager)
+
+
+# Pagination. List endpoints accept ``limit``/``offset`` (or a ``cursor``) and
+# reply with either a bare JSON list or an envelope such as
+# ``{"items": [...], "next_cursor": "...", "total": 123}``.
+
+_PAGE_ITEM_KEYS = ("items", "resources", "results", "data")
+
+
+def _page_items(payload: Any) -> Tuple[Optional[List[Any]], Optional[str], Optional[int]]:
+    """
+    Split a page payload into ``(items, next_cursor, total)``.
+
+    ``items`` is None when the payload is not a page (e.g. a plain dict).
+    """
+    if isinstance(payload, list):
+        return payload, None, None
+    if isinstance(payload, dict):
+        for key in _PAGE_ITEM_KEYS:
+            if isinstance(payload.get(key), list):
+                next_cursor = payload.get("next_cursor") or payload.get("next")
+                return payload[key], next_cursor, payload.get("total")
+    return None, None, None
+
+
+class _Pager:
+    """
+    Sans-I/O pagination state shared by Tools and AsyncTools.
+
+    The caller loops ``while (params := pager.next_params()) is not None`` and
+    feeds each page reply to ``add_page``. Each page is handed to
+    ``render_page(response, start, count)`` as it arrives and then dropped, so
+    memory is bounded by one page no matter how large the inventory is. When
+    ``render_page`` returns False (e.g. a ``_Renderer`` whose budget is spent)
+    no further pages are fetched.
+    """
+
+    def __init__(
+        self,
+        params: Dict[str, Any],
+        limit: int,
+        offset: int,
+        page_size: int,
+        render_page: Any,
+    ):
+        self.params = params
+        self.limit = limit
+        self.offset = offset
+        self.page_size = page_size
+        self.render_page = render_page
+        self.count = 0
+        self.total: Optional[int] = None
+        self.more = False
+        # First reply that was not a page (an error or a legacy payload)
+        self.unpaged: Optional[Any] = None
+        self._cursor: Optional[str] = None
+        self._requested = 0
+        self._done = limit <= 0
+        self._stopped = False
+
+    def next_params(self) -> Optional[Dict[str, Any]]:
+        if self._done:
+            return None
+        self._requested = min(self.page_size, self.limit - self.count)
+        params = {**self.params, "limit": self._requested}
+        if self._cursor:
+            params["cursor"] = self._cursor
+        else:
+            params["offset"] = self.offset + self.count
+        return params
+
+    def add_page(self, response: Any) -> None:
+        payload = _json_body(response) if response.status_code == 200 else None
+        items, cursor, total = _page_items(payload)
+        if items is None:
+            self._done = True
+            if self.count == 0:
+                self.unpaged = response
+            else:
+                self.more = True
+            return
+
+        taken = min(len(items), self.limit - self.count)
+        if taken and not self.render_page(response, self.offset + self.count + 1, taken):
+            self._stopped = True
+        self.count += taken
+        self._cursor = cursor
+
+        if total is not None:
+            self.total = total
+            self.more = total > self.offset + self.count
+        elif len(items) > taken:
+            # The server ignored ``limit`` and over-delivered; cut it off here.
+            self.more = True
+        elif isinstance(payload, dict) and cursor is None and (
+            "next_cursor" in payload or "next" in payload
+        ):
+            self.more = False
+        else:
+            # Without a total, a full page means there may be more.
+            self.more = len(items) >= self._requested
+        self._done = self._stopped or not self.more or self.count >= self.limit
+
+    def footer(self, noun: str) -> str:
+        if not self.more:
+            return ""
+        return (
+            f"_Showing {self.count} {noun} from offset {self.offset}. More are available; "
+            f"call again with offset={self.offset + self.count}._\n"
+        )
+
+
+# Local metrics store. When the metrics endpoint returns raw samples, they are
+# kept in compact per-series arrays with rolling downsampled tiers, so repeated
+# questions about a resource only fetch the samples added since the last call
+# (``since=<latest timestamp>``) and aggregate locally. Summary-only replies
+# (``{"cpu": {"current": ..., "average": ...}}``) are rendered as before.
+
+_TIMEFRAME_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+_SAMPLE_KEYS = ("samples", "values", "datapoints", "series")
+
+
+def _timeframe_seconds(timeframe: str) -> Optional[float]:
+    """``'90s'``, ``'15m'``, ``'1h'``, ``'7d'`` -> seconds; None if unrecognized."""
+    text = str(timeframe).strip().lower()
+    unit = _TIMEFRAME_UNITS.get(text[-1:])
+    try:
+        amount = float(text[:-1])
+    except ValueError:
+        return None
+    return amount * unit if unit and amount > 0 else None
+
+
+def _sample_time(value: Any) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        # Millisecond epochs are common in metrics APIs
+        return value / 1000.0 if value > 1e11 else float(value)
+    if isinstance(value, str):
+        try:
+            parsed = datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+        return parsed.timestamp()
+    return None
+
+
+def _parse_samples(data: Any) -> Optional[List[Tuple[float, float]]]:
+    """
+    Extract ``(timestamp, value)`` pairs from one metric's payload.
+
+    Accepts a list of ``[ts, value]`` pairs or ``{"timestamp"|"ts"|"time", "value"}``
+    dicts, bare or under a ``samples``/``values``/``datapoints``/``series`` key.
+    Returns None when the payload holds no samples (e.g. a summary dict).
+    """
+    if isinstance(data, dict):
+        data = next((data[key] for key in _SAMPLE_KEYS if isinstance(data.get(key), list)), None)
+    if not isinstance(data, list):
+        return None
+    samples = []
+    for point in data:
+        if isinstance(point, (list, tuple)) and len(point) == 2:
+            raw_ts, raw_value = point
+        elif isinstance(point, dict):
+            raw_ts = next((point[k] for k in ("timestamp", "ts", "time") if k in point), None)
+            raw_value = point.get("value")
+        else:
+            return None
+        ts = _sample_time(raw_ts)
+        if ts is None or isinstance(raw_value, bool) or not isinstance(raw_value, (int, float)):
+            return None
+        samples.append((ts, float(raw_value)))
+    return sorted(samples)
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    """Linear-interpolated percentile of sorted values (NumPy's default method)."""
+    position = (len(ordered) - 1) * q / 100.0
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+class _Tier:
+    """Fixed-width buckets (count/sum/min/max/last) in parallel arrays."""
+
+    __slots__ = ("width", "retention", "start", "count", "total", "low", "high", "last")
+
+    def __init__(self, width: int, retention: float):
+        self.width = width
+        self.retention = retention
+        self.start = array("d")
+        self.count = array("L")
+        self.total = array("d")
+        self.low = array("d")
+        self.high = array("d")
+        self.last = array("d")
+
+    def add(self, ts: float, value: float) -> None:
+        bucket = ts - ts % self.width
+        if self.start and self.start[-1] == bucket:
+            self.count[-1] += 1
+            self.total[-1] += value
+            self.low[-1] = min(self.low[-1], value)
+            self.high[-1] = max(self.high[-1], value)
+            self.last[-1] = value
+            return
+        self.start.append(bucket)
+        self.count.append(1)
+        self.total.append(value)
+        self.low.append(value)
+        self.high.append(value)
+        self.last.append(value)
+
+    def trim(self, latest: float) -> None:
+        cut = bisect.bisect_left(self.start, latest - self.retention)
+        if cut:
+            for column in (self.start, self.count, self.total, self.low, self.high, self.last):
+                del column[:cut]
+
+    def nbytes(self) -> int:
+        return sum(
+            column.itemsize * len(column)
+            for column in (self.start, self.count, self.total, self.low, self.high, self.last)
+        )
+
+
+class _Series:
+    """
+    One metric of one resource: raw samples plus 1-minute and 1-hour tiers.
+
+    Timestamps and values are ``array('d')`` columns, so they can be handed to
+    NumPy without copying (``numpy.frombuffer(series.values)``).
+    """
+
+    __slots__ = ("times", "values", "raw_retention", "tiers")
+
+    def __init__(self, raw_retention: float, minute_retention: float, hour_retention: float):
+        self.times = array("d")
+        self.values = array("d")
+        self.raw_retention = raw_retention
+        self.tiers = (_Tier(60, minute_retention), _Tier(3600, hour_retention))
+
+    @property
+    def latest(self) -> Optional[float]:
+        return self.times[-1] if self.times else None
+
+    def extend(self, samples: List[Tuple[float, float]]) -> int:
+        """Append samples newer than the latest one; returns how many were new."""
+        added = 0
+        for ts, value in samples:
+            if self.times and ts <= self.times[-1]:
+                continue  # Overlap with what we already hold
+            self.times.append(ts)
+            self.values.append(value)
+            for tier in self.tiers:
+                tier.add(ts, value)
+            added += 1
+        if added:
+            latest = self.times[-1]
+            cut = bisect.bisect_left(self.times, latest - self.raw_retention)
+            if cut:
+                del self.times[:cut]
+                del self.values[:cut]
+            for tier in self.tiers:
+                tier.trim(latest)
+        return added
+
+    def summary(self, start: float) -> Optional[Dict[str, Any]]:
+        """
+        Aggregate everything from ``start`` on, from the finest tier retaining it.
+
+        Percentiles are exact over raw samples; over a downsampled tier they are
+        taken over bucket averages.
+        """
+        if not self.times:
+            return None
+        span = self.times[-1] - start
+        if span <= self.raw_retention:
+            values = self.values[bisect.bisect_left(self.times, start):]
+            if not values:
+                return None
+            ordered = sorted(values)
+            return {
+                "current": values[-1],
+                "average": sum(values) / len(values),
+                "max": ordered[-1],
+                "min": ordered[0],
+                "p50": _percentile(ordered, 50),
+                "p95": _percentile(ordered, 95),
+                "p99": _percentile(ordered, 99),
+                "samples": len(values),
+                "resolution": "raw",
+            }
+        tier = next((t for t in self.tiers if span <= t.retention), self.tiers[-1])
+        i = bisect.bisect_left(tier.start, start - start % tier.width)
+        if i >= len(tier.start):
+            return None
+        count = sum(tier.count[i:])
+        means = sorted(t / c for t, c in zip(tier.total[i:], tier.count[i:]))
+        return {
+            "current": tier.last[-1],
+            "average": sum(tier.total[i:]) / count,
+            "max": max(tier.high[i:]),
+            "min": min(tier.low[i:]),
+            "p50": _percentile(means, 50),
+            "p95": _percentile(means, 95),
+            "p99": _percentile(means, 99),
+            "samples": count,
+            "resolution": "1m" if tier.width == 60 else "1h",
+        }
+
+    def nbytes(self) -> int:
+        return (self.times.itemsize + self.values.itemsize) * len(self.times) + sum(
+            tier.nbytes() for tier in self.tiers
+        )
+
+
+class _MetricsStore:
+    """
+    Sans-I/O local store for metric samples, shared by Tools and AsyncTools.
+
+    ``plan`` says what to request for a query: the full window the first time,
+    then only ``since`` the newest stored sample. ``ingest`` adds a reply's
+    samples and ``render`` aggregates the requested window locally. Series are
+    evicted least recently used beyond ``max_series``.
+    """
+
+    def __init__(
+        self,
+        raw_retention: float = 7200,
+        minute_retention: float = 172800,
+        hour_retention: float = 2592000,
+        max_series: int = 1024,
+    ):
+        self.raw_retention = raw_retention
+        self.minute_retention = minute_retention
+        self.hour_retention = hour_retention
+        self.max_series = max_series
+        self._series: "OrderedDict[Tuple[str, str], _Series]" = OrderedDict()
+        # (resource_id, metric_type) -> (covered_from, metric names); the
+        # window start of the full fetch tells which later windows a delta serves.
+        self._synced: Dict[Tuple[str, str], Tuple[float, List[str]]] = {}
+        self._lock = threading.Lock()
+
+    def plan(self, resource_id: str, metric_type: str, timeframe: str) -> Dict[str, Any]:
+        """Query parameters for the next fetch of ``resource_id``'s metrics."""
+        params: Dict[str, Any] = {"type": metric_type, "timeframe": timeframe}
+        window = _timeframe_seconds(timeframe)
+        with self._lock:
+            synced = self._synced.get((resource_id, metric_type))
+            if window is None or synced is None or synced[0] > time.time() - window:
+                return params
+            latest = []
+            for name in synced[1]:
+                series = self._series.get((resource_id, name))
+                stamp = series.latest if series is not None else None
+                if stamp is None:
+                    return params
+                latest.append(stamp)
+        if latest:
+            params["since"] = min(latest)
+        return params
+
+    def ingest(self, resource_id: str, metric_type: str, timeframe: str, response: Any) -> bool:
+        """
+        Store the samples of a 200 reply.
+
+        Returns:
+            bool: False if the reply holds no samples, so the caller renders it as is
+        """
+        window = _timeframe_seconds(timeframe)
+        if window is None or response.status_code != 200:
+            return False
+        payload = _json_body(response)
+        if not isinstance(payload, dict):
+            return False
+        parsed: Dict[str, List[Tuple[float, float]]] = {}
+        for name, data in payload.items():
+            samples = _parse_samples(data)
+            if samples is None:
+                return False
+            parsed[name] = samples
+        with self._lock:
+            if not parsed and (resource_id, metric_type) not in self._synced:
+                return False
+            for name, samples in parsed.items():
+                key = (resource_id, name)
+                series = self._series.get(key)
+                if series is None:
+                    series = self._series[key] = _Series(
+                        self.raw_retention, self.minute_retention, self.hour_retention
+                    )
+                self._series.move_to_end(key)
+                series.extend(samples)
+            while len(self._series) > self.max_series:
+                self._series.popitem(last=False)
+            key = (resource_id, metric_type)
+            previous = self._synced.get(key)
+            names = sorted(set(parsed) | set(previous[1] if previous else ()))
+            covered_from = time.time() - window
+            if previous is not None:
+                covered_from = min(covered_from, previous[0])
+            self._synced[key] = (covered_from, names)
+        return True
+
+    def summaries(
+        self, resource_id: str, metric_type: str, timeframe: str
+    ) -> Dict[str, Dict[str, Any]]:
+        window = _timeframe_seconds(timeframe) or 0
+        with self._lock:
+            synced = self._synced.get((resource_id, metric_type))
+            names = synced[1] if synced else []
+            result = {}
+            for name in names:
+                series = self._series.get((resource_id, name))
+                latest = series.latest if series is not None else None
+                if series is None or latest is None:
+                    continue
+                summary = series.summary(max(time.time(), latest) - window)
+                if summary is not None:
+                    result[name] = summary
+        return result
+
+    def nbytes(self) -> int:
+        with self._lock:
+            return sum(series.nbytes() for series in self._series.values())
+
+
+def _render_metric_summaries(
+    summaries: Dict[str, Dict[str, Any]],
+    resource_id: str,
+    timeframe: str,
+    output_format: str = "markdown",
+    max_chars: Optional[int] = None,
+) -> str:
+    out = _Renderer(_METRIC_SUMMARY_VIEW, output_format, max_chars)
+    out.add([{"metric": metric_name, **summary} for metric_name, summary in summaries.items()])
+    return out.render(
+        f"📊 **Metrics for Resource '{resource_id}'**\n*Timeframe: {timeframe}*\n\n",
+        f"Metrics for '{resource_id}' ({timeframe})",
+    )
+
+
+# Tool plans. Each worklocal_* tool is written once, as a generator that yields
+# the I/O it needs (a _Call, a _Fanout over several items, a _Sleep, a _Status
+# update or a _Background plan) and is resumed with the outcome; an exception raised by a step
+# is thrown back into the plan at its yield. ``_drive`` runs a plan on the
+# blocking client for Tools and ``_drive_async`` on the async client for
+# AsyncTools, so argument handling and rendering are shared by both.
+
+_Plan = Generator[Any, Any, Any]
+
+
+class _Call:
+    """A client request; the plan is resumed with its response."""
+
+    __slots__ = ("method", "path", "kwargs")
+
+    def __init__(self, method: str, path: str, **kwargs: Any):
+        self.method = method
+        self.path = path
+        self.kwargs = kwargs
+
+
+class _Fanout:
+    """Run ``plan(item)`` for every item, ``concurrency`` at a time.
+
+    The plan is resumed with the _BatchRows.
+    """
+
+    __slots__ = ("items", "plan", "concurrency")
+
+    def __init__(self, items: List[Any], plan: Callable[[Any], _Plan], concurrency: int):
+        self.items = items
+        self.plan = plan
+        self.concurrency = concurrency
+
+
+class _Background:
+    """
+    Start ``plan`` on its own, outside the calling tool's context (its tenant,
+    deadline and _CallRecord): on a daemon thread under ``_drive``, as a task
+    under ``_drive_async``. The calling plan is resumed at once.
+    """
+
+    __slots__ = ("plan",)
+
+    def __init__(self, plan: _Plan):
+        self.plan = plan
+
+
+# Started _Background tasks; the event loop only keeps weak references.
+_BACKGROUND_TASKS: set = set()
+
+
+class _Sleep:
+    __slots__ = ("seconds",)
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+
+
+class _Status:
+    """A progress line for OpenWebUI's ``__event_emitter__``; dropped where there is none."""
+
+    __slots__ = ("description", "done")
+
+    def __init__(self, description: str, done: bool):
+        self.description = description
+        self.done = done
+
+
+def _drive(client: "_WorkLocalClient", plan: _Plan) -> Any:
+    """Run ``plan`` on the blocking client and return its result."""
+    reply: Any = None
+    error: Optional[Exception] = None
+    try:
+        while True:
+            try:
+                step = plan.send(reply) if error is None else plan.throw(error)
+            except StopIteration as done:
+                return done.value
+            reply, error = None, None
+            try:
+                if isinstance(step, _Call):
+                    reply = client.request(step.method, step.path, **step.kwargs)
+                elif isinstance(step, _Fanout):
+                    reply = _run_batch(
+                        step.items, lambda item: _drive(client, step.plan(item)), step.concurrency
+                    )
+                elif isinstance(step, _Sleep):
+                    time.sleep(step.seconds)
+                elif isinstance(step, _Background):
+                    threading.Thread(
+                        target=contextvars.Context().run,
+                        args=(_drive, client, step.plan),
+                        name="worklocal-background",
+                        daemon=True,
+                    ).start()
+            except Exception as e:
+                error = e
+    finally:
+        # Runs the plan's cleanup (its finally blocks) if the driver is interrupted
+        plan.close()
+
+
+async def _drive_async(
+    client: "_AsyncWorkLocalClient",
+    plan: _Plan,
+    emit: Optional[Callable[[Dict[str, Any]], Any]] = None,
+) -> Any:
+    """Async counterpart of ``_drive``; ``_Status`` steps go to ``emit``."""
+    reply: Any = None
+    error: Optional[Exception] = None
+    try:
+        while True:
+            try:
+                step = plan.send(reply) if error is None else plan.throw(error)
+            except StopIteration as done:
+                return done.value
+            reply, error = None, None
+            try:
+                if isinstance(step, _Call):
+                    reply = await client.request(step.method, step.path, **step.kwargs)
+                elif isinstance(step, _Fanout):
+                    reply = await _run_batch_async(
+                        step.items,
+                        lambda item: _drive_async(client, step.plan(item)),
+                        step.concurrency,
+                    )
+                elif isinstance(step, _Sleep):
+                    await asyncio.sleep(step.seconds)
+                elif isinstance(step, _Status) and emit is not None:
+                    data = {"description": step.description, "done": step.done}
+                    await emit({"type": "status", "data": data})
+                elif isinstance(step, _Background):
+                    # The task copies the current context: start it from an empty one
+                    task = contextvars.Context().run(
+                        asyncio.ensure_future, _drive_async(client, step.plan)
+                    )
+                    _BACKGROUND_TASKS.add(task)
+                    task.add_done_callback(_BACKGROUND_TASKS.discard)
+            except Exception as e:
+                error = e
+    finally:
+        # Runs the plan's cleanup if the driver is cancelled (e.g. its loop shuts down)
+        plan.close()
+
+
+# Resource index. An opt-in in-process copy of the inventory that answers
+# searches, per-type listings and name lookups locally. It is refreshed with
+# ``updated_since`` syncs (and a periodic full sync to notice deletions) and
+# kept current between syncs by write-through from the client's writes.
+
+# Top-level fields not worth a term index entry
+_UNINDEXED_FIELDS = ("id", "name", "description", "created_at", "updated_at")
+
+
+def _term(value: Any) -> str:
+    return value if isinstance(value, str) else json.dumps(value)
+
+
+def _trigrams(text: str) -> set:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class _ResourceIndex:
+    """
+    Thread-safe inventory index: by id, name (sorted, for prefixes), name/id
+    trigrams (for substrings), and ``type``/``status``/``metadata`` values.
+
+    Sans-I/O like ``_Pager``: ``begin_sync`` says what to fetch, each page goes
+    to ``collect_page`` and ``end_sync`` commits it.
+    """
+
+    def __init__(
+        self,
+        sync_interval: float = 60,
+        full_sync_interval: float = 900,
+        max_staleness: float = 300,
+        fallback_to_server: bool = True,
+        max_resources: int = 100000,
+    ):
+        self.sync_interval = sync_interval
+        self.full_sync_interval = full_sync_interval
+        self.max_staleness = max_staleness
+        self.fallback_to_server = fallback_to_server
+        self.max_resources = max_resources
+        self.synced_at: Optional[float] = None
+        # Set while a change feed keeps the index current; only full syncs then run.
+        self.live = False
+        self._full_synced_at: Optional[float] = None
+        self._watermark: Optional[str] = None
+        self._resources: Dict[str, _Resource] = {}
+        self._terms: Dict[Tuple[str, str], set] = {}
+        self._grams: Dict[str, set] = {}
+        self._names: List[Tuple[str, str]] = []  # sorted (lowercase name, id)
+        self._syncing = False
+        self._staging: Optional[Dict[str, Dict[str, Any]]] = None
+        self._sync_started = 0.0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._resources)
+
+    def __contains__(self, resource_id: object) -> bool:
+        return resource_id in self._resources
+
+    # Maintenance
+
+    def _entries(self, resource: Mapping) -> Tuple[set, str, str]:
+        terms = set()
+        metadata = resource.get("metadata")
+        fields = [(k, v) for k, v in resource.items() if k not in _UNINDEXED_FIELDS]
+        if isinstance(metadata, dict):
+            fields.extend((f"metadata.{k}", v) for k, v in metadata.items())
+        for field, value in fields:
+            if value is not None and not isinstance(value, (dict, list)):
+                terms.add((field, "*"))
+                terms.add((field, _term(value)))
+        name = str(resource.get("name") or "").lower()
+        return terms, name, f"{name}\x00{str(resource['id']).lower()}"
+
+    def _add(self, resource: Mapping) -> None:
+        resource_id = str(resource["id"])
+        if not isinstance(resource, _Resource):
+            resource = _Resource(resource)
+        terms, name, text = self._entries(resource)
+        self._resources[resource_id] = resource
+        for term in terms:
+            self._terms.setdefault(term, set()).add(resource_id)
+        for gram in _trigrams(text):
+            self._grams.setdefault(gram, set()).add(resource_id)
+        bisect.insort(self._names, (name, resource_id))
+
+    def _discard(self, resource_id: str) -> None:
+        resource = self._resources.pop(resource_id, None)
+        if resource is None:
+            return
+        terms, name, text = self._entries(resource)
+        for index, keys in ((self._terms, terms), (self._grams, _trigrams(text))):
+            for key in keys:
+                ids = index.get(key)
+                if ids is not None:
+                    ids.discard(resource_id)
+                    if not ids:
+                        del index[key]
+        i = bisect.bisect_left(self._names, (name, resource_id))
+        if i < len(self._names) and self._names[i] == (name, resource_id):
+            del self._names[i]
+
+    def upsert(self, resource: Dict[str, Any], merge: bool = False) -> None:
+        """Add or replace a resource (or, with ``merge``, update the fields given)."""
+        if not isinstance(resource, dict) or resource.get("id") is None:
+            return
+        resource_id = str(resource["id"])
+        with self._lock:
+            if merge:
+                current = self._resources.get(resource_id)
+                if current is None:
+                    return
+                resource = {**current, **resource}
+            self._discard(resource_id)
+            self._add(resource)
+
+    def remove(self, resource_id: str) -> None:
+        with self._lock:
+            self._discard(str(resource_id))
+
+    def apply_write(self, method: str, path: str, body: Any, response: Any) -> None:
+        """Write-through for a successful write the client just made."""
+        parts = path.strip("/").split("/")
+        if parts[0] != "resources":
+            return
+        try:
+            reply = _json_body(response) if response.status_code != 204 else None
+        except ValueError:
+            reply = None
+        fields = (
+            {k: v for k, v in reply.items() if k != "message"} if isinstance(reply, dict) else {}
+        )
+        if len(parts) == 1 and method == "POST" and fields.get("id") is not None:
+            created = {k: v for k, v in (body or {}).items() if k in ("name", "type")}
+            self.upsert({**created, **fields})
+        elif len(parts) == 2 and method == "DELETE":
+            self.remove(parts[1])
+        elif len(parts) == 2 and method in ("PATCH", "PUT"):
+            self.upsert({**(body or {}), **fields, "id": parts[1]}, merge=True)
+        elif len(parts) == 3 and parts[2] == "actions" and "status" in fields:
+            self.upsert({"id": parts[1], "status": fields["status"]}, merge=True)
+
+    # Syncing
+
+    def begin_sync(self) -> Optional[Dict[str, Any]]:
+        """
+        Claim a due sync.
+
+        Returns:
+            dict: ``/resources`` query parameters, or None if no sync is due
+                (or another caller is already running it)
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self._syncing or (
+                self.synced_at is not None and now - self.synced_at < self.sync_interval
+            ):
+                return None
+            full = (
+                self._full_synced_at is None
+                or now - self._full_synced_at >= self.full_sync_interval
+            )
+            if self.live and not full:
+                return None
+            self._syncing = True
+            self._sync_started = time.time()
+            # No type filter: the API lists every type when it is left out
+            params: Dict[str, Any] = {}
+            self._staging = {} if full else None
+            if not full and self._watermark:
+                params["updated_since"] = self._watermark
+            return params
+
+    def collect_page(self, response: Any, start: int, count: int) -> bool:
+        """``_Pager`` page callback: index the page's resources instead of rendering."""
+        items = (_page_items(_json_body(response))[0] or [])[:count]
+        if self._staging is not None:
+            for item in items:
+                if isinstance(item, dict) and item.get("id") is not None:
+                    self._staging[str(item["id"])] = item
+        else:
+            for item in items:
+                self.upsert(item)
+        return True
+
+    def end_sync(self, ok: bool) -> None:
+        with self._lock:
+            if ok:
+                now = time.monotonic()
+                if self._staging is not None:
+                    self._resources, self._terms, self._grams, self._names = {}, {}, {}, []
+                    for resource in self._staging.values():
+                        self._add(resource)
+                    self._full_synced_at = now
+                self.synced_at = now
+                # Seconds precision; a little overlap with the next sync is harmless.
+                self._watermark = datetime.datetime.fromtimestamp(
+                    int(self._sync_started) - 1, datetime.timezone.utc
+                ).isoformat().replace("+00:00", "Z")
+            self._staging = None
+            self._syncing = False
+
+    def answers_locally(self) -> bool:
+        """Whether queries should be answered from the index rather than the server."""
+        if self.synced_at is None:
+            return False
+        return (
+            self.live
+            or not self.fallback_to_server
+            or time.monotonic() - self.synced_at <= self.max_staleness
+        )
+
+    # Queries
+
+    def search(self, query: str = "", filters: Optional[Dict[str, Any]] = None) -> List[_Resource]:
+        """
+        Resources whose name or id contains ``query`` (names starting with it,
+        for queries under three characters) and that match every filter.
+
+        A filter matches a top-level field or, failing that, a ``metadata`` key
+        (``{"region": "eu"}``, or explicitly ``{"metadata.region": "eu"}``);
+        ``"*"`` matches any value.
+        """
+        needle = (query or "").strip().lower()
+        with self._lock:
+            sets: List[set] = []
+            for key, value in (filters or {}).items():
+                term = _term(value)
+                ids = self._terms.get((key, term), set())
+                if not key.startswith("metadata."):
+                    meta = self._terms.get((f"metadata.{key}", term))
+                    ids = ids | meta if meta else ids
+                sets.append(ids)
+            if len(needle) >= 3:
+                sets.extend(self._grams.get(g, set()) for g in _trigrams(needle))
+            elif needle:
+                i = bisect.bisect_left(self._names, (needle, ""))
+                matched = set()
+                while i < len(self._names) and self._names[i][0].startswith(needle):
+                    matched.add(self._names[i][1])
+                    i += 1
+                sets.append(matched)
+            if sets:
+                # Smallest first, so each intersection only walks the survivors.
+                sets.sort(key=len)
+                candidates = set(sets[0])
+                for ids in sets[1:]:
+                    if not candidates:
+                        break
+                    candidates &= ids
+            else:
+                candidates = set(self._resources)
+            results = [self._resources[resource_id] for resource_id in candidates]
+        if len(needle) >= 3:
+            # Trigrams only narrow the candidates; confirm the substring itself.
+            results = [r for r in results if needle in self._entries(r)[2]]
+        results.sort(key=lambda r: (str(r.get("name") or "").lower(), str(r["id"])))
+        return results
+
+    def resolve(self, name_or_id: str) -> str:
+        """Map an exact (case-insensitive) resource name to its id; ids pass through."""
+        with self._lock:
+            if name_or_id in self._resources:
+                return name_or_id
+            name = name_or_id.lower()
+            i = bisect.bisect_left(self._names, (name, ""))
+            matches = []
+            while i < len(self._names) and self._names[i][0] == name:
+                matches.append(self._names[i][1])
+                i += 1
+        return matches[0] if len(matches) == 1 else name_or_id
+
+
+def _index_sync_succeeded(pager: "_Pager", index: _ResourceIndex) -> bool:
+    return pager.unpaged is None and (not pager.more or pager.count >= index.max_resources)
+
+
+def _refresh_index(index: _ResourceIndex, page_size: int) -> _Plan:
+    """
+    Plan: start a due index sync in the background, off the calling tool's
+    request path; returns whether the index, as it is now, should answer.
+    """
+    local = index.answers_locally()
+    params = index.begin_sync()
+    if params is not None:
+        yield _Background(_sync_index(index, params, page_size))
+    return local
+
+
+def _sync_index(index: _ResourceIndex, params: Dict[str, Any], page_size: int) -> _Plan:
+    """Plan: fetch the sync claimed by ``index.begin_sync`` and commit it."""
+    ok = False
+    try:
+        pager = _Pager(params, index.max_resources, 0, page_size, index.collect_page)
+        while (page_params := pager.next_params()) is not None:
+            pager.add_page((yield _Call("GET", "/resources", params=page_params, endpoint="index")))
+        ok = _index_sync_succeeded(pager, index)
+    except requests.exceptions.RequestException as e:
+        logger.warning("Resource index sync failed: %s", e)
+    except Exception:
+        logger.exception("Resource index sync failed")
+    finally:
+        index.end_sync(ok)
+
+
+def _local_pager(items: List[Mapping], limit: int, offset: int, render_page: Any) -> "_Pager":
+    """A ``_Pager`` fed from local results, so they render exactly like server pages."""
+    pager = _Pager({}, limit, offset, max(limit, 1), render_page)
+    if pager.next_params() is not None:
+        page = {"items": items[offset:offset + limit], "total": len(items)}
+        pager.add_page(_CachedResponse(200, "", page, "index", 0.0))
+    return pager
+
+
+# Change feed. An optional background consumer of resource change events
+# (server-sent events, long polling, or webhooks pushed to a local receiver)
+# that applies each change to the response cache and the resource index. While
+# it is connected, resource entries are trusted for ``live_ttl`` instead of
+# their usual short TTL, so reads rarely reach the API.
+
+_FEED_MODES = ("sse", "long_poll", "webhook")
+_LIVE_ENDPOINTS = ("resource", "resources", "search")
+
+
+def _parse_change(event: Any) -> Tuple[str, Optional[str], Optional[Dict[str, Any]], bool]:
+    """
+    Split a change event into ``(kind, resource_id, resource, full)``.
+
+    Events look like ``{"type": "resource.updated", "resource": {...}}``; a
+    ``resource`` object is the full representation (``full`` is True), while
+    ``data``/``changes`` objects or a bare ``resource_id`` are partial.
+    """
+    if not isinstance(event, dict):
+        return "", None, None, False
+    kind = str(event.get("type") or event.get("event") or event.get("action") or "")
+    resource, full = event.get("resource"), True
+    if not isinstance(resource, dict):
+        resource = next(
+            (event[k] for k in ("data", "changes") if isinstance(event.get(k), dict)), None
+        )
+        full = False
+    resource_id = resource.get("id") if resource else None
+    if resource_id is None:
+        resource_id = event.get("resource_id", event.get("id"))
+    if resource is not None and resource_id is not None:
+        resource = {**resource, "id": resource_id}
+    return kind, None if resource_id is None else str(resource_id), resource, full
+
+
+def _stream_lines(response: Any) -> Iterator[str]:
+    """Yield the lines of a streamed ``requests`` body as soon as each arrives."""
+    read1 = getattr(response.raw, "read1", None)
+    if read1 is None:
+        # urllib3 < 2: read byte by byte so a line is never held back in a buffer
+        yield from response.iter_lines(chunk_size=1, decode_unicode=True)
+        return
+    buffer = b""
+    while True:
+        chunk = read1(65536)
+        if not chunk:
+            break
+        *lines, buffer = (buffer + chunk).split(b"\n")
+        for line in lines:
+            yield line.rstrip(b"\r").decode("utf-8", "replace")
+    if buffer:
+        yield buffer.decode("utf-8", "replace")
+
+
+class _SSEParser:
+    """Incremental ``text/event-stream`` parser: feed lines, get events back."""
+
+    def __init__(self):
+        self.last_event_id: Optional[str] = None
+        self._event = ""
+        self._data: List[str] = []
+
+    def feed(self, line: str) -> Optional[Dict[str, Any]]:
+        """Consume one line; returns the decoded event when ``line`` completes one."""
+        if not line:
+            if not self._data:
+                self._event = ""
+                return None
+            data, event = "\n".join(self._data), self._event
+            self._data, self._event = [], ""
+            try:
+                payload = json.loads(data)
+            except ValueError:
+                return None
+            if isinstance(payload, dict) and event and not (
+                payload.get("type") or payload.get("event")
+            ):
+                payload["type"] = event
+            return payload
+        if line.startswith(":"):
+            return None  # Comment / heartbeat
+        field, _, value = line.partition(":")
+        value = value[1:] if value.startswith(" ") else value
+        if field == "data":
+            self._data.append(value)
+        elif field == "event":
+            self._event = value
+        elif field == "id":
+            self.last_event_id = value
+        return None
+
+
+class _ChangeFeed:
+    """
+    Background change-event consumer feeding a ``_ResponseCache`` and an
+    optional ``_ResourceIndex``. Runs on a daemon thread with its own HTTP
+    session (or on the process's ``_WebhookReceiver`` in webhook mode), so it
+    never holds a connection of the tools' pool. If the webhook port cannot
+    be bound, e.g. by a second worker process, the feed long-polls instead.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        headers: Dict[str, str],
+        cache: _ResponseCache,
+        index: Optional[_ResourceIndex] = None,
+        mode: str = "sse",
+        path: str = "/events",
+        live_ttl: float = 300,
+        read_timeout: float = 90,
+        reconnect_delay: float = 1.0,
+        max_reconnect_delay: float = 30.0,
+        webhook_host: str = "127.0.0.1",
+        webhook_port: int = 8787,
+        webhook_secret: Optional[str] = None,
+        verify_ssl: Any = True,
+    ):
+        self.base_url = base_url
+        self.headers = headers
+        self.cache = cache
+        self.index = index
+        self.mode = mode
+        self.path = path
+        self.live_ttl = live_ttl
+        self.read_timeout = read_timeout
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.webhook_host = webhook_host
+        self.webhook_port = webhook_port
+        self.webhook_secret = webhook_secret
+        self.verify_ssl = verify_ssl
+        self.applied = 0
+        self.reconnects = 0
+        self.last_event_id: Optional[str] = None
+        self.webhook_url: Optional[str] = None
+        self._live = False
+        self._saved_ttls: Dict[str, float] = {}
+        self._stop = threading.Event()
+        self._receiver: Optional[_WebhookReceiver] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def live(self) -> bool:
+        return self._live
+
+    def start(self) -> "_ChangeFeed":
+        if self.mode == "webhook":
+            self._start_receiver()  # Switches to long polling if the port is taken
+        if self._receiver is not None:
+            self._set_live(True)
+        else:
+            target = self._run_sse if self.mode == "sse" else self._run_long_poll
+            self._thread = threading.Thread(
+                target=target, name="worklocal-change-feed", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """
+        Stop consuming events. A stream or poll reader blocked on the network
+        exits at its next event, heartbeat or read timeout; nothing it
+        receives after this is applied.
+        """
+        self._stop.set()
+        if self._receiver is not None:
+            _release_webhook_receiver(self._receiver, self)
+            self._receiver = None
+        self._set_live(False)
+
+    def apply(self, event: Any) -> bool:
+        """Apply one change event; returns False if it names no resource."""
+        kind, resource_id, resource, full = _parse_change(event)
+        if resource_id is None:
+            return False
+        deleted = "delet" in kind.lower() or "remov" in kind.lower()
+        # Lists and searches may have changed either way.
+        self.cache.invalidate(resource_id)
+        if not deleted and full and resource is not None:
+            self.cache.put_data(self.cache.key(f"/resources/{resource_id}"), resource, "resource")
+        if self.index is not None:
+            if deleted:
+                self.index.remove(resource_id)
+            elif resource is not None:
+                self.index.upsert(resource, merge=not full and resource_id in self.index)
+        with self._lock:
+            self.applied += 1
+        return True
+
+    def _set_live(self, live: bool) -> None:
+        """Trust resource entries for ``live_ttl`` while connected; drop them on disconnect."""
+        with self._lock:
+            if live == self._live:
+                return
+            self._live = live
+            if live:
+                self._saved_ttls = {e: self.cache.ttls.get(e, 0) for e in _LIVE_ENDPOINTS}
+                for endpoint in _LIVE_ENDPOINTS:
+                    self.cache.ttls[endpoint] = max(self.live_ttl, self._saved_ttls[endpoint])
+            else:
+                self.cache.ttls.update(self._saved_ttls)
+        if self.index is not None:
+            self.index.live = live
+        if not live:
+            # Events may have been missed while disconnected. The disk tier is
+            # shared by every worker on the host, so only what this feed vouched
+            # for is dropped there.
+            self.cache.drop_trusted(self._saved_ttls)
+
+    def _backoff(self, failures: int) -> None:
+        self._stop.wait(min(self.reconnect_delay * (2 ** failures), self.max_reconnect_delay))
+
+    def _session(self) -> "requests.Session":
+        session = requests.Session()
+        session.headers.update(self.headers)
+        session.verify = self.verify_ssl
+        return session
+
+    def _run_sse(self) -> None:
+        session = self._session()
+        failures = 0
+        while not self._stop.is_set():
+            parser = _SSEParser()
+            headers = {"Accept": "text/event-stream"}
+            if self.last_event_id:
+                headers["Last-Event-ID"] = self.last_event_id
+            try:
+                response = session.get(
+                    f"{self.base_url}{self.path}",
+                    headers=headers,
+                    stream=True,
+                    timeout=(10, self.read_timeout),
+                )
+                if response.status_code != 200:
+                    raise requests.exceptions.HTTPError(f"status {response.status_code}")
+                if self._stop.is_set():
+                    response.close()
+                    break
+                self._set_live(True)
+                failures = 0
+                for line in _stream_lines(response):
+                    if self._stop.is_set():
+                        break
+                    event = parser.feed(line)
+                    if parser.last_event_id:
+                        self.last_event_id = parser.last_event_id
+                    if event is not None:
+                        self.apply(event)
+                response.close()
+            except Exception as e:
+                if not self._stop.is_set():
+                    logger.warning("Change feed disconnected: %s", e)
+            self._set_live(False)
+            if self._stop.is_set():
+                break
+            self.reconnects += 1
+            self._backoff(failures)
+            failures += 1
+        session.close()
+
+    def _run_long_poll(self) -> None:
+        session = self._session()
+        failures = 0
+        cursor: Optional[str] = None
+        while not self._stop.is_set():
+            params: Dict[str, Any] = {"timeout": int(self.read_timeout)}
+            if cursor:
+                params["cursor"] = cursor
+            try:
+                response = session.get(
+                    f"{self.base_url}{self.path}",
+                    params=params,
+                    timeout=(10, self.read_timeout + 10),
+                )
+                if response.status_code != 200:
+                    raise requests.exceptions.HTTPError(f"status {response.status_code}")
+                payload = _json_body(response)
+            except Exception as e:
+                if self._stop.is_set():
+                    break
+                logger.warning("Change feed poll failed: %s", e)
+                self._set_live(False)
+                self.reconnects += 1
+                self._backoff(failures)
+                failures += 1
+                continue
+            if self._stop.is_set():
+                break
+            failures = 0
+            self._set_live(True)
+            events = payload.get("events", []) if isinstance(payload, dict) else payload
+            for event in events if isinstance(events, list) else []:
+                self.apply(event)
+            if isinstance(payload, dict) and payload.get("cursor"):
+                cursor = str(payload["cursor"])
+                self.last_event_id = cursor
+        session.close()
+
+    def _verified(self, body: bytes, signature: Optional[str]) -> bool:
+        if not self.webhook_secret:
+            return True
+        import hmac
+
+        expected = hmac.new(self.webhook_secret.encode(), body, hashlib.sha256).hexdigest()
+        return signature is not None and hmac.compare_digest(
+            signature.split("=", 1)[-1], expected
+        )
+
+    def _start_receiver(self) -> None:
+        try:
+            self._receiver = _webhook_receiver(self.webhook_host, self.webhook_port)
+        except OSError as e:
+            # Another process (or tool) already listens there: poll the events instead
+            logger.warning(
+                "Change feed webhook receiver %s:%s unavailable (%s); polling %s instead",
+                self.webhook_host, self.webhook_port, e, self.path,
+            )
+            self.mode = "long_poll"
+            return
+        self._receiver.add(self)
+        port = self._receiver.server.server_address[1]
+        self.webhook_url = f"http://{self.webhook_host}:{port}{self.path}"
+
+
+class _WebhookReceiver:
+    """
+    The local HTTP server webhook-mode change feeds share: one per host and
+    port in the process, so Tools and AsyncTools (and every set of
+    credentials) can each run a feed on the configured ``webhook_port``.
+    A delivery goes to every feed on its path whose secret verifies it.
+    """
+
+    def __init__(self, host: str, port: int):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        receiver = self
+        self.feeds: List[_ChangeFeed] = []
+        self._lock = threading.Lock()
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+            def do_POST(self) -> None:
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                status = receiver.deliver(
+                    self.path.split("?", 1)[0], body, self.headers.get("X-WorkLocal-Signature")
+                )
+                self.send_response(status)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(
+            target=self.server.serve_forever, name="worklocal-webhooks", daemon=True
+        ).start()
+
+    def add(self, feed: "_ChangeFeed") -> None:
+        with self._lock:
+            self.feeds.append(feed)
+
+    def remove(self, feed: "_ChangeFeed") -> bool:
+        """Stop delivering to ``feed``; returns True once no feed is left."""
+        with self._lock:
+            if feed in self.feeds:
+                self.feeds.remove(feed)
+            return not self.feeds
+
+    def deliver(self, path: str, body: bytes, signature: Optional[str]) -> int:
+        """Apply a delivery to the feeds it is for and return the HTTP status to answer with."""
+        with self._lock:
+            feeds = [feed for feed in self.feeds if feed.path == path]
+        if not feeds:
+            return 404
+        feeds = [feed for feed in feeds if feed._verified(body, signature)]
+        if not feeds:
+            return 401
+        try:
+            payload = json.loads(body or b"null")
+        except ValueError:
+            payload = None
+        events = payload.get("events", payload) if isinstance(payload, dict) else payload
+        events = events if isinstance(events, list) else [events]
+        applied = [feed.apply(event) for feed in feeds for event in events]
+        return 204 if any(applied) else 400
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+# (host, port) -> the process's webhook receiver there
+_RECEIVERS: Dict[Tuple[str, int], _WebhookReceiver] = {}
+_RECEIVERS_LOCK = threading.Lock()
+
+
+def _webhook_receiver(host: str, port: int) -> _WebhookReceiver:
+    """The process-wide receiver on ``host:port``, started on first use; raises OSError if busy."""
+    with _RECEIVERS_LOCK:
+        receiver = _RECEIVERS.get((host, port))
+        if receiver is None:
+            receiver = _RECEIVERS[(host, port)] = _WebhookReceiver(host, port)
+        return receiver
+
+
+def _release_webhook_receiver(receiver: _WebhookReceiver, feed: "_ChangeFeed") -> None:
+    """Detach ``feed`` from ``receiver`` and shut the receiver down once no feed uses it."""
+    with _RECEIVERS_LOCK:
+        if receiver.remove(feed):
+            for key, running in list(_RECEIVERS.items()):
+                if running is receiver:
+                    del _RECEIVERS[key]
+            receiver.close()
+
+
+# Batch operations. Each item is one ordinary API call; the calls fan out over
+# a bounded pool and the outcomes are collected into one compact table.
+
+_BatchRow = Tuple[str, bool, str, float]  # (resource_id, ok, result, elapsed_ms)
+
+
+def _parse_batch_ids(resource_ids: str) -> Optional[List[str]]:
+    try:
+        ids = json.loads(resource_ids)
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(ids, list) or not all(isinstance(i, (str, int)) for i in ids):
+        return None
+    return [str(i) for i in ids]
+
+
+def _parse_batch_updates(updates: str) -> Optional[List[Tuple[str, Dict[str, Any]]]]:
+    """Accept ``{"id": {...}}`` or ``[{"id": "...", "updates": {...}}, ...]``."""
+    try:
+        parsed = json.loads(updates)
+    except json.JSONDecodeError:
+        return None
+    if isinstance(parsed, dict):
+        items = list(parsed.items())
+    elif isinstance(parsed, list) and all(isinstance(i, dict) and "id" in i for i in parsed):
+        items = [(i["id"], i.get("updates", {})) for i in parsed]
+    else:
+        return None
+    if not all(isinstance(u, dict) for _, u in items):
+        return None
+    return [(str(resource_id), u) for resource_id, u in items]
+
+
+def _batch_outcome(response: Any, success_codes: Tuple[int, ...]) -> Tuple[bool, str]:
+    if response.status_code in success_codes:
+        if response.status_code == 204:
+            return True, "✅ Done"
+        if response.status_code == 202:
+            job_id = _job_id(response)
+            return True, f"⏳ Accepted (job `{job_id}`)" if job_id else "⏳ Accepted"
+        body = _json_body(response)
+        if isinstance(body, Mapping) and "message" in body:
+            return True, f"✅ {body['message']}"
+        if isinstance(body, Mapping) and "name" in body:
+            return True, (
+                f"✅ {body.get('name')} ({body.get('type', 'Unknown')}, "
+                f"{body.get('status', 'Unknown')})"
+            )
+        return True, "✅ Done"
+    if response.status_code == 404:
+        return False, "❌ Not found"
+    return False, f"⚠️ Status {response.status_code}"
+
+
+def _run_batch(
+    items: List[Any], call: Callable[[Any], Tuple[bool, str]], concurrency: int
+) -> List[_BatchRow]:
+    """Run ``call`` for every item on a bounded thread pool, keeping input order."""
+
+    def timed(item: Any) -> _BatchRow:
+        start = time.perf_counter()
+        try:
+            ok, result = call(item)
+        except requests.exceptions.RequestException as e:
+            ok, result = False, f"❌ {e}"
+        return _batch_id(item), ok, result, (time.perf_counter() - start) * 1000
+
+    if not items:
+        return []
+    # Each worker runs in a copy of the caller's context, so its requests are
+    # attributed to the calling tool's _CallRecord.
+    contexts = [contextvars.copy_context() for _ in items]
+    with ThreadPoolExecutor(max_workers=min(concurrency, len(items))) as pool:
+        return list(pool.map(lambda ctx, item: ctx.run(timed, item), contexts, items))
+
+
+async def _run_batch_async(items: List[Any], call: Any, concurrency: int) -> List[_BatchRow]:
+    """Async counterpart of ``_run_batch``: at most ``concurrency`` calls in flight."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def timed(item: Any) -> _BatchRow:
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                ok, result = await call(item)
+            except requests.exceptions.RequestException as e:
+                ok, result = False, f"❌ {e}"
+            return _batch_id(item), ok, result, (time.perf_counter() - start) * 1000
+
+    return list(await asyncio.gather(*(timed(item) for item in items)))
+
+
+def _batch_id(item: Any) -> str:
+    return item[0] if isinstance(item, tuple) else item
+
+
+def _render_batch(
+    title: str,
+    rows: List[_BatchRow],
+    elapsed: float,
+    output_format: str = "markdown",
+    max_chars: Optional[int] = None,
+) -> str:
+    succeeded = sum(1 for row in rows if row[1])
+    out = _Renderer(_BATCH_VIEW, output_format, max_chars)
+    out.add([
+        {"id": resource_id, "outcome": "ok" if ok else "failed", "result": result, "ms": round(ms)}
+        for resource_id, ok, result, ms in rows
+    ])
+    return out.render(
+        f"📦 **{title}**: {len(rows)} resources in {elapsed:.2f}s "
+        f"({succeeded} succeeded, {len(rows) - succeeded} failed)\n\n"
+        "| ID | Result | Time |\n|----|--------|------|\n",
+        f"{title} ({elapsed:.2f}s)",
+    )
+
+
+# Long-running actions. With ``mode="job"`` (or whenever the API answers an
+# action with 202 Accepted) ``worklocal_execute_action`` returns a job handle
+# at once, and ``worklocal_wait_action`` polls ``GET /jobs/{job_id}`` until the
+# jobs finish or a deadline passes, so a slow restart is neither a timeout
+# failure nor a worker held for minutes.
+
+_JOB_SUCCEEDED = ("succeeded", "success", "completed", "complete", "done", "finished")
+_JOB_FAILED = ("failed", "failure", "error", "cancelled", "canceled", "aborted")
+
+
+def _job_id(response: Any) -> Optional[str]:
+    """The job ID of a 202 reply: ``job_id``/``id`` in the body, or the Location header."""
+    try:
+        body = _json_body(response)
+    except ValueError:
+        body = None
+    if isinstance(body, dict):
+        for key in ("job_id", "jobId", "id"):
+            if body.get(key) is not None:
+                return str(body[key])
+    location = response.headers.get("Location") if response.headers else None
+    return location.rstrip("/").rsplit("/", 1)[-1] if location else None
+
+
+def _render_job_accepted(response: Any, resource_id: str, action: str) -> str:
+    job_id = _job_id(response)
+    if job_id is None:
+        return (
+            f"⏳ Action '{action}' accepted on resource '{resource_id}' "
+            "and running in the background."
+        )
+    return (
+        f"⏳ Action '{action}' accepted on resource '{resource_id}'. Job: `{job_id}`\n\n"
+        f"Call worklocal_wait_action('{job_id}') to wait for the result."
+    )
+
+
+class _JobWaiter:
+    """
+    Sans-I/O polling schedule for one or many jobs.
+
+    Each job has its own interval: it starts at ``initial_interval``, grows by
+    ``backoff`` while nothing changes (up to ``max_interval``), and drops back
+    when the job reports progress. A ``Retry-After`` header or ``poll_after``
+    field from the server takes precedence.
+    """
+
+    def __init__(
+        self,
+        job_ids: List[str],
+        timeout: float,
+        initial_interval: float = 0.5,
+        max_interval: float = 10.0,
+        backoff: float = 1.5,
+    ):
+        now = time.monotonic()
+        self.started = now
+        self.deadline = now + timeout
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.jobs: Dict[str, Dict[str, Any]] = {
+            job_id: {"status": "pending", "next": now, "interval": initial_interval, "seen": None}
+            for job_id in job_ids
+        }
+        self._lock = threading.Lock()
+
+    def pending(self) -> List[str]:
+        return [job_id for job_id, job in self.jobs.items() if not job.get("final")]
+
+    def due(self) -> List[str]:
+        now = time.monotonic()
+        return [job_id for job_id in self.pending() if self.jobs[job_id]["next"] <= now]
+
+    def next_delay(self) -> Optional[float]:
+        """Seconds until the next poll is due, or None when done or out of time."""
+        pending = self.pending()
+        now = time.monotonic()
+        if not pending or now >= self.deadline:
+            return None
+        wake = min(self.jobs[job_id]["next"] for job_id in pending)
+        return max(0.0, min(wake, self.deadline) - now)
+
+    def update(self, job_id: str, response: Any) -> Tuple[bool, str]:
+        """Record one ``GET /jobs/{job_id}`` reply; returns ``(ok, detail)`` like a batch call."""
+        with self._lock:
+            job = self.jobs[job_id]
+            if response.status_code == 404:
+                job.update(final=True, ok=False, status="not found", detail="❌ Job not found")
+                return False, job["detail"]
+            hint = _retry_after(response, 0, 0) if response.headers.get("Retry-After") else None
+            if response.status_code != 200:
+                # Transient; keep polling with backoff until the deadline.
+                job["detail"] = f"⚠️ Status {response.status_code}"
+                return self._reschedule(job, changed=False, hint=hint)
+            body = _json_body(response)
+            body = body if isinstance(body, dict) else {}
+            status = str(body.get("status") or body.get("state") or "running").lower()
+            progress = body.get("progress")
+            message = body.get("message") or body.get("error") or body.get("result") or ""
+            job.update(status=status, progress=progress, message=message)
+            if status in _JOB_SUCCEEDED:
+                job.update(final=True, ok=True, detail=f"✅ {message or 'Succeeded'}")
+                return True, job["detail"]
+            if status in _JOB_FAILED:
+                detail = f"❌ {status.capitalize()}: {message or 'no details'}"
+                job.update(final=True, ok=False, detail=detail)
+                return False, job["detail"]
+            job["detail"] = f"⏳ {status.capitalize()}" + (
+                f" ({progress}%)" if isinstance(progress, (int, float)) else ""
+            ) + (f": {message}" if message else "")
+            try:
+                poll_after = float(body["poll_after"])
+                if not math.isnan(poll_after):
+                    hint = max(poll_after, 0.0)
+            except (KeyError, TypeError, ValueError):
+                pass  # Absent or not a number: Retry-After or the backoff decides
+            return self._reschedule(job, changed=(status, progress) != job["seen"], hint=hint)
+
+    def failed(self, job_id: str, error: str) -> None:
+        with self._lock:
+            job = self.jobs[job_id]
+            job["detail"] = f"⚠️ {error}"
+            self._reschedule(job, changed=False, hint=None)
+
+    def _reschedule(
+        self, job: Dict[str, Any], changed: bool, hint: Optional[float]
+    ) -> Tuple[bool, str]:
+        if changed:
+            job["interval"] = self.initial_interval
+            job["seen"] = (job.get("status"), job.get("progress"))
+        else:
+            job["interval"] = min(job["interval"] * self.backoff, self.max_interval)
+        now = time.monotonic()
+        delay = hint if hint is not None else job["interval"]
+        job["next"] = now + min(delay, max(self.deadline - now, 0.0))
+        return True, job["detail"]
+
+    def progress_line(self) -> str:
+        done = len(self.jobs) - len(self.pending())
+        running = [
+            f"{job_id} {job['progress']}%"
+            for job_id, job in self.jobs.items()
+            if not job.get("final") and isinstance(job.get("progress"), (int, float))
+        ]
+        suffix = f" ({', '.join(running)})" if running else ""
+        return f"{done}/{len(self.jobs)} jobs finished{suffix}"
+
+    def render(self, output_format: str = "markdown", max_chars: Optional[int] = None) -> str:
+        elapsed = time.monotonic() - self.started
+        pending = self.pending()
+        if len(self.jobs) == 1:
+            job_id, job = next(iter(self.jobs.items()))
+            detail = job.get("detail", "⏳ Pending")
+            if pending:
+                return (
+                    f"{detail}\n\nJob `{job_id}` is still running after {elapsed:.0f}s. "
+                    f"Call worklocal_wait_action('{job_id}') again to keep waiting."
+                )
+            return f"{detail}\n\nJob `{job_id}` finished in {elapsed:.1f}s."
+        succeeded = sum(1 for job in self.jobs.values() if job.get("ok"))
+        failed = len(self.jobs) - len(pending) - succeeded
+        out = _Renderer(_JOB_VIEW, output_format, max_chars)
+        out.add([
+            {
+                "job": job_id,
+                "state": "running" if not job.get("final") else "ok" if job.get("ok") else "failed",
+                "result": job.get("detail", "⏳ Pending"),
+            }
+            for job_id, job in self.jobs.items()
+        ])
+        return out.render(
+            f"⏱️ **Jobs**: {len(self.jobs)} in {elapsed:.1f}s "
+            f"({succeeded} succeeded, {failed} failed, {len(pending)} still running)\n\n"
+            "| Job | Result |\n|-----|--------|\n",
+            f"Jobs ({elapsed:.1f}s)",
+            footer=(
+                "\n_Some jobs are still running; "
+                "call worklocal_wait_action again with their IDs._\n"
+                if pending else ""
+            ),
+        )
+
+
+_JOB_VIEW = _View(
+    "jobs",
+    ("job", "state", "result"),
+    lambda idx, row: f"| `{row['job']}` | {row['result']} |\n",
+    tally=("state",),
+)
+
+
+# Fleet metrics. One search selects the resources, their metrics are fetched
+# concurrently through the batch fan-out, and the per-resource values are
+# aggregated into fleet-wide percentiles, a top-N and outliers.
+
+_FLEET_STATISTICS = ("current", "average", "max", "min", "p50", "p95", "p99")
+
+
+class _FleetScan:
+    """Sans-I/O state for ``worklocal_get_fleet_metrics``, shared by Tools and AsyncTools."""
+
+    def __init__(
+        self,
+        metric_type: str,
+        statistic: str,
+        timeframe: str,
+        top_n: int,
+        store: Optional[_MetricsStore],
+    ):
+        self.metric_type = metric_type
+        self.statistic = statistic
+        self.timeframe = timeframe
+        self.top_n = top_n
+        self.store = store
+        self.names: Dict[str, str] = {}
+        self.values: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def collect_page(self, response: Any, start: int, count: int) -> bool:
+        """``_Pager`` page callback: remember the IDs and names instead of rendering."""
+        items, _, _ = _page_items(_json_body(response))
+        for item in (items or [])[:count]:
+            if isinstance(item, Mapping) and item.get("id") is not None:
+                self.names[str(item["id"])] = str(item.get("name", ""))
+        return True
+
+    def params(self, resource_id: str) -> Dict[str, Any]:
+        if self.store is not None:
+            return self.store.plan(resource_id, self.metric_type, self.timeframe)
+        return {"type": self.metric_type, "timeframe": self.timeframe}
+
+    def add_metrics(self, resource_id: str, response: Any) -> Tuple[bool, str]:
+        if response.status_code != 200:
+            return _batch_outcome(response, (200,))
+        value: Any = None
+        if self.store is not None and self.store.ingest(
+            resource_id, self.metric_type, self.timeframe, response
+        ):
+            summaries = self.store.summaries(resource_id, self.metric_type, self.timeframe)
+            value = summaries.get(self.metric_type, {}).get(self.statistic)
+        else:
+            payload = _json_body(response)
+            data = payload.get(self.metric_type) if isinstance(payload, dict) else None
+            value = data.get(self.statistic) if isinstance(data, Mapping) else data
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return False, f"⚠️ No {self.metric_type} {self.statistic}"
+        with self._lock:
+            self.values[resource_id] = float(value)
+        return True, ""
+
+    def render(
+        self,
+        query: str,
+        pager: "_Pager",
+        rows: List[_BatchRow],
+        elapsed: float,
+        output_format: str = "markdown",
+        max_chars: Optional[int] = None,
+    ) -> str:
+        label = self.metric_type.upper()
+        heading = f"Fleet {label} ({self.statistic}, {self.timeframe})"
+        counts = (
+            f" for '{query}': {len(rows)} resources in {elapsed:.2f}s ({len(self.values)} "
+            f"with data, {len(rows) - len(self.values)} without)"
+        )
+        header = [f"🌐 **{heading}**{counts}\n\n"]
+        stats = ""
+        ranked = sorted(self.values.items(), key=lambda kv: kv[1], reverse=True)
+        out = _Renderer(_FLEET_VIEW, output_format, max_chars)
+        footer = []
+        if self.values:
+            ordered = sorted(self.values.values())
+            q1, q3 = _percentile(ordered, 25), _percentile(ordered, 75)
+            fence = q3 + 1.5 * (q3 - q1)
+            stats = (
+                f"Fleet p50: {_percentile(ordered, 50):.4g} · p95: {_percentile(ordered, 95):.4g}"
+                f" · mean: {sum(ordered) / len(ordered):.4g} · min: {ordered[0]:g}"
+                f" · max: {ordered[-1]:g}\n"
+            )
+            header.append(f"{stats}\n**Top {min(self.top_n, len(ranked))}**\n\n")
+            header.append(f"| # | ID | Name | {label} |\n|---|----|------|------|\n")
+            out.add([
+                {
+                    "rank": rank,
+                    "id": resource_id,
+                    "name": self.names.get(resource_id, ""),
+                    "value": value,
+                }
+                for rank, (resource_id, value) in enumerate(ranked[: self.top_n], 1)
+            ])
+            outliers = [(rid, value) for rid, value in ranked if value > fence]
+            if outliers:
+                footer.append(f"\n**Outliers** (above {fence:.4g}, Q3 + 1.5×IQR): ")
+                footer.append(", ".join(f"`{rid}` ({value:g})" for rid, value in outliers))
+                footer.append("\n")
+        failed = [(resource_id, result) for resource_id, ok, result, _ in rows if not ok]
+        if failed:
+            footer.append("\n**Without data**: ")
+            footer.append(", ".join(f"`{rid}` {result}" for rid, result in failed))
+            footer.append("\n")
+        footer.append(pager.footer("resources"))
+        return out.render("".join(header), heading + counts, footer="".join(footer), preamble=stats)
+
+
+def _markdown_fleet_row(idx: int, row: Dict[str, Any]) -> str:
+    return f"| {row['rank']} | `{row['id']}` | {row['name']} | {row['value']:g} |\n"
+
+
+_FLEET_VIEW = _View("resources", ("rank", "id", "name", "value"), _markdown_fleet_row)
+
+
+# The worklocal_* tools as plans (see ``_drive``); ``tools`` is the Tools or
+# AsyncTools instance making the call.
+
+
+def _health_check(tools: Any) -> _Plan:
+    breaker = tools._client.breaker
+    try:
+        response = yield _Call("GET", "/health", endpoint="health")
+        if response.status_code == 200 and breaker is not None:
+            breaker.recovered()
+        return _render_health(response) + _render_circuits(breaker)
+    except requests.exceptions.RequestException as e:
+        return f"❌ Error connecting to API: {str(e)}" + _render_circuits(breaker)
+
+
+def _list_resources(
+    tools: Any,
+    resource_type: str,
+    limit: Optional[int],
+    offset: int,
+    output_format: Optional[str],
+    max_chars: Optional[int],
+) -> _Plan:
+    options = _output_options(tools.config, output_format, max_chars)
+    if isinstance(options, str):
+        return options
+    out = _Renderer(_RESOURCE_VIEW, *options)
+    try:
+        index = _own(tools._index)
+        if index is not None and (yield from _refresh_index(index, tools.page_size)):
+            filters = {} if resource_type == "all" else {"type": resource_type}
+            items = index.search("", filters)
+            if not items and resource_type.endswith("s"):
+                items = index.search("", {"type": resource_type[:-1]})  # 'servers'
+            pager = _local_pager(items, limit or tools.search_limit, offset, out.page)
+            return _render_paged_resources(pager, resource_type, out)
+
+        params = {} if resource_type == "all" else {"type": resource_type}
+
+        pager = _Pager(params, limit or tools.search_limit, offset, tools.page_size, out.page)
+        while (page_params := pager.next_params()) is not None:
+            pager.add_page(
+                (yield _Call("GET", "/resources", params=page_params, endpoint="resources"))
+            )
+        return _render_paged_resources(pager, resource_type, out)
+    except requests.exceptions.RequestException as e:
+        return f"❌ Error listing resources: {str(e)}"
+
+
+def _get_resource(
+    tools: Any, resource_id: str, output_format: Optional[str], max_chars: Optional[int]
+) -> _Plan:
+    options = _output_options(tools.config, output_format, max_chars)
+    if isinstance(options, str):
+        return options
+    index = _own(tools._index)
+    if index is not None:
+        resource_id = index.resolve(resource_id)  # Accept a resource name
+    try:
+        response = yield _Call("GET", f"/resources/{resource_id}", endpoint="resource")
+        return _render_resource(response, resource_id, *options)
+    except requests.exceptions.RequestException as e:
+        return f"❌ Error getting resource: {str(e)}"
+
+
+def _create_resource(tools: Any, name: str, resource_type: str, config: str) -> _Plan:
+    try:
+        # Parse the config string
+        try:
+            config_dict = json.loads(config)
+        except json.JSONDecodeError:
+            return "❌ Invalid JSON in config parameter. Please provide valid JSON."
+
+        payload = {
+            "name": name,
+            "type": resource_type,
+            "config": config_dict
+        }
+
+        response = yield _Call("POST", "/resources", json=payload, endpoint="create")
+        return _render_created(response, name, resource_type)
+    except requests.exceptions.RequestException as e:
+        return f"❌ Error creating resource: {str(e)}"
+
+
+def _update_resource(tools: Any, resource_id: str, updates: str) -> _Plan:
+    try:
+        # Parse the updates string
+        try:
+            updates_dict = json.loads(updates)
+        except json.JSONDecodeError:
+            return "❌ Invalid JSON in updates parameter. Please provide valid JSON."
+
+        response = yield _Call(
+            "PATCH", f"/resources/{resource_id}", json=updates_dict, endpoint="update"
+        )
+        return _render_updated(response, resource_id)
+    except requests.exceptions.RequestException as e:
+        return f"❌ Error updating resource: {str(e)}"
+
+
+def _delete_resource(tools: Any, resource_id: str) -> _Plan:
+    try:
+        response = yield _Call("DELETE", f"/resources/{resource_id}", endpoint="delete")
+        return _render_deleted(response, resource_id)
+    except requests.exceptions.RequestException as e:
+        return f"❌ Error deleting resource: {str(e)}"
+
+
+def _execute_action(tools: Any, resource_id: str, action: str, parameters: str, mode: str) -> _Plan:
+    if mode not in ("sync", "job"):
+        return "❌ Invalid mode. Use 'sync' or 'job'."
+    try:
+        # Parse the parameters string
+        try:
+            params_dict = json.loads(parameters)
+        except json.JSONDecodeError:
+            return "❌ Invalid JSON in parameters. Please provide valid JSON."
+
+        payload = {
+            "action": action,
+            "parameters": params_dict
+        }
+
+        response = yield _Call(
+            "POST",
+            f"/resources/{resource_id}/actions",
+            json=payload,
+            endpoint="action",
+            headers={"Prefer": "respond-async"} if mode == "job" else None,
+        )
+        return _render_action(response, resource_id, action)
+    except requests.exceptions.Timeout:
+        # The action may well still be running; don't report it as failed.
+        timeout = tools._client.timeouts.get("action", tools._client.timeout)
+        return (
+            f"⚠️ No reply to action '{action}' on resource '{resource_id}' within {timeout:g}s; "
+            "it may still be running. Check the resource with worklocal_get_resource, "
+            "or use mode='job' for long operations."
+        )
+    except requests.exceptions.RequestException as e:
+        return f"❌ Error executing action: {str(e)}"
+
+
+def _get_metrics(
+    tools: Any,
+    resource_id: str,
+    metric_type: str,
+    timeframe: Optional[str],
+    output_format: Optional[str],
+    max_chars: Optional[int],
+) -> _Plan:
+    disabled = _feature_disabled(tools.config, "metrics_enabled")
+    if disabled:
+        return disabled
+    options = _output_options(tools.config, output_format, max_chars)
+    if isinstance(options, str):
+        return options
+    timeframe = timeframe or tools.metric_timeframe
+    store = _own(tools._metrics_store)
+    try:
+        if store is not None:
+            params = store.plan(resource_id, metric_type, timeframe)
+        else:
+            params = {
+                "type": metric_type,
+                "timeframe": timeframe
+            }
+
+        response = yield _Call(
+            "GET",
+            f"/resources/{resource_id}/metrics",
+            params=params,
+            endpoint="metrics",
+        )
+        if store is not None and store.ingest(resource_id, metric_type, timeframe, response):
+            return _render_metric_summaries(
+                store.summaries(resource_id, metric_type, timeframe),
+                resource_id,
+                timeframe,
+                *options,
+            )
+        return _render_metrics(response, resource_id, timeframe, *options)
+    except requests.exceptions.RequestException as e:
+        return f"❌ Error getting metrics: {str(e)}"
+
+
+def _search_resources(
+    tools: Any,
+    query: str,
+    filters: str,
+    limit: Optional[int],
+    offset: int,
+    output_format: Optional[str],
+    max_chars: Optional[int],
+) -> _Plan:
+    disabled = _feature_disabled(tools.config, "search_enabled")
+    if disabled:
+        return disabled
+    options = _output_options(tools.config, output_format, max_chars)
+    if isinstance(options, str):
+        return options
+    try:
+        # Parse the filters string
+        try:
+            filters_dict = json.loads(filters) if filters else {}
+        except json.JSONDecodeError:
+            return "❌ Invalid JSON in filters parameter. Please provide valid JSON."
+
+        out = _Renderer(_SEARCH_VIEW, *options)
+        index = _own(tools._index)
+        if index is not None and (yield from _refresh_index(index, tools.page_size)):
+            pager = _local_pager(
+                index.search(query, filters_dict),
+                limit or tools.search_limit,
+                offset,
+                out.page,
+            )
+            return _render_paged_search(pager, query, out)
+
+        params = {
+            "q": query,
+            **filters_dict
+        }
+
+        pager = _Pager(params, limit or tools.search_limit, offset, tools.page_size, out.page)
+        while (page_params := pager.next_params()) is not None:
+            pager.add_page(
+                (yield _Call("GET", "/resources/search", params=page_params, endpoint="search"))
+            )
+        return _render_paged_search(pager, query, out)
+    except requests.exceptions.RequestException as e:
+        return f"❌ Error searching resources: {str(e)}"
+
+
+def _batch_get_resources(
+    tools: Any, resource_ids: str, output_format: Optional[str], max_chars: Optional[int]
+) -> _Plan:
+    disabled = _feature_disabled(tools.config, "batch_operations")
+    if disabled:
+        return disabled
+    options = _output_options(tools.config, output_format, max_chars)
+    if isinstance(options, str):
+        return options
+    ids = _parse_batch_ids(resource_ids)
+    if ids is None:
+        return "❌ Invalid resource_ids parameter. Please provide a JSON list of resource IDs."
+
+    def get(resource_id: str) -> _Plan:
+        response = yield _Call("GET", f"/resources/{resource_id}", endpoint="resource")
+        return _batch_outcome(response, (200,))
+
+    start = time.perf_counter()
+    rows = yield _Fanout(ids, get, tools.batch_concurrency)
+    return _render_batch("Batch get", rows, time.perf_counter() - start, *options)
+
+
+def _batch_update_resources(
+    tools: Any, updates: str, output_format: Optional[str], max_chars: Optional[int]
+) -> _Plan:
+    disabled = _feature_disabled(tools.config, "batch_operations")
+    if disabled:
+        return disabled
+    options = _output_options(tools.config, output_format, max_chars)
+    if isinstance(options, str):
+        return options
+    items = _parse_batch_updates(updates)
+    if items is None:
+        return (
+            "❌ Invalid JSON in updates parameter. "
+            "Please provide a JSON object of resource IDs to updates."
+        )
+
+    def update(item: Tuple[str, Dict[str, Any]]) -> _Plan:
+        resource_id, changes = item
+        response = yield _Call(
+            "PATCH", f"/resources/{resource_id}", json=changes, endpoint="update"
+        )
+        ok, result = _batch_outcome(response, (200,))
+        return ok, "✅ Updated" if ok else result
+
+    start = time.perf_counter()
+    rows = yield _Fanout(items, update, tools.batch_concurrency)
+    return _render_batch("Batch update", rows, time.perf_counter() - start, *options)
+
+
+def _batch_delete_resources(
+    tools: Any, resource_ids: str, output_format: Optional[str], max_chars: Optional[int]
+) -> _Plan:
+    disabled = _feature_disabled(tools.config, "batch_operations")
+    if disabled:
+        return disabled
+    options = _output_options(tools.config, output_format, max_chars)
+    if isinstance(options, str):
+        return options
+    ids = _parse_batch_ids(resource_ids)
+    if ids is None:
+        return "❌ Invalid resource_ids parameter. Please provide a JSON list of resource IDs."
+
+    def delete(resource_id: str) -> _Plan:
+        response = yield _Call("DELETE", f"/resources/{resource_id}", endpoint="delete")
+        ok, result = _batch_outcome(response, (200, 204))
+        return ok, "✅ Deleted" if ok else result
+
+    start = time.perf_counter()
+    rows = yield _Fanout(ids, delete, tools.batch_concurrency)
+    return _render_batch("Batch delete", rows, time.perf_counter() - start, *options)
+
+
+def _batch_execute_action(
+    tools: Any,
+    resource_ids: str,
+    action: str,
+    parameters: str,
+    output_format: Optional[str],
+    max_chars: Optional[int],
+) -> _Plan:
+    disabled = _feature_disabled(tools.config, "batch_operations")
+    if disabled:
+        return disabled
+    options = _output_options(tools.config, output_format, max_chars)
+    if isinstance(options, str):
+        return options
+    ids = _parse_batch_ids(resource_ids)
+    if ids is None:
+        return "❌ Invalid resource_ids parameter. Please provide a JSON list of resource IDs."
+    try:
+        params_dict = json.loads(parameters)
+    except json.JSONDecodeError:
+        return "❌ Invalid JSON in parameters. Please provide valid JSON."
+    payload = {"action": action, "parameters": params_dict}
+
+    def execute(resource_id: str) -> _Plan:
+        response = yield _Call(
+            "POST", f"/resources/{resource_id}/actions", json=payload, endpoint="action"
+        )
+        return _batch_outcome(response, (200, 202))
+
+    start = time.perf_counter()
+    rows = yield _Fanout(ids, execute, tools.batch_concurrency)
+    return _render_batch(f"Batch action '{action}'", rows, time.perf_counter() - start, *options)
+
+
+def _get_fleet_metrics(
+    tools: Any,
+    query: str,
+    filters: str,
+    metric_type: str,
+    statistic: str,
+    timeframe: Optional[str],
+    top_n: int,
+    output_format: Optional[str],
+    max_chars: Optional[int],
+) -> _Plan:
+    disabled = _feature_disabled(tools.config, "metrics_enabled") or _feature_disabled(
+        tools.config, "search_enabled"
+    )
+    if disabled:
+        return disabled
+    options = _output_options(tools.config, output_format, max_chars)
+    if isinstance(options, str):
+        return options
+    if metric_type == "all" or statistic not in _FLEET_STATISTICS:
+        return (
+            "❌ Choose one metric_type (e.g. 'cpu') and a statistic from "
+            f"{', '.join(_FLEET_STATISTICS)}."
+        )
+    try:
+        filters_dict = json.loads(filters) if filters else {}
+    except json.JSONDecodeError:
+        return "❌ Invalid JSON in filters parameter. Please provide valid JSON."
+    scan = _FleetScan(
+        metric_type,
+        statistic,
+        timeframe or tools.metric_timeframe,
+        top_n,
+        _own(tools._metrics_store),
+    )
+    start = time.perf_counter()
+    try:
+        pager = _Pager(
+            {"q": query, **filters_dict}, tools.fleet_limit, 0, tools.page_size, scan.collect_page
+        )
+        while (page_params := pager.next_params()) is not None:
+            pager.add_page(
+                (yield _Call("GET", "/resources/search", params=page_params, endpoint="search"))
+            )
+        if pager.count == 0 and pager.unpaged is not None:
+            return _render_search(pager.unpaged, query)
+    except requests.exceptions.RequestException as e:
+        return f"❌ Error searching resources: {str(e)}"
+
+    def fetch(resource_id: str) -> _Plan:
+        response = yield _Call(
+            "GET",
+            f"/resources/{resource_id}/metrics",
+            params=scan.params(resource_id),
+            endpoint="metrics",
+        )
+        return scan.add_metrics(resource_id, response)
+
+    rows = yield _Fanout(list(scan.names), fetch, tools.fleet_concurrency)
+    return scan.render(query, pager, rows, time.perf_counter() - start, *options)
+
+
+def _wait_action(
+    tools: Any,
+    job_ids: str,
+    timeout: Optional[float],
+    output_format: Optional[str],
+    max_chars: Optional[int],
+) -> _Plan:
+    options = _output_options(tools.config, output_format, max_chars)
+    if isinstance(options, str):
+        return options
+    text = job_ids.strip()
+    ids = _parse_batch_ids(text) if text.startswith("[") else ([text] if text else None)
+    if not ids:
+        return "❌ Invalid job_ids parameter. Please provide a job ID or a JSON list of job IDs."
+    jobs = tools.jobs
+    waiter = _JobWaiter(
+        list(dict.fromkeys(ids)),
+        _until_deadline(timeout if timeout is not None and timeout >= 0 else jobs["wait_timeout"]),
+        initial_interval=jobs["initial_interval"],
+        max_interval=jobs["max_interval"],
+        backoff=jobs["backoff"],
+    )
+
+    def poll(job_id: str) -> _Plan:
+        try:
+            response = yield _Call("GET", jobs["status_path"].format(job_id=job_id), endpoint="job")
+        except requests.exceptions.RequestException as e:
+            waiter.failed(job_id, str(e))
+            return False, str(e)
+        return waiter.update(job_id, response)
+
+    while True:
+        due = waiter.due()
+        if due:
+            yield _Fanout(due, poll, tools.batch_concurrency)
+        yield _Status(waiter.progress_line(), not waiter.pending())
+        delay = waiter.next_delay()
+        if delay is None:
+            return waiter.render(*options)
+        _observe("wait", delay)
+        yield _Sleep(delay)
+
+
+class _Setting:
+    """
+    A tool setting read from the config on first access, then kept on the
+    instance like a plain attribute (so it can be overridden per instance).
+    """
+
+    def __init__(self, section: str, key: Optional[str] = None):
+        self.section = section
+        self.key = key
+        self.name = ""
+
+    def __set_name__(self, owner: Any, name: str) -> None:
+        self.name = name
+
+    def __get__(self, tools: Any, owner: Any = None) -> Any:
+        if tools is None:
+            return self
+        value = tools.config[self.section]
+        if self.key is not None:
+            value = value[self.key]
+        tools.__dict__[self.name] = value
+        return value
+
+
+class _ToolsBase:
+    """
+    Settings and shared state of ``Tools`` and ``AsyncTools``.
+
+    Constructing a tool only creates its valves: the config, the shared
+    client and its local state are set up on first use, since OpenWebUI
+    instantiates a tool far more often than it calls one.
+    """
+
+    Valves = _Valves
+    UserValves = _UserValves
+
+    _client: Any
 
-class Tools:
     def __init__(self):
-        self.base_url = "https://worklocal.app"
-        # If you have path-based routing in Google Cloud Gateway:
-        # self.base_url = "https://worklocal.app/api"
-        # self.base_url = "https://worklocal.app/tools"
-        
-        self.headers = {
-            "Content-Type": "application/json",
-            # "Authorization": "Bearer YOUR_API_KEY"  # Uncomment and add if needed
-            # "X-API-Key": "YOUR_API_KEY"  # Alternative auth header
-        }
+        # OpenWebUI valves: the admin's `api_key` replaces the configured one,
+        # and a user's own `api_key` runs their calls as a tenant of the
+        # shared client (own cache partition and rate-limit budget).
+        self.valves = self.Valves()
+
+    @functools.cached_property
+    def config(self) -> Dict[str, Any]:
+        # Settings come from config/config.yaml (or the file named by
+        # $WORKLOCAL_CONFIG) and WORKLOCAL_* environment variables such as
+        # WORKLOCAL_BASE_URL and WORKLOCAL_API_KEY. See config/config.example.yaml.
+        return _load_config()
+
+    @functools.cached_property
+    def headers(self) -> Dict[str, str]:
+        return {"Content-Type": "application/json", **_auth_headers(self.config)}
+
+    base_url = _Setting("api", "base_url")
+
+    # Listing and search results are fetched page by page; `limit`
+    # defaults to `defaults.search_limit`.
+    search_limit = _Setting("defaults", "search_limit")
+    page_size = _Setting("defaults", "page_size")
+    metric_timeframe = _Setting("defaults", "metric_timeframe")
+
+    # Batch tools fan out over at most this many concurrent requests.
+    batch_concurrency = _Setting("defaults", "batch_concurrency")
+
+    # Fleet metrics cover at most `fleet_limit` search matches, fetching
+    # their metrics `fleet_concurrency` at a time (default: the pool size).
+    fleet_limit = _Setting("defaults", "fleet_limit")
+    fleet_concurrency = _Setting("defaults", "fleet_concurrency")
+
+    # Long actions run as background jobs, polled by worklocal_wait_action.
+    jobs = _Setting("jobs")
+
+    # The connection pool, cache, limiter, circuit breakers, index, metrics
+    # store and change feed are shared process-wide (see _attach), so a new
+    # instance costs next to nothing and starts warm. Attaching the client
+    # also starts its local state, so the change feed runs from first use.
+    @functools.cached_property
+    def _metrics_store(self) -> Optional[_MetricsStore]:
+        return _shared_local_state(self._client, self.config)[0]
+
+    @functools.cached_property
+    def _index(self) -> Optional[_ResourceIndex]:
+        return _shared_local_state(self._client, self.config)[1]
+
+    @functools.cached_property
+    def _feed(self) -> Optional[_ChangeFeed]:
+        return _shared_local_state(self._client, self.config)[2]
+
+    # Phase timings, status codes, payload sizes and cache/retry counts of
+    # every tool call go to the sinks configured under `instrumentation`.
+    @functools.cached_property
+    def _telemetry(self) -> _Telemetry:
+        return _telemetry_from_config(self.config)
+
+
+class Tools(_ToolsBase):
+    @functools.cached_property
+    def _client(self) -> _WorkLocalClient:
+        return _attach(self, _WorkLocalClient)
 
-    def worklocal_health_check(self) -> str:
+    @_instrumented
+    def worklocal_health_check(self, __user__: Optional[Dict[str, Any]] = None) -> str:
         """
         Check if the WorkLocal Studio API is healthy and accessible.
         
         Returns:
             str: Health status of the API
         """
-        try:
-            response = requests.get(
-                f"{self.base_url}/health",
-                headers=self.headers,
-                timeout=10
-            )
-            
-            if response.status_code == 200:
-                return f"✅ WorkLocal Studio API is healthy. Status: {response.text}"
-            else:
-                return f"⚠️ API returned status code: {response.status_code}"
-                
-        except requests.exceptions.RequestException as e:
-            return f"❌ Error connecting to API: {str(e)}"
+        return _drive(self._client, _health_check(self))
 
-    def worklocal_list_resources(self, resource_type: str = "all") -> str:
+    @_instrumented
+    def worklocal_list_resources(
+        self,
+        resource_type: str = "all",
+        limit: Optional[int] = None,
+        offset: int = 0,
+        output_format: Optional[str] = None,
+        max_chars: Optional[int] = None,
+        __user__: Optional[Dict[str, Any]] = None,
+    ) -> str:
         """
         List infrastructure resources from WorkLocal Studio.
         
         Args:
             resource_type (str): Type of resources to list (e.g., 'servers', 'containers', 'all')
+            limit (int): Maximum number of resources to return (default: 50)
+            offset (int): Number of resources to skip, for fetching the next batch
+            output_format (str): 'markdown' (default), 'table', 'csv', 'jsonl' or 'summary'
+            max_chars (int): Character budget for the reply
             
         Returns:
             str: Formatted list of resources
         """
-        try:
-            endpoint = f"{self.base_url}/resources"
-            params = {} if resource_type == "all" else {"type": resource_type}
-            
-            response = requests.get(
-                endpoint,
-                headers=self.headers,
-                params=params,
-                timeout=10
-            )
-            
-            if response.status_code == 200:
-                resources = response.json()
-                
-                # Format the response
-                output = f"📋 **WorkLocal Resources ({resource_type})**\n\n"
-                
-                if isinstance(resources, list):
-                    for idx, resource in enumerate(resources, 1):
-                        output += f"{idx}. **{resource.get('name', 'Unnamed')}**\n"
-                        output += f"   - Type: {resource.get('type', 'Unknown')}\n"
-                        output += f"   - Status: {resource.get('status', 'Unknown')}\n"
-                        output += f"   - ID: `{resource.get('id', 'N/A')}`\n\n"
-                elif isinstance(resources, dict):
-                    for key, value in resources.items():
-                        output += f"- **{key}**: {value}\n"
-                else:
-                    output += f"Raw response: {resources}\n"
-                    
-                return output
-            else:
-                return f"⚠️ API returned status code: {response.status_code}\nResponse: {response.text}"
-                
-        except requests.exceptions.RequestException as e:
-            return f"❌ Error listing resources: {str(e)}"
+        return _drive(
+            self._client,
+            _list_resources(self, resource_type, limit, offset, output_format, max_chars),
+        )
 
-    def worklocal_get_resource(self, resource_id: str) -> str:
+    @_instrumented
+    def worklocal_get_resource(
+        self,
+        resource_id: str,
+        output_format: Optional[str] = None,
+        max_chars: Optional[int] = None,
+        __user__: Optional[Dict[str, Any]] = None,
+    ) -> str:
         """
         Get detailed information about a specific resource.
         
         Args:
             resource_id (str): The ID of the resource to retrieve
+            output_format (str): 'markdown' (default), 'table', 'csv', 'jsonl' or 'summary'
+            max_chars (int): Character budget for the reply
             
         Returns:
             str: Formatted resource details
         """
-        try:
-            response = requests.get(
-                f"{self.base_url}/resources/{resource_id}",
-                headers=self.headers,
-                timeout=10
-            )
-            
-            if response.status_code == 200:
-                resource = response.json()
-                
-                # Format the response
-                output = f"🔍 **Resource Details**\n\n"
-                output += f"**ID**: `{resource.get('id', resource_id)}`\n"
-                output += f"**Name**: {resource.get('name', 'Unnamed')}\n"
-                output += f"**Type**: {resource.get('type', 'Unknown')}\n"
-                output += f"**Status**: {resource.get('status', 'Unknown')}\n"
-                output += f"**Created**: {resource.get('created_at', 'Unknown')}\n"
-                output += f"**Updated**: {resource.get('updated_at', 'Unknown')}\n\n"
-                
-                # Add any additional metadata
-                if 'metadata' in resource:
-                    output += "**Metadata**:\n"
-                    for key, value in resource['metadata'].items():
-                        output += f"  - {key}: {value}\n"
-                
-                return output
-            elif response.status_code == 404:
-                return f"❌ Resource with ID '{resource_id}' not found"
-            else:
-                return f"⚠️ API returned status code: {response.status_code}\nResponse: {response.text}"
-                
-        except requests.exceptions.RequestException as e:
-            return f"❌ Error getting resource: {str(e)}"
+        return _drive(self._client, _get_resource(self, resource_id, output_format, max_chars))
 
-    def worklocal_create_resource(self, name: str, resource_type: str, config: str = "{}") -> str:
+    @_instrumented
+    def worklocal_create_resource(
+        self,
+        name: str,
+        resource_type: str,
+        config: str = "{}",
+        __user__: Optional[Dict[str, Any]] = None,
+    ) -> str:
         """
         Create a new infrastructure resource.
         
@@ -143,36 +6263,15 @@ class Tools:
         Returns:
             str: Creation result message
         """
-        try:
-            # Parse the config string
-            try:
-                config_dict = json.loads(config)
-            except json.JSONDecodeError:
-                return "❌ Invalid JSON in config parameter. Please provide valid JSON."
-            
-            payload = {
-                "name": name,
-                "type": resource_type,
-                "config": config_dict
-            }
-            
-            response = requests.post(
-                f"{self.base_url}/resources",
-                headers=self.headers,
-                json=payload,
-                timeout=10
-            )
-            
-            if response.status_code in [200, 201]:
-                resource = response.json()
-                return f"✅ Resource created successfully!\n\n**ID**: `{resource.get('id', 'N/A')}`\n**Name**: {name}\n**Type**: {resource_type}"
-            else:
-                return f"⚠️ Failed to create resource. Status: {response.status_code}\nResponse: {response.text}"
-                
-        except requests.exceptions.RequestException as e:
-            return f"❌ Error creating resource: {str(e)}"
+        return _drive(self._client, _create_resource(self, name, resource_type, config))
 
-    def worklocal_update_resource(self, resource_id: str, updates: str) -> str:
+    @_instrumented
+    def worklocal_update_resource(
+        self,
+        resource_id: str,
+        updates: str,
+        __user__: Optional[Dict[str, Any]] = None,
+    ) -> str:
         """
         Update an existing infrastructure resource.
         
@@ -183,31 +6282,14 @@ class Tools:
         Returns:
             str: Update result message
         """
-        try:
-            # Parse the updates string
-            try:
-                updates_dict = json.loads(updates)
-            except json.JSONDecodeError:
-                return "❌ Invalid JSON in updates parameter. Please provide valid JSON."
-            
-            response = requests.patch(
-                f"{self.base_url}/resources/{resource_id}",
-                headers=self.headers,
-                json=updates_dict,
-                timeout=10
-            )
-            
-            if response.status_code == 200:
-                return f"✅ Resource '{resource_id}' updated successfully!"
-            elif response.status_code == 404:
-                return f"❌ Resource with ID '{resource_id}' not found"
-            else:
-                return f"⚠️ Failed to update resource. Status: {response.status_code}\nResponse: {response.text}"
-                
-        except requests.exceptions.RequestException as e:
-            return f"❌ Error updating resource: {str(e)}"
+        return _drive(self._client, _update_resource(self, resource_id, updates))
 
-    def worklocal_delete_resource(self, resource_id: str) -> str:
+    @_instrumented
+    def worklocal_delete_resource(
+        self,
+        resource_id: str,
+        __user__: Optional[Dict[str, Any]] = None,
+    ) -> str:
         """
         Delete an infrastructure resource.
         
@@ -217,24 +6299,13 @@ class Tools:
         Returns:
             str: Deletion result message
         """
-        try:
-            response = requests.delete(
-                f"{self.base_url}/resources/{resource_id}",
-                headers=self.headers,
-                timeout=10
-            )
-            
-            if response.status_code in [200, 204]:
-                return f"✅ Resource '{resource_id}' deleted successfully!"
-            elif response.status_code == 404:
-                return f"❌ Resource with ID '{resource_id}' not found"
-            else:
-                return f"⚠️ Failed to delete resource. Status: {response.status_code}\nResponse: {response.text}"
-                
-        except requests.exceptions.RequestException as e:
-            return f"❌ Error deleting resource: {str(e)}"
+        return _drive(self._client, _delete_resource(self, resource_id))
 
-    def worklocal_execute_action(self, resource_id: str, action: str, parameters: str = "{}") -> str:
+    @_instrumented
+    def worklocal_execute_action(
+        self, resource_id: str, action: str, parameters: str = "{}", mode: str = "sync",
+        __user__: Optional[Dict[str, Any]] = None,
+    ) -> str:
         """
         Execute an action on a resource (e.g., start, stop, restart).
         
@@ -242,143 +6313,631 @@ class Tools:
             resource_id (str): ID of the resource
             action (str): Action to execute (e.g., 'start', 'stop', 'restart')
             parameters (str): JSON string containing action parameters
+            mode (str): 'sync' to wait for the API's reply, or 'job' to get a job ID back
+                at once for long operations (deploys, slow restarts); follow up with
+                worklocal_wait_action
             
         Returns:
-            str: Action execution result
+            str: Action execution result, or the job to wait for
         """
-        try:
-            # Parse the parameters string
-            try:
-                params_dict = json.loads(parameters)
-            except json.JSONDecodeError:
-                return "❌ Invalid JSON in parameters. Please provide valid JSON."
+        return _drive(self._client, _execute_action(self, resource_id, action, parameters, mode))
+
+    @_instrumented
+    def worklocal_get_metrics(
+        self,
+        resource_id: str,
+        metric_type: str = "all",
+        timeframe: Optional[str] = None,
+        output_format: Optional[str] = None,
+        max_chars: Optional[int] = None,
+        __user__: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """
+        Get metrics for a specific resource.
+        
+        Args:
+            resource_id (str): ID of the resource
+            metric_type (str): Type of metrics to retrieve (e.g., 'cpu', 'memory', 'network', 'all')
+            timeframe (str): Timeframe for metrics (e.g., '1h', '24h', '7d'; default: '1h')
+            output_format (str): 'markdown' (default), 'table', 'csv', 'jsonl' or 'summary'
+            max_chars (int): Character budget for the reply
             
-            payload = {
-                "action": action,
-                "parameters": params_dict
-            }
+        Returns:
+            str: Formatted metrics data
+        """
+        return _drive(
+            self._client,
+            _get_metrics(self, resource_id, metric_type, timeframe, output_format, max_chars),
+        )
+
+    @_instrumented
+    def worklocal_search_resources(
+        self,
+        query: str,
+        filters: str = "{}",
+        limit: Optional[int] = None,
+        offset: int = 0,
+        output_format: Optional[str] = None,
+        max_chars: Optional[int] = None,
+        __user__: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """
+        Search for resources based on query and filters.
+        
+        Args:
+            query (str): Search query string
+            filters (str): JSON string containing search filters
+            limit (int): Maximum number of results to return (default: 50)
+            offset (int): Number of results to skip, for fetching the next batch
+            output_format (str): 'markdown' (default), 'table', 'csv', 'jsonl' or 'summary'
+            max_chars (int): Character budget for the reply
             
-            response = requests.post(
-                f"{self.base_url}/resources/{resource_id}/actions",
-                headers=self.headers,
-                json=payload,
-                timeout=10
-            )
+        Returns:
+            str: Search results
+        """
+        return _drive(
+            self._client,
+            _search_resources(self, query, filters, limit, offset, output_format, max_chars),
+        )
+
+    @_instrumented
+    def worklocal_batch_get_resources(
+        self,
+        resource_ids: str,
+        output_format: Optional[str] = None,
+        max_chars: Optional[int] = None,
+        __user__: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """
+        Get several resources at once.
+        
+        Args:
+            resource_ids (str): JSON list of resource IDs, e.g. '["res-1", "res-2"]'
+            output_format (str): 'markdown' (default), 'table', 'csv', 'jsonl' or 'summary'
+            max_chars (int): Character budget for the reply
             
-            if response.status_code == 200:
-                result = response.json()
-                return f"✅ Action '{action}' executed successfully on resource '{resource_id}'\n\nResult: {result.get('message', 'Success')}"
-            elif response.status_code == 404:
-                return f"❌ Resource with ID '{resource_id}' not found"
-            else:
-                return f"⚠️ Failed to execute action. Status: {response.status_code}\nResponse: {response.text}"
-                
-        except requests.exceptions.RequestException as e:
-            return f"❌ Error executing action: {str(e)}"
+        Returns:
+            str: Table with one result row per resource
+        """
+        return _drive(
+            self._client,
+            _batch_get_resources(self, resource_ids, output_format, max_chars),
+        )
+
+    @_instrumented
+    def worklocal_batch_update_resources(
+        self,
+        updates: str,
+        output_format: Optional[str] = None,
+        max_chars: Optional[int] = None,
+        __user__: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """
+        Update several resources at once.
+        
+        Args:
+            updates (str): JSON object mapping resource IDs to their updates,
+                e.g. '{"res-1": {"cpu": 4}, "res-2": {"memory": "8GB"}}'
+            output_format (str): 'markdown' (default), 'table', 'csv', 'jsonl' or 'summary'
+            max_chars (int): Character budget for the reply
+            
+        Returns:
+            str: Table with one result row per resource
+        """
+        return _drive(
+            self._client,
+            _batch_update_resources(self, updates, output_format, max_chars),
+        )
+
+    @_instrumented
+    def worklocal_batch_delete_resources(
+        self,
+        resource_ids: str,
+        output_format: Optional[str] = None,
+        max_chars: Optional[int] = None,
+        __user__: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """
+        Delete several resources at once.
+        
+        Args:
+            resource_ids (str): JSON list of resource IDs, e.g. '["res-1", "res-2"]'
+            output_format (str): 'markdown' (default), 'table', 'csv', 'jsonl' or 'summary'
+            max_chars (int): Character budget for the reply
+            
+        Returns:
+            str: Table with one result row per resource
+        """
+        return _drive(
+            self._client,
+            _batch_delete_resources(self, resource_ids, output_format, max_chars),
+        )
+
+    @_instrumented
+    def worklocal_batch_execute_action(
+        self,
+        resource_ids: str,
+        action: str,
+        parameters: str = "{}",
+        output_format: Optional[str] = None,
+        max_chars: Optional[int] = None,
+        __user__: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """
+        Execute the same action on several resources at once (e.g., restart 40 containers).
+        
+        Args:
+            resource_ids (str): JSON list of resource IDs, e.g. '["res-1", "res-2"]'
+            action (str): Action to execute (e.g., 'start', 'stop', 'restart')
+            parameters (str): JSON string containing action parameters
+            output_format (str): 'markdown' (default), 'table', 'csv', 'jsonl' or 'summary'
+            max_chars (int): Character budget for the reply
+            
+        Returns:
+            str: Table with one result row per resource
+        """
+        return _drive(
+            self._client,
+            _batch_execute_action(self, resource_ids, action, parameters, output_format, max_chars),
+        )
+
+    @_instrumented
+    def worklocal_get_fleet_metrics(
+        self,
+        query: str = "",
+        filters: str = "{}",
+        metric_type: str = "cpu",
+        statistic: str = "average",
+        timeframe: Optional[str] = None,
+        top_n: int = 10,
+        output_format: Optional[str] = None,
+        max_chars: Optional[int] = None,
+        __user__: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """
+        Compare one metric across every resource matching a search (e.g. "which server is hottest").
+
+        Args:
+            query (str): Search query string selecting the resources ('' for all)
+            filters (str): JSON string containing search filters, e.g. '{"type": "server"}'
+            metric_type (str): Metric to compare (e.g., 'cpu', 'memory', 'network')
+            statistic (str): Value per resource: 'current', 'average', 'max', 'min',
+                'p50', 'p95' or 'p99'
+            timeframe (str): Timeframe for metrics (e.g., '1h', '24h', '7d'; default: '1h')
+            top_n (int): Number of highest resources to list
+            output_format (str): 'markdown' (default), 'table', 'csv', 'jsonl' or 'summary'
+            max_chars (int): Character budget for the reply
+
+        Returns:
+            str: Fleet percentiles, the top resources and outliers
+        """
+        return _drive(
+            self._client,
+            _get_fleet_metrics(
+                self,
+                query,
+                filters,
+                metric_type,
+                statistic,
+                timeframe,
+                top_n,
+                output_format,
+                max_chars,
+            ),
+        )
+
+    @_instrumented
+    def worklocal_wait_action(
+        self,
+        job_ids: str,
+        timeout: Optional[float] = None,
+        output_format: Optional[str] = None,
+        max_chars: Optional[int] = None,
+        __user__: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """
+        Wait for action jobs started with worklocal_execute_action(mode='job') to finish.
+
+        Args:
+            job_ids (str): A job ID, or a JSON list of job IDs to wait for together
+            timeout (float): Maximum seconds to wait (default: 120); jobs still running
+                by then are reported as such, not as failures
+            output_format (str): 'markdown' (default), 'table', 'csv', 'jsonl' or 'summary'
+            max_chars (int): Character budget for the reply
+
+        Returns:
+            str: The outcome of each job
+        """
+        return _drive(self._client, _wait_action(self, job_ids, timeout, output_format, max_chars))
+
+
+class AsyncTools(_ToolsBase):
+    """
+    Async variant of ``Tools`` with the same ``worklocal_*`` surface and output.
+
+    OpenWebUI awaits coroutine tool methods, so many concurrent invocations
+    share one event loop and one pooled ``httpx.AsyncClient`` instead of each
+    holding a worker thread. Requires ``httpx``.
+    """
+
+    @functools.cached_property
+    def _client(self) -> _AsyncWorkLocalClient:
+        return _attach(self, _AsyncWorkLocalClient)
+
+    @_instrumented
+    async def worklocal_health_check(self, __user__: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Check if the WorkLocal Studio API is healthy and accessible.
+        
+        Returns:
+            str: Health status of the API
+        """
+        return await _drive_async(self._client, _health_check(self))
+
+    @_instrumented
+    async def worklocal_list_resources(
+        self,
+        resource_type: str = "all",
+        limit: Optional[int] = None,
+        offset: int = 0,
+        output_format: Optional[str] = None,
+        max_chars: Optional[int] = None,
+        __user__: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """
+        List infrastructure resources from WorkLocal Studio.
+        
+        Args:
+            resource_type (str): Type of resources to list (e.g., 'servers', 'containers', 'all')
+            limit (int): Maximum number of resources to return (default: 50)
+            offset (int): Number of resources to skip, for fetching the next batch
+            output_format (str): 'markdown' (default), 'table', 'csv', 'jsonl' or 'summary'
+            max_chars (int): Character budget for the reply
+            
+        Returns:
+            str: Formatted list of resources
+        """
+        return await _drive_async(
+            self._client,
+            _list_resources(self, resource_type, limit, offset, output_format, max_chars),
+        )
+
+    @_instrumented
+    async def worklocal_get_resource(
+        self,
+        resource_id: str,
+        output_format: Optional[str] = None,
+        max_chars: Optional[int] = None,
+        __user__: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """
+        Get detailed information about a specific resource.
+        
+        Args:
+            resource_id (str): The ID of the resource to retrieve
+            output_format (str): 'markdown' (default), 'table', 'csv', 'jsonl' or 'summary'
+            max_chars (int): Character budget for the reply
+            
+        Returns:
+            str: Formatted resource details
+        """
+        return await _drive_async(
+            self._client,
+            _get_resource(self, resource_id, output_format, max_chars),
+        )
+
+    @_instrumented
+    async def worklocal_create_resource(
+        self,
+        name: str,
+        resource_type: str,
+        config: str = "{}",
+        __user__: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """
+        Create a new infrastructure resource.
+        
+        Args:
+            name (str): Name of the resource to create
+            resource_type (str): Type of resource (e.g., 'server', 'container', 'database')
+            config (str): JSON string containing additional configuration
+            
+        Returns:
+            str: Creation result message
+        """
+        return await _drive_async(self._client, _create_resource(self, name, resource_type, config))
+
+    @_instrumented
+    async def worklocal_update_resource(
+        self,
+        resource_id: str,
+        updates: str,
+        __user__: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """
+        Update an existing infrastructure resource.
+        
+        Args:
+            resource_id (str): ID of the resource to update
+            updates (str): JSON string containing the updates
+            
+        Returns:
+            str: Update result message
+        """
+        return await _drive_async(self._client, _update_resource(self, resource_id, updates))
+
+    @_instrumented
+    async def worklocal_delete_resource(
+        self,
+        resource_id: str,
+        __user__: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """
+        Delete an infrastructure resource.
+        
+        Args:
+            resource_id (str): ID of the resource to delete
+            
+        Returns:
+            str: Deletion result message
+        """
+        return await _drive_async(self._client, _delete_resource(self, resource_id))
+
+    @_instrumented
+    async def worklocal_execute_action(
+        self, resource_id: str, action: str, parameters: str = "{}", mode: str = "sync",
+        __user__: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """
+        Execute an action on a resource (e.g., start, stop, restart).
+        
+        Args:
+            resource_id (str): ID of the resource
+            action (str): Action to execute (e.g., 'start', 'stop', 'restart')
+            parameters (str): JSON string containing action parameters
+            mode (str): 'sync' to wait for the API's reply, or 'job' to get a job ID back
+                at once for long operations (deploys, slow restarts); follow up with
+                worklocal_wait_action
+            
+        Returns:
+            str: Action execution result, or the job to wait for
+        """
+        return await _drive_async(
+            self._client,
+            _execute_action(self, resource_id, action, parameters, mode),
+        )
 
-    def worklocal_get_metrics(self, resource_id: str, metric_type: str = "all", timeframe: str = "1h") -> str:
+    @_instrumented
+    async def worklocal_get_metrics(
+        self,
+        resource_id: str,
+        metric_type: str = "all",
+        timeframe: Optional[str] = None,
+        output_format: Optional[str] = None,
+        max_chars: Optional[int] = None,
+        __user__: Optional[Dict[str, Any]] = None,
+    ) -> str:
         """
         Get metrics for a specific resource.
         
         Args:
             resource_id (str): ID of the resource
             metric_type (str): Type of metrics to retrieve (e.g., 'cpu', 'memory', 'network', 'all')
-            timeframe (str): Timeframe for metrics (e.g., '1h', '24h', '7d')
+            timeframe (str): Timeframe for metrics (e.g., '1h', '24h', '7d'; default: '1h')
+            output_format (str): 'markdown' (default), 'table', 'csv', 'jsonl' or 'summary'
+            max_chars (int): Character budget for the reply
             
         Returns:
             str: Formatted metrics data
         """
-        try:
-            params = {
-                "type": metric_type,
-                "timeframe": timeframe
-            }
-            
-            response = requests.get(
-                f"{self.base_url}/resources/{resource_id}/metrics",
-                headers=self.headers,
-                params=params,
-                timeout=10
-            )
-            
-            if response.status_code == 200:
-                metrics = response.json()
-                
-                output = f"📊 **Metrics for Resource '{resource_id}'**\n"
-                output += f"*Timeframe: {timeframe}*\n\n"
-                
-                if isinstance(metrics, dict):
-                    for metric_name, metric_data in metrics.items():
-                        output += f"**{metric_name.upper()}**:\n"
-                        if isinstance(metric_data, dict):
-                            output += f"  - Current: {metric_data.get('current', 'N/A')}\n"
-                            output += f"  - Average: {metric_data.get('average', 'N/A')}\n"
-                            output += f"  - Max: {metric_data.get('max', 'N/A')}\n"
-                            output += f"  - Min: {metric_data.get('min', 'N/A')}\n"
-                        else:
-                            output += f"  {metric_data}\n"
-                        output += "\n"
-                else:
-                    output += f"Raw metrics: {metrics}\n"
-                
-                return output
-            elif response.status_code == 404:
-                return f"❌ Resource with ID '{resource_id}' not found"
-            else:
-                return f"⚠️ Failed to get metrics. Status: {response.status_code}\nResponse: {response.text}"
-                
-        except requests.exceptions.RequestException as e:
-            return f"❌ Error getting metrics: {str(e)}"
+        return await _drive_async(
+            self._client,
+            _get_metrics(self, resource_id, metric_type, timeframe, output_format, max_chars),
+        )
 
-    def worklocal_search_resources(self, query: str, filters: str = "{}") -> str:
+    @_instrumented
+    async def worklocal_search_resources(
+        self,
+        query: str,
+        filters: str = "{}",
+        limit: Optional[int] = None,
+        offset: int = 0,
+        output_format: Optional[str] = None,
+        max_chars: Optional[int] = None,
+        __user__: Optional[Dict[str, Any]] = None,
+    ) -> str:
         """
         Search for resources based on query and filters.
         
         Args:
             query (str): Search query string
             filters (str): JSON string containing search filters
+            limit (int): Maximum number of results to return (default: 50)
+            offset (int): Number of results to skip, for fetching the next batch
+            output_format (str): 'markdown' (default), 'table', 'csv', 'jsonl' or 'summary'
+            max_chars (int): Character budget for the reply
             
         Returns:
             str: Search results
         """
-        try:
-            # Parse the filters string
-            try:
-                filters_dict = json.loads(filters) if filters else {}
-            except json.JSONDecodeError:
-                return "❌ Invalid JSON in filters parameter. Please provide valid JSON."
+        return await _drive_async(
+            self._client,
+            _search_resources(self, query, filters, limit, offset, output_format, max_chars),
+        )
+
+    @_instrumented
+    async def worklocal_batch_get_resources(
+        self,
+        resource_ids: str,
+        output_format: Optional[str] = None,
+        max_chars: Optional[int] = None,
+        __user__: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """
+        Get several resources at once.
+        
+        Args:
+            resource_ids (str): JSON list of resource IDs, e.g. '["res-1", "res-2"]'
+            output_format (str): 'markdown' (default), 'table', 'csv', 'jsonl' or 'summary'
+            max_chars (int): Character budget for the reply
             
-            params = {
-                "q": query,
-                **filters_dict
-            }
+        Returns:
+            str: Table with one result row per resource
+        """
+        return await _drive_async(
+            self._client,
+            _batch_get_resources(self, resource_ids, output_format, max_chars),
+        )
+
+    @_instrumented
+    async def worklocal_batch_update_resources(
+        self,
+        updates: str,
+        output_format: Optional[str] = None,
+        max_chars: Optional[int] = None,
+        __user__: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """
+        Update several resources at once.
+        
+        Args:
+            updates (str): JSON object mapping resource IDs to their updates,
+                e.g. '{"res-1": {"cpu": 4}, "res-2": {"memory": "8GB"}}'
+            output_format (str): 'markdown' (default), 'table', 'csv', 'jsonl' or 'summary'
+            max_chars (int): Character budget for the reply
             
-            response = requests.get(
-                f"{self.base_url}/resources/search",
-                headers=self.headers,
-                params=params,
-                timeout=10
-            )
+        Returns:
+            str: Table with one result row per resource
+        """
+        return await _drive_async(
+            self._client,
+            _batch_update_resources(self, updates, output_format, max_chars),
+        )
+
+    @_instrumented
+    async def worklocal_batch_delete_resources(
+        self,
+        resource_ids: str,
+        output_format: Optional[str] = None,
+        max_chars: Optional[int] = None,
+        __user__: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """
+        Delete several resources at once.
+        
+        Args:
+            resource_ids (str): JSON list of resource IDs, e.g. '["res-1", "res-2"]'
+            output_format (str): 'markdown' (default), 'table', 'csv', 'jsonl' or 'summary'
+            max_chars (int): Character budget for the reply
             
-            if response.status_code == 200:
-                results = response.json()
-                
-                output = f"🔍 **Search Results for '{query}'**\n\n"
-                
-                if isinstance(results, list) and results:
-                    output += f"Found {len(results)} resources:\n\n"
-                    for idx, resource in enumerate(results, 1):
-                        output += f"{idx}. **{resource.get('name', 'Unnamed')}** (`{resource.get('id', 'N/A')}`)\n"
-                        output += f"   - Type: {resource.get('type', 'Unknown')}\n"
-                        output += f"   - Status: {resource.get('status', 'Unknown')}\n\n"
-                elif isinstance(results, list):
-                    output += "No resources found matching your search criteria."
-                else:
-                    output += f"Results: {results}"
-                
-                return output
-            else:
-                return f"⚠️ Search failed. Status: {response.status_code}\nResponse: {response.text}"
-                
-        except requests.exceptions.RequestException as e:
-            return f"❌ Error searching resources: {str(e)}"
\ No newline at end of file
+        Returns:
+            str: Table with one result row per resource
+        """
+        return await _drive_async(
+            self._client,
+            _batch_delete_resources(self, resource_ids, output_format, max_chars),
+        )
+
+    @_instrumented
+    async def worklocal_batch_execute_action(
+        self,
+        resource_ids: str,
+        action: str,
+        parameters: str = "{}",
+        output_format: Optional[str] = None,
+        max_chars: Optional[int] = None,
+        __user__: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """
+        Execute the same action on several resources at once (e.g., restart 40 containers).
+        
+        Args:
+            resource_ids (str): JSON list of resource IDs, e.g. '["res-1", "res-2"]'
+            action (str): Action to execute (e.g., 'start', 'stop', 'restart')
+            parameters (str): JSON string containing action parameters
+            output_format (str): 'markdown' (default), 'table', 'csv', 'jsonl' or 'summary'
+            max_chars (int): Character budget for the reply
+            
+        Returns:
+            str: Table with one result row per resource
+        """
+        return await _drive_async(
+            self._client,
+            _batch_execute_action(self, resource_ids, action, parameters, output_format, max_chars),
+        )
+
+    @_instrumented
+    async def worklocal_get_fleet_metrics(
+        self,
+        query: str = "",
+        filters: str = "{}",
+        metric_type: str = "cpu",
+        statistic: str = "average",
+        timeframe: Optional[str] = None,
+        top_n: int = 10,
+        output_format: Optional[str] = None,
+        max_chars: Optional[int] = None,
+        __user__: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """
+        Compare one metric across every resource matching a search (e.g. "which server is hottest").
+
+        Args:
+            query (str): Search query string selecting the resources ('' for all)
+            filters (str): JSON string containing search filters, e.g. '{"type": "server"}'
+            metric_type (str): Metric to compare (e.g., 'cpu', 'memory', 'network')
+            statistic (str): Value per resource: 'current', 'average', 'max', 'min',
+                'p50', 'p95' or 'p99'
+            timeframe (str): Timeframe for metrics (e.g., '1h', '24h', '7d'; default: '1h')
+            top_n (int): Number of highest resources to list
+            output_format (str): 'markdown' (default), 'table', 'csv', 'jsonl' or 'summary'
+            max_chars (int): Character budget for the reply
+
+        Returns:
+            str: Fleet percentiles, the top resources and outliers
+        """
+        return await _drive_async(
+            self._client,
+            _get_fleet_metrics(
+                self,
+                query,
+                filters,
+                metric_type,
+                statistic,
+                timeframe,
+                top_n,
+                output_format,
+                max_chars,
+            ),
+        )
+
+    @_instrumented
+    async def worklocal_wait_action(
+        self,
+        job_ids: str,
+        timeout: Optional[float] = None,
+        output_format: Optional[str] = None,
+        max_chars: Optional[int] = None,
+        __event_emitter__: Optional[Callable[[Dict[str, Any]], Any]] = None,
+        __user__: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """
+        Wait for action jobs started with worklocal_execute_action(mode='job') to finish.
+
+        Args:
+            job_ids (str): A job ID, or a JSON list of job IDs to wait for together
+            timeout (float): Maximum seconds to wait (default: 120); jobs still running
+                by then are reported as such, not as failures
+            __event_emitter__: Injected by OpenWebUI; receives a status update after
+                each polling round
+            output_format (str): 'markdown' (default), 'table', 'csv', 'jsonl' or 'summary'
+            max_chars (int): Character budget for the reply
+
+        Returns:
+            str: The outcome of each job
+        """
+        return await _drive_async(
+            self._client,
+            _wait_action(self, job_ids, timeout, output_format, max_chars),
+            __event_emitter__,
+        )
@@ -0,0 +1,20 @@
+import os
+
+import pytest
+
+from src.worklocal_tools import _load_config
+
+
+@pytest.fixture(autouse=True)
+def isolated_config(monkeypatch):
+    """Run every test against the built-in defaults, not the developer's config or env."""
+    for variable in list(os.environ):
+        if variable.startswith("WORKLOCAL_"):
+            monkeypatch.delenv(variable)
+    monkeypatch.setattr("src.worklocal_tools._config_path", lambda: None)
+    # Clients are shared process-wide; give each test fresh ones.
+    monkeypatch.setattr("src.worklocal_tools._CLIENTS", {})
+    monkeypatch.setattr("src.worklocal_tools._LOCAL_STATE", {})
+    _load_config.cache_clear()
+    yield
+    _load_config.cache_clear()
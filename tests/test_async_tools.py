@@ -0,0 +1,490 @@
+import asyncio
+import json
+import pytest
+import requests
+import threading
+from unittest.mock import Mock, patch
+from src.worklocal_tools import (
+    AsyncTools,
+    Tools,
+    _AsyncWriteCoalescer,
+    _CircuitBreaker,
+    _Hedger,
+    _Telemetry,
+    deadline,
+)
+
+httpx = pytest.importorskip("httpx")
+
+
+def _mock_transport(routes):
+    """Build an httpx.MockTransport answering ``(method, path)`` with ``(status, body)``."""
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        status, body = routes[(request.method, request.url.path)]
+        if isinstance(body, str):
+            return httpx.Response(status, text=body)
+        return httpx.Response(
+            status, text=json.dumps(body), headers={"Content-Type": "application/json"}
+        )
+
+    transport = httpx.MockTransport(handler)
+    transport.calls = calls
+    return transport
+
+
+class TestAsyncWorkLocalTools:
+    @pytest.fixture
+    def tools(self):
+        return AsyncTools()
+
+    def _run(self, tools, routes, coro_fn):
+        tools._client.transport = _mock_transport(routes)
+        return asyncio.run(coro_fn()), tools._client.transport.calls
+
+    def test_health_check_success(self, tools):
+        result, calls = self._run(
+            tools, {("GET", "/health"): (200, "OK")}, tools.worklocal_health_check
+        )
+
+        assert result == "✅ WorkLocal Studio API is healthy. Status: OK"
+        assert str(calls[0].url) == "https://worklocal.app/health"
+        assert calls[0].headers["Content-Type"] == "application/json"
+
+    def test_user_valves_partition_credentials_and_cache(self, tools):
+        user = {"id": "u1", "valves": AsyncTools.UserValves(api_key="user-key")}
+
+        async def calls():
+            for caller in (user, user, None):
+                await tools.worklocal_get_resource("res-1", __user__=caller)
+
+        _, sent = self._run(
+            tools, {("GET", "/resources/res-1"): (200, {"id": "res-1"})}, calls
+        )
+
+        assert [c.headers.get("Authorization") for c in sent] == [
+            "Bearer user-key",
+            None,
+        ]
+        assert AsyncTools()._client is tools._client
+
+    def test_create_resource_sends_payload(self, tools):
+        result, calls = self._run(
+            tools,
+            {("POST", "/resources"): (201, {"id": "new-123"})},
+            lambda: tools.worklocal_create_resource(
+                "test-server", "server", '{"cpu": 2}'
+            ),
+        )
+
+        assert "✅" in result
+        assert json.loads(calls[0].content) == {
+            "name": "test-server",
+            "type": "server",
+            "config": {"cpu": 2},
+        }
+
+    def test_create_resource_invalid_json(self, tools):
+        result = asyncio.run(
+            tools.worklocal_create_resource("test", "server", "invalid json")
+        )
+
+        assert "Invalid JSON" in result
+
+    @pytest.mark.parametrize(
+        "method_name, args, route, status, body",
+        [
+            (
+                "worklocal_list_resources",
+                (),
+                ("GET", "/resources"),
+                200,
+                [{"id": "1", "name": "server1", "type": "server", "status": "running"}],
+            ),
+            (
+                "worklocal_get_resource",
+                ("res-123",),
+                ("GET", "/resources/res-123"),
+                200,
+                {"id": "res-123", "name": "test-server", "metadata": {"region": "eu"}},
+            ),
+            (
+                "worklocal_get_resource",
+                ("missing",),
+                ("GET", "/resources/missing"),
+                404,
+                {},
+            ),
+            (
+                "worklocal_get_metrics",
+                ("res-123",),
+                ("GET", "/resources/res-123/metrics"),
+                200,
+                {"cpu": {"current": 45.5, "average": 40.2, "max": 78.9, "min": 12.3}},
+            ),
+            (
+                "worklocal_search_resources",
+                ("prod",),
+                ("GET", "/resources/search"),
+                200,
+                [
+                    {
+                        "id": "1",
+                        "name": "prod-server",
+                        "type": "server",
+                        "status": "running",
+                    }
+                ],
+            ),
+            (
+                "worklocal_search_resources",
+                ("prod", "{}", None, 0, "table", 120),
+                ("GET", "/resources/search"),
+                200,
+                [
+                    {"id": str(i), "name": f"prod-{i}", "type": "server"}
+                    for i in range(9)
+                ],
+            ),
+            (
+                "worklocal_get_metrics",
+                ("res-123", "all", None, "summary"),
+                ("GET", "/resources/res-123/metrics"),
+                200,
+                {
+                    "cpu": {"current": 45.5, "average": 40.2},
+                    "memory": {"current": 61.0},
+                },
+            ),
+            (
+                "worklocal_execute_action",
+                ("res-123", "start"),
+                ("POST", "/resources/res-123/actions"),
+                200,
+                {"message": "Server started"},
+            ),
+            (
+                "worklocal_delete_resource",
+                ("res-123",),
+                ("DELETE", "/resources/res-123"),
+                500,
+                {"error": "boom"},
+            ),
+        ],
+    )
+    def test_output_matches_sync_tools(
+        self, tools, method_name, args, route, status, body
+    ):
+        result, _ = self._run(
+            tools, {route: (status, body)}, lambda: getattr(tools, method_name)(*args)
+        )
+
+        mock_response = Mock(status_code=status, text=json.dumps(body))
+        mock_response.json.return_value = body
+        with patch("requests.Session.request", return_value=mock_response):
+            expected = getattr(Tools(), method_name)(*args)
+
+        assert result == expected
+
+    def test_timeout_bounds_whole_call(self, tools):
+        async def slow_handler(request):
+            await asyncio.sleep(1)
+            return httpx.Response(200, text="OK")
+
+        async def call():
+            return await tools._client.request("GET", "/health", timeout=0.05)
+
+        tools._client.transport = httpx.MockTransport(slow_handler)
+
+        with pytest.raises(requests.exceptions.Timeout):
+            asyncio.run(call())
+
+    def test_transport_error_returns_error_message(self, tools):
+        def failing_handler(request):
+            raise httpx.ConnectError("connection refused")
+
+        tools._client.transport = httpx.MockTransport(failing_handler)
+
+        result = asyncio.run(tools.worklocal_get_metrics("res-123"))
+
+        assert result == "❌ Error getting metrics: connection refused"
+
+    def test_open_circuit_fails_fast_and_health_check_reports_it(self, tools):
+        tools._client.breaker = _CircuitBreaker(min_calls=3, open_duration=60)
+        routes = {("GET", f"/resources/res-{i}/metrics"): (500, {}) for i in range(4)}
+        routes[("GET", "/health")] = (200, "OK")
+
+        async def calls():
+            for i in range(4):
+                await tools.worklocal_get_metrics(f"res-{i}")
+            return (
+                await tools.worklocal_get_metrics("res-3"),
+                await tools.worklocal_health_check(),
+            )
+
+        (result, health), calls = self._run(tools, routes, calls)
+
+        assert "circuit open" in result
+        assert len(calls) == 4  # three 500s, then only /health
+        assert "- `metrics`: open, the next call probes the API" in health
+
+    def test_slow_read_is_hedged_and_loser_cancelled(self, tools):
+        cancelled = []
+
+        async def handler(request):
+            if len(seen) == 0:
+                seen.append(request)
+                try:
+                    await asyncio.sleep(1)
+                except asyncio.CancelledError:
+                    cancelled.append(request)
+                    raise
+            seen.append(request)
+            return httpx.Response(200, json={"id": "res-1", "name": "fast"})
+
+        seen = []
+        tools._client.transport = httpx.MockTransport(handler)
+        tools._client.hedger = hedger = _Hedger(
+            min_samples=1, min_delay=0.02, budget=1.0
+        )
+        hedger.observe("resource", 0.01)
+
+        result = asyncio.run(tools.worklocal_get_resource("res-1"))
+
+        assert "fast" in result
+        assert (hedger.issued, hedger.won) == (1, 1) and len(cancelled) == 1
+
+    def test_deadline_bounds_the_call(self, tools):
+        async def handler(request):
+            await asyncio.sleep(1)
+            return httpx.Response(200, json={})
+
+        tools._client.transport = httpx.MockTransport(handler)
+
+        async def call():
+            with deadline(0.1):
+                return await tools.worklocal_get_resource("res-1")
+
+        result = asyncio.run(call())
+
+        assert result.startswith("❌") and "timed out after 0.1" in result
+
+    def test_concurrent_updates_coalesce_and_delete_waits_for_them(self, tools):
+        tools._client.coalescer = _AsyncWriteCoalescer(window=5)
+        routes = {
+            ("PATCH", "/resources/res-1"): (200, {"id": "res-1"}),
+            ("DELETE", "/resources/res-1"): (204, ""),
+        }
+
+        async def calls():
+            updates = [
+                asyncio.ensure_future(
+                    tools.worklocal_update_resource("res-1", json.dumps(u))
+                )
+                for u in ({"cpu": 4}, {"memory": "8GB"})
+            ]
+            await asyncio.sleep(0.01)
+            deleted = await tools.worklocal_delete_resource("res-1")
+            return await asyncio.gather(*updates), deleted
+
+        (updated, deleted), calls = self._run(tools, routes, calls)
+
+        assert all("✅" in r for r in updated) and "✅" in deleted
+        assert [c.method for c in calls] == ["PATCH", "DELETE"]
+        assert json.loads(calls[0].content) == {"cpu": 4, "memory": "8GB"}
+
+    def test_concurrent_calls_share_client(self, tools):
+        tools._client.transport = _mock_transport(
+            {
+                ("GET", f"/resources/res-{i}"): (200, {"id": f"res-{i}"})
+                for i in range(20)
+            }
+        )
+
+        async def many():
+            results = await asyncio.gather(
+                *(tools.worklocal_get_resource(f"res-{i}") for i in range(20))
+            )
+            return results, tools._client.client
+
+        results, client = asyncio.run(many())
+
+        assert all("🔍" in r for r in results)
+        assert len(tools._client.transport.calls) == 20
+        assert client is not None
+
+    def test_each_event_loop_keeps_its_own_client_until_closed(self, tools):
+        tools._client.transport = _mock_transport({("GET", "/health"): (200, "OK")})
+
+        async def used():
+            assert "✅" in await tools.worklocal_health_check()
+            return tools._client.client
+
+        background = asyncio.new_event_loop()
+        thread = threading.Thread(target=background.run_forever, daemon=True)
+        thread.start()
+        try:
+            other = asyncio.run_coroutine_threadsafe(used(), background).result()
+
+            async def main():
+                mine = await used()
+                assert (
+                    await used() is mine and tools._client._clients[background] is other
+                )
+                await tools._client.aclose()
+                return mine
+
+            mine = asyncio.run(main())
+        finally:
+            background.call_soon_threadsafe(background.stop)
+            thread.join()
+            background.close()
+
+        assert mine is not other and mine.is_closed and other.is_closed
+        assert len(tools._client._clients) == 0
+
+    def test_reads_are_cached_until_a_write(self, tools):
+        routes = {
+            ("GET", "/resources/res-123"): (
+                200,
+                {"id": "res-123", "name": "test-server"},
+            ),
+            ("PATCH", "/resources/res-123"): (200, {}),
+        }
+        tools._client.transport = _mock_transport(routes)
+
+        async def scenario():
+            await tools.worklocal_get_resource("res-123")
+            await tools.worklocal_get_resource("res-123")
+            await tools.worklocal_update_resource("res-123", '{"cpu": 4}')
+            await tools.worklocal_get_resource("res-123")
+
+        asyncio.run(scenario())
+
+        methods = [request.method for request in tools._client.transport.calls]
+        assert methods == ["GET", "PATCH", "GET"]
+
+    def test_batch_execute_action_runs_concurrently(self, tools):
+        in_flight = []
+        peak = []
+
+        async def handler(request):
+            in_flight.append(request)
+            peak.append(len(in_flight))
+            await asyncio.sleep(0.01)
+            in_flight.remove(request)
+            return httpx.Response(200, json={"message": "Restarted"})
+
+        tools.batch_concurrency = 4
+        tools._client.transport = httpx.MockTransport(handler)
+        ids = json.dumps([f"res-{i}" for i in range(10)])
+
+        result = asyncio.run(tools.worklocal_batch_execute_action(ids, "restart"))
+
+        assert "(10 succeeded, 0 failed)" in result
+        assert max(peak) == 4
+
+    def test_identical_concurrent_reads_are_coalesced(self, tools):
+        async def handler(request):
+            await asyncio.sleep(0.02)
+            return httpx.Response(200, json={"cpu": {"current": 1}})
+
+        calls = []
+        tools._client.transport = httpx.MockTransport(
+            lambda request: calls.append(request) or handler(request)
+        )
+
+        async def many():
+            return await asyncio.gather(
+                *(tools.worklocal_get_metrics("res-123", "cpu") for _ in range(10))
+            )
+
+        results = asyncio.run(many())
+
+        assert len(set(results)) == 1
+        assert len(calls) == 1
+        assert tools._client.flights.coalesced == 9
+
+    def test_cancelled_caller_does_not_cancel_shared_read(self, tools):
+        async def handler(request):
+            await asyncio.sleep(0.05)
+            return httpx.Response(200, json={"id": "res-123", "name": "shared"})
+
+        tools._client.transport = httpx.MockTransport(handler)
+
+        async def scenario():
+            first = asyncio.ensure_future(tools.worklocal_get_resource("res-123"))
+            await asyncio.sleep(0.01)
+            second = asyncio.ensure_future(tools.worklocal_get_resource("res-123"))
+            await asyncio.sleep(0.01)
+            first.cancel()
+            return await second
+
+        assert "shared" in asyncio.run(scenario())
+
+    def test_calls_are_instrumented_like_sync_tools(self, tools):
+        records = []
+        tools._telemetry = _Telemetry([Mock(emit=records.append)])
+
+        result, calls = self._run(
+            tools,
+            {("POST", "/resources"): (201, {"id": "new-123"})},
+            lambda: tools.worklocal_create_resource("test-server", "server"),
+        )
+
+        (record,) = records
+        assert record.tool == "worklocal_create_resource"
+        assert record.outcome == "ok"
+        assert record.statuses == {201: 1}
+        assert record.bytes_out == len(calls[0].content)
+        assert record.bytes_in > 0
+        assert sum(record.phases.values()) == pytest.approx(record.duration)
+
+    def test_fleet_metrics_match_sync_output(self, tools):
+        routes = {
+            ("GET", "/resources/search"): (
+                200,
+                [{"id": "a", "name": "x"}, {"id": "b", "name": "y"}],
+            )
+        }
+        routes[("GET", "/resources/a/metrics")] = (200, {"cpu": {"average": 10}})
+        routes[("GET", "/resources/b/metrics")] = (200, {"cpu": {"average": 90}})
+
+        result, calls = self._run(
+            tools, routes, lambda: tools.worklocal_get_fleet_metrics("web")
+        )
+
+        assert len(calls) == 3
+        assert "| 1 | `b` | y | 90 |" in result
+        assert "Fleet p50: 50" in result
+
+    def test_wait_action_streams_progress(self, tools):
+        tools.jobs = {**tools.jobs, "initial_interval": 0.01, "max_interval": 0.02}
+        states = iter(
+            [
+                {"status": "running", "progress": 50},
+                {"status": "succeeded", "message": "Restarted"},
+            ]
+        )
+
+        def handler(request):
+            return httpx.Response(200, json=next(states))
+
+        tools._client.transport = httpx.MockTransport(handler)
+        updates = []
+
+        async def emit(event):
+            updates.append(event["data"])
+
+        result = asyncio.run(
+            tools.worklocal_wait_action("job-1", __event_emitter__=emit)
+        )
+
+        assert result.startswith("✅ Restarted")
+        assert updates[0] == {
+            "description": "0/1 jobs finished (job-1 50%)",
+            "done": False,
+        }
+        assert updates[-1]["done"] is True
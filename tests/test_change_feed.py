@@ -0,0 +1,329 @@
+import hashlib
+import hmac
+import json
+import queue
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from src.worklocal_tools import (
+    AsyncTools,
+    Tools,
+    _ChangeFeed,
+    _DiskCache,
+    _ResourceIndex,
+    _ResponseCache,
+    _SSEParser,
+    _load_config,
+)
+
+
+class _EventSource:
+    """Local stand-in for the WorkLocal API with an /events stream."""
+
+    def __init__(self):
+        self.events = queue.Queue()
+        self.requests = []
+        self.resource_calls = 0
+        source = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                source.requests.append((self.path, dict(self.headers)))
+                if self.path.startswith("/events?"):
+                    return self._long_poll()
+                if self.path == "/events":
+                    return self._stream()
+                source.resource_calls += 1
+                body = json.dumps(
+                    {"id": self.path.rsplit("/", 1)[-1], "name": "from-api"}
+                ).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _stream(self):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                while True:
+                    chunk = source.events.get()
+                    if chunk is None:  # Drop the connection
+                        return
+                    self.wfile.write(chunk.encode())
+                    self.wfile.flush()
+
+            def _long_poll(self):
+                try:
+                    batch = source.events.get(timeout=0.2)
+                except queue.Empty:
+                    batch = []
+                body = json.dumps(
+                    {"events": batch, "cursor": f"c{len(source.requests)}"}
+                ).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def send(self, event, event_id=None):
+        lines = [f"id: {event_id}"] if event_id else []
+        lines.append(f"data: {json.dumps(event)}")
+        self.events.put("\n".join(lines) + "\n\n")
+
+    def close(self):
+        self.events.put(None)
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met in time")
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def source():
+    source = _EventSource()
+    yield source
+    source.close()
+
+
+@pytest.fixture
+def feed_tools(source, tmp_path, monkeypatch):
+    """Tools pointed at the event source, with the index and an SSE feed enabled."""
+    path = tmp_path / "config.yaml"
+    path.write_text(
+        f"api:\n  base_url: {source.url}\n"
+        "index:\n  enabled: true\n"
+        "change_feed:\n  enabled: true\n  live_ttl: 600\n  reconnect_delay: 0.05\n"
+    )
+    monkeypatch.setattr("src.worklocal_tools._config_path", lambda: str(path))
+    _load_config.cache_clear()
+    tools = Tools()
+    yield tools
+    tools._feed.stop()
+
+
+class TestChangeFeed:
+    def test_events_keep_cache_and_index_hot(self, source, feed_tools):
+        feed = feed_tools._feed
+        _wait_for(lambda: feed.live)
+        assert feed_tools._client.cache.ttls["resource"] == 600
+
+        source.send(
+            {
+                "type": "resource.updated",
+                "resource": {"id": "res-1", "name": "web-01", "status": "stopped"},
+            }
+        )
+        _wait_for(lambda: feed.applied == 1)
+
+        result = feed_tools.worklocal_get_resource("res-1")
+        assert "stopped" in result
+        assert source.resource_calls == 0
+        assert feed_tools._index.search("web")[0]["status"] == "stopped"
+
+        source.send({"type": "resource.deleted", "resource_id": "res-1"})
+        _wait_for(lambda: feed.applied == 2)
+
+        assert feed_tools._index.search("web") == []
+        assert "from-api" in feed_tools.worklocal_get_resource("res-1")
+        assert source.resource_calls == 1
+
+    def test_reconnects_with_last_event_id(self, source, feed_tools):
+        feed = feed_tools._feed
+        source.send(
+            {"type": "resource.updated", "resource": {"id": "res-1", "name": "a"}}, "7"
+        )
+        _wait_for(lambda: feed.applied == 1)
+        source.events.put(None)
+
+        _wait_for(lambda: len([p for p, _ in source.requests if p == "/events"]) == 2)
+        assert source.requests[-1][1]["Last-Event-ID"] == "7"
+        assert feed.reconnects == 1
+        _wait_for(lambda: feed.live)
+
+    def test_disconnect_drops_trusted_entries(self, source):
+        cache = Tools()._client.cache
+        feed = _ChangeFeed(
+            source.url, {}, cache, live_ttl=600, reconnect_delay=5
+        ).start()
+        try:
+            _wait_for(lambda: feed.live)
+            cache.put_data(cache.key("/resources/res-1"), {"id": "res-1"}, "resource")
+            source.events.put(None)
+            _wait_for(lambda: not feed.live)
+
+            assert cache.ttls["resource"] == 30
+            assert cache.get(cache.key("/resources/res-1")) is None
+        finally:
+            feed.stop()
+
+    def test_disconnect_keeps_other_workers_disk_entries(self, source, tmp_path):
+        disk = _DiskCache(str(tmp_path / "cache.db"), "ns")
+        cache = _ResponseCache(disk=disk)
+        cache.put_data(cache.key("/resources/res-2"), {"id": "res-2"}, "resource")
+        feed = _ChangeFeed(
+            source.url, {}, cache, live_ttl=600, reconnect_delay=5
+        ).start()
+        try:
+            _wait_for(lambda: feed.live)
+            cache.put_data(cache.key("/resources/res-1"), {"id": "res-1"}, "resource")
+            source.events.put(None)
+            _wait_for(lambda: not feed.live)
+
+            assert disk.get(cache.key("/resources/res-1")) is None
+            assert disk.get(cache.key("/resources/res-2")).json() == {"id": "res-2"}
+        finally:
+            feed.stop()
+
+    def test_long_poll(self, source):
+        index = _ResourceIndex()
+        feed = _ChangeFeed(
+            source.url, {}, Tools()._client.cache, index, mode="long_poll"
+        ).start()
+        try:
+            source.events.put(
+                [
+                    {
+                        "type": "resource.created",
+                        "resource": {"id": "res-5", "name": "new"},
+                    }
+                ]
+            )
+            _wait_for(lambda: feed.applied == 1)
+            _wait_for(lambda: len(source.requests) >= 2)
+
+            assert index.resolve("new") == "res-5"
+            assert "cursor=c" in source.requests[1][0]
+            assert feed.live and index.live
+        finally:
+            feed.stop()
+
+    def test_webhook_receiver_checks_signatures(self):
+        index = _ResourceIndex()
+        index.upsert({"id": "res-1", "name": "web", "status": "running"})
+        feed = _ChangeFeed(
+            "http://unused",
+            {},
+            Tools()._client.cache,
+            index,
+            mode="webhook",
+            webhook_port=0,
+            webhook_secret="s3cret",
+        ).start()
+        try:
+            body = json.dumps(
+                {
+                    "type": "resource.updated",
+                    "data": {"id": "res-1", "status": "stopped"},
+                }
+            )
+            signature = hmac.new(b"s3cret", body.encode(), hashlib.sha256).hexdigest()
+
+            bad = requests.post(
+                feed.webhook_url,
+                data=body,
+                headers={"X-WorkLocal-Signature": "sha256=00"},
+            )
+            good = requests.post(
+                feed.webhook_url,
+                data=body,
+                headers={"X-WorkLocal-Signature": f"sha256={signature}"},
+            )
+
+            assert (bad.status_code, good.status_code) == (401, 204)
+            assert index.search("web")[0] == {
+                "id": "res-1",
+                "name": "web",
+                "status": "stopped",
+            }
+            assert feed.applied == 1
+        finally:
+            feed.stop()
+
+    def test_sync_and_async_tools_share_one_webhook_receiver(
+        self, tmp_path, monkeypatch
+    ):
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            port = probe.getsockname()[1]
+        path = tmp_path / "config.yaml"
+        path.write_text(
+            f"change_feed:\n  enabled: true\n  mode: webhook\n  webhook_port: {port}\n"
+        )
+        monkeypatch.setattr("src.worklocal_tools._config_path", lambda: str(path))
+        monkeypatch.setattr("src.worklocal_tools._CLIENTS", {})
+        _load_config.cache_clear()
+        tools, async_tools = Tools(), AsyncTools()
+        feeds = tools._feed, async_tools._feed  # Attached (and started) on first use
+        try:
+            body = json.dumps(
+                {"type": "resource.updated", "resource": {"id": "res-1", "name": "web"}}
+            )
+            reply = requests.post(tools._feed.webhook_url, data=body)
+
+            assert reply.status_code == 204
+            assert tools._feed.webhook_url == async_tools._feed.webhook_url
+            assert [feed.applied for feed in feeds] == [1, 1]
+        finally:
+            for feed in feeds:
+                feed.stop()
+
+    def test_webhook_port_in_use_falls_back_to_polling(self, source):
+        with socket.socket() as taken:
+            taken.bind(("127.0.0.1", 0))
+            taken.listen()
+            feed = _ChangeFeed(
+                source.url,
+                {},
+                Tools()._client.cache,
+                mode="webhook",
+                webhook_port=taken.getsockname()[1],
+            ).start()
+            try:
+                source.events.put(
+                    [{"type": "resource.created", "resource": {"id": "res-5"}}]
+                )
+                _wait_for(lambda: feed.applied == 1)
+
+                assert feed.mode == "long_poll" and feed.webhook_url is None
+            finally:
+                feed.stop()
+
+
+class TestSSEParser:
+    def test_parses_events(self):
+        parser = _SSEParser()
+        lines = [
+            ": heartbeat",
+            "",
+            "id: 41",
+            "event: resource.deleted",
+            'data: {"resource_id":',
+            'data: "res-9"}',
+            "",
+        ]
+        events = [e for e in map(parser.feed, lines) if e is not None]
+
+        assert events == [{"resource_id": "res-9", "type": "resource.deleted"}]
+        assert parser.last_event_id == "41"
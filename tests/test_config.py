@@ -0,0 +1,204 @@
+import pytest
+from unittest.mock import Mock, patch
+
+from src.worklocal_tools import Tools, _LogSink, _config_path, _load_config
+
+
+@pytest.fixture
+def config_file(tmp_path, monkeypatch):
+    """Write a config.yaml and point the loader at it."""
+    path = tmp_path / "config.yaml"
+
+    def write(text):
+        path.write_text(text)
+        monkeypatch.setattr("src.worklocal_tools._config_path", lambda: str(path))
+        _load_config.cache_clear()
+        return path
+
+    return write
+
+
+class TestConfigLoading:
+    def test_defaults_without_file(self):
+        config = _load_config()
+
+        assert config["api"]["base_url"] == "https://worklocal.app"
+        assert config["api"]["timeout"] == 10
+        assert config["defaults"]["search_limit"] == 50
+
+    def test_file_is_merged_over_defaults(self, config_file):
+        config_file(
+            "api:\n"
+            "  base_url: https://staging.worklocal.app/\n"
+            "  timeouts:\n"
+            "    health: 3\n"
+            "pool:\n"
+            "  maxsize: 50\n"
+        )
+
+        config = _load_config()
+
+        assert config["api"]["base_url"] == "https://staging.worklocal.app"
+        assert config["api"]["timeouts"] == {"metrics": 30, "health": 3}
+        assert config["api"]["timeout"] == 10
+        assert config["pool"]["maxsize"] == 50
+        assert config["pool"]["connections"] == 10
+
+    def test_loaded_once_per_process(self, config_file):
+        path = config_file("api:\n  timeout: 5\n")
+
+        first = _load_config()
+        path.write_text("api:\n  timeout: 99\n")
+
+        assert _load_config() is first
+        assert _load_config()["api"]["timeout"] == 5
+
+    def test_environment_overrides_file(self, config_file, monkeypatch):
+        config_file("api:\n  base_url: https://file.example\n  timeout: 5\n")
+        monkeypatch.setenv("WORKLOCAL_BASE_URL", "https://env.example")
+        monkeypatch.setenv("WORKLOCAL_TIMEOUT", "7.5")
+        monkeypatch.setenv("WORKLOCAL_VERIFY_SSL", "false")
+
+        config = _load_config()
+
+        assert config["api"]["base_url"] == "https://env.example"
+        assert config["api"]["timeout"] == 7.5
+        assert config["api"]["verify_ssl"] is False
+
+    def test_explicit_path_from_environment(self, monkeypatch, tmp_path):
+        monkeypatch.setenv("WORKLOCAL_CONFIG", str(tmp_path / "custom.yaml"))
+
+        assert _config_path() == str(tmp_path / "custom.yaml")
+
+    @pytest.mark.parametrize(
+        "text, message",
+        [
+            ("api:\n  base_url: worklocal.app\n", "api.base_url"),
+            ("api:\n  timeout: 0\n", "api.timeout"),
+            ("api:\n  timeouts:\n    metrics: -1\n", "api.timeouts.metrics"),
+            ("authentication:\n  type: oauth\n", "authentication.type"),
+            ("rate_limiting:\n  burst_size: 0\n", "rate_limiting.burst_size"),
+            ("defaults:\n  search_limit: many\n", "defaults.search_limit"),
+            ("change_feed:\n  mode: carrier-pigeon\n", "change_feed.mode"),
+            ("output:\n  format: xml\n", "output.format"),
+            ("output:\n  max_chars: -5\n", "output.max_chars"),
+            ("circuit_breaker:\n  failure_rate: 1.5\n", "circuit_breaker.failure_rate"),
+            ("circuit_breaker:\n  open_duration: 0\n", "circuit_breaker.open_duration"),
+            ("transport:\n  compress_min_bytes: -1\n", "transport.compress_min_bytes"),
+            ("cache:\n  disk:\n    max_bytes: 0\n", "cache.disk.max_bytes"),
+            ("api:\n  deadline: 0\n", "api.deadline"),
+            ("hedging:\n  percentile: 100\n", "hedging.percentile"),
+            ("write_coalescing:\n  window: 0\n", "write_coalescing.window"),
+            ("- just\n- a list\n", "expected a mapping"),
+        ],
+    )
+    def test_invalid_values_are_rejected(self, config_file, text, message):
+        config_file(text)
+
+        with pytest.raises(ValueError, match=message):
+            _load_config()
+
+    def test_invalid_environment_value(self, monkeypatch):
+        monkeypatch.setenv("WORKLOCAL_TIMEOUT", "soon")
+
+        with pytest.raises(ValueError, match="WORKLOCAL_TIMEOUT"):
+            _load_config()
+
+
+class TestConfigWiring:
+    @pytest.mark.parametrize(
+        "auth, expected",
+        [
+            ("type: bearer", {"Authorization": "Bearer secret"}),
+            ("type: api_key\n  header_name: X-API-Key", {"X-API-Key": "secret"}),
+            ("type: basic", {"Authorization": "Basic c2VjcmV0"}),
+            ("type: none", {}),
+        ],
+    )
+    def test_authentication_headers(self, config_file, auth, expected):
+        config_file(f"api:\n  api_key: secret\nauthentication:\n  {auth}\n")
+
+        tools = Tools()
+
+        assert tools.headers == {"Content-Type": "application/json", **expected}
+
+    @patch("requests.Session.request")
+    def test_per_endpoint_timeouts(self, mock_request, config_file):
+        config_file("api:\n  timeout: 8\n  timeouts:\n    health: 2\n    metrics: 45\n")
+        mock_request.return_value = Mock(status_code=200, text="{}", headers={})
+        mock_request.return_value.json.return_value = {}
+        tools = Tools()
+
+        tools.worklocal_health_check()
+        tools.worklocal_get_metrics("res-123")
+        tools.worklocal_get_resource("res-123")
+
+        timeouts = [c.kwargs["timeout"] for c in mock_request.call_args_list]
+        assert timeouts == [2, 45, 8]
+
+    def test_pool_cache_limiter_and_ssl_settings(self, config_file):
+        config_file(
+            "api:\n  verify_ssl: false\n"
+            "pool:\n  maxsize: 7\n"
+            "cache:\n  max_entries: 3\n  ttls:\n    metrics: 1\n"
+            "rate_limiting:\n  enabled: true\n  requests_per_minute: 120\n  burst_size: 4\n"
+        )
+
+        client = Tools()._client
+
+        assert client.session.verify is False
+        assert client.session.get_adapter("https://worklocal.app")._pool_maxsize == 7
+        assert client.cache.max_entries == 3
+        assert client.cache.ttls["metrics"] == 1
+        assert client.limiter.rate == 2
+        assert client.limiter.capacity == 4
+
+    @patch("requests.Session.request")
+    def test_defaults_apply_to_tools(self, mock_request, config_file):
+        config_file("defaults:\n  search_limit: 5\n  metric_timeframe: 24h\n")
+        mock_request.return_value = Mock(status_code=200, text="[]", headers={})
+        mock_request.return_value.json.return_value = []
+        tools = Tools()
+
+        tools.worklocal_list_resources()
+        assert mock_request.call_args.kwargs["params"]["limit"] == 5
+
+        tools.worklocal_get_metrics("res-123")
+        assert mock_request.call_args.kwargs["params"]["timeframe"] == "24h"
+
+    @patch("requests.Session.request")
+    def test_disabled_features(self, mock_request, config_file):
+        config_file(
+            "features:\n  metrics_enabled: false\n  search_enabled: false\n"
+            "  batch_operations: false\n"
+        )
+        tools = Tools()
+
+        assert "features.metrics_enabled" in tools.worklocal_get_metrics("res-123")
+        assert "features.search_enabled" in tools.worklocal_search_resources("web")
+        assert "features.batch_operations" in tools.worklocal_batch_get_resources(
+            '["a"]'
+        )
+        mock_request.assert_not_called()
+
+    def test_instrumentation_sinks(self, config_file):
+        config_file(
+            "instrumentation:\n  metrics: false\n  log_calls: true\n"
+            "logging:\n  console: false\n"
+        )
+
+        sinks = Tools()._telemetry.sinks
+
+        assert [type(sink) for sink in sinks] == [_LogSink]
+
+    def test_resource_index(self, config_file):
+        assert Tools()._index is None
+
+        config_file(
+            "index:\n  enabled: true\n  sync_interval: 5\n  fallback_to_server: false\n"
+        )
+        tools = Tools()
+
+        assert tools._index.sync_interval == 5
+        assert tools._index.fallback_to_server is False
+        assert tools._client.write_listeners == [tools._index.apply_write]
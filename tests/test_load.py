@@ -0,0 +1,178 @@
+"""End-to-end runs of the tools against the bundled stub server (benchmarks/stub_server.py)."""
+
+import pytest
+
+import asyncio
+import json
+import time
+
+from benchmarks.stub_server import start_h2_stub_server, start_stub_server
+from src.worklocal_tools import AsyncTools, Tools, _load_config
+
+
+@pytest.fixture
+def stub_tools(tmp_path, monkeypatch):
+    """Start a stub with the given options and return Tools pointed at it; ``config`` adds YAML."""
+    servers = []
+
+    def start(config="", http2=False, tools_class=Tools, **options):
+        server, url = (start_h2_stub_server if http2 else start_stub_server)(**options)
+        servers.append(server)
+        path = tmp_path / "config.yaml"
+        path.write_text(
+            f"api:\n  base_url: {url}\n"
+            "pool:\n  backoff_factor: 0\n"
+            "defaults:\n  page_size: 40\n"
+            "jobs:\n  initial_interval: 0.01\n  max_interval: 0.05\n" + config
+        )
+        monkeypatch.setattr("src.worklocal_tools._config_path", lambda: str(path))
+        _load_config.cache_clear()
+        return server.stub, tools_class()
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+class TestAgainstStub:
+    def test_pages_through_a_large_inventory(self, stub_tools):
+        stub, tools = stub_tools(resources=500)
+
+        result = tools.worklocal_list_resources(
+            limit=100, offset=380, output_format="csv"
+        )
+
+        rows = result.strip().splitlines()
+        assert rows[1].startswith("res-381,") and rows[100].startswith("res-480,")
+        assert stub.counts == {200: 3}  # 40 + 40 + 20
+
+    def test_search_and_metrics(self, stub_tools):
+        stub, tools = stub_tools(resources=50)
+
+        assert "database-00003" in tools.worklocal_search_resources("database-0000")
+        assert "**MEMORY**" in tools.worklocal_get_metrics("res-3")
+        assert "not found" in tools.worklocal_get_resource("res-51")
+
+    def test_index_loads_the_whole_inventory_in_the_background(self, stub_tools):
+        stub, tools = stub_tools("index:\n  enabled: true\n", resources=50)
+
+        first = tools.worklocal_search_resources(
+            "database-0000"
+        )  # By the API while the index loads
+        while tools._index._syncing:
+            time.sleep(0.005)
+        sent = sum(stub.counts.values())
+        second = tools.worklocal_search_resources("database-0000")
+
+        assert len(tools._index) == 50 and sum(stub.counts.values()) == sent
+        assert (
+            first == second
+            and "database-00003" in second
+            and "Found 2 resources" in second
+        )
+        assert tools._index.resolve("database-00003") == "res-3"
+
+    def test_async_index_loads_on_a_background_task(self, stub_tools):
+        stub, tools = stub_tools(
+            "index:\n  enabled: true\n", tools_class=AsyncTools, resources=50
+        )
+
+        async def searches():
+            await tools.worklocal_search_resources("database-0000")
+            while tools._index._syncing:
+                await asyncio.sleep(0.005)
+            return await tools.worklocal_search_resources("database-0000")
+
+        result = asyncio.run(searches())
+
+        assert len(tools._index) == 50 and "Found 2 resources" in result
+
+    def test_throttled_reads_are_retried(self, stub_tools):
+        stub, tools = stub_tools(resources=20, throttle_rate=0.5, seed=1)
+
+        results = [tools.worklocal_get_resource(f"res-{i}") for i in range(1, 21)]
+
+        assert all("❌" not in r and "⚠️" not in r for r in results)
+        assert stub.counts[429] > 0 and stub.counts[200] == 20
+
+    def test_injected_errors_surface(self, stub_tools):
+        stub, tools = stub_tools(resources=5, error_rate=1.0)
+
+        assert "Status: 500" in tools.worklocal_execute_action("res-1", "restart")
+        assert "OK" in tools.worklocal_health_check()
+
+    def test_job_mode(self, stub_tools):
+        stub, tools = stub_tools(resources=5, job_duration=0.05)
+
+        accepted = tools.worklocal_execute_action("res-1", "backup", mode="job")
+        assert "Job: `job-1`" in accepted
+        assert "✅" in tools.worklocal_wait_action("job-1", timeout=5)
+
+
+class TestTransport:
+    def test_gzipped_replies(self, stub_tools):
+        stub, tools = stub_tools(resources=200, compress_min_bytes=512)
+
+        result = tools.worklocal_list_resources(limit=40, output_format="csv")
+
+        assert result.strip().splitlines()[40].startswith("res-40,")
+        # 40 resources are ~8 KB of JSON; gzip shrinks the repetitive rows a lot
+        assert stub.sent_bytes < 2000
+
+    def test_compression_can_be_turned_off(self, stub_tools):
+        stub, tools = stub_tools(
+            "transport:\n  compression: false\n", resources=200, compress_min_bytes=512
+        )
+
+        tools.worklocal_list_resources(limit=40)
+
+        assert stub.sent_bytes > 5000
+
+    def test_large_writes_are_gzipped(self, stub_tools):
+        stub, tools = stub_tools(
+            "transport:\n  compress_requests: true\n  compress_min_bytes: 256\n",
+            resources=5,
+        )
+
+        assert "✅" in tools.worklocal_create_resource(
+            "web-01", "server", json.dumps({"tags": ["x"] * 100})
+        )
+        assert "✅" in tools.worklocal_create_resource("web-02", "server")
+        assert stub.gzipped_requests == 1
+
+    def test_http2_multiplexes_threads_over_one_connection(self, stub_tools):
+        pytest.importorskip("h2")
+        stub, tools = stub_tools(
+            "transport:\n  http2: true\n", http2=True, resources=50, latency=0.05
+        )
+
+        result = tools.worklocal_batch_get_resources(
+            json.dumps([f"res-{i}" for i in range(1, 21)])
+        )
+
+        assert "20 succeeded" in result
+        assert stub.connections == 1 and stub.counts == {200: 20}
+
+    def test_http2_async(self, stub_tools):
+        pytest.importorskip("h2")
+        stub, tools = stub_tools(
+            "transport:\n  http2: true\n",
+            http2=True,
+            tools_class=AsyncTools,
+            resources=50,
+            latency=0.05,
+        )
+
+        async def run():
+            try:
+                return await asyncio.gather(
+                    *(tools.worklocal_get_resource(f"res-{i}") for i in range(1, 11))
+                )
+            finally:
+                await tools._client.aclose()
+
+        results = asyncio.run(run())
+
+        assert all("❌" not in r for r in results)
+        assert stub.connections == 1
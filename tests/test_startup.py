@@ -0,0 +1,60 @@
+"""Loading cost of the tool module, measured by benchmarks/bench_import.py in fresh interpreters."""
+
+import pytest
+import requests
+
+from benchmarks.bench_import import BUDGETS, breaches, measure, summarize
+from src import worklocal_tools
+from src.worklocal_tools import AsyncTools, Tools, _load_config
+
+
+@pytest.mark.parametrize("tools_class", ["Tools", "AsyncTools"])
+def test_loading_the_tool_leaves_heavy_dependencies_unloaded(tools_class):
+    run = measure(tools_class)
+
+    assert run["loaded_at_import"] == [] and run["loaded_by_instance"] == []
+
+
+def test_import_and_instantiation_stay_within_budget():
+    summary = summarize([measure() for _ in range(3)])
+
+    # Twice the benchmark's budgets, so a busy test machine does not fail it
+    assert breaches(summary, {key: 2 * budget for key, budget in BUDGETS.items()}) == []
+
+
+@pytest.mark.parametrize("tools_class", [Tools, AsyncTools])
+def test_config_loads_on_first_use(tools_class):
+    _load_config.cache_clear()
+
+    tools = tools_class()
+    assert _load_config.cache_info().currsize == 0 and "config" not in vars(tools)
+
+    assert tools.page_size == tools.config["defaults"]["page_size"]
+    assert _load_config.cache_info().currsize == 1
+
+
+def test_instances_share_config_client_and_local_state(tmp_path, monkeypatch):
+    path = tmp_path / "config.yaml"
+    path.write_text("index:\n  enabled: true\n")
+    monkeypatch.setattr("src.worklocal_tools._config_path", lambda: str(path))
+    _load_config.cache_clear()
+
+    first, second = Tools(), Tools()
+
+    assert first.config is second.config and first._client is second._client
+    assert (
+        first._index is second._index and first._metrics_store is second._metrics_store
+    )
+    assert first._client.write_listeners == [first._index.apply_write]
+
+
+def test_lazily_defined_errors_keep_the_requests_contract():
+    deadline_error = worklocal_tools._DeadlineExceeded
+
+    assert issubclass(deadline_error, requests.exceptions.Timeout)
+    assert issubclass(
+        worklocal_tools._CircuitOpenError, requests.exceptions.ConnectionError
+    )
+    assert worklocal_tools._DeadlineExceeded is deadline_error
+    with pytest.raises(AttributeError):
+        worklocal_tools._NoSuchThing
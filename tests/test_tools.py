@@ -1,7 +1,46 @@
 import pytest
 from unittest.mock import Mock, patch
+import asyncio
 import json
-from src.worklocal_tools import Tools
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import datetime
+
+from src.worklocal_tools import (
+    Tools,
+    _CachedResponse,
+    _CircuitBreaker,
+    _CircuitOpenError,
+    _DiskCache,
+    _Hedger,
+    _LogSink,
+    _MetricsRegistry,
+    _JobWaiter,
+    _MetricSummary,
+    _MetricsStore,
+    _ResourceIndex,
+    _Renderer,
+    _Resource,
+    _ResponseCache,
+    _SpanSink,
+    _Telemetry,
+    _TokenBucket,
+    _View,
+    _WriteCoalescer,
+    _compose_patches,
+    _json_body,
+    _load_config,
+    _typed_body,
+    deadline,
+    metrics_text,
+)
 
 class TestWorkLocalTools:
     @pytest.fixture
@@ -14,10 +53,11 @@ class TestWorkLocalTools:
         mock = Mock()
         mock.status_code = 200
         mock.text = "OK"
+        mock.headers = {}
         mock.json.return_value = {}
         return mock
     
-    @patch('requests.get')
+    @patch('requests.Session.request')
     def test_health_check_success(self, mock_get, tools):
         mock_get.return_value.status_code = 200
         mock_get.return_value.text = "OK"
@@ -27,12 +67,13 @@ class TestWorkLocalTools:
         assert "✅" in result
         assert "healthy" in result
         mock_get.assert_called_once_with(
+            "GET",
             "https://worklocal.app/health",
             headers={"Content-Type": "application/json"},
             timeout=10
         )
     
-    @patch('requests.get')
+    @patch('requests.Session.request')
     def test_health_check_failure(self, mock_get, tools):
         mock_get.return_value.status_code = 500
         
@@ -41,7 +82,7 @@ class TestWorkLocalTools:
         assert "⚠️" in result
         assert "500" in result
     
-    @patch('requests.get')
+    @patch('requests.Session.request')
     def test_list_resources_all(self, mock_get, tools, mock_response):
         mock_response.json.return_value = [
             {"id": "1", "name": "server1", "type": "server", "status": "running"},
@@ -56,7 +97,7 @@ class TestWorkLocalTools:
         assert "running" in result
         assert "stopped" in result
     
-    @patch('requests.get')
+    @patch('requests.Session.request')
     def test_list_resources_filtered(self, mock_get, tools, mock_response):
         mock_response.json.return_value = [
             {"id": "1", "name": "server1", "type": "server", "status": "running"}
@@ -66,13 +107,14 @@ class TestWorkLocalTools:
         result = tools.worklocal_list_resources("servers")
         
         mock_get.assert_called_with(
+            "GET",
             "https://worklocal.app/resources",
             headers={"Content-Type": "application/json"},
-            params={"type": "servers"},
+            params={"type": "servers", "limit": 50, "offset": 0},
             timeout=10
         )
     
-    @patch('requests.get')
+    @patch('requests.Session.request')
     def test_get_resource_success(self, mock_get, tools, mock_response):
         mock_response.json.return_value = {
             "id": "res-123",
@@ -90,7 +132,7 @@ class TestWorkLocalTools:
         assert "res-123" in result
         assert "running" in result
     
-    @patch('requests.get')
+    @patch('requests.Session.request')
     def test_get_resource_not_found(self, mock_get, tools):
         mock_get.return_value.status_code = 404
         
@@ -99,7 +141,7 @@ class TestWorkLocalTools:
         assert "❌" in result
         assert "not found" in result
     
-    @patch('requests.post')
+    @patch('requests.Session.request')
     def test_create_resource_success(self, mock_post, tools, mock_response):
         mock_response.status_code = 201
         mock_response.json.return_value = {"id": "new-123"}
@@ -121,7 +163,7 @@ class TestWorkLocalTools:
         assert call_args.kwargs['json']['type'] == "server"
         assert call_args.kwargs['json']['config'] == {"cpu": 2}
     
-    @patch('requests.post')
+    @patch('requests.Session.request')
     def test_create_resource_invalid_json(self, mock_post, tools):
         result = tools.worklocal_create_resource(
             name="test",
@@ -133,7 +175,7 @@ class TestWorkLocalTools:
         assert "Invalid JSON" in result
         mock_post.assert_not_called()
     
-    @patch('requests.patch')
+    @patch('requests.Session.request')
     def test_update_resource_success(self, mock_patch, tools, mock_response):
         mock_patch.return_value = mock_response
         
@@ -145,7 +187,7 @@ class TestWorkLocalTools:
         assert "✅" in result
         assert "updated successfully" in result
     
-    @patch('requests.delete')
+    @patch('requests.Session.request')
     def test_delete_resource_success(self, mock_delete, tools):
         mock_delete.return_value.status_code = 204
         
@@ -154,7 +196,7 @@ class TestWorkLocalTools:
         assert "✅" in result
         assert "deleted successfully" in result
     
-    @patch('requests.post')
+    @patch('requests.Session.request')
     def test_execute_action_success(self, mock_post, tools, mock_response):
         mock_response.json.return_value = {"message": "Server started"}
         mock_post.return_value = mock_response
@@ -168,7 +210,7 @@ class TestWorkLocalTools:
         assert "start" in result
         assert "Server started" in result
     
-    @patch('requests.get')
+    @patch('requests.Session.request')
     def test_get_metrics_success(self, mock_get, tools, mock_response):
         mock_response.json.return_value = {
             "cpu": {
@@ -193,7 +235,7 @@ class TestWorkLocalTools:
         assert "MEMORY" in result
         assert "62.1" in result
     
-    @patch('requests.get')
+    @patch('requests.Session.request')
     def test_search_resources_success(self, mock_get, tools, mock_response):
         mock_response.json.return_value = [
             {"id": "1", "name": "prod-server", "type": "server", "status": "running"},
@@ -210,11 +252,1908 @@ class TestWorkLocalTools:
         assert "prod-server" in result
         assert "prod-db" in result
     
-    @patch('requests.get')
+    @patch('requests.Session.request')
     def test_search_resources_no_results(self, mock_get, tools, mock_response):
         mock_response.json.return_value = []
         mock_get.return_value = mock_response
         
         result = tools.worklocal_search_resources("nonexistent")
         
-        assert "No resources found" in result
\ No newline at end of file
+        assert "No resources found" in result
+
+
+class TestConnectionPool:
+    @pytest.fixture
+    def tools(self):
+        return Tools()
+
+    @patch('requests.Session.request')
+    def test_methods_share_one_session(self, mock_request, tools):
+        mock_request.return_value.status_code = 200
+        mock_request.return_value.json.return_value = []
+
+        session = tools._client.session
+        tools.worklocal_health_check()
+        tools.worklocal_list_resources()
+        tools.worklocal_delete_resource("res-123")
+
+        assert tools._client.session is session
+        assert mock_request.call_count == 3
+
+    def test_adapter_pool_and_retry_settings(self, tools):
+        adapter = tools._client.session.get_adapter("https://worklocal.app/health")
+
+        assert adapter._pool_maxsize == 20
+        assert adapter.max_retries.total == 3
+        assert "GET" in adapter.max_retries.allowed_methods
+        assert "POST" not in adapter.max_retries.allowed_methods
+        assert 502 in adapter.max_retries.status_forcelist
+        assert 503 not in adapter.max_retries.status_forcelist  # handled by the limiter
+
+    def test_close_releases_session(self, tools):
+        session = tools._client.session
+        tools._client.close()
+
+        assert tools._client.session is not session
+
+
+class TestResponseCache:
+    @pytest.fixture
+    def tools(self):
+        return Tools()
+
+    @pytest.fixture
+    def mock_response(self):
+        mock = Mock()
+        mock.status_code = 200
+        mock.text = '{"id": "res-123", "name": "test-server"}'
+        mock.headers = {}
+        mock.json.return_value = {"id": "res-123", "name": "test-server"}
+        return mock
+
+    @patch('requests.Session.request')
+    def test_repeated_reads_hit_cache(self, mock_request, tools, mock_response):
+        mock_request.return_value = mock_response
+
+        first = tools.worklocal_get_resource("res-123")
+        second = tools.worklocal_get_resource("res-123")
+
+        assert first == second
+        assert mock_request.call_count == 1
+        assert tools._client.cache.stats()["hits"] == 1
+        assert tools._client.cache.stats()["misses"] == 1
+
+    @patch('requests.Session.request')
+    def test_params_are_part_of_key(self, mock_request, tools, mock_response):
+        mock_response.json.return_value = []
+        mock_request.return_value = mock_response
+
+        tools.worklocal_list_resources("servers")
+        tools.worklocal_list_resources("containers")
+        tools.worklocal_list_resources("servers")
+
+        assert mock_request.call_count == 2
+
+    @patch('requests.Session.request')
+    def test_errors_are_not_cached(self, mock_request, tools):
+        mock_request.return_value.status_code = 404
+
+        tools.worklocal_get_resource("missing")
+        tools.worklocal_get_resource("missing")
+
+        assert mock_request.call_count == 2
+
+    @patch('requests.Session.request')
+    def test_entries_expire_after_ttl(self, mock_request, tools, mock_response):
+        mock_request.return_value = mock_response
+        tools._client.cache.ttls["resource"] = 0.01
+
+        tools.worklocal_get_resource("res-123")
+        time.sleep(0.02)
+        tools.worklocal_get_resource("res-123")
+
+        assert mock_request.call_count == 2
+
+    @pytest.mark.parametrize("write", [
+        lambda tools: tools.worklocal_update_resource("res-123", '{"cpu": 4}'),
+        lambda tools: tools.worklocal_delete_resource("res-123"),
+        lambda tools: tools.worklocal_execute_action("res-123", "restart"),
+    ])
+    @patch('requests.Session.request')
+    def test_successful_write_invalidates_resource(self, mock_request, write, tools, mock_response):
+        mock_request.return_value = mock_response
+        tools.worklocal_get_resource("res-123")
+        tools.worklocal_get_metrics("res-123")
+        tools.worklocal_get_resource("res-456")
+
+        write(tools)
+        calls_before = mock_request.call_count
+        tools.worklocal_get_resource("res-123")
+        tools.worklocal_get_metrics("res-123")
+        tools.worklocal_get_resource("res-456")
+
+        assert mock_request.call_count == calls_before + 2
+
+    @patch('requests.Session.request')
+    def test_create_invalidates_lists_and_searches(self, mock_request, tools, mock_response):
+        mock_request.return_value = mock_response
+        tools.worklocal_list_resources()
+        tools.worklocal_search_resources("test")
+        tools.worklocal_get_resource("res-123")
+
+        mock_response.status_code = 201
+        tools.worklocal_create_resource("new", "server")
+        mock_response.status_code = 200
+        calls_before = mock_request.call_count
+        tools.worklocal_list_resources()
+        tools.worklocal_search_resources("test")
+        tools.worklocal_get_resource("res-123")
+
+        assert mock_request.call_count == calls_before + 2
+
+    def test_lru_eviction_by_count_and_bytes(self):
+        cache = _ResponseCache(max_entries=2, max_bytes=10)
+        response = Mock(status_code=200, text="abcd", headers={})
+        response.json.return_value = {}
+
+        cache.put(cache.key("/resources/a"), response, "resource")
+        cache.put(cache.key("/resources/b"), response, "resource")
+        cache.get(cache.key("/resources/a"))
+        cache.put(cache.key("/resources/c"), response, "resource")
+
+        assert cache.get(cache.key("/resources/b")) is None
+        assert cache.get(cache.key("/resources/a")) is not None
+        assert cache.stats()["evictions"] == 1
+
+        response.text = "abcdefgh"
+        cache.put(cache.key("/resources/d"), response, "resource")
+
+        assert cache.stats()["entries"] == 1
+        assert cache.stats()["bytes"] == 8
+
+
+def _entry(body, ttl=30.0, etag=None):
+    expires_at = time.monotonic() + ttl
+    return _CachedResponse(200, body, json.loads(body), "resource", expires_at, etag=etag)
+
+
+class TestDiskCache:
+    @pytest.fixture
+    def worker(self, tmp_path, monkeypatch):
+        """Builds Tools as a fresh worker process would: new clients over the same cache file."""
+        path = tmp_path / "config.yaml"
+        path.write_text(f"cache:\n  disk:\n    enabled: true\n    path: {tmp_path / 'cache.db'}\n")
+        monkeypatch.setattr("src.worklocal_tools._config_path", lambda: str(path))
+        _load_config.cache_clear()
+
+        def start():
+            monkeypatch.setattr("src.worklocal_tools._CLIENTS", {})
+            return Tools()
+
+        return start
+
+    @pytest.fixture
+    def mock_response(self):
+        mock = Mock(
+            status_code=200,
+            content=b'{"id": "res-123", "name": "web-01"}',
+            headers={"ETag": '"v1"'},
+        )
+        mock.json.return_value = {"id": "res-123", "name": "web-01"}
+        return mock
+
+    @patch('requests.Session.request')
+    def test_new_workers_start_warm(self, mock_request, worker, mock_response):
+        mock_request.return_value = mock_response
+        first = worker().worklocal_get_resource("res-123")
+
+        tools = worker()
+        second = tools.worklocal_get_resource("res-123")
+
+        assert second == first and "web-01" in second
+        assert mock_request.call_count == 1
+        assert tools._client.cache.stats()["disk_hits"] == 1
+
+    @patch('requests.Session.request')
+    def test_writes_invalidate_for_every_worker(self, mock_request, worker, mock_response):
+        mock_request.return_value = mock_response
+        worker().worklocal_get_resource("res-123")
+
+        worker().worklocal_update_resource("res-123", '{"cpu": 4}')
+        worker().worklocal_get_resource("res-123")
+
+        assert mock_request.call_count == 3
+
+    def test_shared_between_processes(self, tmp_path):
+        path = str(tmp_path / "cache.db")
+        entry = _entry('{"name": "from-parent"}', etag='"e"')
+        _DiskCache(path, "ns").put(("/resources/a", "{}", ""), entry)
+        script = (
+            "import sys; from src.worklocal_tools import _DiskCache, _CachedResponse\n"
+            "disk = _DiskCache(sys.argv[1], 'ns')\n"
+            "entry = disk.get(('/resources/a', '{}', ''))\n"
+            "body = b'{\"name\": \"from-child\"}'\n"
+            "reply = _CachedResponse(200, body, {}, 'resource', 1e12)\n"
+            "disk.put(('/resources/b', '{}', ''), reply)\n"
+            "print(entry.json()['name'], entry.etag)\n"
+        )
+
+        child = subprocess.run(
+            [sys.executable, "-c", script, path], capture_output=True, text=True, check=True
+        )
+
+        assert child.stdout.split() == ["from-parent", '"e"']
+        child_entry = _DiskCache(path, "ns").get(("/resources/b", "{}", ""))
+        assert child_entry.json() == {"name": "from-child"}
+        assert _DiskCache(path, "other").get(("/resources/b", "{}", "")) is None
+
+    def test_size_bound_evicts_least_recently_read(self, tmp_path, monkeypatch):
+        monkeypatch.setattr("src.worklocal_tools._DISK_EVICT_EVERY", 1)
+        disk = _DiskCache(str(tmp_path / "cache.db"), "ns", max_bytes=100)
+        body = json.dumps({"pad": "x" * 20})
+        disk.put(("/resources/a", "{}", ""), _entry(body))
+        disk.put(("/resources/b", "{}", ""), _entry(body))
+        disk.get(("/resources/a", "{}", ""))
+        for name in "cde":
+            disk.put((f"/resources/{name}", "{}", ""), _entry(body))
+
+        kept = [name for name in "abcde" if disk.get((f"/resources/{name}", "{}", "")) is not None]
+
+        assert "b" not in kept and "e" in kept and len(kept) < 5
+
+    def test_expired_and_foreign_rows_are_misses(self, tmp_path):
+        path = str(tmp_path / "cache.db")
+        disk = _DiskCache(path, "ns")
+        disk.put(("/resources/old", "{}", ""), _entry('{"a": 1}', ttl=-1))
+        disk.put(("/resources/new", "{}", ""), _entry('{"a": 1}'))
+        with sqlite3.connect(path) as conn:
+            conn.execute("UPDATE entries SET format = 99 WHERE path = '/resources/new'")
+
+        assert disk.get(("/resources/old", "{}", "")) is None
+        assert disk.get(("/resources/new", "{}", "")) is None
+
+    def test_corrupt_rows_are_dropped(self, tmp_path):
+        path = str(tmp_path / "cache.db")
+        disk = _DiskCache(path, "ns")
+        disk.put(("/resources/a", "{}", ""), _entry('{"a": 1}'))
+        disk.put(("/resources/b", "{}", ""), _entry('{"b": 1}'))
+        with sqlite3.connect(path) as conn:
+            conn.execute("UPDATE entries SET body = ? WHERE path = '/resources/a'", (b"not zlib",))
+            conn.execute(
+                "UPDATE entries SET body = ? WHERE path = '/resources/b'",
+                (zlib.compress(b"{not json"),),
+            )
+
+        assert disk.get(("/resources/a", "{}", "")) is None
+        assert disk.get(("/resources/b", "{}", "")) is None
+        with sqlite3.connect(path) as conn:
+            assert conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0] == 0
+
+    def test_unusable_file_reads_as_miss(self, tmp_path):
+        path = tmp_path / "cache.db"
+        path.write_bytes(b"not a database" * 100)
+        cache = _ResponseCache(disk=_DiskCache(str(path), "ns"))
+
+        cache.put_data(cache.key("/resources/a"), {"id": "a"}, "resource")
+
+        assert cache.get(cache.key("/resources/a")).json() == {"id": "a"}
+        assert cache.get(cache.key("/resources/b")) is None
+        assert cache.stats()["disk_errors"] == 2
+
+
+class TestConditionalRequests:
+    @pytest.fixture
+    def tools(self):
+        tools = Tools()
+        tools._client.cache.ttls.update(resources=0.01, resource=0.01)
+        return tools
+
+    def _response(self, status_code, body=None, **headers):
+        mock = Mock(status_code=status_code, text=json.dumps(body), headers=headers)
+        mock.json.return_value = body
+        return mock
+
+    @patch('requests.Session.request')
+    def test_expired_entry_sends_validators(self, mock_request, tools):
+        mock_request.side_effect = [
+            self._response(200, {"id": "res-123"}, ETag='"v1"',
+                           **{"Last-Modified": "Wed, 01 Jan 2025 00:00:00 GMT"}),
+            self._response(304),
+        ]
+
+        tools.worklocal_get_resource("res-123")
+        time.sleep(0.02)
+        tools.worklocal_get_resource("res-123")
+
+        sent = mock_request.call_args_list[1].kwargs["headers"]
+        assert sent["If-None-Match"] == '"v1"'
+        assert sent["If-Modified-Since"] == "Wed, 01 Jan 2025 00:00:00 GMT"
+        assert "If-None-Match" not in mock_request.call_args_list[0].kwargs["headers"]
+
+    @patch('requests.Session.request')
+    def test_not_modified_reuses_body_and_markdown(self, mock_request, tools):
+        mock_request.side_effect = [
+            self._response(200, [{"id": "1", "name": "server1"}], ETag='"v1"'),
+            self._response(304, ETag='"v1"'),
+        ]
+
+        first = tools.worklocal_list_resources()
+        entry = tools._client.cache.get(
+            tools._client.cache.key("/resources", {"limit": 50, "offset": 0})
+        )
+        (page_key,) = entry.rendered
+        entry.rendered[page_key] = ("memoized page\n",)
+        time.sleep(0.02)
+        second = tools.worklocal_list_resources()
+
+        assert "server1" in first
+        assert "memoized page" in second
+        assert tools._client.cache.stats()["revalidations"] == 1
+
+    @patch('requests.Session.request')
+    def test_changed_resource_replaces_entry(self, mock_request, tools):
+        mock_request.side_effect = [
+            self._response(200, {"id": "res-123", "status": "running"}, ETag='"v1"'),
+            self._response(200, {"id": "res-123", "status": "stopped"}, ETag='"v2"'),
+        ]
+
+        tools.worklocal_get_resource("res-123")
+        time.sleep(0.02)
+        result = tools.worklocal_get_resource("res-123")
+
+        assert "stopped" in result
+        key = tools._client.cache.key("/resources/res-123")
+        assert tools._client.cache.conditional_headers(key) == {"If-None-Match": '"v2"'}
+
+    @patch('requests.Session.request')
+    def test_entries_without_validators_are_dropped(self, mock_request, tools):
+        mock_request.return_value = self._response(200, {"id": "res-123"})
+
+        tools.worklocal_get_resource("res-123")
+        time.sleep(0.02)
+        tools.worklocal_get_resource("res-123")
+
+        assert "If-None-Match" not in mock_request.call_args.kwargs["headers"]
+
+
+class TestPagination:
+    @pytest.fixture
+    def tools(self):
+        tools = Tools()
+        tools.page_size = 2
+        return tools
+
+    def _page(self, body):
+        mock = Mock(status_code=200, text=json.dumps(body), headers={})
+        mock.json.return_value = body
+        return mock
+
+    def _resources(self, start, stop):
+        return [{"id": f"res-{i}", "name": f"server{i}"} for i in range(start, stop)]
+
+    @patch('requests.Session.request')
+    def test_list_fetches_pages_up_to_limit(self, mock_request, tools):
+        mock_request.side_effect = [
+            self._page(self._resources(1, 3)),
+            self._page(self._resources(3, 5)),
+            self._page(self._resources(5, 6)),
+        ]
+
+        result = tools.worklocal_list_resources(limit=5)
+
+        pages = [c.kwargs["params"] for c in mock_request.call_args_list]
+        assert pages == [
+            {"limit": 2, "offset": 0}, {"limit": 2, "offset": 2}, {"limit": 1, "offset": 4}
+        ]
+        assert "5. **server5**" in result
+        assert "More are available; call again with offset=5" in result
+
+    @patch('requests.Session.request')
+    def test_short_page_ends_listing(self, mock_request, tools):
+        mock_request.side_effect = [
+            self._page(self._resources(1, 3)),
+            self._page(self._resources(3, 4)),
+        ]
+
+        result = tools.worklocal_list_resources(limit=10)
+
+        assert mock_request.call_count == 2
+        assert "3. **server3**" in result
+        assert "More are available" not in result
+
+    @patch('requests.Session.request')
+    def test_offset_continues_numbering(self, mock_request, tools):
+        mock_request.return_value = self._page(self._resources(11, 12))
+
+        result = tools.worklocal_list_resources("servers", limit=5, offset=10)
+
+        assert mock_request.call_args.kwargs["params"] == {
+            "type": "servers", "limit": 2, "offset": 10
+        }
+        assert "11. **server11**" in result
+
+    @patch('requests.Session.request')
+    def test_cursor_envelope_is_followed(self, mock_request, tools):
+        mock_request.side_effect = [
+            self._page({"items": self._resources(1, 3), "next_cursor": "abc"}),
+            self._page({"items": self._resources(3, 4), "next_cursor": None}),
+        ]
+
+        result = tools.worklocal_list_resources(limit=10)
+
+        assert mock_request.call_args_list[1].kwargs["params"] == {"limit": 2, "cursor": "abc"}
+        assert "3. **server3**" in result
+        assert "More are available" not in result
+
+    @patch('requests.Session.request')
+    def test_search_reports_total(self, mock_request, tools):
+        tools.page_size = 50
+        mock_request.return_value = self._page({"results": self._resources(1, 4), "total": 120})
+
+        result = tools.worklocal_search_resources("server", '{"status": "running"}', limit=3)
+
+        assert mock_request.call_args.kwargs["params"] == {
+            "q": "server", "status": "running", "limit": 3, "offset": 0
+        }
+        assert "Found 120 resources (showing 1-3)" in result
+        assert "call again with offset=3" in result
+
+    @patch('requests.Session.request')
+    def test_server_ignoring_limit_is_cut_off(self, mock_request, tools):
+        mock_request.return_value = self._page(self._resources(1, 101))
+
+        result = tools.worklocal_list_resources(limit=3)
+
+        assert mock_request.call_count == 1
+        assert "3. **server3**" in result
+        assert "server4" not in result
+        assert "call again with offset=3" in result
+
+    @patch('requests.Session.request')
+    def test_plain_dict_payload_is_rendered_as_before(self, mock_request, tools):
+        mock_request.return_value = self._page({"servers": 3, "containers": 7})
+
+        result = tools.worklocal_list_resources()
+
+        assert "- **servers**: 3" in result
+        assert "- **containers**: 7" in result
+
+
+class TestBatchOperations:
+    @pytest.fixture
+    def tools(self):
+        return Tools()
+
+    def _response(self, status_code, body=None):
+        mock = Mock(status_code=status_code, text=json.dumps(body), headers={})
+        mock.json.return_value = body
+        return mock
+
+    @patch('requests.Session.request')
+    def test_batch_execute_action_reports_each_item(self, mock_request, tools):
+        def respond(method, url, **kwargs):
+            if "res-2" in url:
+                return self._response(404)
+            return self._response(200, {"message": "Restarted"})
+
+        mock_request.side_effect = respond
+
+        result = tools.worklocal_batch_execute_action('["res-1", "res-2", "res-3"]', "restart")
+
+        assert "3 resources" in result
+        assert "(2 succeeded, 1 failed)" in result
+        assert "| `res-1` | ✅ Restarted |" in result
+        assert "| `res-2` | ❌ Not found |" in result
+        assert result.index("`res-1`") < result.index("`res-2`") < result.index("`res-3`")
+        assert all(c.kwargs["json"] == {"action": "restart", "parameters": {}}
+                   for c in mock_request.call_args_list)
+
+    @patch('requests.Session.request')
+    def test_batch_concurrency_is_bounded(self, mock_request, tools):
+        tools.batch_concurrency = 3
+        lock = threading.Lock()
+        in_flight = []
+        peak = []
+
+        def respond(method, url, **kwargs):
+            with lock:
+                in_flight.append(url)
+                peak.append(len(in_flight))
+            time.sleep(0.02)
+            with lock:
+                in_flight.remove(url)
+            return self._response(204)
+
+        mock_request.side_effect = respond
+
+        result = tools.worklocal_batch_delete_resources(json.dumps([f"r{i}" for i in range(12)]))
+
+        assert "(12 succeeded, 0 failed)" in result
+        assert max(peak) == 3
+
+    @patch('requests.Session.request')
+    def test_batch_update_accepts_mapping_and_list(self, mock_request, tools):
+        mock_request.return_value = self._response(200, {})
+
+        tools.worklocal_batch_update_resources('{"res-1": {"cpu": 4}}')
+        tools.worklocal_batch_update_resources('[{"id": "res-2", "updates": {"cpu": 8}}]')
+
+        sent = [(c.args[1], c.kwargs["json"]) for c in mock_request.call_args_list]
+        assert sent == [
+            ("https://worklocal.app/resources/res-1", {"cpu": 4}),
+            ("https://worklocal.app/resources/res-2", {"cpu": 8}),
+        ]
+
+    @patch('requests.Session.request')
+    def test_batch_get_uses_cache_and_renders_summary(self, mock_request, tools):
+        mock_request.return_value = self._response(
+            200, {"id": "res-1", "name": "web", "type": "server", "status": "running"}
+        )
+
+        tools.worklocal_get_resource("res-1")
+        result = tools.worklocal_batch_get_resources('["res-1"]')
+
+        assert mock_request.call_count == 1
+        assert "✅ web (server, running)" in result
+
+    @patch('requests.Session.request')
+    def test_transport_errors_are_per_item(self, mock_request, tools):
+        mock_request.side_effect = requests.exceptions.ConnectionError("refused")
+
+        result = tools.worklocal_batch_delete_resources('["res-1"]')
+
+        assert "| `res-1` | ❌ refused |" in result
+
+    @pytest.mark.parametrize("bad", ["not json", '{"a": 1}', '[["nested"]]'])
+    def test_invalid_id_list(self, tools, bad):
+        assert "Invalid resource_ids" in tools.worklocal_batch_get_resources(bad)
+
+
+class TestRateLimiting:
+    @pytest.fixture
+    def tools(self):
+        tools = Tools()
+        tools._client.backoff_factor = 0.001
+        return tools
+
+    def _response(self, status_code, **headers):
+        mock = Mock(status_code=status_code, text="{}", headers=headers)
+        mock.json.return_value = {"message": "ok"}
+        return mock
+
+    def test_bucket_allows_burst_then_spaces_requests(self):
+        bucket = _TokenBucket(requests_per_minute=600, burst_size=3)
+
+        waits = [bucket.reserve() for _ in range(5)]
+
+        assert waits[:3] == [0, 0, 0]
+        assert waits[3] == pytest.approx(0.1, abs=0.01)
+        assert waits[4] == pytest.approx(0.2, abs=0.01)
+
+    def test_bucket_is_shared_by_threads_and_tasks(self):
+        bucket = _TokenBucket(requests_per_minute=6000, burst_size=1)
+        start = time.monotonic()
+
+        threads = [threading.Thread(target=bucket.acquire) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+
+        async def tasks():
+            await asyncio.gather(*(bucket.acquire_async() for _ in range(5)))
+
+        asyncio.run(tasks())
+        for thread in threads:
+            thread.join()
+
+        # 10 tokens at 100/s with a burst of 1 take at least 90 ms to hand out
+        assert time.monotonic() - start >= 0.085
+
+    def test_pause_holds_every_caller(self):
+        bucket = _TokenBucket(requests_per_minute=6000, burst_size=10)
+        bucket.pause(0.5)
+
+        assert bucket.reserve() == pytest.approx(0.5, abs=0.05)
+
+    @patch('requests.Session.request')
+    def test_429_is_retried_after_retry_after(self, mock_request, tools):
+        mock_request.side_effect = [
+            self._response(429, **{"Retry-After": "0"}),
+            self._response(200),
+        ]
+
+        result = tools.worklocal_execute_action("res-123", "start")
+
+        assert "✅" in result
+        assert mock_request.call_count == 2
+        assert tools._client.throttled == 1
+
+    @patch('requests.Session.request')
+    def test_retry_after_pauses_shared_limiter(self, mock_request, tools):
+        tools._client.limiter = _TokenBucket(requests_per_minute=6000, burst_size=10)
+        mock_request.side_effect = [
+            self._response(429, **{"Retry-After": "2"}),
+            self._response(200),
+        ]
+
+        with patch('time.sleep') as mock_sleep:
+            tools.worklocal_health_check()
+
+        assert mock_sleep.call_args.args[0] == pytest.approx(2, abs=0.05)
+
+    @patch('requests.Session.request')
+    def test_retries_give_up_after_limit(self, mock_request, tools):
+        mock_request.return_value = self._response(429)
+
+        result = tools.worklocal_health_check()
+
+        assert "429" in result
+        assert mock_request.call_count == 4
+
+    @patch('requests.Session.request')
+    def test_503_replays_only_idempotent_or_retry_after(self, mock_request, tools):
+        mock_request.return_value = self._response(503)
+
+        tools.worklocal_execute_action("res-123", "start")
+        assert mock_request.call_count == 1
+
+        mock_request.reset_mock()
+        tools.worklocal_delete_resource("res-123")
+        assert mock_request.call_count == 4
+
+        mock_request.reset_mock()
+        mock_request.side_effect = [
+            self._response(503, **{"Retry-After": "0"}),
+            self._response(200),
+        ]
+        tools.worklocal_execute_action("res-123", "start")
+        assert mock_request.call_count == 2
+
+
+class TestRequestCoalescing:
+    @pytest.fixture
+    def tools(self):
+        return Tools()
+
+    def _run_concurrently(self, fn, count):
+        results = [None] * count
+        barrier = threading.Barrier(count)
+
+        def worker(i):
+            barrier.wait()
+            results[i] = fn()
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    @patch('requests.Session.request')
+    def test_identical_reads_share_one_call(self, mock_request, tools):
+        def slow(method, url, **kwargs):
+            time.sleep(0.05)
+            mock = Mock(status_code=200, text="{}", headers={})
+            mock.json.return_value = {"cpu": {"current": 42}}
+            return mock
+
+        mock_request.side_effect = slow
+
+        results = self._run_concurrently(lambda: tools.worklocal_get_metrics("res-123"), 8)
+
+        assert mock_request.call_count == 1
+        assert len(set(results)) == 1 and "42" in results[0]
+        assert tools._client.flights.coalesced == 7
+
+    @patch('requests.Session.request')
+    def test_different_params_are_not_coalesced(self, mock_request, tools):
+        def slow(method, url, **kwargs):
+            time.sleep(0.05)
+            mock = Mock(status_code=200, text="{}", headers={})
+            mock.json.return_value = {}
+            return mock
+
+        mock_request.side_effect = slow
+        timeframes = iter(["1h", "24h"])
+        lock = threading.Lock()
+
+        def call():
+            with lock:
+                timeframe = next(timeframes)
+            return tools.worklocal_get_metrics("res-123", timeframe=timeframe)
+
+        self._run_concurrently(call, 2)
+
+        assert mock_request.call_count == 2
+        assert tools._client.flights.coalesced == 0
+
+    @patch('requests.Session.request')
+    def test_followers_share_leader_error(self, mock_request, tools):
+        def failing(method, url, **kwargs):
+            time.sleep(0.05)
+            raise requests.exceptions.ConnectionError("refused")
+
+        mock_request.side_effect = failing
+
+        results = self._run_concurrently(lambda: tools.worklocal_get_resource("res-123"), 4)
+
+        assert mock_request.call_count == 1
+        assert all(r == "❌ Error getting resource: refused" for r in results)
+
+    @patch('requests.Session.request')
+    def test_writes_are_never_coalesced(self, mock_request, tools):
+        def slow(method, url, **kwargs):
+            time.sleep(0.02)
+            return Mock(status_code=204)
+
+        mock_request.side_effect = slow
+
+        self._run_concurrently(lambda: tools.worklocal_delete_resource("res-123"), 3)
+
+        assert mock_request.call_count == 3
+
+
+class TestInstrumentation:
+    class _Capture:
+        def __init__(self):
+            self.records = []
+
+        def emit(self, record):
+            self.records.append(record)
+
+    @pytest.fixture
+    def capture(self):
+        return self._Capture()
+
+    @pytest.fixture
+    def tools(self, capture):
+        tools = Tools()
+        tools._telemetry = _Telemetry([capture])
+        return tools
+
+    @staticmethod
+    def _response(body, status_code=200, elapsed=0.01):
+        mock = Mock(status_code=status_code, headers={}, content=json.dumps(body).encode())
+        mock.text = mock.content.decode()
+        mock.json.return_value = body
+        mock.elapsed = datetime.timedelta(seconds=elapsed)
+        mock.request.body = None
+        return mock
+
+    @patch('requests.Session.request')
+    def test_call_record_has_phases_status_and_sizes(self, mock_request, tools, capture):
+        mock_request.return_value = self._response({"id": "res-123", "name": "web"})
+
+        tools.worklocal_get_resource("res-123")
+
+        (record,) = capture.records
+        assert record.tool == "worklocal_get_resource"
+        assert record.outcome == "ok"
+        assert record.statuses == {200: 1}
+        assert record.bytes_in == len(mock_request.return_value.content)
+        assert {"server", "transfer", "parse", "format"} <= set(record.phases)
+        assert record.phases["server"] == pytest.approx(0.01, abs=0.01)
+        assert sum(record.phases.values()) == pytest.approx(record.duration)
+        assert record.counts == {"cache_miss": 1}
+
+    @patch('requests.Session.request')
+    def test_cache_hits_and_error_outcomes_are_recorded(self, mock_request, tools, capture):
+        mock_request.return_value = self._response({"id": "res-123"})
+        tools.worklocal_get_resource("res-123")
+        tools.worklocal_get_resource("res-123")
+        mock_request.side_effect = requests.exceptions.ConnectionError("refused")
+        tools.worklocal_health_check()
+
+        assert capture.records[1].counts == {"cache_hit": 1}
+        assert capture.records[1].statuses == {}
+        assert capture.records[2].outcome == "error"
+
+    @patch('requests.Session.request')
+    def test_throttle_retries_are_counted(self, mock_request, tools, capture):
+        throttled = self._response({}, status_code=429)
+        throttled.headers = {"Retry-After": "0"}
+        mock_request.side_effect = [throttled, self._response({"status": "healthy"})]
+
+        tools.worklocal_health_check()
+
+        (record,) = capture.records
+        assert record.counts["retries"] == 1
+        assert record.statuses == {429: 1, 200: 1}
+
+    @patch('requests.Session.request')
+    def test_batch_workers_report_into_the_calling_tool(self, mock_request, tools, capture):
+        mock_request.side_effect = lambda method, url, **kw: self._response(
+            {"id": url.rsplit("/", 1)[1]}
+        )
+
+        tools.worklocal_batch_get_resources('["a", "b", "c"]')
+
+        (record,) = capture.records
+        assert record.tool == "worklocal_batch_get_resources"
+        assert record.statuses == {200: 3}
+
+    def test_broken_sink_does_not_break_the_tool(self, tools):
+        broken = Mock()
+        broken.emit.side_effect = RuntimeError("sink down")
+        tools._telemetry = _Telemetry([broken])
+
+        with patch('requests.Session.request', return_value=self._response({"status": "healthy"})):
+            assert "✅" in tools.worklocal_health_check()
+
+    def test_registry_renders_prometheus_text(self):
+        registry = _MetricsRegistry()
+        with patch('requests.Session.request', return_value=self._response({"status": "healthy"})):
+            tools = Tools()
+            tools._telemetry = _Telemetry([registry])
+            tools.worklocal_health_check()
+
+        text = registry.render_text()
+        assert 'worklocal_tool_calls_total{outcome="ok",tool="worklocal_health_check"} 1' in text
+        assert (
+            'worklocal_http_responses_total{status="200",tool="worklocal_health_check"} 1'
+            in text
+        )
+        assert (
+            'worklocal_tool_phase_seconds_count{phase="total",tool="worklocal_health_check"} 1'
+            in text
+        )
+        assert "# TYPE worklocal_tool_phase_seconds histogram" in text
+
+    def test_default_config_feeds_process_registry(self):
+        with patch('requests.Session.request', return_value=self._response({"status": "healthy"})):
+            Tools().worklocal_health_check()
+
+        assert 'tool="worklocal_health_check"' in metrics_text()
+
+    def test_log_and_span_sinks(self, caplog):
+        spans = []
+        telemetry = _Telemetry([_LogSink(), _SpanSink(lambda *span: spans.append(span))])
+        tools = Tools()
+        tools._telemetry = telemetry
+
+        with caplog.at_level("INFO", logger="worklocal_tools"):
+            healthy = self._response({"status": "healthy"})
+            with patch('requests.Session.request', return_value=healthy):
+                tools.worklocal_health_check()
+
+        (line,) = [r.getMessage() for r in caplog.records if r.name == "worklocal_tools"]
+        assert json.loads(line.split(" ", 1)[1])["tool"] == "worklocal_health_check"
+        name, start, end, attributes = spans[0]
+        assert name == "worklocal_health_check" and end >= start
+        assert attributes["worklocal.outcome"] == "ok"
+
+
+class TestMetricsStore:
+    @pytest.fixture
+    def tools(self):
+        return Tools()
+
+    @staticmethod
+    def _reply(payload):
+        mock = Mock(status_code=200, text=json.dumps(payload), headers={})
+        mock.json.return_value = payload
+        return mock
+
+    @staticmethod
+    def _samples(start, count, step=10, value=lambda i: float(i)):
+        return [[start + i * step, value(i)] for i in range(count)]
+
+    @patch('requests.Session.request')
+    def test_second_call_fetches_only_new_samples(self, mock_request, tools):
+        now = time.time()
+        first = self._samples(now - 3000, 300)
+        mock_request.return_value = self._reply({"cpu": first})
+
+        tools.worklocal_get_metrics("res-123", "cpu")
+
+        assert "since" not in mock_request.call_args.kwargs["params"]
+
+        newest = first[-1][0]
+        mock_request.return_value = self._reply(
+            {"cpu": [[newest - 10, 0.0], [newest + 5, 500.0]]}
+        )
+        result = tools.worklocal_get_metrics("res-123", "cpu")
+
+        assert mock_request.call_args.kwargs["params"]["since"] == newest
+        assert "Current: 500" in result
+        assert "Max: 500" in result
+        assert "Samples: 301 (raw)" in result
+
+    @patch('requests.Session.request')
+    def test_local_percentiles_and_aggregates(self, mock_request, tools):
+        samples = self._samples(time.time() - 100, 101, step=1)
+        mock_request.return_value = self._reply({"cpu": {"samples": samples}})
+
+        result = tools.worklocal_get_metrics("res-123", "cpu")
+
+        assert "Average: 50" in result
+        assert "Min: 0" in result
+        assert "P50/P95/P99: 50 / 95 / 99" in result
+
+    @patch('requests.Session.request')
+    def test_wider_window_than_synced_refetches_in_full(self, mock_request, tools):
+        mock_request.return_value = self._reply({"cpu": self._samples(time.time() - 60, 6)})
+        tools.worklocal_get_metrics("res-123", "cpu", "1h")
+        tools.worklocal_get_metrics("res-123", "cpu", "24h")
+
+        assert "since" not in mock_request.call_args.kwargs["params"]
+
+    @patch('requests.Session.request')
+    def test_summary_payloads_render_as_before(self, mock_request, tools):
+        mock_request.return_value = self._reply({"cpu": {"current": 45, "average": 40}})
+
+        result = tools.worklocal_get_metrics("res-123", "cpu")
+        tools._client.cache.clear()
+        tools.worklocal_get_metrics("res-123", "cpu")
+
+        assert "Current: 45" in result
+        assert "since" not in mock_request.call_args.kwargs["params"]
+
+    def test_downsampled_tiers_serve_long_windows(self):
+        store = _MetricsStore(raw_retention=600)
+        now = time.time()
+        samples = [{"timestamp": now - 7200 + i * 30, "value": i % 4} for i in range(240)]
+        store.ingest("res-1", "cpu", "2h", self._reply({"cpu": samples}))
+
+        summary = store.summaries("res-1", "cpu", "2h")["cpu"]
+        series = store._series[("res-1", "cpu")]
+
+        assert summary["resolution"] == "1m"
+        assert summary["samples"] == 240
+        assert summary["average"] == pytest.approx(1.5)
+        assert (summary["min"], summary["max"]) == (0, 3)
+        assert len(series.times) <= 21  # raw samples trimmed to the last 10 minutes
+        assert store.summaries("res-1", "cpu", "5m")["cpu"]["resolution"] == "raw"
+
+    def test_iso_and_millisecond_timestamps(self):
+        store = _MetricsStore()
+        now = time.time()
+        iso = datetime.datetime.fromtimestamp(now - 30, datetime.timezone.utc).isoformat()
+        store.ingest(
+            "res-1", "all", "1h",
+            self._reply({"cpu": [[iso, 1.0]], "memory": [[int((now - 20) * 1000), 2.0]]}),
+        )
+
+        summaries = store.summaries("res-1", "all", "1h")
+
+        assert summaries["cpu"]["current"] == 1.0
+        assert summaries["memory"]["current"] == 2.0
+
+    def test_series_are_evicted_beyond_max_series(self):
+        store = _MetricsStore(max_series=2)
+        for resource_id in ("a", "b", "c"):
+            store.ingest(resource_id, "cpu", "1h", self._reply({"cpu": [[time.time(), 1.0]]}))
+
+        assert [key[0] for key in store._series] == ["b", "c"]
+
+
+class TestFleetMetrics:
+    @pytest.fixture
+    def tools(self):
+        return Tools()
+
+    @staticmethod
+    def _router(values, delay=0.0):
+        def respond(method, url, **kwargs):
+            time.sleep(delay)
+            if url.endswith("/resources/search"):
+                payload = [{"id": rid, "name": f"srv-{rid}"} for rid in values]
+            else:
+                resource_id = url.rsplit("/", 2)[-2]
+                value = values[resource_id]
+                if value is None:
+                    return Mock(status_code=404, headers={}, text="")
+                payload = {"cpu": {"current": value, "average": value}}
+            mock = Mock(status_code=200, text=json.dumps(payload), headers={})
+            mock.json.return_value = payload
+            return mock
+
+        return respond
+
+    @patch('requests.Session.request')
+    def test_top_n_percentiles_and_outliers(self, mock_request, tools):
+        values = {f"res-{i}": float(i) for i in range(1, 20)}
+        values["res-hot"] = 500.0
+        values["res-gone"] = None
+        mock_request.side_effect = self._router(values)
+
+        result = tools.worklocal_get_fleet_metrics("web", '{"type": "server"}', top_n=3)
+
+        search_params = mock_request.call_args_list[0].kwargs["params"]
+        assert search_params["q"] == "web" and search_params["type"] == "server"
+        assert "21 resources" in result and "20 with data, 1 without" in result
+        assert "Fleet p50: 10.5" in result
+        assert "| 1 | `res-hot` | srv-res-hot | 500 |" in result
+        assert "| 3 | `res-18` | srv-res-18 | 18 |" in result
+        assert "`res-17`" not in result
+        assert "**Outliers**" in result and "`res-hot` (500)" in result
+        assert "`res-gone` ❌ Not found" in result
+
+    @patch('requests.Session.request')
+    def test_metrics_are_fetched_concurrently(self, mock_request, tools):
+        values = {f"res-{i}": float(i) for i in range(20)}
+        mock_request.side_effect = self._router(values, delay=0.05)
+
+        start = time.perf_counter()
+        tools.worklocal_get_fleet_metrics()
+        elapsed = time.perf_counter() - start
+
+        assert mock_request.call_count == 21
+        assert elapsed < 0.5  # ~2 round trips, not 21
+
+    def test_requires_a_single_metric(self, tools):
+        assert tools.worklocal_get_fleet_metrics(metric_type="all").startswith("❌")
+        assert tools.worklocal_get_fleet_metrics(statistic="median").startswith("❌")
+
+
+class TestResourceIndex:
+    INVENTORY = [
+        {"id": "res-1", "name": "web-01", "type": "server", "status": "running",
+         "metadata": {"region": "eu"}},
+        {"id": "res-2", "name": "web-02", "type": "server", "status": "stopped",
+         "metadata": {"region": "us"}},
+        {"id": "res-3", "name": "db-primary", "type": "database", "status": "running"},
+        {"id": "res-4", "name": "cache", "type": "container", "status": "running",
+         "metadata": {"region": "eu", "owner": "ops"}},
+    ]
+
+    @pytest.fixture
+    def tools(self):
+        tools = Tools()
+        tools._index = _ResourceIndex()
+        tools._client.write_listeners.append(tools._index.apply_write)
+        return tools
+
+    @staticmethod
+    def _reply(payload, status_code=200):
+        mock = Mock(status_code=status_code, text=json.dumps(payload), headers={})
+        mock.json.return_value = payload
+        return mock
+
+    def _inventory(self, items=None):
+        items = self.INVENTORY if items is None else items
+        return lambda method, url, **kwargs: self._reply({"items": items, "total": len(items)})
+
+    @staticmethod
+    def _synced(tools):
+        """Wait for the background sync started by the last call."""
+        deadline = time.monotonic() + 5
+        while tools._index._syncing and time.monotonic() < deadline:
+            time.sleep(0.005)
+        assert not tools._index._syncing
+
+    def _load(self, tools):
+        tools.worklocal_search_resources("")
+        self._synced(tools)
+
+    @patch('requests.Session.request')
+    def test_first_query_loads_in_background_then_answers_locally(self, mock_request, tools):
+        mock_request.side_effect = self._inventory()
+
+        first = tools.worklocal_search_resources("web")
+        self._synced(tools)
+        second = tools.worklocal_search_resources("web", '{"status": "running"}')
+
+        urls = sorted(c.args[1] for c in mock_request.call_args_list)
+        assert urls == ["https://worklocal.app/resources", "https://worklocal.app/resources/search"]
+        sync = next(c for c in mock_request.call_args_list if c.args[1].endswith("/resources"))
+        assert sync.kwargs["params"] == {"limit": 200, "offset": 0}
+        assert "web-02" in first  # answered by the API while the index loads
+        assert "Found 1 resources" in second and "web-02" not in second
+
+    @patch('requests.Session.request')
+    def test_local_output_matches_server_output(self, mock_request, tools):
+        mock_request.side_effect = self._inventory()
+        self._load(tools)
+        local = tools.worklocal_list_resources("servers")
+
+        server = Tools()
+        mock_request.side_effect = self._inventory(self.INVENTORY[:2])
+        assert local == server.worklocal_list_resources("servers")
+
+    def test_queries_and_filters(self):
+        index = _ResourceIndex()
+        for resource in self.INVENTORY:
+            index.upsert(resource)
+
+        def names(results):
+            return [r["name"] for r in results]
+
+        assert names(index.search("prim")) == ["db-primary"]
+        assert names(index.search("we")) == ["web-01", "web-02"]  # name prefix
+        assert names(index.search("res-3")) == ["db-primary"]
+        assert names(index.search("", {"region": "eu"})) == ["cache", "web-01"]
+        assert names(index.search("", {"metadata.owner": "*"})) == ["cache"]
+        assert names(index.search("web", {"type": "server", "region": "us"})) == ["web-02"]
+        assert index.search("", {"type": "nothing"}) == []
+        assert index.resolve("DB-Primary") == "res-3"
+        assert index.resolve("res-1") == "res-1"
+
+    def test_lookups_stay_fast_on_large_inventories(self):
+        index = _ResourceIndex()
+        for i in range(20000):
+            index.upsert({
+                "id": f"res-{i}",
+                "name": f"node-{i:05d}",
+                "type": ("server", "container")[i % 2],
+                "status": "running",
+                "metadata": {"rack": str(i % 100)},
+            })
+
+        start = time.perf_counter()
+        for _ in range(100):
+            results = index.search("node-1234", {"type": "container"})
+        per_query = (time.perf_counter() - start) / 100
+
+        assert [r["id"] for r in results] == [
+            "res-12341", "res-12343", "res-12345", "res-12347", "res-12349"
+        ]
+        assert per_query < 0.005
+
+    @patch('requests.Session.request')
+    def test_writes_are_applied_to_the_index(self, mock_request, tools):
+        mock_request.side_effect = self._inventory()
+        self._load(tools)
+
+        mock_request.side_effect = None
+        mock_request.return_value = self._reply({"id": "res-9", "message": "created"}, 201)
+        tools.worklocal_create_resource("web-03", "server")
+        mock_request.return_value = self._reply({}, 200)
+        tools.worklocal_update_resource("res-1", '{"status": "stopped"}')
+        mock_request.return_value = Mock(status_code=204, headers={})
+        tools.worklocal_delete_resource("res-2")
+
+        calls = mock_request.call_count
+        result = tools.worklocal_search_resources("web")
+        assert mock_request.call_count == calls
+        assert "web-03" in result and "web-02" not in result
+        assert tools._index.search("web-01")[0]["status"] == "stopped"
+
+    @patch('requests.Session.request')
+    def test_incremental_then_full_sync(self, mock_request, tools):
+        mock_request.side_effect = self._inventory()
+        self._load(tools)
+
+        tools._index.sync_interval = 0
+        mock_request.side_effect = self._inventory([{**self.INVENTORY[0], "name": "web-renamed"}])
+        tools.worklocal_search_resources("web")
+        self._synced(tools)
+        tools._index.sync_interval = 60
+
+        assert "updated_since" in mock_request.call_args.kwargs["params"]
+        result = tools.worklocal_search_resources("web")
+        assert "web-renamed" in result and "web-02" in result
+
+        tools._index.sync_interval = tools._index.full_sync_interval = 0
+        mock_request.side_effect = self._inventory(self.INVENTORY[:1])
+        tools.worklocal_search_resources("web")
+        self._synced(tools)
+        tools._index.sync_interval = tools._index.full_sync_interval = 60
+
+        assert "updated_since" not in mock_request.call_args.kwargs["params"]
+        result = tools.worklocal_search_resources("web")
+        assert "web-01" in result and "web-02" not in result
+
+    @patch('requests.Session.request')
+    def test_queries_do_not_wait_for_a_full_sync(self, mock_request, tools):
+        mock_request.side_effect = self._inventory()
+        self._load(tools)
+
+        release = threading.Event()
+
+        def slow_inventory(method, url, **kwargs):
+            release.wait(5)
+            return self._reply({"items": self.INVENTORY[:1], "total": 1})
+
+        tools._index.sync_interval = tools._index.full_sync_interval = 0
+        mock_request.side_effect = slow_inventory
+        start = time.perf_counter()
+        during = tools.worklocal_search_resources("web")
+        elapsed = time.perf_counter() - start
+        release.set()
+        self._synced(tools)
+        tools._index.sync_interval = tools._index.full_sync_interval = 60
+
+        assert elapsed < 1 and "web-02" in during  # The index as it was before the sync
+        assert "web-02" not in tools.worklocal_search_resources("web")
+
+    @patch('requests.Session.request')
+    def test_falls_back_to_server_when_stale(self, mock_request, tools):
+        mock_request.side_effect = self._inventory()
+        self._load(tools)
+
+        tools._index.sync_interval = tools._index.max_staleness = 0
+
+        def failing_sync(method, url, **kwargs):
+            if url.endswith("/resources"):
+                return self._reply({}, 500)
+            return self._reply([{"id": "res-7", "name": "from-server"}])
+
+        mock_request.side_effect = failing_sync
+        result = tools.worklocal_search_resources("web")
+        self._synced(tools)
+
+        assert "from-server" in result
+
+        tools._index.fallback_to_server = False
+        assert "web-01" in tools.worklocal_search_resources("web")
+        self._synced(tools)
+
+    @patch('requests.Session.request')
+    def test_get_resource_accepts_a_name(self, mock_request, tools):
+        mock_request.side_effect = self._inventory()
+        self._load(tools)
+
+        mock_request.side_effect = None
+        mock_request.return_value = self._reply(self.INVENTORY[2])
+        tools.worklocal_get_resource("db-primary")
+
+        assert mock_request.call_args.args[1].endswith("/resources/res-3")
+
+
+class TestActionJobs:
+    FAST = {"status_path": "/jobs/{job_id}", "wait_timeout": 5, "initial_interval": 0.01,
+            "max_interval": 0.05, "backoff": 2}
+
+    @pytest.fixture
+    def tools(self):
+        tools = Tools()
+        tools.jobs = dict(self.FAST)
+        return tools
+
+    @staticmethod
+    def _reply(payload, status_code=200, headers=None):
+        mock = Mock(status_code=status_code, text=json.dumps(payload), headers=headers or {})
+        mock.json.return_value = payload
+        return mock
+
+    @patch('requests.Session.request')
+    def test_job_mode_returns_handle(self, mock_request, tools):
+        mock_request.return_value = self._reply({"job_id": "job-1", "status": "pending"}, 202)
+
+        result = tools.worklocal_execute_action("res-1", "deploy", mode="job")
+
+        assert mock_request.call_args.kwargs["headers"]["Prefer"] == "respond-async"
+        assert result.startswith("⏳") and "`job-1`" in result
+        assert "worklocal_wait_action('job-1')" in result
+
+    @patch('requests.Session.request')
+    def test_accepted_reply_is_not_a_failure(self, mock_request, tools):
+        mock_request.return_value = self._reply({}, 202, {"Location": "/jobs/job-9"})
+
+        result = tools.worklocal_execute_action("res-1", "restart")
+
+        assert "Prefer" not in mock_request.call_args.kwargs["headers"]
+        assert "`job-9`" in result and "Failed" not in result
+
+    @patch('requests.Session.request')
+    def test_timeout_is_reported_as_unknown_outcome(self, mock_request, tools):
+        mock_request.side_effect = requests.exceptions.ReadTimeout("read timed out")
+
+        result = tools.worklocal_execute_action("res-1", "restart")
+
+        assert result.startswith("⚠️") and "may still be running" in result
+        assert tools.worklocal_execute_action("res-1", "restart", mode="later").startswith("❌")
+
+    @patch('requests.Session.request')
+    def test_wait_polls_until_done(self, mock_request, tools):
+        mock_request.side_effect = [
+            self._reply({"status": "running", "progress": 10}),
+            self._reply({"status": "running", "progress": 60}),
+            self._reply({"status": "succeeded", "message": "Deployed v2"}),
+        ]
+
+        result = tools.worklocal_wait_action("job-1")
+
+        assert mock_request.call_args.args[1].endswith("/jobs/job-1")
+        assert mock_request.call_count == 3
+        assert result.startswith("✅ Deployed v2") and "finished in" in result
+
+    @patch('requests.Session.request')
+    def test_deadline_reports_still_running(self, mock_request, tools):
+        mock_request.side_effect = lambda *a, **kw: self._reply(
+            {"status": "running", "progress": 30}
+        )
+
+        start = time.perf_counter()
+        result = tools.worklocal_wait_action("job-1", timeout=0.1)
+
+        assert time.perf_counter() - start < 0.5
+        assert result.startswith("⏳ Running (30%)")
+        assert "still running" in result and "❌" not in result
+
+    @patch('requests.Session.request')
+    def test_poll_after_is_parsed_defensively(self, mock_request, tools):
+        mock_request.side_effect = [
+            self._reply({"status": "running", "poll_after": "soon"}),
+            self._reply({"status": "running", "poll_after": 3600}),
+            self._reply({"status": "succeeded"}),
+        ]
+
+        start = time.perf_counter()
+        result = tools.worklocal_wait_action("job-1", timeout=0.2)
+
+        # The bad hint is ignored; the hour-long one is cut to the deadline,
+        # where the last poll runs
+        assert mock_request.call_count == 3 and time.perf_counter() - start < 1
+        assert result.startswith("✅")
+
+    @patch('requests.Session.request')
+    def test_batch_wait(self, mock_request, tools):
+        replies = {
+            "job-a": [self._reply({"status": "running"}), self._reply({"status": "completed"})],
+            "job-b": [self._reply({"status": "failed", "error": "image not found"})],
+            "job-c": [self._reply({}, 404)],
+        }
+        mock_request.side_effect = lambda method, url, **kw: replies[url.rsplit("/", 1)[1]].pop(0)
+
+        result = tools.worklocal_wait_action('["job-a", "job-b", "job-c"]')
+
+        assert "3 in" in result and "(1 succeeded, 2 failed, 0 still running)" in result
+        assert "| `job-a` | ✅ Succeeded |" in result
+        assert "| `job-b` | ❌ Failed: image not found |" in result
+        assert "| `job-c` | ❌ Job not found |" in result
+
+    def test_intervals_adapt_to_progress(self):
+        waiter = _JobWaiter(["j"], timeout=60, initial_interval=1, max_interval=8, backoff=2)
+
+        def running(progress, headers=None):
+            return self._reply({"status": "running", "progress": progress}, headers=headers)
+
+        waiter.update("j", running(10))
+        assert waiter.jobs["j"]["interval"] == 1
+        waiter.update("j", running(10))
+        waiter.update("j", running(10))
+        assert waiter.jobs["j"]["interval"] == 4
+        waiter.update("j", running(20))
+        assert waiter.jobs["j"]["interval"] == 1
+        for _ in range(5):
+            waiter.update("j", running(20))
+        assert waiter.jobs["j"]["interval"] == 8
+
+        waiter.update("j", running(20, {"Retry-After": "30"}))
+        assert waiter.next_delay() == pytest.approx(30, abs=0.5)
+
+
+class TestOutputFormats:
+    @pytest.fixture
+    def tools(self):
+        tools = Tools()
+        tools.page_size = 10
+        return tools
+
+    def _page(self, body):
+        mock = Mock(status_code=200, text=json.dumps(body), headers={})
+        mock.json.return_value = body
+        return mock
+
+    def _resources(self, count, total=None):
+        items = [
+            {"id": f"res-{i}", "name": f"web-{i}", "type": "server",
+             "status": "running" if i % 4 else "stopped"}
+            for i in range(count)
+        ]
+        return {"items": items, "total": total} if total is not None else items
+
+    @patch('requests.Session.request')
+    def test_compact_formats(self, mock_request, tools):
+        mock_request.return_value = self._page({"items": self._resources(2), "total": 2})
+
+        table = tools.worklocal_list_resources(limit=2, output_format="table")
+        csv = tools.worklocal_list_resources(limit=2, output_format="csv")
+        jsonl = tools.worklocal_list_resources(limit=2, output_format="jsonl")
+
+        assert table == (
+            "| id | name | type | status |\n|---|---|---|---|\n"
+            "| res-0 | web-0 | server | stopped |\n| res-1 | web-1 | server | running |\n"
+        )
+        assert csv == (
+            "id,name,type,status\n"
+            "res-0,web-0,server,stopped\n"
+            "res-1,web-1,server,running\n"
+        )
+        assert [json.loads(line) for line in jsonl.splitlines()] == self._resources(2)
+
+    @patch('requests.Session.request')
+    def test_summary_counts_instead_of_rows(self, mock_request, tools):
+        mock_request.return_value = self._page(self._resources(8, total=8))
+
+        result = tools.worklocal_search_resources("web", output_format="summary")
+
+        assert result == (
+            "Search results for 'web': 8 results · type: server 8 · status: running 6, stopped 2\n"
+        )
+
+    @patch('requests.Session.request')
+    def test_budget_cuts_whole_rows_and_stops_paging(self, mock_request, tools):
+        tools.page_size = 5
+        mock_request.side_effect = [
+            self._page({"items": self._resources(5), "total": 100}) for _ in range(4)
+        ]
+
+        result = tools.worklocal_list_resources(limit=20, max_chars=300)
+
+        assert len(result) <= 300
+        assert mock_request.call_count == 1
+        assert result.count("**web-") == 2
+        assert "98 more resources not shown (max_chars=300); call again with offset=2" in result
+
+    @patch('requests.Session.request')
+    def test_budget_clips_a_single_large_record(self, mock_request, tools):
+        metadata = {f"k{i}": "v" * 20 for i in range(50)}
+        resource = {"id": "res-1", "name": "web", "metadata": metadata}
+        mock_request.return_value = self._page(resource)
+
+        result = tools.worklocal_get_resource("res-1", max_chars=250)
+
+        assert len(result) <= 250
+        assert "**Name**: web" in result and "cut at max_chars=250" in result
+
+    @patch('requests.Session.request')
+    def test_batch_rows_drop_status_marks(self, mock_request, tools):
+        found = self._page({"id": "a", "name": "web", "type": "server", "status": "running"})
+        missing = Mock(status_code=404, text="", headers={})
+        mock_request.side_effect = (
+            lambda method, url, **kw: found if url.endswith("/a") else missing
+        )
+
+        result = tools.worklocal_batch_get_resources('["a", "b"]', output_format="csv")
+
+        rows = result.splitlines()
+        assert rows[0] == "id,outcome,result,ms"
+        assert rows[1].startswith("a,ok,\"web (server, running)\",")
+        assert rows[2].startswith("b,failed,Not found,")
+
+    def test_invalid_options(self, tools):
+        result = tools.worklocal_list_resources(output_format="xml")
+        assert result.startswith("❌ Unknown output_format")
+        assert tools.worklocal_list_resources(max_chars=0).startswith("❌ max_chars")
+
+    def test_renderer_keeps_whole_rows_within_budget(self):
+        view = _View("items", ("n",), lambda idx, row: f"{idx}. {row['n']}\n")
+        out = _Renderer(view, "markdown", max_chars=150)
+
+        assert out.add([{"n": "x" * 8}] * 20) is False
+
+        result = out.render("Items\n")
+        assert len(result) <= 150
+        assert result.startswith("Items\n1. xxxxxxxx\n2. xxxxxxxx\n")
+        assert result.count("xxxxxxxx") == 4 and "… 16 more items not shown" in result
+
+
+class TestJsonDecoding:
+    def _raw(self, body, status_code=200):
+        response = requests.Response()
+        response.status_code = status_code
+        response._content = body
+        response.encoding = "utf-8"
+        return response
+
+    def test_body_is_decoded_once_from_bytes(self):
+        response = self._raw(b'{"items": [{"id": "res-1"}]}')
+
+        with patch.object(requests.Response, "json", side_effect=AssertionError("slow path")):
+            first = _json_body(response)
+            second = _json_body(response)
+
+        assert first == {"items": [{"id": "res-1"}]}
+        assert second is first
+
+    def test_malformed_body_raises_the_clients_error(self):
+        with pytest.raises(requests.exceptions.JSONDecodeError):
+            _json_body(self._raw(b"<html>oops</html>"))
+
+    def test_models_read_like_the_original_dict(self):
+        data = {"id": "res-1", "name": "web", "zone": "a", "metadata": {"region": "eu"}}
+        resource = _Resource(data)
+
+        assert resource == data and dict(resource) == data
+        assert resource["zone"] == "a" and resource.get("status", "Unknown") == "Unknown"
+        assert "status" not in resource and len(resource) == 4
+        assert {**resource, "status": "running"}["status"] == "running"
+        with pytest.raises(KeyError):
+            resource["type"]
+
+    def test_cached_bodies_hold_models(self):
+        page = _typed_body("search", {"items": [{"id": "res-1", "score": 0.9}], "total": 1})
+        metrics = _typed_body("metrics", {"cpu": {"current": 1, "max": 2}, "mem": {"samples": []}})
+
+        assert type(page["items"][0]).__name__ == "_SearchResult"
+        assert page["items"][0]["score"] == 0.9
+        assert page["total"] == 1
+        assert isinstance(metrics["cpu"], _MetricSummary) and metrics["mem"] == {"samples": []}
+
+    @patch('requests.Session.request')
+    def test_tools_render_models_like_dicts(self, mock_request):
+        body = {"id": "res-1", "name": "web", "type": "server", "status": "running"}
+        mock_request.return_value = self._raw(json.dumps(body).encode())
+        tools = Tools()
+
+        first = tools.worklocal_get_resource("res-1")
+        entry = tools._client.cache.get(tools._client.cache.key("/resources/res-1"))
+        batch = tools.worklocal_batch_get_resources('["res-1"]')
+
+        assert isinstance(entry.json(), _Resource)
+        assert "**Name**: web" in first and first == tools.worklocal_get_resource("res-1")
+        assert "✅ web (server, running)" in batch
+
+
+class TestCircuitBreaker:
+    @pytest.fixture
+    def tools(self):
+        tools = Tools()
+        tools._client.breaker = _CircuitBreaker(min_calls=4, open_duration=60)
+        return tools
+
+    def _response(self, status_code, body=None):
+        response = requests.Response()
+        response.status_code = status_code
+        response._content = json.dumps(body if body is not None else {}).encode()
+        return response
+
+    def test_opens_on_failure_rate_and_recovers_through_a_probe(self):
+        breaker = _CircuitBreaker(failure_rate=0.5, min_calls=4, open_duration=0.05)
+        for failed in (False, True, False, True):
+            breaker.exit("metrics", breaker.enter("metrics"), 0.01, failed)
+
+        with pytest.raises(_CircuitOpenError, match="'metrics'.*circuit open"):
+            breaker.enter("metrics")
+        assert breaker.enter("search") is False  # other endpoints are unaffected
+
+        time.sleep(0.06)
+        assert breaker.enter("metrics") is True  # the probe
+        with pytest.raises(_CircuitOpenError):
+            breaker.enter("metrics")  # only one probe at a time
+        breaker.exit("metrics", True, 0.01, False)
+
+        assert breaker.states()["metrics"]["state"] == "closed"
+        assert breaker.states()["metrics"]["trips"] == 1
+
+    def test_failed_probe_reopens_and_slow_calls_count_as_failures(self):
+        breaker = _CircuitBreaker(min_calls=2, slow_call_duration=1.0, open_duration=0.05)
+        for _ in range(2):
+            breaker.exit("resource", breaker.enter("resource"), 1.5, False)
+        assert breaker.states()["resource"]["state"] == "open"
+
+        time.sleep(0.06)
+        breaker.exit("resource", breaker.enter("resource"), 0.01, True)
+
+        assert breaker.states()["resource"]["state"] == "open"
+        assert breaker.states()["resource"]["trips"] == 2
+
+    @patch('requests.Session.request')
+    def test_fails_fast_once_open(self, mock_request, tools):
+        mock_request.return_value = self._response(500)
+        for i in range(4):
+            tools.worklocal_execute_action(f"res-{i}", "start")
+        mock_request.reset_mock()
+
+        result = tools.worklocal_execute_action("res-9", "start")
+
+        assert result.startswith("❌ Error executing action: WorkLocal API is failing on 'action'")
+        mock_request.assert_not_called()
+
+    @patch('requests.Session.request')
+    def test_serves_stale_cache_entries_while_open(self, mock_request, tools):
+        mock_request.return_value = self._response(200, {"id": "res-1", "name": "web"})
+        tools.worklocal_get_resource("res-1")
+        entry = tools._client.cache.get(tools._client.cache.key("/resources/res-1"))
+        entry.expires_at = time.monotonic() - 1
+        mock_request.side_effect = requests.exceptions.ConnectionError("refused")
+        for i in range(4):
+            tools.worklocal_get_resource(f"res-{i + 2}")
+
+        result = tools.worklocal_get_resource("res-1")
+
+        assert "**Name**: web" in result
+        assert result.endswith("cached data that may be out of date.")
+        assert "circuit open" in tools.worklocal_get_resource("res-7")
+
+    @patch('requests.Session.request')
+    def test_rate_limiter_waits_are_not_slow_calls(self, mock_request, tools):
+        mock_request.return_value = self._response(200, {"id": "res-1", "name": "web"})
+        tools._client.breaker = _CircuitBreaker(min_calls=4, slow_call_duration=0.05)
+        tools._client.limiter = _TokenBucket(requests_per_minute=600, burst_size=1)
+
+        for i in range(6):
+            assert "**Name**: web" in tools.worklocal_get_resource(f"res-{i}")
+
+        assert tools._client.breaker.states()["resource"]["state"] == "closed"
+
+    @patch('requests.Session.request')
+    def test_health_check_reports_and_feeds_the_breaker(self, mock_request, tools):
+        mock_request.side_effect = requests.exceptions.ConnectionError("refused")
+        for i in range(4):
+            tools.worklocal_get_metrics(f"res-{i}")
+
+        down = tools.worklocal_health_check()
+        assert down.startswith("❌ Error connecting to API")
+        assert "- `metrics`: open, failing fast for another 60s (tripped 1x)" in down
+
+        mock_request.side_effect = None
+        mock_request.return_value = self._response(200, {"cpu": {"current": 1}})
+        up = tools.worklocal_health_check()
+        assert "- `metrics`: open, the next call probes the API" in up
+
+        assert "CPU" in tools.worklocal_get_metrics("res-1")
+        healthy = tools.worklocal_health_check()
+        assert healthy.startswith("✅") and "Circuit breakers" not in healthy
+
+
+def _json_response(status_code, body, headers=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = json.dumps(body).encode()
+    response.headers.update(headers or {})
+    return response
+
+
+class TestDeadlines:
+    @patch('requests.Session.request')
+    def test_request_timeouts_shrink_to_the_deadline(self, mock_request):
+        mock_request.return_value = _json_response(200, {"id": "res-1"})
+
+        with deadline(2.0):
+            Tools().worklocal_get_resource("res-1")
+
+        assert 1.5 < mock_request.call_args.kwargs["timeout"] <= 2.0
+
+    @patch('requests.Session.request')
+    def test_nothing_is_sent_after_the_deadline(self, mock_request):
+        with deadline(0):
+            result = Tools().worklocal_get_resource("res-1")
+
+        assert result.startswith("❌") and "deadline" in result
+        mock_request.assert_not_called()
+
+    @patch('requests.Session.request')
+    def test_expired_deadlines_leave_the_breaker_closed(self, mock_request):
+        mock_request.return_value = _json_response(200, {"id": "res-1", "name": "web"})
+        tools = Tools()
+        tools._client.breaker = _CircuitBreaker(min_calls=4)
+
+        with deadline(0):
+            for i in range(12):
+                tools.worklocal_get_resource(f"res-{i}")
+
+        mock_request.assert_not_called()
+        assert "resource" not in tools._client.breaker.states()  # never admitted, so never failed
+        assert "**Name**: web" in tools.worklocal_get_resource("res-1")
+
+    @patch('requests.Session.request')
+    def test_retry_pauses_stop_at_the_deadline(self, mock_request, monkeypatch):
+        monkeypatch.setenv("WORKLOCAL_DEADLINE", "0.5")
+        _load_config.cache_clear()
+        mock_request.return_value = _json_response(429, {}, {"Retry-After": "5"})
+        tools = Tools()
+
+        start = time.monotonic()
+        result = tools.worklocal_get_resource("res-1")
+
+        assert time.monotonic() - start < 1
+        assert "429" in result and mock_request.call_count == 1
+
+    @patch('requests.Session.request')
+    def test_deadline_header(self, mock_request):
+        mock_request.return_value = _json_response(200, {"id": "res-1"})
+        tools = Tools()
+        tools._client.deadline_header = "X-Request-Timeout"
+
+        tools.worklocal_get_resource("res-1")
+        with deadline(3.0):
+            tools.worklocal_get_resource("res-2")
+
+        first, second = (c.kwargs["headers"] for c in mock_request.call_args_list)
+        assert "X-Request-Timeout" not in first
+        assert 2500 < int(second["X-Request-Timeout"]) <= 3000
+
+
+class TestHedging:
+    def _warmed(self, **options):
+        hedger = _Hedger(min_samples=5, min_delay=0.02, **options)
+        for _ in range(5):
+            hedger.observe("resource", 0.01)
+        return hedger
+
+    def test_delay_follows_recent_latencies_and_budget_caps_backups(self):
+        hedger = _Hedger(min_samples=3, min_delay=0.001, budget=0.5)
+        assert hedger.delay("resource") is None  # too few samples yet
+        for seconds in (0.01, 0.02, 0.2):
+            hedger.observe("resource", seconds)
+
+        assert hedger.delay("metrics") is None  # not a hedged endpoint
+        assert 0.1 < hedger.delay("resource") < 0.2
+        assert hedger.spend() is True and hedger.spend() is False  # 2 requests x 0.5 tokens
+
+    @patch('requests.Session.request')
+    def test_slow_read_is_hedged_and_backup_wins(self, mock_request):
+        def reply(method, url, **kwargs):
+            if mock_request.call_count == 1:
+                time.sleep(0.5)
+                return _json_response(200, {"id": "res-1", "name": "slow"})
+            return _json_response(200, {"id": "res-1", "name": "fast"})
+
+        mock_request.side_effect = reply
+        tools = Tools()
+        tools._client.hedger = hedger = self._warmed(budget=1.0)
+
+        start = time.monotonic()
+        result = tools.worklocal_get_resource("res-1")
+
+        assert "fast" in result and time.monotonic() - start < 0.4
+        assert (hedger.issued, hedger.won) == (1, 1)
+        assert 'worklocal_hedge_won_total{tool="worklocal_get_resource"}' in metrics_text()
+
+    @patch('requests.Session.request')
+    def test_no_backup_without_budget_or_for_fast_reads(self, mock_request):
+        def reply(method, url, **kwargs):
+            time.sleep(0.05 if url.endswith("slow") else 0)
+            return _json_response(200, {"id": "x"})
+
+        mock_request.side_effect = reply
+        tools = Tools()
+        tools._client.hedger = hedger = self._warmed(budget=0.01)
+
+        tools.worklocal_get_resource("fast")
+        tools.worklocal_get_resource("slow")
+
+        assert mock_request.call_count == 2 and hedger.issued == 0
+
+
+class TestWriteCoalescing:
+    def test_composed_patches_match_applying_them_in_turn(self):
+        first = {"config": {"cpu": 2, "disk": None}, "tags": ["a"]}
+        second = {"config": {"cpu": 4, "memory": "8GB"}, "tags": None}
+
+        assert _compose_patches(first, second) == {
+            "config": {"cpu": 4, "disk": None, "memory": "8GB"},
+            "tags": None,
+        }
+        # Patching into a member the first patch removes would need a replace
+        assert _compose_patches({"config": None}, {"config": {"cpu": 4}}) is None
+
+    @patch('requests.Session.request')
+    def test_concurrent_updates_go_out_as_one_patch(self, mock_request):
+        mock_request.return_value = _json_response(200, {"id": "res-1", "name": "web"})
+        tools = Tools()
+        tools._client.coalescer = coalescer = _WriteCoalescer(window=0.2)
+        updates = [{"cpu": 4}, {"memory": "8GB"}, {"config": {"debug": True}}]
+
+        with ThreadPoolExecutor(3) as pool:
+            results = list(pool.map(
+                lambda u: tools.worklocal_update_resource("res-1", json.dumps(u)), updates
+            ))
+
+        assert all("✅" in r for r in results)
+        assert mock_request.call_count == 1
+        assert mock_request.call_args.kwargs["json"] == {
+            "cpu": 4, "memory": "8GB", "config": {"debug": True}
+        }
+        assert (coalescer.sent, coalescer.merged) == (1, 2)
+
+    @patch('requests.Session.request')
+    def test_rejected_batch_is_replayed_per_caller(self, mock_request):
+        def reply(method, url, **kwargs):
+            body = kwargs["json"]
+            status = 422 if "bogus" in body else 200
+            payload = {"message": "bad field"} if status == 422 else {"id": "res-1"}
+            return _json_response(status, payload)
+
+        mock_request.side_effect = reply
+        client = Tools()._client
+        client.coalescer = _WriteCoalescer(window=0.2)
+        patches = [{"cpu": 4}, {"bogus": 1}]
+
+        with ThreadPoolExecutor(2) as pool:
+            statuses = list(pool.map(
+                lambda p: client.request(
+                    "PATCH", "/resources/res-1", json=p, endpoint="update"
+                ).status_code,
+                patches,
+            ))
+
+        assert statuses == [200, 422]
+        sent = [c.kwargs["json"] for c in mock_request.call_args_list]
+        assert sent[0] == {"cpu": 4, "bogus": 1}
+        assert sorted(sent[1:], key=json.dumps) == [{"bogus": 1}, {"cpu": 4}]
+
+    @patch('requests.Session.request')
+    def test_action_flushes_pending_updates_first(self, mock_request):
+        mock_request.return_value = _json_response(200, {"id": "res-1"})
+        tools = Tools()
+        tools._client.coalescer = _WriteCoalescer(window=5)
+
+        with ThreadPoolExecutor(1) as pool:
+            update = pool.submit(tools.worklocal_update_resource, "res-1", '{"cpu": 4}')
+            while not tools._client.coalescer._open:
+                time.sleep(0.001)
+            start = time.monotonic()
+            tools.worklocal_execute_action("res-1", "restart")
+
+        assert "✅" in update.result() and time.monotonic() - start < 1
+        assert [c.args[0] for c in mock_request.call_args_list] == ["PATCH", "POST"]
+
+    @patch('requests.Session.request')
+    def test_batch_update_merges_repeated_ids_in_order(self, mock_request):
+        mock_request.return_value = _json_response(200, {"id": "res-1"})
+        tools = Tools()
+        tools._client.coalescer = _WriteCoalescer(window=0.2)
+        updates = [
+            {"id": "res-1", "updates": {"cpu": 2}},
+            {"id": "res-2", "updates": {"cpu": 8}},
+            {"id": "res-1", "updates": {"cpu": 4}},
+        ]
+
+        result = tools.worklocal_batch_update_resources(json.dumps(updates))
+
+        assert "3 succeeded" in result
+        sent = sorted(
+            (c.args[1].rsplit("/", 1)[-1], c.kwargs["json"]["cpu"])
+            for c in mock_request.call_args_list
+        )
+        assert sent == [("res-1", 4), ("res-2", 8)]
+
+
+class TestMultiTenancy:
+    def _response(self, body):
+        response = requests.Response()
+        response.status_code = 200
+        response._content = json.dumps(body).encode()
+        return response
+
+    def _sent_auth(self, mock_request):
+        return [c.kwargs["headers"].get("Authorization") for c in mock_request.call_args_list]
+
+    def test_instances_share_one_client(self):
+        first, second = Tools(), Tools()
+
+        assert first._client is second._client
+        assert first._client.session is second._client.session
+
+    @patch('requests.Session.request')
+    def test_user_keys_get_their_own_credentials_and_cache_partition(self, mock_request):
+        mock_request.side_effect = lambda *a, **kw: self._response({"id": "res-1", "name": "web"})
+        tools = Tools()
+        alice = {"id": "u1", "valves": Tools.UserValves(api_key="alice-key")}
+        bob = {"id": "u2", "valves": {"api_key": "bob-key"}}
+
+        for user in (alice, alice, bob, None):
+            assert "web" in tools.worklocal_get_resource("res-1", __user__=user)
+
+        assert self._sent_auth(mock_request) == ["Bearer alice-key", "Bearer bob-key", None]
+
+    @patch('requests.Session.request')
+    def test_admin_valves_rehome_the_instance(self, mock_request):
+        mock_request.return_value = self._response({"status": "ok"})
+        tools, other = Tools(), Tools()
+        tools.valves = Tools.Valves(api_key="admin-key")
+
+        tools.worklocal_health_check()
+
+        assert self._sent_auth(mock_request) == ["Bearer admin-key"]
+        assert tools._client is not other._client
+        assert tools.headers["Authorization"] == "Bearer admin-key"
+
+    @patch('requests.Session.request')
+    def test_tenant_writes_invalidate_but_do_not_feed_the_local_index(self, mock_request):
+        mock_request.side_effect = [
+            self._response({"id": "res-8", "name": "mine"}),
+            self._response({"id": "res-9", "name": "ours"}),
+        ]
+        tools = Tools()
+        tools._index = _ResourceIndex()
+        tools._client.write_listeners.append(tools._index.apply_write)
+        user = {"valves": {"api_key": "alice-key"}}
+
+        tools.worklocal_create_resource("mine", "server", __user__=user)
+        tools.worklocal_create_resource("ours", "server")
+
+        assert tools._index.resolve("mine") == "mine"
+        assert tools._index.resolve("ours") == "res-9"
+
+    def test_limiter_budgets_are_per_tenant(self):
+        bucket = _TokenBucket(requests_per_minute=60, burst_size=1)
+
+        assert bucket.reserve() == 0 and bucket.reserve() > 0
+        assert bucket.tenant("a").reserve() == 0
+        assert bucket.tenant("a") is bucket.tenant("a") and bucket.tenant("") is bucket